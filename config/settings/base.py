@@ -412,6 +412,14 @@ if ENABLE_AZURE_COGNITIVE_SEARCH:
         'SCHOOL_INDEX_NAME': env('SCHOOL_INDEX_NAME', default='giga_schools'),
     }
 
+# School search backend of the global search API: 'azure' (Cognitive Search) or 'postgres' (pg_trgm and tsvector
+# over the SchoolSearchDocument table, rebuilt by the index_rebuild_schools command)
+SCHOOL_SEARCH_BACKEND = env('SCHOOL_SEARCH_BACKEND', default='azure')
+
+# Documents per upload request of index_rebuild_schools and number of upload requests in flight
+SCHOOL_SEARCH_INDEX_BATCH_SIZE = env.int('SCHOOL_SEARCH_INDEX_BATCH_SIZE', default=1000)
+SCHOOL_SEARCH_INDEX_UPLOAD_WORKERS = env.int('SCHOOL_SEARCH_INDEX_UPLOAD_WORKERS', default=4)
+
 DATA_SOURCE_CONFIG = {
     'SCHOOL_MASTER': {
         'SHARE_NAME': env('SCHOOL_MASTER_SHARE_NAME', default='gold'),
@@ -436,6 +444,10 @@ DATA_SOURCE_CONFIG = {
     'DAILY_CHECK_APP': {
         'BASE_URL': env('DAILY_CHECK_APP_BASE_URL', default=None),
         'API_CODE': env('DAILY_CHECK_APP_API_CODE', default='DAILY_CHECK_APP'),
+        # Pages requested in parallel and retry policy of the measurements fetch
+        'FETCH_CONCURRENCY': env.int('DAILY_CHECK_APP_FETCH_CONCURRENCY', default=4),
+        'FETCH_RETRIES': env.int('DAILY_CHECK_APP_FETCH_RETRIES', default=3),
+        'FETCH_BACKOFF_FACTOR': env.float('DAILY_CHECK_APP_FETCH_BACKOFF_FACTOR', default=0.5),
     },
 }
 
@@ -521,4 +533,66 @@ AI_TRANSLATION_CACHE_KEY_LIMIT = env('AI_TRANSLATION_CACHE_KEY_LIMIT', default=2
 
 GIGA_METER_ENABLE_AUTO_SYNC = env.bool('GIGA_METER_ENABLE_AUTO_SYNC', default=True)
 
+# Use the set based SQL statements for live data aggregations instead of the school by school ORM queries
+ENABLE_BULK_AGGREGATIONS = env.bool('ENABLE_BULK_AGGREGATIONS', default=True)
+
+# Raw live measurements (RealTimeConnectivity, DailyCheckAppMeasurementData and QoSData) retention. Tables converted
+# with the partition_live_data_tables command get 'day' or 'week' partitions created this many days ahead and
+# dropped once they are older than the retention.
+LIVE_DATA_RETENTION_DAYS = env.int('LIVE_DATA_RETENTION_DAYS', default=30)
+LIVE_DATA_PARTITION_INTERVAL = env('LIVE_DATA_PARTITION_INTERVAL', default='week')
+LIVE_DATA_PARTITIONS_AHEAD_DAYS = env.int('LIVE_DATA_PARTITIONS_AHEAD_DAYS', default=14)
+# 'month' or 'year' partitions of SchoolDailyStatus once converted with the partition_school_daily_status command
+SCHOOL_DAILY_STATUS_PARTITION_INTERVAL = env('SCHOOL_DAILY_STATUS_PARTITION_INTERVAL', default='year')
+
+# Aggregate only the school days recorded as dirty by the live data ingestion instead of every school of every country
+ENABLE_INCREMENTAL_AGGREGATIONS = env.bool('ENABLE_INCREMENTAL_AGGREGATIONS', default=True)
+
+# Serve the global and connectivity statistics from the per country/admin1 summary tables when no advanced filter
+# is applied. Populate the tables with the refresh_statistics_summary command before enabling it.
+ENABLE_STATISTICS_SUMMARY = env.bool('ENABLE_STATISTICS_SUMMARY', default=False)
+
+# Draw the school map tiles from the SchoolMapState table instead of joining the schools with their weekly status
+# and real time registration. Populate the table with the refresh_school_map_state command before enabling it.
+ENABLE_SCHOOL_MAP_STATE = env.bool('ENABLE_SCHOOL_MAP_STATE', default=False)
+
+# Sampled map tiles draw at most one school per cell of a SCHOOL_MAP_THINNING_GRID_SIZE x SCHOOL_MAP_THINNING_GRID_SIZE
+# grid of the tile, every school is drawn from SCHOOL_MAP_THINNING_MAX_ZOOM. Used with ENABLE_SCHOOL_MAP_STATE.
+SCHOOL_MAP_THINNING_GRID_SIZE = env.int('SCHOOL_MAP_THINNING_GRID_SIZE', default=128)
+SCHOOL_MAP_THINNING_MAX_ZOOM = env.int('SCHOOL_MAP_THINNING_MAX_ZOOM', default=12)
+
+# Below SCHOOL_MAP_CLUSTER_ZOOM the map tiles draw the SchoolMapCluster rows of a SCHOOL_MAP_CLUSTER_GRID_SIZE x
+# SCHOOL_MAP_CLUSTER_GRID_SIZE grid of the tile instead of the schools. Needs ENABLE_SCHOOL_MAP_STATE, populate the
+# clusters with the refresh_school_map_state command before enabling it.
+ENABLE_SCHOOL_MAP_CLUSTERS = env.bool('ENABLE_SCHOOL_MAP_CLUSTERS', default=False)
+SCHOOL_MAP_CLUSTER_ZOOM = env.int('SCHOOL_MAP_CLUSTER_ZOOM', default=7)
+SCHOOL_MAP_CLUSTER_GRID_SIZE = env.int('SCHOOL_MAP_CLUSTER_GRID_SIZE', default=32)
+
+# Pre-rendered vector tile store for the data layer map: 'redis', 'disk' or empty string to disable it
+TILE_STORE_BACKEND = env('TILE_STORE_BACKEND', default='redis')
+TILE_STORE_DIRECTORY = env('TILE_STORE_DIRECTORY', default=root('tiles'))
+TILE_STORE_TIMEOUT = env.int('TILE_STORE_TIMEOUT', default=CACHE_CONTROL_MAX_AGE)
+# Tiles up to this zoom level are served from the tile store and pre-rendered by the warming task
+TILE_STORE_MAX_ZOOM = env.int('TILE_STORE_MAX_ZOOM', default=8)
+
+# Only one refresh of an expired/invalidated soft cache entry is queued within this many seconds,
+# concurrent readers keep getting the stale value meanwhile
+SOFT_CACHE_REFRESH_LOCK_TIMEOUT = env.int('SOFT_CACHE_REFRESH_LOCK_TIMEOUT', default=5 * 60)
+
+# Soft cache entries with a soft timeout are dropped by Redis after this many soft timeouts without a rewrite,
+# so the entries which are invalidated and never read again do not stay forever
+SOFT_CACHE_TIMEOUT_FACTOR = env.int('SOFT_CACHE_TIMEOUT_FACTOR', default=7)
+
+# Number of threads used to refresh the registered cached computations inside one warming task
+CACHE_WARMING_WORKERS = env.int('CACHE_WARMING_WORKERS', default=4)
+
+# Number of Delta Sharing tables (countries) pulled in parallel by the School Master and QoS syncs,
+# and how many of them can write to the DB at the same time
+DATA_SOURCE_SYNC_WORKERS = env.int('DATA_SOURCE_SYNC_WORKERS', default=4)
+DATA_SOURCE_SYNC_DB_WRITERS = env.int('DATA_SOURCE_SYNC_DB_WRITERS', default=2)
+
+# Local Parquet cache of the downloaded Delta Sharing table versions, max size in bytes, 0 to disable it
+DATA_SOURCE_CHANGE_CACHE_DIRECTORY = env('DATA_SOURCE_CHANGE_CACHE_DIRECTORY', default=root('delta_sharing_cache'))
+DATA_SOURCE_CHANGE_CACHE_MAX_SIZE = env.int('DATA_SOURCE_CHANGE_CACHE_MAX_SIZE', default=5 * 1024 * 1024 * 1024)
+
 UNDER_TEST = (len(sys.argv) > 1 and sys.argv[1] == 'test')
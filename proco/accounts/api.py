@@ -10,13 +10,16 @@ from django.contrib.admin.models import LogEntry
 from django.db.models import Case, IntegerField, Value, When
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_control
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions
 from rest_framework import status as rest_status
 from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
 from rest_framework.utils.urls import remove_query_param
 from rest_framework.views import APIView
 
@@ -28,6 +31,12 @@ from proco.accounts.config import app_config as account_config
 from proco.connection_statistics import models as statistics_models
 from proco.connection_statistics.config import app_config as statistics_configs
 from proco.connection_statistics.models import SchoolWeeklyStatus
+from proco.connection_statistics.utils import (
+    SCHOOL_MAP_STATE_SCHOOL_JOIN,
+    get_data_layer_cluster_key,
+    get_school_map_cluster_query,
+    get_school_map_sampling,
+)
 from proco.contact.models import ContactMessage
 from proco.core import db_utils as db_utilities
 from proco.core import permissions as core_permissions
@@ -36,10 +45,19 @@ from proco.core.viewsets import BaseModelViewSet
 from proco.custom_auth import models as auth_models
 from proco.locations.models import Country
 from proco.utils import dates as date_utilities
-from proco.utils.cache import cache_manager, custom_cache_control, no_expiry_cache_manager
+from proco.utils.cache import (
+    CACHE_TAG_ALL,
+    cache_manager,
+    custom_cache_control,
+    get_cache_tag,
+    get_cache_tags,
+    get_request_cache_tags,
+    no_expiry_cache_manager,
+)
 from proco.utils.filters import NullsAlwaysLastOrderingFilter
 from proco.utils.mixins import CachedListMixin
 from proco.utils.tasks import update_all_cached_values
+from proco.utils.tiles import compressed_tile_response, get_filter_hash, get_tile_store
 
 
 logger = logging.getLogger('gigamaps.' + __name__)
@@ -306,7 +324,7 @@ class TranslateTextFromEnViewSet(APIView):
                 try:
                     response_json = response.json()
                     no_expiry_cache_manager.set(cache_key, response_json, request_path=request_path,
-                                      soft_timeout=None)
+                                      soft_timeout=None, tags=get_cache_tags(self.CACHE_KEY_PREFIX))
                     response  = Response(data=response_json, status=rest_status.HTTP_200_OK)
                 except requests.exceptions.InvalidJSONError as ex:
                     response = Response(data=ex.strerror, status=rest_status.HTTP_400_BAD_REQUEST)
@@ -404,34 +422,31 @@ class InvalidateCacheByPattern(APIView):
 
             update_all_cached_values.delay()
         else:
-            keys = []
+            tags = []
 
             if cache_key_name == 'country':
                 country_id = payload.get('id', None)
                 country_code = payload.get('code', None)
-                keys = [
-                    "*COUNTRIES_LIST_",
-                    "*PUBLISHED_LAYERS_LIST_*",
-                    "*GLOBAL_COUNTRY_SEARCH_MAPPING_",
-                    "*country_id_\['{0}'\]*".format(country_id),
-                    "*country_id_{0}*".format(country_id),
-                    "*COUNTRY_INFO_pk_{0}".format(country_code),
+                tags = [
+                    'COUNTRIES_LIST',
+                    'PUBLISHED_LAYERS_LIST',
+                    'GLOBAL_COUNTRY_SEARCH_MAPPING',
                 ]
+                if country_id:
+                    tags.append(get_cache_tag(scope='country_id', value=country_id))
+                if country_code:
+                    tags.append(get_cache_tag(scope='country_code', value=country_code))
             elif cache_key_name == 'layer':
                 layer_id = payload.get('id', None)
-                keys = [
-                    "*PUBLISHED_LAYERS_LIST_*",
-                    "*DATA_LAYER_INFO_{0}*".format(layer_id),
-                    "*DATA_LAYER_MAP_{0}*".format(layer_id),
-                    "*layer_id_\['{0}'\]*".format(layer_id),
-                    "*layer_id_{0}*".format(layer_id),
-                ]
+                tags = ['PUBLISHED_LAYERS_LIST']
+                if layer_id:
+                    tags.append(get_cache_tag(scope='layer_id', value=layer_id))
 
             if hard_delete:
-                cache_manager.invalidate_many(keys=keys, hard=True)
+                cache_manager.invalidate_tags(tags, hard=True)
                 message = 'Cache cleared. Map is updated in real time.'
             else:
-                cache_manager.invalidate_many(keys=keys)
+                cache_manager.invalidate_tags(tags)
                 message = 'Cache invalidation started. Maps will be updated in a few minutes.'
 
         return Response(data={'message': message})
@@ -933,21 +948,39 @@ class BaseDataLayerAPIViewSet(APIView):
         permissions.AllowAny,
     )
 
+    def get_default_map_query_params(self, layer_type=None):
+        """
+        get_default_map_query_params
+            Query parameters of the default map view of a layer, as sent by the map client: the last full week for
+            the live layers, the weekly values and the global benchmark.
+        """
+        query_params = {
+            'is_weekly': 'true',
+            'benchmark': 'global',
+        }
+
+        if layer_type != accounts_models.DataLayer.LAYER_TYPE_STATIC:
+            date = core_utilities.get_current_datetime_object() - timedelta(days=7)
+            start_date = date - timedelta(days=date.weekday())
+            query_params['start_date'] = date_utilities.format_date(start_date)
+            query_params['end_date'] = date_utilities.format_date(start_date + timedelta(days=6))
+
+        return query_params
+
     def update_kwargs(self, country_ids, layer_instance):
         query_params = self.request.query_params.dict()
         query_param_keys = query_params.keys()
+        default_query_params = self.get_default_map_query_params(layer_type=layer_instance.type)
 
         if 'start_date' in query_param_keys:
             self.kwargs['start_date'] = date_utilities.to_date(query_params['start_date']).date()
         elif layer_instance.type == accounts_models.DataLayer.LAYER_TYPE_LIVE:
-            date = core_utilities.get_current_datetime_object() - timedelta(days=7)
-            self.kwargs['start_date'] = (date - timedelta(days=date.weekday())).date()
+            self.kwargs['start_date'] = date_utilities.to_date(default_query_params['start_date']).date()
 
         if 'end_date' in query_param_keys:
             self.kwargs['end_date'] = date_utilities.to_date(query_params['end_date']).date()
         elif layer_instance.type == accounts_models.DataLayer.LAYER_TYPE_LIVE:
-            date = core_utilities.get_current_datetime_object() - timedelta(days=7)
-            self.kwargs['end_date'] = ((date - timedelta(days=date.weekday())) + timedelta(days=6)).date()
+            self.kwargs['end_date'] = date_utilities.to_date(default_query_params['end_date']).date()
 
         if 'country_id' in query_param_keys:
             self.kwargs['country_ids'] = [query_params['country_id']]
@@ -1852,7 +1885,9 @@ class DataLayerInfoViewSet(BaseDataLayerAPIViewSet):
                     }
 
             cache_manager.set(cache_key, response, request_path=request_path,
-                              soft_timeout=settings.CACHE_CONTROL_MAX_AGE)
+                              soft_timeout=settings.CACHE_CONTROL_MAX_AGE,
+                              tags=get_request_cache_tags(self.CACHE_KEY_PREFIX, request,
+                                                          layer_id=[self.kwargs.get('pk')]))
 
         return Response(data=response)
 
@@ -1928,11 +1963,61 @@ class DataLayerMapViewSet(BaseDataLayerAPIViewSet, account_utilities.BaseTileGen
             SELECT ST_AsMVT(DISTINCT mvtgeom.*) FROM mvtgeom;
         """
 
+        use_map_state = settings.ENABLE_SCHOOL_MAP_STATE
+        school_table = 'ms' if use_map_state else '"schools_school"'
+
+        if use_map_state:
+            # The live averages are only computed for the RT connected schools of the tile
+            query = """
+            WITH bounds AS (
+                    SELECT {env} AS geom,
+                    {env}::box2d AS b2d
+                ),
+                mvtgeom AS (
+                    SELECT DISTINCT ST_AsMVTGeom(sds.geometry, bounds.b2d) AS geom,
+                        {random_select_list}
+                        sds.id,
+                        True AS is_rt_connected,
+                        sds.{col_name} AS field_avg,
+                        {case_conditions}
+                        'connected' AS connectivity_status
+                    FROM bounds
+                    INNER JOIN (
+                        SELECT ms."id", ms."geometry", ms."last_weekly_status_id", ms."min_zoom",
+                            AVG(t."{col_name}") AS "{col_name}"
+                        FROM connection_statistics_schoolmapstate ms
+                        INNER JOIN bounds ON ST_Intersects(ms."geometry", bounds.geom)
+                        {school_join}
+                        {school_weekly_join}
+                        LEFT OUTER JOIN "connection_statistics_schooldailystatus" t ON (
+                            ms."id" = t."school_id"
+                            AND t."deleted" IS NULL
+                            AND (t."date" BETWEEN '{start_date}' AND '{end_date}')
+                            AND t."live_data_source" IN ({live_source_types})
+                        )
+                        WHERE ms."is_rt_connected" = True
+                            AND ms."rt_registration_date"::date <= '{end_date}'
+                            {country_condition}
+                            {admin1_condition}
+                            {school_condition}
+                            {school_weekly_condition}
+                            {zoom_condition}
+                        GROUP BY ms."id"
+                    ) AS sds ON TRUE
+                    {school_weekly_outer_join}
+                    {random_order}
+                    {limit_condition}
+                )
+                SELECT ST_AsMVT(DISTINCT mvtgeom.*) FROM mvtgeom;
+            """
+
         kwargs = copy.deepcopy(self.kwargs)
 
         kwargs['country_condition'] = ''
         kwargs['admin1_condition'] = ''
         kwargs['school_condition'] = ''
+        kwargs['school_join'] = ''
+        kwargs['zoom_condition'] = ''
 
         kwargs['school_weekly_join'] = ''
         kwargs['school_weekly_condition'] = ''
@@ -1985,7 +2070,8 @@ class DataLayerMapViewSet(BaseDataLayerAPIViewSet, account_utilities.BaseTileGen
 
         if len(kwargs.get('school_ids', [])) > 0:
             add_random_condition = False
-            kwargs['school_condition'] = 'AND "schools_school"."id" IN ({0})'.format(
+            kwargs['school_condition'] = 'AND {0}."id" IN ({1})'.format(
+                school_table,
                 ','.join([str(school_id) for school_id in kwargs['school_ids']])
             )
         elif len(kwargs.get('admin1_ids', [])) > 0:
@@ -1995,7 +2081,8 @@ class DataLayerMapViewSet(BaseDataLayerAPIViewSet, account_utilities.BaseTileGen
             else:
                 add_random_condition = False
 
-            kwargs['admin1_condition'] = 'AND "schools_school"."admin1_id" IN ({0})'.format(
+            kwargs['admin1_condition'] = 'AND {0}."admin1_id" IN ({1})'.format(
+                school_table,
                 ','.join([str(admin1_id) for admin1_id in kwargs['admin1_ids']])
             )
         elif len(kwargs.get('country_ids', [])) > 0:
@@ -2005,36 +2092,65 @@ class DataLayerMapViewSet(BaseDataLayerAPIViewSet, account_utilities.BaseTileGen
             else:
                 add_random_condition = False
 
-            kwargs['country_condition'] = 'AND "schools_school"."country_id" IN ({0})'.format(
+            kwargs['country_condition'] = 'AND {0}."country_id" IN ({1})'.format(
+                school_table,
                 ','.join([str(country_id) for country_id in kwargs['country_ids']])
             )
 
         if len(kwargs['school_filters']) > 0:
             kwargs['school_condition'] += ' AND ' + kwargs['school_filters']
+            kwargs['school_join'] = SCHOOL_MAP_STATE_SCHOOL_JOIN
 
         if len(kwargs['school_static_filters']) > 0:
             kwargs['school_weekly_join'] = """
             INNER JOIN "connection_statistics_schoolweeklystatus"
-                ON "schools_school"."last_weekly_status_id" = "connection_statistics_schoolweeklystatus"."id"
-            """
+                ON {0}."last_weekly_status_id" = "connection_statistics_schoolweeklystatus"."id"
+            """.format(school_table)
             kwargs['school_weekly_condition'] = ' AND ' + kwargs['school_static_filters']
 
         if add_random_condition:
+            zoom_level = int(request.query_params.get('z', '0'))
             if 'limit' in request.query_params:
                 limit = request.query_params['limit']
-                kwargs['random_order'] = 'ORDER BY random()' if int(request.query_params.get('z', '0')) == 2 else ''
+                order_schools = zoom_level == 2
             elif kwargs.get('MAP_API_SAMPLING_LIMIT'):
                 limit = kwargs['MAP_API_SAMPLING_LIMIT']
-                kwargs['random_order'] = 'ORDER BY random()'
+                order_schools = True
             else:
                 limit = '50000'
-                kwargs['random_order'] = 'ORDER BY random()' if int(request.query_params.get('z', '0')) == 2 else ''
+                order_schools = zoom_level == 2
 
+            # The map state rows are ordered in the outer query, through the sds columns
+            order_table = 'sds' if use_map_state else school_table
+            kwargs['zoom_condition'], kwargs['random_order'] = get_school_map_sampling(
+                zoom_level, order_table, order_schools=order_schools)
             kwargs['limit_condition'] = 'LIMIT ' + str(limit)
-            kwargs['random_select_list'] = 'random(),'
+            # SELECT DISTINCT needs the ORDER BY columns in the select list
+            kwargs['random_select_list'] = '{0}."{1}",'.format(
+                order_table, 'min_zoom' if use_map_state else 'giga_id_school')
 
         return query.format(**kwargs)
 
+    def cluster_to_sql(self, tile, env, request):
+        # Only the static layers are clustered, with their global legend
+        if (
+            self.kwargs['layer_type'] != accounts_models.DataLayer.LAYER_TYPE_STATIC or
+            self.kwargs['benchmark'] != 'global' or
+            len(self.kwargs.get('admin1_ids', [])) > 0 or
+            len(self.kwargs.get('school_ids', [])) > 0 or
+            len(self.kwargs['school_filters']) > 0 or
+            len(self.kwargs['school_static_filters']) > 0
+        ):
+            return None
+
+        layer_key = get_data_layer_cluster_key(self.kwargs['pk'])
+        # A layer published after the last refresh of the clusters has no cluster yet
+        if not statistics_models.SchoolMapCluster.objects.filter(layer_key=layer_key, zoom=tile['zoom']).exists():
+            return None
+
+        return get_school_map_cluster_query(
+            self.envelope_to_bounds_sql(env), layer_key, tile['zoom'], 'field_status', self.kwargs.get('country_ids'))
+
     def envelope_to_sql(self, env, request):
         if self.kwargs['layer_type'] == accounts_models.DataLayer.LAYER_TYPE_LIVE:
             return self.get_live_map_query(env, request)
@@ -2069,11 +2185,47 @@ class DataLayerMapViewSet(BaseDataLayerAPIViewSet, account_utilities.BaseTileGen
         SELECT ST_AsMVT(DISTINCT mvtgeom.*) FROM mvtgeom;
         """
 
+        use_map_state = settings.ENABLE_SCHOOL_MAP_STATE
+        school_table = 'ms' if use_map_state else 'schools_school'
+
+        if use_map_state:
+            query = """
+            WITH
+            bounds AS (
+                SELECT {env} AS geom,
+                       {env}::box2d AS b2d
+            ),
+            mvtgeom AS (
+                SELECT DISTINCT ST_AsMVTGeom(ms.geometry, bounds.b2d) AS geom,
+                    {random_select_list}
+                    ms.id,
+                    {table_name}."{col_name}" AS field_value,
+                    'connected' AS connectivity_status,
+                    {label_case_statements}
+                FROM connection_statistics_schoolmapstate ms
+                INNER JOIN bounds ON ST_Intersects(ms.geometry, bounds.geom)
+                {school_join}
+                INNER JOIN connection_statistics_schoolweeklystatus sws ON ms.last_weekly_status_id = sws.id
+                {school_weekly_join}
+                WHERE TRUE
+                {country_condition}
+                {admin1_condition}
+                {school_condition}
+                {school_weekly_condition}
+                {zoom_condition}
+                {random_order}
+                {limit_condition}
+            )
+            SELECT ST_AsMVT(DISTINCT mvtgeom.*) FROM mvtgeom;
+            """
+
         kwargs = copy.deepcopy(self.kwargs)
 
         kwargs['country_condition'] = ''
         kwargs['admin1_condition'] = ''
         kwargs['school_condition'] = ''
+        kwargs['school_join'] = ''
+        kwargs['zoom_condition'] = ''
 
         kwargs['school_weekly_join'] = ''
         kwargs['school_weekly_condition'] = ''
@@ -2088,7 +2240,8 @@ class DataLayerMapViewSet(BaseDataLayerAPIViewSet, account_utilities.BaseTileGen
 
         if len(kwargs.get('school_ids', [])) > 0:
             add_random_condition = False
-            kwargs['school_condition'] = 'AND schools_school."id" IN ({0})'.format(
+            kwargs['school_condition'] = 'AND {0}."id" IN ({1})'.format(
+                school_table,
                 ','.join([str(school_id) for school_id in kwargs['school_ids']])
             )
         elif len(kwargs.get('admin1_ids', [])) > 0:
@@ -2098,7 +2251,8 @@ class DataLayerMapViewSet(BaseDataLayerAPIViewSet, account_utilities.BaseTileGen
             else:
                 add_random_condition = False
 
-            kwargs['admin1_condition'] = 'AND schools_school."admin1_id" IN ({0})'.format(
+            kwargs['admin1_condition'] = 'AND {0}."admin1_id" IN ({1})'.format(
+                school_table,
                 ','.join([str(admin1_id) for admin1_id in kwargs['admin1_ids']])
             )
         elif len(kwargs.get('country_ids', [])) > 0:
@@ -2108,12 +2262,14 @@ class DataLayerMapViewSet(BaseDataLayerAPIViewSet, account_utilities.BaseTileGen
             else:
                 add_random_condition = False
 
-            kwargs['country_condition'] = 'AND schools_school."country_id" IN ({0})'.format(
+            kwargs['country_condition'] = 'AND {0}."country_id" IN ({1})'.format(
+                school_table,
                 ','.join([str(country_id) for country_id in kwargs['country_ids']])
             )
 
         if len(kwargs['school_filters']) > 0:
             kwargs['school_condition'] += ' AND ' + kwargs['school_filters']
+            kwargs['school_join'] = SCHOOL_MAP_STATE_SCHOOL_JOIN
 
         if len(kwargs['school_static_filters']) > 0:
             kwargs['school_weekly_join'] = """
@@ -2122,60 +2278,33 @@ class DataLayerMapViewSet(BaseDataLayerAPIViewSet, account_utilities.BaseTileGen
             """
             kwargs['school_weekly_condition'] = ' AND ' + kwargs['school_static_filters']
 
-        legend_configs = kwargs['legend_configs']
-        label_cases = []
-        values_l = []
         parameter_col_type = kwargs['parameter_col'].get('type', 'str').lower()
         kwargs['table_name'] = kwargs['parameter_col'].get('table_name', 'sws')
+        if kwargs['table_name'] == 'schools_school':
+            kwargs['school_join'] = SCHOOL_MAP_STATE_SCHOOL_JOIN
 
-        for title, values_and_label in legend_configs.items():
-            values = list(filter(lambda val: val if not core_utilities.is_blank_string(val) else None,
-                                 values_and_label.get('values', [])))
-
-            if len(values) > 0:
-                is_sql_value = 'SQL:' in values[0]
-                if is_sql_value:
-                    sql_statement = str(','.join(values)).replace('SQL:', '').format(
-                        table_name=kwargs['table_name'],
-                        col_name=kwargs['col_name'],
-                    )
-                    label_cases.append("""WHEN {sql} THEN '{label}'""".format(sql=sql_statement, label=title))
-                else:
-                    values_l.extend(values)
-                    if parameter_col_type == 'str':
-                        label_cases.append(
-                            """WHEN LOWER({table_name}."{col_name}") IN ({value}) THEN '{label}'""".format(
-                                table_name=kwargs['table_name'],
-                                col_name=kwargs['col_name'],
-                                label=title,
-                                value=','.join(["'" + str(v).lower() + "'" for v in values])
-                            ))
-                    elif parameter_col_type == 'int':
-                        label_cases.append(
-                            """WHEN {table_name}."{col_name}" IN ({value}) THEN '{label}'""".format(
-                                table_name=kwargs['table_name'],
-                                col_name=kwargs['col_name'],
-                                label=title,
-                                value=','.join([str(v) for v in values])
-                            ))
-            else:
-                label_cases.append("ELSE '{label}'".format(label=title))
-
+        label_cases = account_utilities.get_legend_label_cases(
+            kwargs['legend_configs'], kwargs['table_name'], kwargs['col_name'], parameter_col_type)
         kwargs['label_case_statements'] = 'CASE ' + ' '.join(label_cases) + 'END AS field_status'
 
         if add_random_condition:
+            zoom_level = int(request.query_params.get('z', '0'))
             if 'limit' in request.query_params:
                 limit = request.query_params['limit']
-                kwargs['random_order'] = 'ORDER BY random()' if int(request.query_params.get('z', '0')) == 2 else ''
+                order_schools = zoom_level == 2
             elif kwargs.get('MAP_API_SAMPLING_LIMIT'):
                 limit = kwargs['MAP_API_SAMPLING_LIMIT']
-                kwargs['random_order'] = 'ORDER BY random()'
+                order_schools = True
             else:
                 limit = '50000'
-                kwargs['random_order'] = 'ORDER BY random()' if int(request.query_params.get('z', '0')) == 2 else ''
+                order_schools = zoom_level == 2
 
+            kwargs['zoom_condition'], kwargs['random_order'] = get_school_map_sampling(
+                zoom_level, school_table, order_schools=order_schools)
             kwargs['limit_condition'] = 'LIMIT ' + str(limit)
-            kwargs['random_select_list'] = 'random(),'
+            # SELECT DISTINCT needs the ORDER BY columns in the select list
+            kwargs['random_select_list'] = '{0}."{1}",'.format(
+                school_table, 'min_zoom' if use_map_state else 'giga_id_school')
 
         return query.format(**kwargs)
 
@@ -2198,76 +2327,166 @@ class DataLayerMapViewSet(BaseDataLayerAPIViewSet, account_utilities.BaseTileGen
 
         return False
 
-    def get(self, request, *args, **kwargs):
-        use_cached_data = self.request.query_params.get(self.CACHE_KEY, 'on').lower() in ['on', 'true']
-        request_path = remove_query_param(request.get_full_path(), 'cache')
-        cache_key = self.get_cache_key()
+    def get_tile_store_tile(self, request):
+        """Tile requested from the tile store, None if the tile must be handled by the soft cache"""
+        if not all(param in request.query_params for param in ('z', 'x', 'y')):
+            return None
 
-        response = None
-        if use_cached_data:
-            response = cache_manager.get(cache_key)
+        tile = self.path_to_tile(request)
+        if tile and self.tile_is_valid(tile) and tile['zoom'] <= settings.TILE_STORE_MAX_ZOOM:
+            return tile
+        return None
 
-        if not response:
-            data_layer_instance = get_object_or_404(
-                accounts_models.DataLayer.objects.all(),
-                pk=self.kwargs.get('pk'),
-                status=accounts_models.DataLayer.LAYER_STATUS_PUBLISHED,
-            )
+    def get_cache_tags(self):
+        return get_request_cache_tags(self.CACHE_KEY_PREFIX, self.request, layer_id=[self.kwargs.get('pk')])
 
-            data_sources = data_layer_instance.data_sources.all()
+    def get_tile_filter_hash(self):
+        params = dict(self.request.query_params)
+        for param in (self.CACHE_KEY, 'z', 'x', 'y'):
+            params.pop(param, None)
+
+        # Fill in the default view parameters, so the map client requests which send them explicitly and the
+        # requests without them, as the warming ones, share the tiles
+        for param, default_value in self.get_default_map_query_params().items():
+            values = params.get(param) or [default_value]
+            if param in ('start_date', 'end_date'):
+                values = [date_utilities.format_date(date_utilities.to_date(value), default=value) for value in values]
+            params[param] = values
+        # Tile store entries are not tracked by the soft cache, so the current generation of the layer tags
+        # is part of the hash and invalidating any of them moves the layer to a new set of tiles
+        params['__generations'] = cache_manager.get_tag_generations([CACHE_TAG_ALL] + self.get_cache_tags())
+        return get_filter_hash(params)
+
+    def update_map_kwargs(self, data_layer_instance):
+        data_sources = data_layer_instance.data_sources.all()
 
-            live_data_sources = ['UNKNOWN']
+        live_data_sources = ['UNKNOWN']
 
-            for d in data_sources:
-                source_type = d.data_source.data_source_type
-                if source_type == accounts_models.DataSource.DATA_SOURCE_TYPE_QOS:
-                    live_data_sources.append(statistics_configs.QOS_SOURCE)
-                elif source_type == accounts_models.DataSource.DATA_SOURCE_TYPE_DAILY_CHECK_APP:
-                    live_data_sources.append(statistics_configs.DAILY_CHECK_APP_MLAB_SOURCE)
+        for d in data_sources:
+            source_type = d.data_source.data_source_type
+            if source_type == accounts_models.DataSource.DATA_SOURCE_TYPE_QOS:
+                live_data_sources.append(statistics_configs.QOS_SOURCE)
+            elif source_type == accounts_models.DataSource.DATA_SOURCE_TYPE_DAILY_CHECK_APP:
+                live_data_sources.append(statistics_configs.DAILY_CHECK_APP_MLAB_SOURCE)
 
-            country_ids = data_layer_instance.applicable_countries
-            parameter_col = data_sources.first().data_source_column
+        country_ids = data_layer_instance.applicable_countries
+        parameter_col = data_sources.first().data_source_column
 
-            parameter_column_name = str(parameter_col['name'])
-            base_benchmark = str(parameter_col.get('base_benchmark', 1))
+        parameter_column_name = str(parameter_col['name'])
+        base_benchmark = str(parameter_col.get('base_benchmark', 1))
 
-            self.update_kwargs(country_ids, data_layer_instance)
-            benchmark_value, _ = self.get_benchmark_value(data_layer_instance)
-            global_benchmark = data_layer_instance.global_benchmark.get('value')
+        self.update_kwargs(country_ids, data_layer_instance)
+        benchmark_value, _ = self.get_benchmark_value(data_layer_instance)
+        global_benchmark = data_layer_instance.global_benchmark.get('value')
 
-            legend_configs = self.get_legend_configs(data_layer_instance)
+        legend_configs = self.get_legend_configs(data_layer_instance)
 
-            if data_layer_instance.type == accounts_models.DataLayer.LAYER_TYPE_LIVE:
-                self.kwargs.update({
-                    'col_name': parameter_column_name,
-                    'benchmark_value': benchmark_value,
-                    'global_benchmark': global_benchmark,
-                    'national_benchmark': benchmark_value,
-                    'base_benchmark': base_benchmark,
-                    'live_source_types': ','.join(["'" + str(source) + "'" for source in set(live_data_sources)]),
-                    'parameter_col': parameter_col,
-                    'layer_type': accounts_models.DataLayer.LAYER_TYPE_LIVE,
-                    'legend_configs': legend_configs,
-                })
-            else:
-                self.kwargs.update({
-                    'col_name': parameter_column_name,
-                    'legend_configs': legend_configs,
-                    'parameter_col': parameter_col,
-                    'layer_type': accounts_models.DataLayer.LAYER_TYPE_STATIC,
-                })
+        if data_layer_instance.type == accounts_models.DataLayer.LAYER_TYPE_LIVE:
+            self.kwargs.update({
+                'col_name': parameter_column_name,
+                'benchmark_value': benchmark_value,
+                'global_benchmark': global_benchmark,
+                'national_benchmark': benchmark_value,
+                'base_benchmark': base_benchmark,
+                'live_source_types': ','.join(["'" + str(source) + "'" for source in set(live_data_sources)]),
+                'parameter_col': parameter_col,
+                'layer_type': accounts_models.DataLayer.LAYER_TYPE_LIVE,
+                'legend_configs': legend_configs,
+            })
+        else:
+            self.kwargs.update({
+                'col_name': parameter_column_name,
+                'legend_configs': legend_configs,
+                'parameter_col': parameter_col,
+                'layer_type': accounts_models.DataLayer.LAYER_TYPE_STATIC,
+            })
 
-            try:
-                response = self.generate_tile(request)
-                if self.cache_enabled(data_layer_instance) and response.status_code == rest_status.HTTP_200_OK:
-                    cache_manager.set(cache_key, response, request_path=request_path,
-                                      soft_timeout=settings.CACHE_CONTROL_MAX_AGE)
-            except Exception as ex:
-                logger.error('Exception occurred for school connectivity tiles endpoint: {}'.format(ex))
-                response = Response({'error': 'An error occurred while processing the request'}, status=500)
+    def get(self, request, *args, **kwargs):
+        use_cached_data = self.request.query_params.get(self.CACHE_KEY, 'on').lower() in ['on', 'true']
+        request_path = remove_query_param(request.get_full_path(), 'cache')
+
+        tile_store = get_tile_store()
+        store_tile = self.get_tile_store_tile(request) if tile_store else None
+
+        if store_tile:
+            # Low zoom tiles are kept in the tile store, the rest in the soft cache
+            filter_hash = self.get_tile_filter_hash()
+            if use_cached_data:
+                compressed_tile = tile_store.get(
+                    self.kwargs.get('pk'), store_tile['zoom'], store_tile['x'], store_tile['y'], filter_hash)
+                if compressed_tile is not None:
+                    return compressed_tile_response(request, compressed_tile)
+        else:
+            cache_key = self.get_cache_key()
+            if use_cached_data:
+                cached_tile = cache_manager.get_bytes(cache_key)
+                if cached_tile:
+                    compressed_tile, metadata = cached_tile
+                    return compressed_tile_response(request, compressed_tile, content_type=metadata['content_type'])
+
+        data_layer_instance = get_object_or_404(
+            accounts_models.DataLayer.objects.all(),
+            pk=self.kwargs.get('pk'),
+            status=accounts_models.DataLayer.LAYER_STATUS_PUBLISHED,
+        )
+
+        self.update_map_kwargs(data_layer_instance)
+
+        try:
+            response = self.generate_tile(request)
+            if self.cache_enabled(data_layer_instance) and response.status_code == rest_status.HTTP_200_OK:
+                if store_tile:
+                    tile_store.set(self.kwargs.get('pk'), store_tile['zoom'], store_tile['x'], store_tile['y'],
+                                   filter_hash, response.content)
+                else:
+                    cache_manager.set_bytes(cache_key, response.content, content_type=response['Content-Type'],
+                                            request_path=request_path, soft_timeout=settings.CACHE_CONTROL_MAX_AGE,
+                                            tags=self.get_cache_tags())
+        except Exception as ex:
+            logger.error('Exception occurred for school connectivity tiles endpoint: {}'.format(ex))
+            response = Response({'error': 'An error occurred while processing the request'}, status=500)
 
         return response
 
+    @classmethod
+    def warm_tile_store(cls, data_layer_instance, tile_ranges, tile_store):
+        """
+        warm_tile_store
+            Render all the tiles of the given zoom wise tile ranges for the default view of the layer
+            and write them to the tile store.
+
+        :param tile_ranges: {zoom: (min_x, min_y, max_x, max_y)}
+        :return: number of rendered tiles
+        """
+        factory = APIRequestFactory()
+        path = reverse('accounts:map-data-layer', kwargs={'pk': data_layer_instance.id})
+
+        view = cls()
+        # Same parameters as the requests of the map client for the default view of the layer
+        query_params = view.get_default_map_query_params(layer_type=data_layer_instance.type)
+        view.request = Request(factory.get(path, query_params))
+        view.kwargs = {'pk': data_layer_instance.id}
+        view.format_kwarg = None
+        view.update_map_kwargs(data_layer_instance)
+
+        if not view.cache_enabled(data_layer_instance):
+            return 0
+
+        filter_hash = view.get_tile_filter_hash()
+        total_tiles = 0
+
+        for zoom, (min_x, min_y, max_x, max_y) in sorted(tile_ranges.items()):
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    tile_request = Request(factory.get(path, dict(
+                        query_params, z=zoom, x=x, y='{0}.pbf'.format(y))))
+                    response = view.generate_tile(tile_request)
+                    if response.status_code == rest_status.HTTP_200_OK:
+                        tile_store.set(data_layer_instance.id, zoom, x, y, filter_hash, response.content)
+                        total_tiles += 1
+
+        return total_tiles
+
 
 class LogActionViewSet(BaseModelViewSet):
     """
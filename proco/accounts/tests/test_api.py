@@ -1,19 +1,25 @@
 import os
 from collections import OrderedDict
 from datetime import timedelta
+from unittest.mock import patch
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.management import call_command
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import resolve, reverse
 from rest_framework import status
 
 from proco.accounts import models as accounts_models
 from proco.accounts.tests import test_utils as accounts_test_utilities
+from proco.connection_statistics.utils import (
+    get_school_map_cluster_query,
+    refresh_school_map_clusters,
+    refresh_school_map_state,
+)
 from proco.core import utils as core_utilities
 from proco.custom_auth.tests import test_utils as test_utilities
-from proco.locations.tests.factories import CountryFactory
+from proco.locations.tests.factories import Admin1Factory, CountryFactory
 from proco.schools.tests.factories import SchoolFactory
 from proco.utils.tests import TestAPIViewSetMixin
 
@@ -1715,6 +1721,142 @@ class DataLayerMapApiTestCase(TestAPIViewSetMixin, TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+@override_settings(ENABLE_SCHOOL_MAP_STATE=True)
+class DataLayerMapStateApiTestCase(TestAPIViewSetMixin, TestCase):
+    databases = {'default', settings.READ_ONLY_DB_KEY, }
+
+    @classmethod
+    def setUpTestData(cls):
+        args = ['--delete_data_sources', '--update_data_sources', '--update_data_layers']
+        call_command('load_system_data_layers', *args)
+
+        cls.admin_user = test_utilities.setup_admin_user_by_role()
+
+        cls.country = CountryFactory()
+        cls.admin1_one = Admin1Factory(country=cls.country)
+        SchoolFactory(country=cls.country, admin1=cls.admin1_one, school_type='public')
+
+        accounts_test_utilities.publish_school_advance_filters()
+        refresh_school_map_state()
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def publish_data_layer(self, layer_data):
+        url, _, view = accounts_url((), {}, view_name='list-or-create-data-layers')
+        response = self.forced_auth_req('post', url, user=self.admin_user, view=view, data=layer_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        layer_id = response.data['id']
+        for view_name, layer_status in (
+            ('update-or-delete-data-layer', accounts_models.DataLayer.LAYER_STATUS_READY_TO_PUBLISH),
+            ('publish-data-layer', accounts_models.DataLayer.LAYER_STATUS_PUBLISHED),
+        ):
+            url, _, view = accounts_url((layer_id,), {}, view_name=view_name)
+            put_response = self.forced_auth_req('put', url, user=self.admin_user, data={'status': layer_status})
+            self.assertEqual(put_response.status_code, status.HTTP_200_OK)
+
+        return layer_id
+
+    def assert_pbf_tile(self, layer_id, query_params):
+        query_params.update({'z': '2', 'x': '2', 'y': '1.mvt'})
+        url, view, view_info = accounts_url((layer_id,), query_params, view_name='map-data-layer')
+
+        response = self.forced_auth_req('get', url, view=view, view_info=view_info)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+
+    def test_static_data_layer_map_views(self):
+        layer_id = self.publish_data_layer(accounts_test_utilities.static_coverage_layer_data())
+
+        self.assert_pbf_tile(layer_id, {})
+        self.assert_pbf_tile(layer_id, {'country_id': self.country.id})
+        self.assert_pbf_tile(layer_id, {'country_id': self.country.id, 'admin1_id': self.admin1_one.id})
+
+    def test_static_data_layer_map_school_filters(self):
+        layer_id = self.publish_data_layer(accounts_test_utilities.static_coverage_layer_data())
+
+        self.assert_pbf_tile(layer_id, {'country_id': self.country.id, 'school_type__iexact': 'public'})
+        self.assert_pbf_tile(layer_id, {'country_id': self.country.id, 'num_students__range': '10,1000'})
+
+    def test_live_data_layer_map_views(self):
+        layer_id = self.publish_data_layer(accounts_test_utilities.live_download_layer_data_pcdc())
+        weekly_params = {
+            'benchmark': 'global',
+            'start_date': '24-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'true',
+        }
+
+        self.assert_pbf_tile(layer_id, dict(weekly_params))
+        self.assert_pbf_tile(layer_id, dict(weekly_params, country_id=self.country.id))
+        self.assert_pbf_tile(layer_id, dict(weekly_params, country_id=self.country.id, admin1_id=self.admin1_one.id))
+        self.assert_pbf_tile(layer_id, {
+            'country_id': self.country.id,
+            'benchmark': 'global',
+            'start_date': '01-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'false',
+        })
+
+    def test_live_data_layer_map_school_filters(self):
+        layer_id = self.publish_data_layer(accounts_test_utilities.live_download_layer_data_pcdc())
+
+        self.assert_pbf_tile(layer_id, {
+            'country_id': self.country.id,
+            'benchmark': 'global',
+            'start_date': '24-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'true',
+            'school_type__iexact': 'public',
+            'num_students__range': '10,1000',
+        })
+
+
+@override_settings(ENABLE_SCHOOL_MAP_STATE=True, ENABLE_SCHOOL_MAP_CLUSTERS=True, SCHOOL_MAP_CLUSTER_ZOOM=7)
+class DataLayerMapClusterApiTestCase(DataLayerMapStateApiTestCase):
+    """Runs the map state data layer tests with the clusters on, the z=2 tiles are below the cluster zoom"""
+
+    def get_cluster_tile(self, layer_id, query_params):
+        with patch('proco.accounts.api.get_school_map_cluster_query', wraps=get_school_map_cluster_query) as query:
+            self.assert_pbf_tile(layer_id, query_params)
+        return query.called
+
+    def test_static_data_layer_cluster_tiles(self):
+        layer_id = self.publish_data_layer(accounts_test_utilities.static_coverage_layer_data())
+
+        # No cluster of the layer until the next refresh of the clusters
+        self.assertFalse(self.get_cluster_tile(layer_id, {'country_id': self.country.id}))
+
+        refresh_school_map_clusters()
+        self.assertTrue(self.get_cluster_tile(layer_id, {}))
+        self.assertTrue(self.get_cluster_tile(layer_id, {'country_id': self.country.id, 'benchmark': 'global'}))
+
+        # Admin level and school filtered views are drawn with the schools, the clusters are per country
+        self.assertFalse(self.get_cluster_tile(layer_id, {
+            'country_id': self.country.id,
+            'admin1_id': self.admin1_one.id,
+        }))
+        self.assertFalse(self.get_cluster_tile(layer_id, {
+            'country_id': self.country.id,
+            'school_type__iexact': 'public',
+        }))
+
+    def test_live_data_layer_cluster_tiles_fall_back_to_schools(self):
+        layer_id = self.publish_data_layer(accounts_test_utilities.live_download_layer_data_pcdc())
+        refresh_school_map_clusters()
+
+        self.assertFalse(self.get_cluster_tile(layer_id, {
+            'country_id': self.country.id,
+            'benchmark': 'global',
+            'start_date': '24-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'true',
+        }))
+
+
 class DataLayerInfoApiTestCase(TestAPIViewSetMixin, TestCase):
     databases = {'default', settings.READ_ONLY_DB_KEY,}
 
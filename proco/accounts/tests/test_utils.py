@@ -1,3 +1,5 @@
+from django.core.management import call_command
+
 from proco.accounts import models as accounts_models
 
 
@@ -92,3 +94,25 @@ def live_download_layer_data_pcdc():
             "round_unit_value": "{val} / (1000 * 1000)"
         },
     }
+
+
+def publish_school_advance_filters():
+    """
+    Publish the "school_type__iexact" school filter and the "num_students__range" school static data filter
+    """
+    call_command('load_column_configurations', '--update_configurations')
+
+    for name, query_param_filter, filter_type in (
+        ('school_type', accounts_models.AdvanceFilter.FILTER_QUERY_PARAM_IEXACT,
+         accounts_models.AdvanceFilter.TYPE_DROPDOWN),
+        ('num_students', accounts_models.AdvanceFilter.FILTER_QUERY_PARAM_RANGE,
+         accounts_models.AdvanceFilter.TYPE_RANGE),
+    ):
+        accounts_models.AdvanceFilter.objects.create(
+            code=name,
+            name=name,
+            type=filter_type,
+            status=accounts_models.AdvanceFilter.FILTER_STATUS_PUBLISHED,
+            column_configuration=accounts_models.ColumnConfiguration.objects.filter(name=name).first(),
+            query_param_filter=query_param_filter,
+        )
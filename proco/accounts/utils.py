@@ -78,6 +78,48 @@ def send_email_over_mailjet_service(recipient_list, cc=None, bcc=None, fail_sile
     return response
 
 
+def get_legend_label_cases(legend_configs, table_name, col_name, col_type):
+    """
+    get_legend_label_cases
+        WHEN clauses of the CASE which labels a school with the legend of a static data layer, from the values of
+        each legend entry or its SQL: expression. The entry without values is the ELSE label.
+    """
+    label_cases = []
+
+    for title, values_and_label in legend_configs.items():
+        values = list(filter(lambda val: val if not core_utilities.is_blank_string(val) else None,
+                             values_and_label.get('values', [])))
+
+        if len(values) > 0:
+            is_sql_value = 'SQL:' in values[0]
+            if is_sql_value:
+                sql_statement = str(','.join(values)).replace('SQL:', '').format(
+                    table_name=table_name,
+                    col_name=col_name,
+                )
+                label_cases.append("""WHEN {sql} THEN '{label}'""".format(sql=sql_statement, label=title))
+            elif col_type == 'str':
+                label_cases.append(
+                    """WHEN LOWER({table_name}."{col_name}") IN ({value}) THEN '{label}'""".format(
+                        table_name=table_name,
+                        col_name=col_name,
+                        label=title,
+                        value=','.join(["'" + str(v).lower() + "'" for v in values])
+                    ))
+            elif col_type == 'int':
+                label_cases.append(
+                    """WHEN {table_name}."{col_name}" IN ({value}) THEN '{label}'""".format(
+                        table_name=table_name,
+                        col_name=col_name,
+                        label=title,
+                        value=','.join([str(v) for v in values])
+                    ))
+        else:
+            label_cases.append("ELSE '{label}'".format(label=title))
+
+    return label_cases
+
+
 class BaseTileGenerator:
     def path_to_tile(self, request):
         path = "/" + request.query_params.get('z') + "/" + request.query_params.get(
@@ -126,6 +168,10 @@ class BaseTileGenerator:
     def envelope_to_sql(self, env, request):
         raise NotImplementedError("envelope_to_sql must be implemented in the subclass.")
 
+    def cluster_to_sql(self, tile, env, request):
+        """SQL of the precomputed school clusters of a low zoom tile, None to draw the schools"""
+        return None
+
     def sql_to_pbf(self, sql):
         with connections[settings.READ_ONLY_DB_KEY].cursor() as cur:
             try:
@@ -145,7 +191,12 @@ class BaseTileGenerator:
 
         env = self.tile_to_envelope(tile)
 
-        sql = self.envelope_to_sql(env, request)
+        sql = None
+        if settings.ENABLE_SCHOOL_MAP_CLUSTERS and tile['zoom'] < settings.SCHOOL_MAP_CLUSTER_ZOOM:
+            sql = self.cluster_to_sql(tile, env, request)
+
+        if sql is None:
+            sql = self.envelope_to_sql(env, request)
 
         logger.debug(sql.replace('\n', ''))
 
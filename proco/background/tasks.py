@@ -1,10 +1,12 @@
 from typing import List
 
+from django.conf import settings
 from django.utils import timezone
 
 from celery import current_task
 
 from proco.background.models import BackgroundTask
+from proco.connection_statistics.utils import refresh_country_school_map, update_school_status_summary
 from proco.locations.models import Country
 from proco.taskapp import app
 
@@ -19,6 +21,9 @@ def reset_countries_data(ids: List):
     for obj in queryset:
         task.info(f'{obj} started')
         obj._clear_data_country()
+        if settings.ENABLE_STATISTICS_SUMMARY:
+            update_school_status_summary(obj)
+        refresh_country_school_map(obj)
         obj.invalidate_country_related_cache()
         task.info(f'{obj} completed')
 
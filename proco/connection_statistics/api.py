@@ -3,9 +3,10 @@ from datetime import datetime, time, timedelta
 
 from django.conf import settings
 from django.db.models import (
-    Avg, Case, CharField, FilteredRelation, OuterRef, Q, Subquery, Value, When
+    Avg, Case, CharField, FilteredRelation, Max, Min, OuterRef, Q, Subquery, Sum, Value, When
 )
 from django.db.models import BooleanField, Count
+from django.db.models.functions import Coalesce
 from django.db.models.functions.text import Lower
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
@@ -29,6 +30,8 @@ from proco.connection_statistics.models import (
     SchoolWeeklyStatus,
     CountryWeeklyStatus,
     SchoolRealTimeRegistration,
+    RealTimeWeeklySummary,
+    SchoolStatusSummary,
 )
 from proco.connection_statistics.utils import get_benchmark_value_for_default_download_layer
 from proco.core import db_utils as db_utilities
@@ -38,7 +41,7 @@ from proco.core.viewsets import BaseModelViewSet
 from proco.locations.models import Country
 from proco.schools.models import School
 from proco.utils import dates as date_utilities
-from proco.utils.cache import cache_manager
+from proco.utils.cache import cache_manager, get_request_cache_tags
 from proco.utils.error_message import id_missing_error_mess, delete_succ_mess, error_mess
 from proco.utils.filters import NullsAlwaysLastOrderingFilter
 from proco.utils.log import action_log, changed_fields
@@ -64,6 +67,8 @@ class GlobalStatsAPIView(APIView):
         'id': ['exact', 'in'],
     }
 
+    SUMMARY_QUERY_PARAMS = ('country_id', 'country_id__in', 'admin1_id', 'admin1_id__in')
+
     def get_cache_key(self):
         params = dict(self.request.query_params)
         params.pop(self.CACHE_KEY, None)
@@ -95,11 +100,29 @@ class GlobalStatsAPIView(APIView):
 
         if not data:
             data = self.calculate_global_statistic()
-            cache_manager.set(cache_key, data, request_path=request_path, soft_timeout=settings.CACHE_CONTROL_MAX_AGE)
+            cache_manager.set(cache_key, data, request_path=request_path, soft_timeout=settings.CACHE_CONTROL_MAX_AGE,
+                              tags=get_request_cache_tags(self.CACHE_KEY_PREFIX, request, self.kwargs))
 
         return Response(data=data)
 
-    def calculate_global_statistic(self):
+    def use_statistics_summary(self):
+        """Summary rows are per country/admin1, so they can answer only the requests without other filters"""
+        params = set(self.request.query_params.keys()) - {self.CACHE_KEY}
+        return settings.ENABLE_STATISTICS_SUMMARY and params.issubset(self.SUMMARY_QUERY_PARAMS)
+
+    def get_school_connectivity_status_from_summary(self):
+        return self.filter_queryset(SchoolStatusSummary.objects.all()).aggregate(
+            connected=Coalesce(Sum('schools_connected'), 0),
+            not_connected=Coalesce(Sum('schools_not_connected'), 0),
+            unknown=Coalesce(Sum('schools_unknown'), 0),
+            total_schools=Coalesce(Sum('schools_total'), 0),
+            all_countries=Count('country_id', distinct=True, filter=Q(schools_total__gt=0)),
+            schools_with_connectivity_status_mapped=Coalesce(Sum('schools_connectivity_mapped'), 0),
+            countries_with_connectivity_status_mapped=Count(
+                'country_id', distinct=True, filter=Q(schools_connectivity_mapped__gt=0)),
+        )
+
+    def get_school_connectivity_status(self):
         # Count the number of schools with known connectivity status (connected, not_connected, or unknown)
         queryset = self.filter_queryset(self.queryset)
         school_connectivity_status_qry = queryset.annotate(
@@ -131,11 +154,17 @@ class GlobalStatsAPIView(APIView):
                      'countries_with_connectivity_status_mapped', 'total_weekly_schools')
             school_connectivity_status_qry = school_connectivity_status_qry.extra(where=[school_static_filters])
 
+        return list(school_connectivity_status_qry)[0]
+
+    def calculate_global_statistic(self):
+        if self.use_statistics_summary():
+            school_connectivity_status = self.get_school_connectivity_status_from_summary()
+        else:
+            school_connectivity_status = self.get_school_connectivity_status()
+
         giga_connectivity_benchmark, giga_connectivity_benchmark_unit = get_benchmark_value_for_default_download_layer(
             'global', None)
 
-        school_connectivity_status = list(school_connectivity_status_qry)[0]
-
         return {
             'no_of_countries': school_connectivity_status['all_countries'],
             'countries_with_connectivity_status_mapped': school_connectivity_status[
@@ -460,16 +489,66 @@ class ConnectivityAPIView(APIView):
                     week_number = week_numbers_for_month[-1]
 
             data = self.calculate_country_download_data(start_date, end_date, week_number, year_number)
-            cache_manager.set(cache_key, data, request_path=request_path, soft_timeout=settings.CACHE_CONTROL_MAX_AGE)
+            cache_manager.set(cache_key, data, request_path=request_path, soft_timeout=settings.CACHE_CONTROL_MAX_AGE,
+                              tags=get_request_cache_tags(self.CACHE_KEY_PREFIX, request, self.kwargs))
 
         return Response(data=data)
 
-    def calculate_country_download_data(self, start_date, end_date, week_number, year_number):
-        benchmark = self.request.query_params.get('benchmark', 'global')
+    def use_statistics_summary(self):
+        return (
+            settings.ENABLE_STATISTICS_SUMMARY and
+            len(self.school_filters) == 0 and
+            len(self.school_static_filters) == 0
+        )
+
+    @staticmethod
+    def get_date_part(value):
+        return value.date() if isinstance(value, datetime) else value
+
+    def get_summary_queryset(self):
+        queryset = RealTimeWeeklySummary.objects.all()
+
         country_id = self.request.query_params.get('country_id', None)
+        if country_id:
+            queryset = queryset.filter(country_id=country_id)
 
-        speed_benchmark, _ = get_benchmark_value_for_default_download_layer(benchmark, country_id)
+        admin1_id = self.request.query_params.get('admin1_id', None)
+        if admin1_id:
+            queryset = queryset.filter(admin1_id=admin1_id)
 
+        return queryset
+
+    def get_weekly_status_from_summary(self, end_date, week_number, year_number, benchmark, speed_benchmark):
+        """
+        Weekly connectivity buckets from RealTimeWeeklySummary.
+        None if the week is not in the summary yet or it was built with another benchmark value.
+        """
+        country_id = self.request.query_params.get('country_id', None)
+        benchmark_type = 'national' if benchmark == 'national' and country_id else 'global'
+        registered = Q(rt_registration_date__lte=self.get_date_part(end_date))
+
+        summary = self.get_summary_queryset().filter(year=year_number, week=week_number).aggregate(
+            summary_rows=Count('id'),
+            min_benchmark=Min(benchmark_type + '_benchmark'),
+            max_benchmark=Max(benchmark_type + '_benchmark'),
+            good=Coalesce(Sum('schools_good_' + benchmark_type, filter=registered), 0),
+            moderate=Coalesce(Sum('schools_moderate_' + benchmark_type, filter=registered), 0),
+            bad=Coalesce(Sum('schools_bad', filter=registered), 0),
+            no_of_schools_measure=Coalesce(Sum('schools_total', filter=registered), 0),
+            school_with_realtime_data=Coalesce(Sum('schools_with_data', filter=registered), 0),
+            countries_with_realtime_data=Count('country_id', distinct=True, filter=registered & Q(schools_total__gt=0)),
+        )
+
+        if (
+            summary['summary_rows'] == 0 or
+            not (summary['min_benchmark'] == summary['max_benchmark'] == speed_benchmark)
+        ):
+            return None
+
+        summary['unknown'] = summary['no_of_schools_measure'] - summary['school_with_realtime_data']
+        return summary
+
+    def get_weekly_status(self, end_date, week_number, year_number, speed_benchmark):
         weekly_queryset = self.queryset.annotate(
             t=FilteredRelation(
                 'weekly_status',
@@ -506,7 +585,25 @@ class ConnectivityAPIView(APIView):
                 'no_of_schools_measure', 'countries_with_realtime_data', 'total_weekly_schools'
             ).extra(where=[school_static_filters])
 
-        weekly_status = list(weekly_queryset)[0]
+        return list(weekly_queryset)[0]
+
+    def calculate_country_download_data(self, start_date, end_date, week_number, year_number):
+        benchmark = self.request.query_params.get('benchmark', 'global')
+        country_id = self.request.query_params.get('country_id', None)
+
+        speed_benchmark, _ = get_benchmark_value_for_default_download_layer(benchmark, country_id)
+
+        weekly_status = None
+        if self.use_statistics_summary():
+            weekly_status = self.get_weekly_status_from_summary(
+                end_date, week_number, year_number, benchmark, speed_benchmark)
+
+        if weekly_status is not None:
+            graph_data, positive_speeds = self.generate_country_graph_data_from_summary(start_date, end_date)
+        else:
+            weekly_status = self.get_weekly_status(end_date, week_number, year_number, speed_benchmark)
+            graph_data, positive_speeds = self.generate_country_graph_data(start_date, end_date)
+
         real_time_connected_schools = {
             'good': weekly_status['good'],
             'moderate': weekly_status['moderate'],
@@ -514,8 +611,6 @@ class ConnectivityAPIView(APIView):
             'unknown': weekly_status['unknown'],
         }
 
-        graph_data, positive_speeds = self.generate_country_graph_data(start_date, end_date)
-
         live_avg = round(sum(positive_speeds) / len(positive_speeds), 2) if len(positive_speeds) > 0 else 0
 
         live_avg_connectivity = 'unknown'
@@ -590,6 +685,33 @@ class ConnectivityAPIView(APIView):
             )
             avg_daily_connectivity_speed = avg_daily_connectivity_speed.extra(where=[self.school_static_filters])
 
+        return self.format_country_graph_data(start_date, end_date, [
+            (daily_avg_data['daily_status__date'], daily_avg_data['avg_speed'])
+            for daily_avg_data in avg_daily_connectivity_speed
+        ])
+
+    def generate_country_graph_data_from_summary(self, start_date, end_date):
+        # Daily averages are recomputed from the daily sums and counts of all the weeks in the date range
+        summary_rows = self.get_summary_queryset().filter(
+            week_start_date__gte=self.get_date_part(start_date) - timedelta(days=6),
+            week_start_date__lte=self.get_date_part(end_date),
+            rt_registration_date__lte=self.get_date_part(end_date),
+        ).values_list('week_start_date', 'daily_speed_sum', 'daily_speed_count')
+
+        daily_speeds = OrderedDict()
+        for week_start_date, daily_speed_sum, daily_speed_count in summary_rows:
+            for day_no in range(7):
+                if daily_speed_count[day_no] > 0:
+                    speed_sum, speed_count = daily_speeds.get(week_start_date + timedelta(days=day_no), (0, 0))
+                    daily_speeds[week_start_date + timedelta(days=day_no)] = (
+                        speed_sum + daily_speed_sum[day_no], speed_count + daily_speed_count[day_no])
+
+        return self.format_country_graph_data(start_date, end_date, [
+            (date, speed_sum / speed_count)
+            for date, (speed_sum, speed_count) in sorted(daily_speeds.items())
+        ])
+
+    def format_country_graph_data(self, start_date, end_date, daily_avg_speeds):
         # Generate the graph data in the desired format
         graph_data = []
         current_date = start_date
@@ -604,14 +726,14 @@ class ConnectivityAPIView(APIView):
 
         all_positive_speeds = []
         # Update the graph_data with actual values if they exist
-        for daily_avg_data in avg_daily_connectivity_speed:
-            formatted_date = date_utilities.format_date(daily_avg_data['daily_status__date'])
+        for date, avg_speed in daily_avg_speeds:
+            formatted_date = date_utilities.format_date(date)
             for entry in graph_data:
                 if entry['key'] == formatted_date:
                     try:
                         rounded_speed = 0
-                        if daily_avg_data['avg_speed'] is not None:
-                            rounded_speed = round(daily_avg_data['avg_speed'] / 1000000, 2)
+                        if avg_speed is not None:
+                            rounded_speed = round(avg_speed / 1000000, 2)
                         entry['value'] = rounded_speed
                         all_positive_speeds.append(rounded_speed)
                     except (KeyError, TypeError):
@@ -713,7 +835,8 @@ class CoverageAPIView(APIView):
                 'connected_schools': coverage_data,
             }
 
-            cache_manager.set(cache_key, data, request_path=request_path, soft_timeout=settings.CACHE_CONTROL_MAX_AGE)
+            cache_manager.set(cache_key, data, request_path=request_path, soft_timeout=settings.CACHE_CONTROL_MAX_AGE,
+                              tags=get_request_cache_tags(self.CACHE_KEY_PREFIX, request, self.kwargs))
 
         return Response(data=data)
 
@@ -819,7 +942,8 @@ class ConnectivityConfigurationsViewSet(APIView):
 
             request_path = remove_query_param(request.get_full_path(), 'cache')
             cache_manager.set(cache_key, static_data, request_path=request_path,
-                              soft_timeout=settings.CACHE_CONTROL_MAX_AGE)
+                              soft_timeout=settings.CACHE_CONTROL_MAX_AGE,
+                              tags=get_request_cache_tags(self.CACHE_KEY_PREFIX, request, self.kwargs))
 
         return Response(data=static_data)
 
@@ -1283,7 +1407,7 @@ class TimePlayerViewSet(ListAPIView):
          AND t.deleted IS NULL
          AND rt_status.deleted IS NULL
          AND s.country_id = {country_id}
-         AND EXTRACT(YEAR FROM CAST(t.date AS DATE)) >= {start_year}
+         AND t.date >= '{start_year}-01-01'
          AND t.live_data_source IN ({live_source_types})
         GROUP BY s.id, year, is_rt_connected
         ORDER BY s.id ASC, year ASC
@@ -1359,6 +1483,7 @@ class TimePlayerViewSet(ListAPIView):
                                                       db_var=settings.READ_ONLY_DB_KEY)
 
             data = self._format_result(query_data)
-            cache_manager.set(cache_key, data, request_path=request_path, soft_timeout=settings.CACHE_CONTROL_MAX_AGE)
+            cache_manager.set(cache_key, data, request_path=request_path, soft_timeout=settings.CACHE_CONTROL_MAX_AGE,
+                              tags=get_request_cache_tags(self.CACHE_KEY_PREFIX, request, self.kwargs))
 
         return Response(data=data)
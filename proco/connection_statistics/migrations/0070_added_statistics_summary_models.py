@@ -0,0 +1,79 @@
+# Generated by Django 2.2.28 on 2026-10-17 10:00
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+import proco.core.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0021_removed_geometry_simplified_field_from_country'),
+        ('connection_statistics', '0069_increased_upload_field_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolStatusSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('schools_total', models.PositiveIntegerField(default=0)),
+                ('schools_connected', models.PositiveIntegerField(default=0)),
+                ('schools_not_connected', models.PositiveIntegerField(default=0)),
+                ('schools_unknown', models.PositiveIntegerField(default=0)),
+                ('schools_connectivity_mapped', models.PositiveIntegerField(default=0)),
+                ('admin1', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='school_status_summary', to='locations.CountryAdminMetadata')),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='school_status_summary', to='locations.Country')),
+            ],
+            options={
+                'verbose_name': 'School Status Summary',
+                'verbose_name_plural': 'School Status Summary',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='RealTimeWeeklySummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('week', models.PositiveSmallIntegerField()),
+                ('week_start_date', models.DateField()),
+                ('live_data_source', models.CharField(choices=[('DAILY_CHECK_APP_MLAB', 'Daily Check App/MLab'), ('QOS', 'QoS'), ('DAILY_CHECK_APP_MLAB_QOS', 'Daily Check APP/MLab/QoS'), ('UNKNOWN', 'Unknown')], default='UNKNOWN', max_length=50)),
+                ('rt_registration_date', models.DateField(blank=True, null=True)),
+                ('global_benchmark', proco.core.models.PositiveBigIntegerField(help_text='bps')),
+                ('national_benchmark', proco.core.models.PositiveBigIntegerField(help_text='bps')),
+                ('schools_total', models.PositiveIntegerField(default=0)),
+                ('schools_with_weekly_status', models.PositiveIntegerField(default=0)),
+                ('schools_with_data', models.PositiveIntegerField(default=0)),
+                ('schools_good_global', models.PositiveIntegerField(default=0)),
+                ('schools_moderate_global', models.PositiveIntegerField(default=0)),
+                ('schools_good_national', models.PositiveIntegerField(default=0)),
+                ('schools_moderate_national', models.PositiveIntegerField(default=0)),
+                ('schools_bad', models.PositiveIntegerField(default=0)),
+                ('daily_speed_sum', django.contrib.postgres.fields.ArrayField(base_field=models.FloatField(), size=7)),
+                ('daily_speed_count', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), size=7)),
+                ('admin1', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='realtime_weekly_summary', to='locations.CountryAdminMetadata')),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='realtime_weekly_summary', to='locations.Country')),
+            ],
+            options={
+                'verbose_name': 'Real Time Weekly Summary',
+                'verbose_name_plural': 'Real Time Weekly Summary',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='realtimeweeklysummary',
+            index=models.Index(fields=['country', 'year', 'week'], name='rt_weekly_summary_country_week'),
+        ),
+        migrations.AddIndex(
+            model_name='realtimeweeklysummary',
+            index=models.Index(fields=['country', 'week_start_date'], name='rt_weekly_summary_country_date'),
+        ),
+    ]
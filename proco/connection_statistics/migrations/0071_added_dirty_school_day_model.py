@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-17 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0033_removed_location_id_field_from_school_model'),
+        ('connection_statistics', '0070_added_statistics_summary_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtySchoolDay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('live_data_source', models.CharField(choices=[('DAILY_CHECK_APP_MLAB', 'Daily Check App/MLab'), ('QOS', 'QoS'), ('DAILY_CHECK_APP_MLAB_QOS', 'Daily Check APP/MLab/QoS'), ('UNKNOWN', 'Unknown')], default='UNKNOWN', max_length=50)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dirty_days', to='schools.School')),
+            ],
+            options={
+                'verbose_name': 'Dirty School Day',
+                'verbose_name_plural': 'Dirty School Days',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dirtyschoolday',
+            constraint=models.UniqueConstraint(fields=('school', 'date', 'live_data_source'), name='dirtyschoolday_unique'),
+        ),
+    ]
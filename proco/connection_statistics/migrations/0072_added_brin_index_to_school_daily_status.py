@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-17 10:00
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connection_statistics', '0071_added_dirty_school_day_model'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schooldailystatus',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['date'], name='schooldailystatus_date_brin'),
+        ),
+    ]
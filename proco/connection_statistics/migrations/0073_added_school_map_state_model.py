@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-17 10:00
+
+import django.contrib.gis.db.models.fields
+import django.utils.timezone
+from django.db import migrations, models
+
+import proco.core.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connection_statistics', '0072_added_brin_index_to_school_daily_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolMapState',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('country_id', models.IntegerField(db_index=True)),
+                ('admin1_id', models.IntegerField(db_index=True, null=True)),
+                ('admin2_id', models.IntegerField(null=True)),
+                ('giga_id_school', models.CharField(blank=True, max_length=50)),
+                ('geometry', django.contrib.gis.db.models.fields.PointField(srid=3857)),
+                ('coverage_type', models.CharField(blank=True, max_length=10, null=True)),
+                ('coverage_status', models.CharField(max_length=10)),
+                ('connectivity_status', models.CharField(max_length=20)),
+                ('last_weekly_status_id', models.IntegerField(null=True)),
+                ('connectivity_speed', proco.core.models.PositiveBigIntegerField(help_text='bps', null=True)),
+                ('is_rt_connected', models.BooleanField(default=False)),
+                ('rt_registration_date', proco.core.models.CustomDateTimeField(null=True)),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'School Map State',
+                'verbose_name_plural': 'School Map States',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.28 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connection_statistics', '0073_added_school_map_state_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schoolmapstate',
+            name='min_zoom',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='schoolmapstate',
+            index=models.Index(fields=['min_zoom', 'id'], name='schoolmapstate_min_zoom_id'),
+        ),
+    ]
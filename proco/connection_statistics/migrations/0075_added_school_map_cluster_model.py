@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-17 10:00
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.fields.jsonb
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connection_statistics', '0074_added_min_zoom_to_school_map_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolMapCluster',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('layer_key', models.CharField(max_length=64)),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('country_id', models.IntegerField()),
+                ('cell_x', models.IntegerField()),
+                ('cell_y', models.IntegerField()),
+                ('geometry', django.contrib.gis.db.models.fields.PointField(srid=3857)),
+                ('schools_count', models.PositiveIntegerField(default=0)),
+                ('dominant_status', models.CharField(max_length=255, null=True)),
+                ('status_counts', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'School Map Cluster',
+                'verbose_name_plural': 'School Map Clusters',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='schoolmapcluster',
+            index=models.Index(fields=['layer_key', 'zoom', 'country_id'], name='schoolmapcluster_layer_zoom'),
+        ),
+    ]
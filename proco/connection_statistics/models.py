@@ -1,3 +1,6 @@
+from django.contrib.gis.db.models import PointField
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import BrinIndex
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models import Q
@@ -11,7 +14,7 @@ from model_utils.models import TimeStampedModel
 from proco.connection_statistics.config import app_config as statistics_configs
 from proco.core import models as core_models
 from proco.core.managers import BaseManager
-from proco.locations.models import Country
+from proco.locations.models import Country, CountryAdminMetadata
 from proco.schools.constants import statuses_schema
 from proco.schools.models import School
 from proco.utils.dates import get_current_week, get_current_year
@@ -343,6 +346,10 @@ class SchoolDailyStatus(ConnectivityStatistics, TimeStampedModel, models.Model):
                              condition=Q(deleted=None),
                              name='schooldailystatus_unique_without_deleted'),
         ]
+        indexes = [
+            # Rows are written in date order, a BRIN index is a few pages even for years of data
+            BrinIndex(fields=['date'], name='schooldailystatus_date_brin'),
+        ]
 
     def __str__(self):
         year, week, weekday = self.date.isocalendar()
@@ -392,3 +399,176 @@ class SchoolRealTimeRegistration(core_models.BaseModelMixin):
         verbose_name = _('School Real Time Registration Status')
         verbose_name_plural = _('School Real Time Registration Data')
         ordering = ('id',)
+
+
+class SchoolStatusSummary(TimeStampedModel, models.Model):
+    """
+    SchoolStatusSummary
+        Number of schools by connectivity status for each (country, admin1), rebuilt per country after the
+        aggregations and the publish/delete tasks. Used by the global statistics endpoint.
+    """
+    country = models.ForeignKey(Country, related_name='school_status_summary', on_delete=models.CASCADE)
+    admin1 = models.ForeignKey(CountryAdminMetadata, related_name='school_status_summary', null=True, blank=True,
+                               on_delete=models.CASCADE)
+
+    schools_total = models.PositiveIntegerField(default=0)
+    schools_connected = models.PositiveIntegerField(default=0)
+    schools_not_connected = models.PositiveIntegerField(default=0)
+    schools_unknown = models.PositiveIntegerField(default=0)
+    schools_connectivity_mapped = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('School Status Summary')
+        verbose_name_plural = _('School Status Summary')
+        ordering = ('id',)
+
+
+class RealTimeWeeklySummary(TimeStampedModel, models.Model):
+    """
+    RealTimeWeeklySummary
+        Weekly connectivity buckets and daily speed sums of the real time registered schools for each
+        (country, admin1, year, week, live data source, registration date), rebuilt per country and week
+        by the live data aggregations. Used by the connectivity statistics endpoint.
+
+        Rows are split by registration date so the endpoint can count only the schools registered before the
+        requested end date. Speed buckets are counted for the global and the national benchmark which were
+        in place when the row was built.
+    """
+    country = models.ForeignKey(Country, related_name='realtime_weekly_summary', on_delete=models.CASCADE)
+    admin1 = models.ForeignKey(CountryAdminMetadata, related_name='realtime_weekly_summary', null=True, blank=True,
+                               on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    week = models.PositiveSmallIntegerField()
+    week_start_date = models.DateField()
+    live_data_source = models.CharField(
+        max_length=50,
+        choices=statistics_configs.LIVE_DATA_SOURCE_CHOICES,
+        default=statistics_configs.UNKNOWN_SOURCE,
+    )
+    rt_registration_date = models.DateField(null=True, blank=True)
+
+    global_benchmark = core_models.PositiveBigIntegerField(help_text=_('bps'))
+    national_benchmark = core_models.PositiveBigIntegerField(help_text=_('bps'))
+
+    schools_total = models.PositiveIntegerField(default=0)
+    schools_with_weekly_status = models.PositiveIntegerField(default=0)
+    schools_with_data = models.PositiveIntegerField(default=0)
+    schools_good_global = models.PositiveIntegerField(default=0)
+    schools_moderate_global = models.PositiveIntegerField(default=0)
+    schools_good_national = models.PositiveIntegerField(default=0)
+    schools_moderate_national = models.PositiveIntegerField(default=0)
+    schools_bad = models.PositiveIntegerField(default=0)
+
+    # Monday to Sunday sum and count of the non null daily download speeds
+    daily_speed_sum = ArrayField(models.FloatField(), size=7)
+    daily_speed_count = ArrayField(models.PositiveIntegerField(), size=7)
+
+    class Meta:
+        verbose_name = _('Real Time Weekly Summary')
+        verbose_name_plural = _('Real Time Weekly Summary')
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['country', 'year', 'week'], name='rt_weekly_summary_country_week'),
+            models.Index(fields=['country', 'week_start_date'], name='rt_weekly_summary_country_date'),
+        ]
+
+
+class DirtySchoolDay(models.Model):
+    """
+    DirtySchoolDay
+        (school, date, live data source) that received new RealTimeConnectivity rows since its last aggregation.
+        Written by the live data ingestion and consumed by aggregate_dirty_school_days, so an aggregation run
+        only recomputes the school days, weeks and countries with new measurements.
+    """
+    school = models.ForeignKey(School, related_name='dirty_days', on_delete=models.CASCADE)
+    date = models.DateField()
+    live_data_source = models.CharField(
+        max_length=50,
+        choices=statistics_configs.LIVE_DATA_SOURCE_CHOICES,
+        default=statistics_configs.UNKNOWN_SOURCE,
+    )
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _('Dirty School Day')
+        verbose_name_plural = _('Dirty School Days')
+        ordering = ('id',)
+        constraints = [
+            UniqueConstraint(fields=['school', 'date', 'live_data_source'], name='dirtyschoolday_unique'),
+        ]
+
+
+class SchoolMapState(models.Model):
+    """
+    SchoolMapState
+        One row per live school with what the map tiles draw: the EPSG:3857 point, the connectivity and coverage
+        buckets, the speed of the last weekly status, the real time registration and the admin ids.
+        Rebuilt by refresh_school_map_state after the aggregations and the publish/delete tasks, and read by the
+        tile generators when ENABLE_SCHOOL_MAP_STATE is on, so most tiles are a single GiST index scan of this table.
+        id is the School id, the other columns are named as in School so the tile filters work on both tables.
+    """
+    id = models.IntegerField(primary_key=True)
+
+    country_id = models.IntegerField(db_index=True)
+    admin1_id = models.IntegerField(null=True, db_index=True)
+    admin2_id = models.IntegerField(null=True)
+    giga_id_school = models.CharField(max_length=50, blank=True)
+
+    geometry = PointField(srid=3857)
+
+    coverage_type = models.CharField(max_length=10, blank=True, null=True)
+    # good, moderate, bad or unknown
+    coverage_status = models.CharField(max_length=10)
+    # connected, not_connected or unknown
+    connectivity_status = models.CharField(max_length=20)
+
+    last_weekly_status_id = models.IntegerField(null=True)
+    connectivity_speed = core_models.PositiveBigIntegerField(help_text=_('bps'), null=True)
+
+    is_rt_connected = models.BooleanField(default=False)
+    rt_registration_date = core_models.CustomDateTimeField(null=True)
+
+    # Lowest zoom drawing the school when the tile is sampled, assigned by update_school_map_state_min_zoom
+    min_zoom = models.PositiveSmallIntegerField(default=0)
+
+    modified = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _('School Map State')
+        verbose_name_plural = _('School Map States')
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['min_zoom', 'id'], name='schoolmapstate_min_zoom_id'),
+        ]
+
+
+class SchoolMapCluster(models.Model):
+    """
+    SchoolMapCluster
+        Grid cluster of the schools of a country drawn by the low zoom map tiles when ENABLE_SCHOOL_MAP_CLUSTERS is
+        on: the number of schools of the cell, their centroid, the number of schools per status and the dominant
+        status. layer_key names the status: coverage, connectivity_status, connectivity or the data layer.
+        Rebuilt from SchoolMapState by refresh_school_map_clusters.
+    """
+    layer_key = models.CharField(max_length=64)
+    zoom = models.PositiveSmallIntegerField()
+    country_id = models.IntegerField()
+    cell_x = models.IntegerField()
+    cell_y = models.IntegerField()
+
+    geometry = PointField(srid=3857)
+
+    schools_count = models.PositiveIntegerField(default=0)
+    dominant_status = models.CharField(max_length=255, null=True)
+    # Number of schools per status
+    status_counts = JSONField(default=dict)
+
+    modified = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _('School Map Cluster')
+        verbose_name_plural = _('School Map Clusters')
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['layer_key', 'zoom', 'country_id'], name='schoolmapcluster_layer_zoom'),
+        ]
@@ -1,12 +1,18 @@
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
-from django.test import TestCase
+from django.contrib.gis.geos import GEOSGeometry
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
 from proco.connection_statistics.models import (
     CountryDailyStatus,
     CountryWeeklyStatus,
+    DirtySchoolDay,
+    RealTimeConnectivity,
     SchoolDailyStatus,
+    SchoolMapCluster,
+    SchoolMapState,
     SchoolWeeklyStatus,
 )
 from proco.connection_statistics.tests.factories import (
@@ -16,9 +22,21 @@ from proco.connection_statistics.tests.factories import (
     SchoolWeeklyStatusFactory,
 )
 from proco.connection_statistics.utils import (
+    SCHOOL_MAP_CLUSTER_COVERAGE,
+    aggregate_dirty_school_days,
     aggregate_real_time_data_to_school_daily_status,
+    aggregate_real_time_data_to_school_daily_status_in_bulk,
+    aggregate_real_time_data_to_school_daily_status_per_school,
     aggregate_school_daily_status_to_school_weekly_status,
+    aggregate_school_daily_status_to_school_weekly_status_in_bulk,
+    aggregate_school_daily_status_to_school_weekly_status_per_school,
     aggregate_school_daily_to_country_daily,
+    get_school_map_cluster_query,
+    get_school_map_sampling,
+    mark_real_time_connectivity_dirty,
+    mark_school_days_dirty,
+    refresh_school_map_clusters,
+    refresh_school_map_state,
     update_country_weekly_status,
 )
 from proco.data_sources.tasks import finalize_previous_day_data
@@ -46,12 +64,31 @@ class AggregateConnectivityDataTestCase(TestCase):
         self.assertEqual(SchoolDailyStatus.objects.count(approx=False), 1)
         self.assertEqual(SchoolDailyStatus.objects.first().connectivity_speed, 5000000)
 
+    def test_aggregate_real_time_data_to_school_daily_status_per_school(self):
+        aggregate_real_time_data_to_school_daily_status_per_school(self.country, timezone.now().date())
+        self.assertEqual(SchoolDailyStatus.objects.count(approx=False), 1)
+        self.assertEqual(SchoolDailyStatus.objects.first().connectivity_speed, 5000000)
+
+    def test_aggregate_real_time_data_to_school_daily_status_in_bulk(self):
+        self.assertEqual(
+            aggregate_real_time_data_to_school_daily_status_in_bulk(self.country, timezone.now().date()), 1)
+        self.assertEqual(SchoolDailyStatus.objects.count(approx=False), 1)
+        self.assertEqual(SchoolDailyStatus.objects.first().connectivity_speed, 5000000)
+
+        # Re-running the aggregation updates the existing row instead of creating a new one
+        RealTimeConnectivityFactory(school=self.school, connectivity_speed=8000000, created=self.today_datetime,
+                                    live_data_source='DAILY_CHECK_APP_MLAB')
+        aggregate_real_time_data_to_school_daily_status_in_bulk(self.country, timezone.now().date())
+        self.assertEqual(SchoolDailyStatus.objects.count(approx=False), 1)
+        self.assertEqual(SchoolDailyStatus.objects.first().connectivity_speed, 6000000)
+
     def test_aggregate_real_time_data_to_country_daily_status(self):
         aggregate_real_time_data_to_school_daily_status(self.country, timezone.now().date())
         aggregate_school_daily_to_country_daily(self.country, timezone.now().date())
         self.assertEqual(CountryDailyStatus.objects.count(), 1)
         self.assertEqual(CountryDailyStatus.objects.first().connectivity_speed, 5000000)
 
+    @override_settings(ENABLE_INCREMENTAL_AGGREGATIONS=False)
     def test_aggregate_real_time_yesterday_data(self):
         yesterday = timezone.now() - timedelta(days=1)
         yesterday_status = SchoolDailyStatusFactory(school=self.school, date=yesterday.date(),
@@ -67,6 +104,72 @@ class AggregateConnectivityDataTestCase(TestCase):
         self.assertEqual(yesterday_status.connectivity_speed, 3000000)
         self.assertEqual(self.country.daily_status.get(date=yesterday_status.date).connectivity_speed, 3000000)
 
+    def test_aggregate_dirty_school_days(self):
+        today = self.today_datetime.date()
+        other_school = SchoolFactory(country=self.country)
+        RealTimeConnectivityFactory(school=other_school, connectivity_speed=2000000, created=self.today_datetime,
+                                    live_data_source='DAILY_CHECK_APP_MLAB')
+
+        # Nothing is aggregated without dirty school days
+        self.assertFalse(aggregate_dirty_school_days(self.country))
+        self.assertEqual(SchoolDailyStatus.objects.count(approx=False), 0)
+
+        mark_school_days_dirty([
+            (self.school.id, today, 'DAILY_CHECK_APP_MLAB'),
+            (self.school.id, today, 'DAILY_CHECK_APP_MLAB'),
+        ])
+        self.assertEqual(DirtySchoolDay.objects.count(), 1)
+
+        self.assertTrue(aggregate_dirty_school_days(self.country))
+        self.assertEqual(DirtySchoolDay.objects.count(), 0)
+
+        # Only the dirty school is aggregated, the country rows are computed from it
+        self.assertEqual(SchoolDailyStatus.objects.get(school=self.school, date=today).connectivity_speed, 5000000)
+        self.assertFalse(SchoolDailyStatus.objects.filter(school=other_school).exists())
+        self.assertEqual(SchoolWeeklyStatus.objects.get(school=self.school).connectivity_speed, 5000000)
+        self.assertEqual(CountryDailyStatus.objects.get(country=self.country, date=today).connectivity_speed, 5000000)
+        self.assertTrue(CountryWeeklyStatus.objects.filter(country=self.country).exists())
+
+        self.assertFalse(aggregate_dirty_school_days(self.country))
+
+    def test_aggregate_dirty_school_days_keeps_keys_on_failure(self):
+        mark_school_days_dirty([(self.school.id, self.today_datetime.date(), 'DAILY_CHECK_APP_MLAB')])
+
+        with patch('proco.connection_statistics.utils.aggregate_school_daily_to_country_daily',
+                   side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                aggregate_dirty_school_days(self.country)
+
+        # The DELETE of the keys is rolled back with the failed aggregation
+        self.assertEqual(DirtySchoolDay.objects.count(), 1)
+        self.assertEqual(SchoolDailyStatus.objects.count(approx=False), 0)
+
+    def test_mark_real_time_connectivity_dirty(self):
+        yesterday = self.today_datetime - timedelta(days=1)
+        mark_real_time_connectivity_dirty([
+            RealTimeConnectivity(school=self.school, created=yesterday.date(), live_data_source='QOS'),
+            RealTimeConnectivity(school=self.school, created=self.today_datetime,
+                                 live_data_source='DAILY_CHECK_APP_MLAB'),
+            RealTimeConnectivity(school=self.school, created=self.today_datetime,
+                                 live_data_source='DAILY_CHECK_APP_MLAB'),
+        ])
+
+        self.assertEqual(DirtySchoolDay.objects.count(), 2)
+        self.assertTrue(DirtySchoolDay.objects.filter(
+            school=self.school, date=yesterday.date(), live_data_source='QOS').exists())
+
+    def test_finalize_explicit_date_without_dirty_school_days(self):
+        yesterday = timezone.now() - timedelta(days=1)
+        RealTimeConnectivityFactory(
+            school=self.school, connectivity_speed=3000000, created=yesterday,
+            live_data_source='DAILY_CHECK_APP_MLAB'
+        )
+
+        # The recovery commands and loader views re-aggregate the given date even without dirty keys
+        finalize_previous_day_data(None, self.country.id, yesterday.date(), incremental=False)
+        self.assertEqual(
+            SchoolDailyStatus.objects.get(school=self.school, date=yesterday.date()).connectivity_speed, 3000000)
+
     def test_aggregate_school_daily_to_country_daily(self):
         today = datetime.now().date()
         SchoolDailyStatusFactory(school__country=self.country, connectivity_speed=4000000, date=today,
@@ -124,6 +227,67 @@ class AggregateConnectivityDataTestCase(TestCase):
         self.assertEqual(SchoolWeeklyStatus.objects.last().connectivity_speed, 5000000)
         self.assertEqual(SchoolWeeklyStatus.objects.last().connectivity, True)
 
+    def test_aggregate_school_daily_status_to_school_weekly_status_per_school(self):
+        date = datetime.now().date() - timedelta(days=6)
+        monday_date = date - timedelta(days=date.weekday())
+
+        SchoolDailyStatusFactory(school=self.school, connectivity_speed=4000000, date=monday_date,
+                                 live_data_source='DAILY_CHECK_APP_MLAB')
+        SchoolDailyStatusFactory(school=self.school, connectivity_speed=6000000, date=monday_date,
+                                 live_data_source='QOS')
+
+        self.assertTrue(aggregate_school_daily_status_to_school_weekly_status_per_school(self.country, monday_date))
+        self.assertEqual(SchoolWeeklyStatus.objects.count(), 1)
+        self.assertEqual(SchoolWeeklyStatus.objects.last().connectivity_speed, 5000000)
+
+    def test_aggregate_school_daily_status_to_school_weekly_status_in_bulk(self):
+        date = datetime.now().date() - timedelta(days=6)
+        monday_date = date - timedelta(days=date.weekday())
+        prev_monday_date = monday_date - timedelta(days=7)
+
+        prev_weekly = SchoolWeeklyStatusFactory(
+            school=self.school, year=prev_monday_date.isocalendar()[0], week=prev_monday_date.isocalendar()[1],
+            num_students=120, running_water=True, connectivity_type='fiber', coverage_type='4g',
+        )
+        self.school.last_weekly_status = prev_weekly
+        self.school.save()
+
+        SchoolDailyStatusFactory(school=self.school, connectivity_speed=4000000, date=monday_date,
+                                 live_data_source='DAILY_CHECK_APP_MLAB')
+        SchoolDailyStatusFactory(school=self.school, connectivity_speed=6000000, date=monday_date + timedelta(days=1),
+                                 live_data_source='DAILY_CHECK_APP_MLAB')
+
+        self.assertTrue(aggregate_school_daily_status_to_school_weekly_status_in_bulk(self.country, monday_date))
+        self.assertEqual(SchoolWeeklyStatus.objects.count(), 2)
+
+        school_weekly = SchoolWeeklyStatus.objects.last()
+        self.assertEqual(school_weekly.date, monday_date)
+        self.assertEqual(school_weekly.connectivity, True)
+        self.assertEqual(school_weekly.connectivity_speed, 5000000)
+        # Static fields are carried forward from the previous week
+        self.assertEqual(school_weekly.num_students, 120)
+        self.assertEqual(school_weekly.running_water, True)
+        self.assertEqual(school_weekly.connectivity_type, 'fiber')
+        self.assertEqual(school_weekly.coverage_type, '4g')
+
+        self.school.refresh_from_db()
+        self.assertEqual(self.school.last_weekly_status_id, school_weekly.id)
+
+        # Re-running the aggregation only refreshes the averages of the existing row
+        SchoolDailyStatusFactory(school=self.school, connectivity_speed=8000000, date=monday_date + timedelta(days=2),
+                                 live_data_source='DAILY_CHECK_APP_MLAB')
+        self.assertTrue(aggregate_school_daily_status_to_school_weekly_status_in_bulk(self.country, monday_date))
+        self.assertEqual(SchoolWeeklyStatus.objects.count(), 2)
+
+        school_weekly.refresh_from_db()
+        self.assertEqual(school_weekly.connectivity_speed, 6000000)
+        self.assertEqual(school_weekly.num_students, 120)
+
+    def test_aggregate_school_daily_status_to_school_weekly_status_in_bulk_without_data(self):
+        self.assertFalse(aggregate_school_daily_status_to_school_weekly_status_in_bulk(
+            self.country, datetime.now().date() - timedelta(days=14)))
+        self.assertEqual(SchoolWeeklyStatus.objects.count(), 0)
+
     def test_aggregate_school_daily_status_to_school_weekly_status_connectivity_unknown(self):
         # daily status is too old, so it wouldn't be involved into country calculations
         today = datetime.now().date()
@@ -148,3 +312,119 @@ class AggregateConnectivityDataTestCase(TestCase):
         aggregate_school_daily_status_to_school_weekly_status(self.country, today)
         self.assertEqual(SchoolWeeklyStatus.objects.count(), 1)
         self.assertEqual(SchoolWeeklyStatus.objects.last().connectivity, False)
+
+
+class SchoolMapStateTestCase(TestCase):
+    databases = ['default', ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory()
+        cls.school = SchoolFactory(country=cls.country, coverage_type='4g', connectivity_status='good')
+        cls.other_school = SchoolFactory(country=cls.country, coverage_type='no')
+
+    def test_refresh_school_map_state(self):
+        refresh_school_map_state(country_id=self.country.id)
+        self.assertEqual(SchoolMapState.objects.count(), 2)
+
+        map_state = SchoolMapState.objects.get(id=self.school.id)
+        self.assertEqual(map_state.coverage_status, 'good')
+        self.assertEqual(map_state.connectivity_status, 'connected')
+        self.assertFalse(map_state.is_rt_connected)
+        self.assertEqual(map_state.geometry.srid, 3857)
+
+    def test_refresh_school_map_state_for_changed_schools(self):
+        refresh_school_map_state()
+        modified = SchoolMapState.objects.get(id=self.other_school.id).modified
+
+        self.school.coverage_type = '3g'
+        self.school.save()
+        weekly_status = SchoolWeeklyStatusFactory(school=self.school, connectivity_speed=5000000)
+        self.school.last_weekly_status_id = weekly_status.id
+        self.school.save()
+
+        refresh_school_map_state(school_ids=[self.school.id, self.other_school.id])
+        map_state = SchoolMapState.objects.get(id=self.school.id)
+        self.assertEqual(map_state.coverage_status, 'moderate')
+        self.assertEqual(map_state.connectivity_speed, 5000000)
+        # Unchanged rows are not rewritten
+        self.assertEqual(SchoolMapState.objects.get(id=self.other_school.id).modified, modified)
+
+        self.other_school.delete()
+        refresh_school_map_state(school_ids=[self.other_school.id])
+        self.assertFalse(SchoolMapState.objects.filter(id=self.other_school.id).exists())
+        self.assertEqual(SchoolMapState.objects.count(), 1)
+
+    @override_settings(ENABLE_SCHOOL_MAP_STATE=True)
+    def test_school_map_state_refreshed_by_aggregation_only(self):
+        # Saving the country only invalidates the cache, the map state is rebuilt after the aggregation
+        self.country.save()
+        self.assertFalse(SchoolMapState.objects.exists())
+
+        finalize_previous_day_data(None, self.country.id, timezone.now().date(), incremental=False)
+        self.assertEqual(SchoolMapState.objects.filter(country_id=self.country.id).count(), 2)
+
+    @override_settings(ENABLE_SCHOOL_MAP_STATE=True, ENABLE_SCHOOL_MAP_CLUSTERS=True, SCHOOL_MAP_CLUSTER_ZOOM=3)
+    def test_school_map_clusters_refreshed_by_aggregation_only(self):
+        self.country.save()
+        self.assertFalse(SchoolMapCluster.objects.exists())
+
+        finalize_previous_day_data(None, self.country.id, timezone.now().date(), incremental=False)
+        self.assertTrue(SchoolMapCluster.objects.filter(country_id=self.country.id).exists())
+
+    @override_settings(SCHOOL_MAP_THINNING_MAX_ZOOM=4)
+    def test_update_school_map_state_min_zoom(self):
+        far_school = SchoolFactory(country=self.country, geopoint=GEOSGeometry('Point(30 30)'))
+        refresh_school_map_state(country_id=self.country.id)
+
+        # One of the schools sharing the same point is thinned out until the max zoom
+        self.assertListEqual(
+            sorted(SchoolMapState.objects.filter(
+                id__in=[self.school.id, self.other_school.id]).values_list('min_zoom', flat=True)),
+            [0, 4],
+        )
+        self.assertEqual(SchoolMapState.objects.get(id=far_school.id).min_zoom, 0)
+
+        # Deterministic between refreshes
+        min_zooms = dict(SchoolMapState.objects.values_list('id', 'min_zoom'))
+        refresh_school_map_state(country_id=self.country.id)
+        self.assertDictEqual(dict(SchoolMapState.objects.values_list('id', 'min_zoom')), min_zooms)
+
+    def test_get_school_map_sampling(self):
+        with override_settings(ENABLE_SCHOOL_MAP_STATE=True):
+            self.assertEqual(get_school_map_sampling(3, 'ms'),
+                             ('AND ms."min_zoom" <= 3', 'ORDER BY ms."min_zoom", ms."id"'))
+
+        with override_settings(ENABLE_SCHOOL_MAP_STATE=False):
+            self.assertEqual(get_school_map_sampling(2, 'schools_school'),
+                             ('', 'ORDER BY schools_school."giga_id_school"'))
+            self.assertEqual(get_school_map_sampling(3, 'schools_school', order_schools=False), ('', ''))
+
+    @override_settings(SCHOOL_MAP_CLUSTER_ZOOM=3)
+    def test_refresh_school_map_clusters(self):
+        refresh_school_map_state(country_id=self.country.id)
+        refresh_school_map_clusters(country_id=self.country.id)
+
+        clusters = SchoolMapCluster.objects.filter(layer_key=SCHOOL_MAP_CLUSTER_COVERAGE)
+        self.assertListEqual(sorted(clusters.values_list('zoom', flat=True)), [0, 1, 2])
+
+        # Both schools share the same point, so the same cell at every zoom
+        cluster = clusters.get(zoom=2)
+        self.assertEqual(cluster.schools_count, 2)
+        self.assertDictEqual(cluster.status_counts, {'good': 1, 'bad': 1})
+        self.assertEqual(cluster.dominant_status, 'bad')
+        self.assertEqual(cluster.geometry.srid, 3857)
+
+        # Rebuilt, not appended
+        refresh_school_map_clusters(country_id=self.country.id)
+        self.assertEqual(SchoolMapCluster.objects.filter(layer_key=SCHOOL_MAP_CLUSTER_COVERAGE).count(), 3)
+
+    def test_get_school_map_cluster_query(self):
+        query = get_school_map_cluster_query('ST_MakeEnvelope(0, 0, 1, 1, 3857)', SCHOOL_MAP_CLUSTER_COVERAGE, 2,
+                                             'coverage_status', country_ids=['7', 'invalid'])
+        self.assertIn('mc."layer_key" = \'coverage\'', query)
+        self.assertIn('mc."zoom" = 2', query)
+        self.assertIn('mc."country_id" IN (7,0)', query)
+        self.assertIn('AS "coverage_status"', query)
+        # The cluster id must not be mistaken for a school id by the map clients
+        self.assertIn('mc."id" AS cluster_id', query)
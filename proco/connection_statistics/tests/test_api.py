@@ -3,21 +3,28 @@ from datetime import datetime, timedelta
 from django.conf import settings
 from django.core.cache import cache
 from django.core.management import call_command
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import resolve, reverse
 from isoweek import Week
 from rest_framework import exceptions as rest_exceptions
 from rest_framework import status
 
 from proco.accounts import models as accounts_models
-from proco.connection_statistics.models import CountryWeeklyStatus
+from proco.connection_statistics.models import (
+    CountryWeeklyStatus,
+    RealTimeWeeklySummary,
+    SchoolRealTimeRegistration,
+    SchoolStatusSummary,
+)
 from proco.connection_statistics.tests.factories import (
     CountryDailyStatusFactory,
     CountryWeeklyStatusFactory,
     SchoolDailyStatusFactory,
     SchoolWeeklyStatusFactory,
 )
+from proco.connection_statistics.utils import update_realtime_weekly_summary, update_school_status_summary
 from proco.custom_auth.tests import test_utils as test_utilities
+from proco.data_sources.tasks import finalize_previous_day_data
 from proco.locations.tests.factories import CountryFactory, Admin1Factory
 from proco.schools.tests.factories import SchoolFactory
 from proco.utils.dates import format_date, get_first_date_of_month, get_last_date_of_month
@@ -659,6 +666,102 @@ class ConnectivityStatApiTestCase(TestAPIViewSetMixin, TestCase):
         self.assertIn('real_time_connected_schools', response_data)
 
 
+@override_settings(ENABLE_STATISTICS_SUMMARY=True)
+class StatisticsSummaryApiTestCase(TestAPIViewSetMixin, TestCase):
+    databases = ['default', ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory()
+        cls.admin1_one = Admin1Factory(country=cls.country, layer_name='adm1')
+
+        cls.monday_date = datetime.now().date() - timedelta(days=datetime.now().date().weekday())
+        year, week, _ = cls.monday_date.isocalendar()
+
+        speeds = [3 * (10 ** 6), 500000, None]
+        for speed in speeds:
+            school = SchoolFactory(country=cls.country, admin1=cls.admin1_one, connectivity_status='good')
+            SchoolRealTimeRegistration.objects.create(
+                school=school, rt_registered=True, rt_registration_date=datetime.now() - timedelta(days=30))
+            school.last_weekly_status = SchoolWeeklyStatusFactory(school=school, year=year, week=week,
+                                                                  connectivity_speed=speed)
+            school.save()
+
+            if speed:
+                SchoolDailyStatusFactory(school=school, date=cls.monday_date, connectivity_speed=speed)
+
+        SchoolFactory(country=cls.country, connectivity_status='unknown')
+
+        update_school_status_summary(cls.country)
+        update_realtime_weekly_summary(cls.country, cls.monday_date)
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def get_response_data(self, query_params, view_name='global-stat'):
+        url, _, view = statistics_url((), dict(query_params, cache='off'), view_name=view_name)
+        response = self.forced_auth_req('get', url, view=view)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_global_stats_from_summary(self):
+        self.assertEqual(SchoolStatusSummary.objects.filter(country=self.country).count(), 2)
+
+        with override_settings(ENABLE_STATISTICS_SUMMARY=False):
+            live_data = self.get_response_data({'country_id': self.country.id})
+
+        self.assertDictEqual(self.get_response_data({'country_id': self.country.id}), live_data)
+        self.assertEqual(live_data['schools_connected'], 4)
+
+    def test_school_status_summary_refreshed_by_aggregation_only(self):
+        SchoolStatusSummary.objects.all().delete()
+
+        self.country.save()
+        self.assertFalse(SchoolStatusSummary.objects.filter(country=self.country).exists())
+
+        finalize_previous_day_data(None, self.country.id, self.monday_date, incremental=False)
+        self.assertEqual(SchoolStatusSummary.objects.filter(country=self.country).count(), 2)
+
+    def test_global_stats_with_filters_use_live_data(self):
+        SchoolStatusSummary.objects.update(schools_total=100)
+
+        self.assertEqual(self.get_response_data({'country_id': self.country.id})['schools_connected'], 400)
+        self.assertEqual(self.get_response_data({
+            'country_id': self.country.id,
+            'id__in': ','.join(map(str, self.country.schools.values_list('id', flat=True))),
+        })['schools_connected'], 4)
+
+    def test_connectivity_stat_from_summary(self):
+        query_params = {
+            'country_id': self.country.id,
+            'start_date': format_date(self.monday_date),
+            'end_date': format_date(self.monday_date + timedelta(days=6)),
+            'is_weekly': 'true',
+        }
+
+        self.assertTrue(RealTimeWeeklySummary.objects.filter(country=self.country).exists())
+
+        with override_settings(ENABLE_STATISTICS_SUMMARY=False):
+            live_data = self.get_response_data(query_params, view_name='global-connectivity-stat')
+
+        summary_data = self.get_response_data(query_params, view_name='global-connectivity-stat')
+        self.assertDictEqual(summary_data, live_data)
+        self.assertEqual(summary_data['no_of_schools_measure'], 3)
+        self.assertEqual(summary_data['school_with_realtime_data'], 2)
+
+    def test_connectivity_stat_with_changed_benchmark_use_live_data(self):
+        RealTimeWeeklySummary.objects.update(global_benchmark=1, schools_total=100)
+
+        data = self.get_response_data({
+            'country_id': self.country.id,
+            'start_date': format_date(self.monday_date),
+            'end_date': format_date(self.monday_date + timedelta(days=6)),
+            'is_weekly': 'true',
+        }, view_name='global-connectivity-stat')
+        self.assertEqual(data['no_of_schools_measure'], 3)
+
+
 class SchoolConnectivityStatApiTestCase(TestAPIViewSetMixin, TestCase):
 
     @classmethod
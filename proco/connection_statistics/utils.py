@@ -1,10 +1,15 @@
 import json
+import logging
 import re
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 
+from django.conf import settings
+from django.db import connection, transaction
 from django.db.models import Avg, Q
+from django.utils import timezone
 
 from proco.accounts.models import DataLayer
+from proco.accounts.utils import get_legend_label_cases
 from proco.connection_statistics.aggregations import (
     aggregate_connectivity_by_availability,
     aggregate_connectivity_by_speed,
@@ -13,11 +18,17 @@ from proco.connection_statistics.aggregations import (
     aggregate_coverage_by_types,
     aggregate_coverage_default,
 )
+from proco.connection_statistics.config import app_config as statistics_configs
 from proco.connection_statistics.models import (
     CountryDailyStatus,
     CountryWeeklyStatus,
+    DirtySchoolDay,
     RealTimeConnectivity,
+    RealTimeWeeklySummary,
     SchoolDailyStatus,
+    SchoolMapCluster,
+    SchoolMapState,
+    SchoolStatusSummary,
     SchoolWeeklyStatus,
 )
 from proco.core.utils import convert_to_int, get_current_datetime_object
@@ -26,12 +37,154 @@ from proco.schools.constants import ColorMapSchema
 from proco.schools.constants import statuses_schema
 from proco.schools.models import School
 from proco.utils import dates as date_utilities
+from proco.utils.tiles import WORLD_MERCATOR_MAX
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+CONNECTIVITY_STATISTICS_FIELDS = (
+    'connectivity_speed',
+    'connectivity_upload_speed',
+    'connectivity_latency',
+    'roundtrip_time',
+    'jitter_download',
+    'jitter_upload',
+    'rtt_packet_loss_pct',
+    'connectivity_speed_probe',
+    'connectivity_upload_speed_probe',
+    'connectivity_latency_probe',
+    'connectivity_speed_mean',
+    'connectivity_upload_speed_mean',
+)
+
+# Static fields copied from the previous week when a new SchoolWeeklyStatus row is created by the aggregation
+SCHOOL_WEEKLY_CARRY_FORWARD_FIELDS = (
+    'num_students',
+    'num_teachers',
+    'num_classroom',
+    'num_latrines',
+    'running_water',
+    'electricity_availability',
+    'computer_lab',
+    'num_computers',
+    'connectivity_type',
+    'coverage_availability',
+    'coverage_type',
+    'download_speed_contracted',
+    'num_computers_desired',
+    'electricity_type',
+    'num_adm_personnel',
+    'fiber_node_distance',
+    'microwave_node_distance',
+    'schools_within_1km',
+    'schools_within_2km',
+    'schools_within_3km',
+    'nearest_lte_distance',
+    'nearest_umts_distance',
+    'nearest_gsm_distance',
+    'nearest_nr_distance',
+    'pop_within_1km',
+    'pop_within_2km',
+    'pop_within_3km',
+    'school_data_source',
+    'school_data_collection_year',
+    'school_data_collection_modality',
+    'school_location_ingestion_timestamp',
+    'connectivity_govt_ingestion_timestamp',
+    'connectivity_govt_collection_year',
+    'disputed_region',
+    'download_speed_benchmark',
+    'num_students_girls',
+    'num_students_boys',
+    'num_students_other',
+    'num_teachers_female',
+    'num_teachers_male',
+    'num_tablets',
+    'num_robotic_equipment',
+    'computer_availability',
+    'teachers_trained',
+    'sustainable_business_model',
+    'device_availability',
+    'building_id_govt',
+    'num_schools_per_building',
+)
+
+
+def aggregate_real_time_data_to_school_daily_status(country, date, in_bulk=None, school_ids=None):
+    """
+    aggregate_real_time_data_to_school_daily_status
+        Average the RealTimeConnectivity rows of the given country and date per school and live data source
+        and store them in SchoolDailyStatus.
 
+        in_bulk: if True, use the set based INSERT ... ON CONFLICT statement, otherwise aggregate school by school.
+        Defaults to settings.ENABLE_BULK_AGGREGATIONS.
+        school_ids: if given, only these schools of the country are aggregated.
+    """
+    if in_bulk is None:
+        in_bulk = settings.ENABLE_BULK_AGGREGATIONS
 
-def aggregate_real_time_data_to_school_daily_status(country, date):
+    if in_bulk:
+        return aggregate_real_time_data_to_school_daily_status_in_bulk(country, date, school_ids=school_ids)
+    return aggregate_real_time_data_to_school_daily_status_per_school(country, date, school_ids=school_ids)
+
+
+def aggregate_real_time_data_to_school_daily_status_in_bulk(country, date, school_ids=None):
+    """
+    aggregate_real_time_data_to_school_daily_status_in_bulk
+        Compute the daily averages of all the schools of a country in one GROUP BY query and upsert them into
+        SchoolDailyStatus against the "schooldailystatus_unique_without_deleted" constraint.
+
+    :return: number of inserted or updated SchoolDailyStatus rows
+    """
+    start_datetime = timezone.make_aware(datetime.combine(date, time.min))
+    end_datetime = start_datetime + timedelta(days=1)
+
+    query = """
+    INSERT INTO "connection_statistics_schooldailystatus" (
+        "created", "modified", "school_id", "date", "live_data_source", {columns}, "deleted"
+    )
+    SELECT %(current_datetime)s, %(current_datetime)s, rt."school_id", %(date)s, rt."live_data_source",
+        {avg_columns},
+        NULL
+    FROM "connection_statistics_realtimeconnectivity" rt
+    INNER JOIN "schools_school" s ON s."id" = rt."school_id"
+    WHERE s."country_id" = %(country_id)s
+        AND rt."deleted" IS NULL
+        AND rt."created" >= %(start_datetime)s
+        AND rt."created" < %(end_datetime)s
+        {school_filter}
+    GROUP BY rt."school_id", rt."live_data_source"
+    ON CONFLICT ("date", "school_id", "live_data_source") WHERE "deleted" IS NULL
+    DO UPDATE SET {update_columns}, "modified" = EXCLUDED."modified"
+    """.format(
+        columns=', '.join(['"{0}"'.format(field) for field in CONNECTIVITY_STATISTICS_FIELDS]),
+        avg_columns=', '.join(['AVG(rt."{0}")'.format(field) for field in CONNECTIVITY_STATISTICS_FIELDS]),
+        update_columns=', '.join(['"{0}" = EXCLUDED."{0}"'.format(field) for field in CONNECTIVITY_STATISTICS_FIELDS]),
+        school_filter='AND rt."school_id" = ANY(%(school_ids)s)' if school_ids is not None else '',
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, {
+            'current_datetime': get_current_datetime_object(),
+            'date': date,
+            'country_id': country.id,
+            'start_datetime': start_datetime,
+            'end_datetime': end_datetime,
+            'school_ids': list(school_ids or []),
+        })
+        total_rows = cursor.rowcount
+
+    logger.debug('School daily aggregation for country "{0}" on "{1}" upserted {2} rows.'.format(
+        country.id, date, total_rows))
+    return total_rows
+
+
+def aggregate_real_time_data_to_school_daily_status_per_school(country, date, school_ids=None):
     schools = RealTimeConnectivity.objects.all().filter(
         created__date=date, school__country=country,
-    ).order_by('school').values_list('school', flat=True).order_by('school_id').distinct('school_id')
+    )
+    if school_ids is not None:
+        schools = schools.filter(school_id__in=school_ids)
+    schools = schools.order_by('school').values_list('school', flat=True).order_by('school_id').distinct('school_id')
 
     for school in schools:
         aggregate_by_source = RealTimeConnectivity.objects.filter(
@@ -124,22 +277,169 @@ def aggregate_school_daily_to_country_daily(country, date) -> bool:
     return updated
 
 
-def aggregate_school_daily_status_to_school_weekly_status(country, date) -> bool:
+def aggregate_school_daily_status_to_school_weekly_status(country, date, in_bulk=None, school_ids=None) -> bool:
+    """
+    aggregate_school_daily_status_to_school_weekly_status
+        Average the SchoolDailyStatus rows of the week of the given date per school and store them in
+        SchoolWeeklyStatus. Newly created weekly rows carry forward the static fields of the previous week.
+
+        in_bulk: if True, use the set based SQL statements, otherwise aggregate school by school.
+        Defaults to settings.ENABLE_BULK_AGGREGATIONS.
+        school_ids: if given, only these schools of the country are aggregated.
+    """
+    if in_bulk is None:
+        in_bulk = settings.ENABLE_BULK_AGGREGATIONS
+
+    if in_bulk:
+        return aggregate_school_daily_status_to_school_weekly_status_in_bulk(country, date, school_ids=school_ids)
+    return aggregate_school_daily_status_to_school_weekly_status_per_school(country, date, school_ids=school_ids)
+
+
+def update_school_last_weekly_status(weekly_ids):
+    """
+    update_school_last_weekly_status
+        Set School.last_weekly_status for the given SchoolWeeklyStatus rows written with bulk statements.
+        Same rule as the SchoolWeeklyStatus post_save signal: only move forward, never back to an older week.
+    """
+    if len(weekly_ids) == 0:
+        return
+
+    last_weekly_status_query = """
+    UPDATE "schools_school" AS s
+    SET "last_weekly_status_id" = sws."id"
+    FROM "connection_statistics_schoolweeklystatus" sws
+    WHERE sws."id" = ANY(%(weekly_ids)s)
+        AND sws."school_id" = s."id"
+        AND NOT EXISTS (
+            SELECT 1 FROM "connection_statistics_schoolweeklystatus" lws
+            WHERE lws."id" = s."last_weekly_status_id"
+                AND lws."date" >= sws."date"
+        )
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(last_weekly_status_query, {'weekly_ids': list(weekly_ids)})
+
+
+def aggregate_school_daily_status_to_school_weekly_status_in_bulk(country, date, school_ids=None) -> bool:
+    """
+    aggregate_school_daily_status_to_school_weekly_status_in_bulk
+        Compute the weekly averages of all the schools of a country in one GROUP BY query and upsert them into
+        SchoolWeeklyStatus against the "schoolweeklystatus_unique_without_deleted" constraint.
+        Inserted rows copy the static fields from the latest previous weekly row of the school, existing rows
+        only get the new averages. Finally, School.last_weekly_status is moved forward the same way the
+        SchoolWeeklyStatus post_save signal does it for a single row.
+
+    :return: True if any school of the country had daily data in the week
+    """
     monday_date = date - timedelta(days=date.weekday())
     sunday_date = monday_date + timedelta(days=6)
 
     monday_week_no = date_utilities.get_week_from_date(monday_date)
     monday_year = date_utilities.get_year_from_date(monday_date)
 
-    school_ids = SchoolDailyStatus.objects.all().filter(
+    params = {
+        'current_datetime': get_current_datetime_object(),
+        'country_id': country.id,
+        'monday_date': monday_date,
+        'sunday_date': sunday_date,
+        'year': monday_year,
+        'week': monday_week_no,
+        'live_data_source': SchoolWeeklyStatus._meta.get_field('live_data_source').get_default(),
+        'school_ids': list(school_ids or []),
+    }
+
+    carry_forward_columns = []
+    for field_name in SCHOOL_WEEKLY_CARRY_FORWARD_FIELDS:
+        field = SchoolWeeklyStatus._meta.get_field(field_name)
+        if field.null:
+            carry_forward_columns.append('pw."{0}"'.format(field_name))
+        else:
+            # Not nullable columns fall back to the model default when the school has no previous week
+            params['default_' + field_name] = field.get_default()
+            carry_forward_columns.append('COALESCE(pw."{0}", %(default_{0})s)'.format(field_name))
+
+    upsert_query = """
+    WITH weekly_avg AS (
+        SELECT sds."school_id", {avg_columns}
+        FROM "connection_statistics_schooldailystatus" sds
+        INNER JOIN "schools_school" s ON s."id" = sds."school_id"
+        WHERE s."country_id" = %(country_id)s
+            AND s."deleted" IS NULL
+            AND sds."deleted" IS NULL
+            AND sds."date" BETWEEN %(monday_date)s AND %(sunday_date)s
+            {school_filter}
+        GROUP BY sds."school_id"
+    ),
+    prev_weekly AS (
+        SELECT DISTINCT ON (sws."school_id") sws.*
+        FROM "connection_statistics_schoolweeklystatus" sws
+        INNER JOIN weekly_avg wa ON wa."school_id" = sws."school_id"
+        WHERE sws."deleted" IS NULL
+            AND sws."date" < %(monday_date)s
+            AND NOT EXISTS (
+                SELECT 1 FROM "connection_statistics_schoolweeklystatus" cws
+                WHERE cws."school_id" = sws."school_id"
+                    AND cws."year" = %(year)s
+                    AND cws."week" = %(week)s
+                    AND cws."deleted" IS NULL
+            )
+        ORDER BY sws."school_id", sws."id" DESC
+    )
+    INSERT INTO "connection_statistics_schoolweeklystatus" (
+        "created", "modified", "school_id", "year", "week", "date", "connectivity", "live_data_source",
+        {columns}, {carry_forward_columns}, "deleted"
+    )
+    SELECT %(current_datetime)s, %(current_datetime)s, wa."school_id", %(year)s, %(week)s, %(monday_date)s,
+        TRUE, %(live_data_source)s,
+        {weekly_avg_columns}, {carry_forward_values},
+        NULL
+    FROM weekly_avg wa
+    LEFT JOIN prev_weekly pw ON pw."school_id" = wa."school_id"
+    ON CONFLICT ("year", "week", "school_id") WHERE "deleted" IS NULL
+    DO UPDATE SET {update_columns}, "connectivity" = TRUE, "modified" = EXCLUDED."modified"
+    RETURNING "id"
+    """.format(
+        avg_columns=', '.join(['AVG(sds."{0}") AS "{0}"'.format(field) for field in CONNECTIVITY_STATISTICS_FIELDS]),
+        columns=', '.join(['"{0}"'.format(field) for field in CONNECTIVITY_STATISTICS_FIELDS]),
+        carry_forward_columns=', '.join(['"{0}"'.format(field) for field in SCHOOL_WEEKLY_CARRY_FORWARD_FIELDS]),
+        weekly_avg_columns=', '.join(['wa."{0}"'.format(field) for field in CONNECTIVITY_STATISTICS_FIELDS]),
+        carry_forward_values=', '.join(carry_forward_columns),
+        update_columns=', '.join(['"{0}" = EXCLUDED."{0}"'.format(field) for field in CONNECTIVITY_STATISTICS_FIELDS]),
+        school_filter='AND sds."school_id" = ANY(%(school_ids)s)' if school_ids is not None else '',
+    )
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(upsert_query, params)
+            weekly_ids = [row[0] for row in cursor.fetchall()]
+
+        update_school_last_weekly_status(weekly_ids)
+
+    logger.debug('School weekly aggregation for country "{0}" on "{1}-{2}" upserted {3} rows.'.format(
+        country.id, monday_year, monday_week_no, len(weekly_ids)))
+    return len(weekly_ids) > 0
+
+
+def aggregate_school_daily_status_to_school_weekly_status_per_school(country, date, school_ids=None) -> bool:
+    monday_date = date - timedelta(days=date.weekday())
+    sunday_date = monday_date + timedelta(days=6)
+
+    monday_week_no = date_utilities.get_week_from_date(monday_date)
+    monday_year = date_utilities.get_year_from_date(monday_date)
+
+    weekly_school_ids = SchoolDailyStatus.objects.all().filter(
         date__range=[monday_date, sunday_date],
         school__country=country,
         school__deleted__isnull=True
-    ).values_list('school', flat=True).order_by('school_id').distinct('school_id')
+    )
+    if school_ids is not None:
+        weekly_school_ids = weekly_school_ids.filter(school_id__in=school_ids)
+    weekly_school_ids = weekly_school_ids.values_list('school', flat=True).order_by('school_id').distinct('school_id')
 
     updated = False
 
-    for school_id in school_ids:
+    for school_id in weekly_school_ids:
         updated = True
         created = False
 
@@ -190,65 +490,8 @@ def aggregate_school_daily_status_to_school_weekly_status(country, date) -> bool
             ).last()
 
             if prev_weekly:
-                school_weekly.num_students = prev_weekly.num_students
-                school_weekly.num_teachers = prev_weekly.num_teachers
-                school_weekly.num_classroom = prev_weekly.num_classroom
-                school_weekly.num_latrines = prev_weekly.num_latrines
-                school_weekly.running_water = prev_weekly.running_water
-                school_weekly.electricity_availability = prev_weekly.electricity_availability
-                school_weekly.computer_lab = prev_weekly.computer_lab
-                school_weekly.num_computers = prev_weekly.num_computers
-
-                school_weekly.connectivity_type = prev_weekly.connectivity_type
-                school_weekly.coverage_availability = prev_weekly.coverage_availability
-                school_weekly.coverage_type = prev_weekly.coverage_type
-
-                school_weekly.download_speed_contracted = prev_weekly.download_speed_contracted
-                school_weekly.num_computers_desired = prev_weekly.num_computers_desired
-                school_weekly.electricity_type = prev_weekly.electricity_type
-                school_weekly.num_adm_personnel = prev_weekly.num_adm_personnel
-
-                school_weekly.fiber_node_distance = prev_weekly.fiber_node_distance
-                school_weekly.microwave_node_distance = prev_weekly.microwave_node_distance
-
-                school_weekly.schools_within_1km = prev_weekly.schools_within_1km
-                school_weekly.schools_within_2km = prev_weekly.schools_within_2km
-                school_weekly.schools_within_3km = prev_weekly.schools_within_3km
-
-                school_weekly.nearest_lte_distance = prev_weekly.nearest_lte_distance
-                school_weekly.nearest_umts_distance = prev_weekly.nearest_umts_distance
-                school_weekly.nearest_gsm_distance = prev_weekly.nearest_gsm_distance
-                school_weekly.nearest_nr_distance = prev_weekly.nearest_nr_distance
-
-                school_weekly.pop_within_1km = prev_weekly.pop_within_1km
-                school_weekly.pop_within_2km = prev_weekly.pop_within_2km
-                school_weekly.pop_within_3km = prev_weekly.pop_within_3km
-
-                school_weekly.school_data_source = prev_weekly.school_data_source
-                school_weekly.school_data_collection_year = prev_weekly.school_data_collection_year
-                school_weekly.school_data_collection_modality = prev_weekly.school_data_collection_modality
-                school_weekly.school_location_ingestion_timestamp = prev_weekly.school_location_ingestion_timestamp
-                school_weekly.connectivity_govt_ingestion_timestamp = prev_weekly.connectivity_govt_ingestion_timestamp
-                school_weekly.connectivity_govt_collection_year = prev_weekly.connectivity_govt_collection_year
-                school_weekly.disputed_region = prev_weekly.disputed_region
-
-                school_weekly.download_speed_benchmark = prev_weekly.download_speed_benchmark
-
-                school_weekly.num_students_girls = prev_weekly.num_students_girls
-                school_weekly.num_students_boys = prev_weekly.num_students_boys
-                school_weekly.num_students_other = prev_weekly.num_students_other
-                school_weekly.num_teachers_female = prev_weekly.num_teachers_female
-                school_weekly.num_teachers_male = prev_weekly.num_teachers_male
-                school_weekly.num_tablets = prev_weekly.num_tablets
-                school_weekly.num_robotic_equipment = prev_weekly.num_robotic_equipment
-
-                school_weekly.computer_availability = prev_weekly.computer_availability
-                school_weekly.teachers_trained = prev_weekly.teachers_trained
-                school_weekly.sustainable_business_model = prev_weekly.sustainable_business_model
-                school_weekly.device_availability = prev_weekly.device_availability
-
-                school_weekly.building_id_govt = prev_weekly.building_id_govt
-                school_weekly.num_schools_per_building = prev_weekly.num_schools_per_building
+                for field in SCHOOL_WEEKLY_CARRY_FORWARD_FIELDS:
+                    setattr(school_weekly, field, getattr(prev_weekly, field))
 
         school_weekly.save()
 
@@ -440,6 +683,103 @@ def update_country_weekly_status(country: Country, date):
     country_status.save()
 
 
+def mark_school_days_dirty(dirty_keys):
+    """
+    mark_school_days_dirty
+        Record the (school_id, date, live_data_source) keys that received new RealTimeConnectivity rows.
+        Keys already waiting for the next aggregation are skipped.
+    """
+    DirtySchoolDay.objects.bulk_create([
+        DirtySchoolDay(school_id=school_id, date=date, live_data_source=live_data_source)
+        for school_id, date, live_data_source in dirty_keys
+    ], batch_size=5000, ignore_conflicts=True)
+
+
+def mark_real_time_connectivity_dirty(realtime_rows):
+    """
+    mark_real_time_connectivity_dirty
+        Record the DirtySchoolDay keys of RealTimeConnectivity instances written with bulk_create.
+        The created value can be a date or a datetime, as the data loss recovery commands store plain dates.
+    """
+    dirty_keys = set()
+    for realtime_row in realtime_rows:
+        created = realtime_row.created
+        if isinstance(created, datetime):
+            created = timezone.localtime(created).date() if timezone.is_aware(created) else created.date()
+        dirty_keys.add((realtime_row.school_id, created, realtime_row.live_data_source))
+
+    mark_school_days_dirty(dirty_keys)
+
+
+def pop_dirty_school_days(country):
+    """
+    pop_dirty_school_days
+        Delete the DirtySchoolDay keys of the country in one statement.
+        Call it inside the transaction of the aggregation, so the keys come back if the aggregation fails.
+
+    :return: list of (school_id, date, live_data_source) tuples
+    """
+    query = """
+    DELETE FROM "{dirty_table}" d
+    USING "{school_table}" s
+    WHERE s."id" = d."school_id"
+        AND s."country_id" = %(country_id)s
+    RETURNING d."school_id", d."date", d."live_data_source"
+    """.format(
+        dirty_table=DirtySchoolDay._meta.db_table,
+        school_table=School._meta.db_table,
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, {'country_id': country.id})
+        return cursor.fetchall()
+
+
+def aggregate_dirty_school_days(country) -> bool:
+    """
+    aggregate_dirty_school_days
+        Incremental version of the live data aggregations. Consume the DirtySchoolDay keys of the country and
+        recompute the SchoolDailyStatus and SchoolWeeklyStatus rows of the dirty schools only, then the
+        CountryDailyStatus rows of the dirty dates and the CountryWeeklyStatus rows of the dirty weeks.
+        The keys are deleted in the same transaction as the aggregation, so a failed or killed run keeps them.
+
+    :return: True if the country had dirty school days
+    """
+    with transaction.atomic():
+        dirty_keys = pop_dirty_school_days(country)
+        if len(dirty_keys) == 0:
+            return False
+
+        school_ids_by_date = {}
+        for school_id, date, _ in dirty_keys:
+            school_ids_by_date.setdefault(date, set()).add(school_id)
+
+        school_ids_by_week = {}
+        for date in sorted(school_ids_by_date):
+            school_ids = sorted(school_ids_by_date[date])
+            aggregate_real_time_data_to_school_daily_status(country, date, school_ids=school_ids)
+            aggregate_school_daily_to_country_daily(country, date)
+
+            monday_date = date - timedelta(days=date.weekday())
+            school_ids_by_week.setdefault(monday_date, set()).update(school_ids)
+
+        for monday_date in sorted(school_ids_by_week):
+            weekly_data_available = aggregate_school_daily_status_to_school_weekly_status(
+                country, monday_date, school_ids=sorted(school_ids_by_week[monday_date]))
+            if weekly_data_available:
+                update_country_weekly_status(country, monday_date)
+
+            if settings.ENABLE_STATISTICS_SUMMARY:
+                update_realtime_weekly_summary(country, monday_date)
+
+        if settings.ENABLE_STATISTICS_SUMMARY:
+            update_school_status_summary(country)
+
+    logger.debug('Aggregated {0} dirty school days of country "{1}" over {2} dates.'.format(
+        len(dirty_keys), country.id, len(school_ids_by_date)))
+    return True
+
+
 def update_country_data_source_by_csv_filename(imported_file):
     match = re.search(r'-(\D+)(?:-\d+)*-[^-]+\.\w+$', imported_file.filename)  # noqa: DUO138
     if match:
@@ -486,3 +826,507 @@ def get_benchmark_value_for_default_download_layer(benchmark, country_id):
                     benchmark_val = all_live_layers[str(data_layer_instance.id)]
 
     return convert_to_int(str(benchmark_val), default='20000000'), benchmark_unit
+
+
+def update_school_status_summary(country):
+    """
+    update_school_status_summary
+        Rebuild the SchoolStatusSummary rows of a country: number of schools by connectivity status per admin1.
+    """
+    params = {
+        'current_datetime': get_current_datetime_object(),
+        'country_id': country.id,
+    }
+
+    delete_query = 'DELETE FROM "{table}" WHERE "country_id" = %(country_id)s'.format(
+        table=SchoolStatusSummary._meta.db_table)
+
+    insert_query = """
+    INSERT INTO "{table}" (
+        "created", "modified", "country_id", "admin1_id", "schools_total", "schools_connected",
+        "schools_not_connected", "schools_unknown", "schools_connectivity_mapped"
+    )
+    SELECT %(current_datetime)s, %(current_datetime)s, s."country_id", s."admin1_id",
+        COUNT(*),
+        COUNT(*) FILTER (WHERE s."connectivity_status" IN ('good', 'moderate')),
+        COUNT(*) FILTER (WHERE s."connectivity_status" = 'no'),
+        COUNT(*) FILTER (WHERE s."connectivity_status" = 'unknown'),
+        COUNT(*) FILTER (WHERE s."connectivity_status" IN ('good', 'moderate', 'no'))
+    FROM "schools_school" s
+    WHERE s."country_id" = %(country_id)s
+        AND s."deleted" IS NULL
+    GROUP BY s."country_id", s."admin1_id"
+    """.format(table=SchoolStatusSummary._meta.db_table)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(delete_query, params)
+            cursor.execute(insert_query, params)
+
+
+# Columns rewritten by refresh_school_map_state, a row is only updated when one of them changed
+SCHOOL_MAP_STATE_COLUMNS = (
+    'country_id', 'admin1_id', 'admin2_id', 'giga_id_school', 'geometry', 'coverage_type', 'coverage_status',
+    'connectivity_status', 'last_weekly_status_id', 'connectivity_speed', 'is_rt_connected', 'rt_registration_date',
+)
+
+
+# With ENABLE_SCHOOL_MAP_STATE the tiles read the SchoolMapState rows (alias ms) and only join the schools when the
+# request filters on the other School columns
+SCHOOL_MAP_STATE_SCHOOL_JOIN = 'INNER JOIN schools_school ON schools_school."id" = ms."id"'
+
+
+def get_school_map_sampling(zoom, order_table, order_schools=True):
+    """
+    get_school_map_sampling
+        Zoom condition and ORDER BY of the tile queries which draw a limited sample of the schools, so a tile
+        always draws the same schools and the cached tiles agree at their edges.
+        With ENABLE_SCHOOL_MAP_STATE the tile keeps the schools thinned in at its zoom through the min_zoom index.
+        Else the schools are ordered by their giga id, a stable pseudo random rank, only when order_schools is set
+        as it sorts all the schools of the tile.
+    """
+    if settings.ENABLE_SCHOOL_MAP_STATE:
+        return (
+            'AND ms."min_zoom" <= {0}'.format(int(zoom)),
+            'ORDER BY {0}."min_zoom", {0}."id"'.format(order_table),
+        )
+
+    if order_schools:
+        return '', 'ORDER BY {0}."giga_id_school"'.format(order_table)
+    return '', ''
+
+
+def refresh_school_map_state(country_id=None, school_ids=None):
+    """
+    refresh_school_map_state
+        Upsert the SchoolMapState rows of the live schools of a country, of a list of schools or of all the schools
+        and delete the rows of the schools which are deleted or have no location. Unchanged rows are not rewritten.
+    """
+    params = {
+        'current_datetime': get_current_datetime_object(),
+        'max_zoom': settings.SCHOOL_MAP_THINNING_MAX_ZOOM,
+    }
+    school_filter = ''
+    map_state_filter = ''
+
+    if country_id:
+        school_filter += ' AND s."country_id" = %(country_id)s'
+        map_state_filter += ' AND ms."country_id" = %(country_id)s'
+        params['country_id'] = country_id
+
+    if school_ids is not None:
+        school_filter += ' AND s."id" = ANY(%(school_ids)s)'
+        map_state_filter += ' AND ms."id" = ANY(%(school_ids)s)'
+        params['school_ids'] = list(school_ids)
+
+    delete_query = """
+    DELETE FROM "{table}" ms
+    WHERE TRUE {map_state_filter}
+        AND NOT EXISTS (
+            SELECT 1 FROM "schools_school" s
+            WHERE s."id" = ms."id"
+                AND s."deleted" IS NULL
+                AND s."geopoint" IS NOT NULL
+                {school_filter}
+        )
+    """.format(table=SchoolMapState._meta.db_table, map_state_filter=map_state_filter, school_filter=school_filter)
+
+    upsert_query = """
+    INSERT INTO "{table}" AS ms ("id", {columns}, "min_zoom", "modified")
+    SELECT s."id", s."country_id", s."admin1_id", s."admin2_id", s."giga_id_school",
+        ST_Transform(s."geopoint", 3857),
+        s."coverage_type",
+        CASE WHEN LOWER(s."coverage_type") IN ('5g', '4g') THEN 'good'
+            WHEN LOWER(s."coverage_type") IN ('3g', '2g') THEN 'moderate'
+            WHEN LOWER(s."coverage_type") = 'no' THEN 'bad'
+            ELSE 'unknown'
+        END,
+        CASE WHEN s."connectivity_status" IN ('good', 'moderate') THEN 'connected'
+            WHEN s."connectivity_status" = 'no' THEN 'not_connected'
+            ELSE 'unknown'
+        END,
+        sws."id", sws."connectivity_speed",
+        COALESCE(rt."rt_registered", FALSE), rt."rt_registration_date",
+        %(max_zoom)s, %(current_datetime)s
+    FROM "schools_school" s
+    LEFT OUTER JOIN "connection_statistics_schoolweeklystatus" sws
+        ON sws."id" = s."last_weekly_status_id" AND sws."deleted" IS NULL
+    LEFT JOIN LATERAL (
+        SELECT BOOL_OR(r."rt_registered") AS "rt_registered",
+            MIN(r."rt_registration_date") FILTER (WHERE r."rt_registered" = True) AS "rt_registration_date"
+        FROM "connection_statistics_schoolrealtimeregistration" r
+        WHERE r."school_id" = s."id" AND r."deleted" IS NULL
+    ) rt ON TRUE
+    WHERE s."deleted" IS NULL
+        AND s."geopoint" IS NOT NULL
+        {school_filter}
+    ON CONFLICT ("id") DO UPDATE SET {update_columns}, "modified" = EXCLUDED."modified"
+    WHERE ({state_columns}) IS DISTINCT FROM ({excluded_columns})
+    """.format(
+        table=SchoolMapState._meta.db_table,
+        columns=', '.join(['"{0}"'.format(column) for column in SCHOOL_MAP_STATE_COLUMNS]),
+        update_columns=', '.join(['"{0}" = EXCLUDED."{0}"'.format(column) for column in SCHOOL_MAP_STATE_COLUMNS]),
+        state_columns=', '.join(['ms."{0}"'.format(column) for column in SCHOOL_MAP_STATE_COLUMNS]),
+        excluded_columns=', '.join(['EXCLUDED."{0}"'.format(column) for column in SCHOOL_MAP_STATE_COLUMNS]),
+        school_filter=school_filter,
+    )
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(delete_query, params)
+            cursor.execute(upsert_query, params)
+
+        # The new schools of a list are drawn from the max zoom until the next refresh of their country
+        if school_ids is None:
+            update_school_map_state_min_zoom(country_id=country_id)
+
+
+def update_school_map_state_min_zoom(country_id=None):
+    """
+    update_school_map_state_min_zoom
+        Assign the SchoolMapState.min_zoom of the schools of a country or of all the schools by grid thinning.
+        At every zoom below SCHOOL_MAP_THINNING_MAX_ZOOM each tile is split in a grid of
+        SCHOOL_MAP_THINNING_GRID_SIZE cells per side and the school with the lowest stable rank of a cell is kept,
+        so min_zoom is the first zoom keeping the school. The cells of a zoom split the cells of the zoom above,
+        so a school kept at a zoom is kept at all the higher zooms. The schools are thinned per country.
+    """
+    params = {
+        'max_zoom': settings.SCHOOL_MAP_THINNING_MAX_ZOOM,
+        'grid_size': settings.SCHOOL_MAP_THINNING_GRID_SIZE,
+        'world_merc_max': WORLD_MERCATOR_MAX,
+    }
+    map_state_filter = ''
+
+    if country_id:
+        map_state_filter += ' AND s."country_id" = %(country_id)s'
+        params['country_id'] = country_id
+
+    query = """
+    UPDATE "{table}" ms
+    SET "min_zoom" = COALESCE(kept."min_zoom", %(max_zoom)s)
+    FROM "{table}" s
+    LEFT OUTER JOIN (
+        SELECT cells."id", MIN(cells."zoom") AS "min_zoom"
+        FROM (
+            SELECT DISTINCT ON (c."country_id", c."zoom", c."cell_x", c."cell_y") c."id", c."zoom"
+            FROM (
+                SELECT s."id", s."country_id", z."zoom",
+                    FLOOR((ST_X(s."geometry") + %(world_merc_max)s) * %(grid_size)s * POWER(2, z."zoom")
+                        / (2 * %(world_merc_max)s)) AS "cell_x",
+                    FLOOR((ST_Y(s."geometry") + %(world_merc_max)s) * %(grid_size)s * POWER(2, z."zoom")
+                        / (2 * %(world_merc_max)s)) AS "cell_y",
+                    MD5(s."id"::text) AS "rank"
+                FROM "{table}" s
+                CROSS JOIN GENERATE_SERIES(0, %(max_zoom)s - 1) AS z("zoom")
+                WHERE TRUE {map_state_filter}
+            ) c
+            ORDER BY c."country_id", c."zoom", c."cell_x", c."cell_y", c."rank"
+        ) cells
+        GROUP BY cells."id"
+    ) kept ON kept."id" = s."id"
+    WHERE ms."id" = s."id" {map_state_filter}
+        AND ms."min_zoom" IS DISTINCT FROM COALESCE(kept."min_zoom", %(max_zoom)s)
+    """.format(table=SchoolMapState._meta.db_table, map_state_filter=map_state_filter)
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+
+
+SCHOOL_MAP_CLUSTER_COVERAGE = 'coverage'
+SCHOOL_MAP_CLUSTER_CONNECTIVITY_STATUS = 'connectivity_status'
+SCHOOL_MAP_CLUSTER_CONNECTIVITY = 'connectivity'
+
+
+def get_data_layer_cluster_key(data_layer_id):
+    return 'data_layer_{0}'.format(data_layer_id)
+
+
+def get_school_map_cluster_layers():
+    """
+    get_school_map_cluster_layers
+        (layer_key, status SQL, joins, condition) of every clustered status, on the SchoolMapState rows (alias ms).
+        The statuses are the ones of the school points: coverage, connectivity status, speed of the last weekly
+        status against the global benchmark of the default download layer and the legend of the published
+        static data layers with their global legend.
+    """
+    benchmark, _ = get_benchmark_value_for_default_download_layer('global', None)
+
+    cluster_layers = [
+        (SCHOOL_MAP_CLUSTER_COVERAGE, 'ms."coverage_status"', '', ''),
+        (SCHOOL_MAP_CLUSTER_CONNECTIVITY_STATUS, 'ms."connectivity_status"', '', ''),
+        (SCHOOL_MAP_CLUSTER_CONNECTIVITY, """
+            CASE WHEN ms."last_weekly_status_id" IS NULL THEN 'unknown'
+                WHEN ms."connectivity_speed" > {benchmark} THEN 'good'
+                WHEN ms."connectivity_speed" <= {benchmark} AND ms."connectivity_speed" >= 1000000 THEN 'moderate'
+                WHEN ms."connectivity_speed" < 1000000 THEN 'bad'
+                ELSE 'unknown'
+            END""".format(benchmark=benchmark), '', ''),
+    ]
+
+    static_data_layers = DataLayer.objects.filter(
+        type=DataLayer.LAYER_TYPE_STATIC,
+        status=DataLayer.LAYER_STATUS_PUBLISHED,
+    ).order_by('id')
+
+    for data_layer in static_data_layers:
+        data_source = data_layer.data_sources.all().first()
+        if not data_source:
+            continue
+
+        parameter_col = data_source.data_source_column
+        table_name = parameter_col.get('table_name', 'sws')
+        label_cases = get_legend_label_cases(
+            data_layer.legend_configs, table_name, parameter_col['name'], parameter_col.get('type', 'str').lower())
+
+        joins = 'INNER JOIN "connection_statistics_schoolweeklystatus" sws ON sws."id" = ms."last_weekly_status_id"'
+        if table_name == 'schools_school':
+            joins += ' ' + SCHOOL_MAP_STATE_SCHOOL_JOIN
+
+        cluster_layers.append((
+            get_data_layer_cluster_key(data_layer.id), 'CASE ' + ' '.join(label_cases) + 'END', joins, ''))
+
+    return cluster_layers
+
+
+def refresh_school_map_clusters(country_id=None):
+    """
+    refresh_school_map_clusters
+        Rebuild the SchoolMapCluster rows of a country or of all the countries from the SchoolMapState rows.
+        At every zoom below SCHOOL_MAP_CLUSTER_ZOOM each tile is split in a grid of SCHOOL_MAP_CLUSTER_GRID_SIZE
+        cells per side, like the thinning of update_school_map_state_min_zoom, and the schools of a cell are
+        counted per status of every cluster layer.
+    """
+    params = {
+        'current_datetime': get_current_datetime_object(),
+        'cluster_zoom': settings.SCHOOL_MAP_CLUSTER_ZOOM,
+        'grid_size': settings.SCHOOL_MAP_CLUSTER_GRID_SIZE,
+        'world_merc_max': WORLD_MERCATOR_MAX,
+    }
+    cluster_filter = ''
+    map_state_filter = ''
+
+    if country_id:
+        cluster_filter += ' AND "country_id" = %(country_id)s'
+        map_state_filter += ' AND ms."country_id" = %(country_id)s'
+        params['country_id'] = country_id
+
+    insert_query = """
+    INSERT INTO "{table}" ("layer_key", "zoom", "country_id", "cell_x", "cell_y", "geometry", "schools_count",
+        "dominant_status", "status_counts", "modified")
+    SELECT %(layer_key)s, st."zoom", st."country_id", st."cell_x", st."cell_y",
+        ST_SetSRID(ST_MakePoint(SUM(st."sum_x") / SUM(st."schools_count"),
+            SUM(st."sum_y") / SUM(st."schools_count")), 3857),
+        SUM(st."schools_count"),
+        (ARRAY_AGG(st."status" ORDER BY st."schools_count" DESC, st."status"))[1],
+        JSONB_OBJECT_AGG(st."status", st."schools_count"),
+        %(current_datetime)s
+    FROM (
+        SELECT c."zoom", c."country_id", c."cell_x", c."cell_y", c."status",
+            COUNT(*) AS "schools_count", SUM(c."x") AS "sum_x", SUM(c."y") AS "sum_y"
+        FROM (
+            SELECT z."zoom", ms."country_id",
+                FLOOR((ST_X(ms."geometry") + %(world_merc_max)s) * %(grid_size)s * POWER(2, z."zoom")
+                    / (2 * %(world_merc_max)s)) AS "cell_x",
+                FLOOR((ST_Y(ms."geometry") + %(world_merc_max)s) * %(grid_size)s * POWER(2, z."zoom")
+                    / (2 * %(world_merc_max)s)) AS "cell_y",
+                COALESCE(({status}), 'unknown') AS "status",
+                ST_X(ms."geometry") AS "x", ST_Y(ms."geometry") AS "y"
+            FROM "{map_state_table}" ms
+            {joins}
+            CROSS JOIN GENERATE_SERIES(0, %(cluster_zoom)s - 1) AS z("zoom")
+            WHERE TRUE {condition} {map_state_filter}
+        ) c
+        GROUP BY c."zoom", c."country_id", c."cell_x", c."cell_y", c."status"
+    ) st
+    GROUP BY st."zoom", st."country_id", st."cell_x", st."cell_y"
+    """
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM "{0}" WHERE TRUE {1}'.format(
+                SchoolMapCluster._meta.db_table, cluster_filter), params)
+
+            for layer_key, status_sql, joins, condition in get_school_map_cluster_layers():
+                # The legend SQL is not a parameter, its % must not be read as a placeholder
+                cursor.execute(insert_query.format(
+                    table=SchoolMapCluster._meta.db_table,
+                    map_state_table=SchoolMapState._meta.db_table,
+                    status=status_sql.replace('%', '%%'),
+                    joins=joins.replace('%', '%%'),
+                    condition=condition.replace('%', '%%'),
+                    map_state_filter=map_state_filter,
+                ), dict(params, layer_key=layer_key))
+
+
+def refresh_country_school_map(country):
+    """
+    refresh_country_school_map
+        Rebuild the SchoolMapState rows of a country after its live data was aggregated, then its SchoolMapCluster
+        rows with ENABLE_SCHOOL_MAP_CLUSTERS. Call it once the aggregation transaction is committed, as the min_zoom
+        thinning and the clusters read all the schools of the country.
+    """
+    if settings.ENABLE_SCHOOL_MAP_STATE:
+        refresh_school_map_state(country_id=country.id)
+
+        if settings.ENABLE_SCHOOL_MAP_CLUSTERS:
+            refresh_school_map_clusters(country_id=country.id)
+
+
+def get_school_map_cluster_query(env, layer_key, zoom, status_name, country_ids=None):
+    """
+    get_school_map_cluster_query
+        MVT query of the SchoolMapCluster rows of a tile. The dominant status is named status_name, as the status
+        of the school points of the same layer, and the number of schools per status is a JSON text property.
+    """
+    country_condition = ''
+    if country_ids:
+        country_condition = 'AND mc."country_id" IN ({0})'.format(
+            ','.join([str(convert_to_int(country_id, default=0)) for country_id in country_ids]))
+
+    return """
+    WITH bounds AS (
+        SELECT {env} AS geom,
+        {env}::box2d AS b2d
+    ),
+    mvtgeom AS (
+        SELECT ST_AsMVTGeom(mc."geometry", bounds.b2d) AS geom,
+            mc."id" AS cluster_id,
+            True AS is_cluster,
+            mc."schools_count",
+            mc."dominant_status" AS "{status_name}",
+            mc."status_counts"::text AS "status_counts"
+        FROM "{table}" mc
+        INNER JOIN bounds ON ST_Intersects(mc."geometry", bounds.geom)
+        WHERE mc."layer_key" = '{layer_key}'
+            AND mc."zoom" = {zoom}
+            {country_condition}
+    )
+    SELECT ST_AsMVT(mvtgeom.*) FROM mvtgeom;
+    """.format(
+        env=env,
+        table=SchoolMapCluster._meta.db_table,
+        layer_key=layer_key,
+        zoom=int(zoom),
+        status_name=status_name,
+        country_condition=country_condition,
+    )
+
+
+def update_realtime_weekly_summary(country, date):
+    """
+    update_realtime_weekly_summary
+        Rebuild the RealTimeWeeklySummary rows of a country for the week of the given date from
+        SchoolWeeklyStatus and SchoolDailyStatus of the real time registered schools.
+
+        Every registered school is counted once per week under the live data source of its weekly row
+        (UNKNOWN without weekly row), daily speeds are summed under the live data source of the daily rows.
+    """
+    monday_date = date - timedelta(days=date.weekday())
+    sunday_date = monday_date + timedelta(days=6)
+
+    global_benchmark, _ = get_benchmark_value_for_default_download_layer('global', None)
+    national_benchmark, _ = get_benchmark_value_for_default_download_layer('national', country.id)
+
+    params = {
+        'current_datetime': get_current_datetime_object(),
+        'country_id': country.id,
+        'monday_date': monday_date,
+        'sunday_date': sunday_date,
+        'year': date_utilities.get_year_from_date(monday_date),
+        'week': date_utilities.get_week_from_date(monday_date),
+        'global_benchmark': global_benchmark,
+        'national_benchmark': national_benchmark,
+        'base_benchmark': 1000000,
+        'unknown_source': statistics_configs.UNKNOWN_SOURCE,
+    }
+
+    delete_query = """
+    DELETE FROM "{table}" WHERE "country_id" = %(country_id)s AND "year" = %(year)s AND "week" = %(week)s
+    """.format(table=RealTimeWeeklySummary._meta.db_table)
+
+    insert_query = """
+    WITH registered_schools AS (
+        SELECT s."id" AS "school_id", s."admin1_id", MIN(r."rt_registration_date")::date AS "rt_registration_date"
+        FROM "schools_school" s
+        INNER JOIN "connection_statistics_schoolrealtimeregistration" r ON r."school_id" = s."id"
+        WHERE s."country_id" = %(country_id)s
+            AND s."deleted" IS NULL
+            AND r."rt_registered" = TRUE
+            AND r."deleted" IS NULL
+        GROUP BY s."id", s."admin1_id"
+    ),
+    weekly_summary AS (
+        SELECT rs."admin1_id", rs."rt_registration_date",
+            COALESCE(sws."live_data_source", %(unknown_source)s) AS "live_data_source",
+            COUNT(*) AS "schools_total",
+            COUNT(sws."id") AS "schools_with_weekly_status",
+            COUNT(sws."connectivity_speed") AS "schools_with_data",
+            COUNT(*) FILTER (WHERE sws."connectivity_speed" > %(global_benchmark)s) AS "schools_good_global",
+            COUNT(*) FILTER (WHERE sws."connectivity_speed" <= %(global_benchmark)s
+                AND sws."connectivity_speed" >= %(base_benchmark)s) AS "schools_moderate_global",
+            COUNT(*) FILTER (WHERE sws."connectivity_speed" > %(national_benchmark)s) AS "schools_good_national",
+            COUNT(*) FILTER (WHERE sws."connectivity_speed" <= %(national_benchmark)s
+                AND sws."connectivity_speed" >= %(base_benchmark)s) AS "schools_moderate_national",
+            COUNT(*) FILTER (WHERE sws."connectivity_speed" < %(base_benchmark)s) AS "schools_bad"
+        FROM registered_schools rs
+        LEFT JOIN "connection_statistics_schoolweeklystatus" sws ON sws."school_id" = rs."school_id"
+            AND sws."year" = %(year)s
+            AND sws."week" = %(week)s
+            AND sws."deleted" IS NULL
+        GROUP BY 1, 2, 3
+    ),
+    daily_by_date AS (
+        SELECT rs."admin1_id", rs."rt_registration_date", sds."live_data_source", sds."date",
+            SUM(sds."connectivity_speed")::float AS "speed_sum",
+            COUNT(*) AS "speed_count"
+        FROM registered_schools rs
+        INNER JOIN "connection_statistics_schooldailystatus" sds ON sds."school_id" = rs."school_id"
+        WHERE sds."date" BETWEEN %(monday_date)s AND %(sunday_date)s
+            AND sds."connectivity_speed" IS NOT NULL
+            AND sds."deleted" IS NULL
+        GROUP BY 1, 2, 3, 4
+    ),
+    daily_summary AS (
+        SELECT k."admin1_id", k."rt_registration_date", k."live_data_source",
+            ARRAY_AGG(COALESCE(d."speed_sum", 0) ORDER BY day_no) AS "daily_speed_sum",
+            ARRAY_AGG(COALESCE(d."speed_count", 0)::integer ORDER BY day_no) AS "daily_speed_count"
+        FROM (SELECT DISTINCT "admin1_id", "rt_registration_date", "live_data_source" FROM daily_by_date) k
+        CROSS JOIN generate_series(0, 6) AS day_no
+        LEFT JOIN daily_by_date d ON d."admin1_id" IS NOT DISTINCT FROM k."admin1_id"
+            AND d."rt_registration_date" IS NOT DISTINCT FROM k."rt_registration_date"
+            AND d."live_data_source" = k."live_data_source"
+            AND d."date" = %(monday_date)s::date + day_no
+        GROUP BY 1, 2, 3
+    )
+    INSERT INTO "{table}" (
+        "created", "modified", "country_id", "admin1_id", "year", "week", "week_start_date", "live_data_source",
+        "rt_registration_date", "global_benchmark", "national_benchmark", "schools_total",
+        "schools_with_weekly_status", "schools_with_data", "schools_good_global", "schools_moderate_global",
+        "schools_good_national", "schools_moderate_national", "schools_bad", "daily_speed_sum", "daily_speed_count"
+    )
+    SELECT %(current_datetime)s, %(current_datetime)s, %(country_id)s,
+        COALESCE(ws."admin1_id", ds."admin1_id"), %(year)s, %(week)s, %(monday_date)s,
+        COALESCE(ws."live_data_source", ds."live_data_source"),
+        COALESCE(ws."rt_registration_date", ds."rt_registration_date"),
+        %(global_benchmark)s, %(national_benchmark)s,
+        COALESCE(ws."schools_total", 0), COALESCE(ws."schools_with_weekly_status", 0),
+        COALESCE(ws."schools_with_data", 0), COALESCE(ws."schools_good_global", 0),
+        COALESCE(ws."schools_moderate_global", 0), COALESCE(ws."schools_good_national", 0),
+        COALESCE(ws."schools_moderate_national", 0), COALESCE(ws."schools_bad", 0),
+        COALESCE(ds."daily_speed_sum", ARRAY[0, 0, 0, 0, 0, 0, 0]::float[]),
+        COALESCE(ds."daily_speed_count", ARRAY[0, 0, 0, 0, 0, 0, 0]::integer[])
+    FROM weekly_summary ws
+    -- FULL JOIN needs a merge/hash joinable condition, so the nullable keys are compared through COALESCE
+    FULL OUTER JOIN daily_summary ds ON COALESCE(ws."admin1_id", 0) = COALESCE(ds."admin1_id", 0)
+        AND COALESCE(ws."rt_registration_date", 'epoch'::date) = COALESCE(ds."rt_registration_date", 'epoch'::date)
+        AND ws."live_data_source" = ds."live_data_source"
+    """.format(table=RealTimeWeeklySummary._meta.db_table)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(delete_query, params)
+            cursor.execute(insert_query, params)
+            inserted_rows = cursor.rowcount
+
+    logger.debug('Real time weekly summary for country "{0}" on "{1}-{2}" rebuilt with {3} rows.'.format(
+        country.id, params['year'], params['week'], inserted_rows))
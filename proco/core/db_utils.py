@@ -1,6 +1,8 @@
+import io
 import logging
 
-from django.db import connections
+from django.db import connections, models, transaction
+from psycopg2.extras import execute_values
 
 logger = logging.getLogger('gigamaps.' + __name__)
 
@@ -26,3 +28,182 @@ def sql_to_response(sql, label='', db_var='default'):
         except Exception as ex:
             logger.error('Exception on query execution - {0}'.format(str(ex)))
     return
+
+
+def get_upsert_query(model, columns, unique_columns, source_sql, update_columns=None):
+    """
+    get_upsert_query
+        INSERT ... ON CONFLICT (unique_columns) DO UPDATE of the rows selected by source_sql, returning the
+        number of inserted and updated rows (xmax is 0 only for the rows inserted by the statement).
+        By default all the inserted columns except the unique ones are updated.
+    """
+    if update_columns is None:
+        update_columns = [column for column in columns if column not in unique_columns]
+
+    return """
+    WITH upserted AS (
+        INSERT INTO "{table}" ({columns})
+        {source_sql}
+        ON CONFLICT ({unique_columns}) DO {conflict_action}
+        RETURNING (xmax = 0) AS "inserted"
+    )
+    SELECT COUNT(*) FILTER (WHERE "inserted"), COUNT(*) FILTER (WHERE NOT "inserted") FROM upserted
+    """.format(
+        table=model._meta.db_table,
+        columns=', '.join('"{0}"'.format(column) for column in columns),
+        source_sql=source_sql,
+        unique_columns=', '.join('"{0}"'.format(column) for column in unique_columns),
+        conflict_action='UPDATE SET {0}'.format(', '.join(
+            '"{0}" = EXCLUDED."{0}"'.format(column) for column in update_columns
+        )) if update_columns else 'NOTHING',
+    )
+
+
+def copy_data_frame_to_model(df, model, unique_fields, db_var='default'):
+    """
+    copy_data_frame_to_model
+        Upsert the rows of a DataFrame into the table of the model: COPY the rows into a temporary table and
+        merge it with one INSERT ... ON CONFLICT on the unique fields. The DataFrame columns must be the DB
+        column names of the model (school_id, not school). For duplicated unique keys the last row wins.
+
+    :return: tuple of inserted and updated row counts
+    """
+    table_name = model._meta.db_table
+    staging_table_name = '{0}_staging'.format(table_name)
+
+    model_fields = {field.column: field for field in model._meta.concrete_fields}
+    columns = [column for column in df.columns if column in model_fields and not model_fields[column].primary_key]
+    unique_columns = [model._meta.get_field(field_name).column for field_name in unique_fields]
+
+    df = df[columns].copy()
+    for column in columns:
+        # Integer columns with missing values are float in pandas, COPY can not load 1.0 to an integer column
+        if isinstance(model_fields[column], (models.IntegerField, models.ForeignKey)) and df[column].dtype.kind == 'f':
+            df[column] = df[column].astype('Int64')
+    df['row_no'] = range(len(df))
+
+    csv_buffer = io.StringIO()
+    df.to_csv(csv_buffer, index=False, header=False)
+    csv_buffer.seek(0)
+
+    quoted_columns = ', '.join('"{0}"'.format(column) for column in columns)
+
+    create_query = """
+    CREATE TEMPORARY TABLE "{staging_table}" AS
+    SELECT {columns}, 0::bigint AS "row_no" FROM "{table}" WITH NO DATA
+    """.format(staging_table=staging_table_name, table=table_name, columns=quoted_columns)
+
+    copy_query = 'COPY "{staging_table}" ({columns}, "row_no") FROM STDIN WITH (FORMAT csv)'.format(
+        staging_table=staging_table_name, columns=quoted_columns)
+
+    merge_query = get_upsert_query(model, columns, unique_columns, """
+        SELECT DISTINCT ON ({unique_columns}) {columns}
+        FROM "{staging_table}"
+        ORDER BY {unique_columns}, "row_no" DESC
+    """.format(
+        staging_table=staging_table_name,
+        columns=quoted_columns,
+        unique_columns=', '.join('"{0}"'.format(column) for column in unique_columns),
+    ))
+
+    with transaction.atomic(using=db_var):
+        with connections[db_var].cursor() as cursor:
+            cursor.execute(create_query)
+            cursor.copy_expert(copy_query, csv_buffer)
+            cursor.execute(merge_query)
+            inserted_rows, updated_rows = cursor.fetchone()
+            cursor.execute('DROP TABLE "{0}"'.format(staging_table_name))
+
+    logger.debug('Loaded {0} new and {1} updated rows to "{2}" table.'.format(inserted_rows, updated_rows, table_name))
+    return inserted_rows, updated_rows
+
+
+def bulk_upsert(records, model, unique_fields, batch_size=5000, db_var='default'):
+    """
+    bulk_upsert
+        Insert or update records with INSERT ... ON CONFLICT (unique_fields) DO UPDATE, one statement per batch
+        instead of one lookup query per record. The unique fields must be covered by a unique constraint.
+
+        records is either a list of dicts keyed by model field names (FK values can be model instances or ids)
+        or a DataFrame keyed by DB column names, which is loaded with COPY (see copy_data_frame_to_model).
+        New rows get the model defaults for the missing fields, existing rows are updated only for the fields
+        present in the records. For duplicated unique keys the last record wins.
+
+    :return: tuple of inserted and updated row counts
+    """
+    if not isinstance(records, (list, tuple)):
+        return copy_data_frame_to_model(records, model, unique_fields, db_var=db_var)
+
+    if len(records) == 0:
+        return 0, 0
+
+    connection = connections[db_var]
+
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    columns = [field.column for field in fields]
+    unique_columns = [model._meta.get_field(field_name).column for field_name in unique_fields]
+
+    record_field_names = set()
+    for record in records:
+        record_field_names.update(record.keys())
+    record_columns = {model._meta.get_field(field_name).column for field_name in record_field_names}
+
+    # Last record wins for duplicated unique keys, Postgres can not update the same row twice in one statement
+    rows = {}
+    for record in records:
+        instance = model(**record)
+        row = [field.get_db_prep_save(field.pre_save(instance, True), connection) for field in fields]
+        rows[tuple(row[columns.index(column)] for column in unique_columns)] = row
+    rows = list(rows.values())
+
+    # Existing rows are updated only for the fields present in the records
+    upsert_query = get_upsert_query(model, columns, unique_columns, 'VALUES %s', update_columns=[
+        column for column in columns if column in record_columns and column not in unique_columns
+    ])
+
+    inserted_rows = updated_rows = 0
+    with transaction.atomic(using=db_var):
+        with connection.cursor() as cursor:
+            for counts in execute_values(cursor.cursor, upsert_query, rows, page_size=batch_size, fetch=True):
+                inserted_rows += counts[0]
+                updated_rows += counts[1]
+
+    logger.debug('Loaded {0} new and {1} updated rows to "{2}" table.'.format(
+        inserted_rows, updated_rows, model._meta.db_table))
+    return inserted_rows, updated_rows
+
+
+class BulkInsertSink(object):
+    """
+    BulkInsertSink
+        Buffer of model instances written with bulk_create every batch_size instances, so a stream of rows is
+        loaded with a constant memory footprint. Use it as a context manager to write the remaining rows.
+    """
+
+    def __init__(self, model, batch_size=5000):
+        self.model = model
+        self.batch_size = batch_size
+        self.buffer = []
+        self.total_count = 0
+
+    def add(self, instance):
+        self.buffer.append(instance)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def extend(self, instances):
+        for instance in instances:
+            self.add(instance)
+
+    def flush(self):
+        if len(self.buffer) > 0:
+            logger.debug('Loading ({0}) rows to "{1}" table.'.format(len(self.buffer), self.model.__name__))
+            self.model.objects.bulk_create(self.buffer)
+            self.total_count += len(self.buffer)
+            self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
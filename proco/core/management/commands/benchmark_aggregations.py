@@ -0,0 +1,189 @@
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from proco.connection_statistics import models as statistics_models
+from proco.connection_statistics.config import app_config as statistics_configs
+from proco.connection_statistics.utils import (
+    aggregate_real_time_data_to_school_daily_status_in_bulk,
+    aggregate_real_time_data_to_school_daily_status_per_school,
+    aggregate_school_daily_status_to_school_weekly_status_in_bulk,
+    aggregate_school_daily_status_to_school_weekly_status_per_school,
+)
+from proco.core import utils as core_utilities
+from proco.locations.models import Country
+from proco.schools.models import School
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+BENCHMARK_COUNTRY_CODE = 'BENCHMARK'
+
+
+def create_synthetic_country(total_schools, seed):
+    """
+    Create a country with the given number of schools spread over a 10x10 degree box.
+    Everything is created in the caller's transaction, so it can be rolled back at the end of the run.
+    """
+    rnd = random.Random(seed)
+    country = Country.objects.bulk_create([Country(
+        name='Benchmark Country',
+        code=BENCHMARK_COUNTRY_CODE,
+        iso3_format=BENCHMARK_COUNTRY_CODE,
+        flag='benchmark.png',
+    )])[0]
+
+    schools = []
+    for index in range(total_schools):
+        schools.append(School(
+            country=country,
+            name='Benchmark School {0}'.format(index),
+            name_lower='benchmark school {0}'.format(index),
+            giga_id_school='benchmark-{0}'.format(index),
+            external_id='benchmark-{0}'.format(index),
+            geopoint=Point(x=rnd.uniform(0, 10), y=rnd.uniform(0, 10)),
+        ))
+        if len(schools) == 5000:
+            School.objects.bulk_create(schools)
+            schools = []
+
+    if len(schools) > 0:
+        School.objects.bulk_create(schools)
+
+    return country
+
+
+def create_synthetic_realtime_data(country, date, measurements_per_school, seed):
+    rnd = random.Random(seed)
+    start_datetime = timezone.make_aware(datetime.combine(date, datetime.min.time()))
+    sources = [statistics_configs.DAILY_CHECK_APP_MLAB_SOURCE, statistics_configs.QOS_SOURCE]
+
+    realtime = []
+    total_rows = 0
+    for school_id in School.objects.filter(country=country).values_list('id', flat=True).order_by('id'):
+        for index in range(measurements_per_school):
+            realtime.append(statistics_models.RealTimeConnectivity(
+                created=start_datetime + timedelta(minutes=rnd.randint(0, 24 * 60 - 1)),
+                school_id=school_id,
+                connectivity_speed=rnd.randint(100000, 50000000),
+                connectivity_upload_speed=rnd.randint(100000, 20000000),
+                connectivity_latency=rnd.uniform(5, 500),
+                roundtrip_time=rnd.uniform(5, 500),
+                jitter_download=rnd.uniform(0, 50),
+                jitter_upload=rnd.uniform(0, 50),
+                rtt_packet_loss_pct=rnd.uniform(0, 10),
+                live_data_source=sources[index % len(sources)],
+            ))
+
+            if len(realtime) == 5000:
+                statistics_models.RealTimeConnectivity.objects.bulk_create(realtime)
+                total_rows += len(realtime)
+                realtime = []
+
+    if len(realtime) > 0:
+        statistics_models.RealTimeConnectivity.objects.bulk_create(realtime)
+        total_rows += len(realtime)
+
+    return total_rows
+
+
+def timed(func, *args):
+    start_time = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start_time
+
+
+def clear_school_daily_status(country, date):
+    statistics_models.SchoolDailyStatus.objects.all_records().filter(school__country=country, date=date).delete()
+
+
+def clear_school_weekly_status(country):
+    School.objects.filter(country=country).update(last_weekly_status=None)
+    statistics_models.SchoolWeeklyStatus.objects.all_records().filter(school__country=country).delete()
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the live data aggregations on a synthetic country. '
+            'All the generated data is rolled back at the end of the run.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-schools', dest='schools', default=50000, type=int,
+            help='Number of synthetic schools to create for the benchmark country.'
+        )
+
+        parser.add_argument(
+            '-measurements', dest='measurements', default=4, type=int,
+            help='Number of RealTimeConnectivity measurements to create per school.'
+        )
+
+        parser.add_argument(
+            '-seed', dest='seed', default=42, type=int,
+            help='Seed for the synthetic data generator.'
+        )
+
+        parser.add_argument(
+            '--skip_per_school', action='store_true', dest='skip_per_school', default=False,
+            help='If provided, only the set based path is measured.'
+        )
+
+    def handle(self, **options):
+        logger.info('Executing aggregations benchmark utility.\n')
+        logger.info('Options: {}\n\n'.format(options))
+
+        total_schools = options.get('schools')
+        measurements = options.get('measurements')
+        seed = options.get('seed')
+
+        date = core_utilities.get_current_datetime_object().date() - timedelta(days=1)
+
+        with transaction.atomic():
+            country, duration = timed(create_synthetic_country, total_schools, seed)
+            logger.info('Created {0} synthetic schools in {1:.2f} seconds.'.format(total_schools, duration))
+
+            total_rows, duration = timed(create_synthetic_realtime_data, country, date, measurements, seed)
+            logger.info('Created {0} RealTimeConnectivity rows in {1:.2f} seconds.'.format(total_rows, duration))
+
+            per_school_rows = None
+            if not options.get('skip_per_school'):
+                _, duration = timed(aggregate_real_time_data_to_school_daily_status_per_school, country, date)
+                per_school_rows = statistics_models.SchoolDailyStatus.objects.filter(
+                    school__country=country, date=date).count()
+                logger.info('Per school daily aggregation: {0} rows in {1:.2f} seconds.'.format(
+                    per_school_rows, duration))
+                clear_school_daily_status(country, date)
+
+            bulk_rows, duration = timed(aggregate_real_time_data_to_school_daily_status_in_bulk, country, date)
+            logger.info('Set based daily aggregation (insert): {0} rows in {1:.2f} seconds.'.format(
+                bulk_rows, duration))
+
+            bulk_rows, duration = timed(aggregate_real_time_data_to_school_daily_status_in_bulk, country, date)
+            logger.info('Set based daily aggregation (update): {0} rows in {1:.2f} seconds.'.format(
+                bulk_rows, duration))
+
+            if per_school_rows is not None and per_school_rows != bulk_rows:
+                logger.error('Row count mismatch between per school ({0}) and set based ({1}) aggregations.'.format(
+                    per_school_rows, bulk_rows))
+
+            if not options.get('skip_per_school'):
+                _, duration = timed(aggregate_school_daily_status_to_school_weekly_status_per_school, country, date)
+                logger.info('Per school weekly aggregation: {0} rows in {1:.2f} seconds.'.format(
+                    statistics_models.SchoolWeeklyStatus.objects.filter(school__country=country).count(), duration))
+                clear_school_weekly_status(country)
+
+            _, duration = timed(aggregate_school_daily_status_to_school_weekly_status_in_bulk, country, date)
+            logger.info('Set based weekly aggregation (insert): {0} rows in {1:.2f} seconds.'.format(
+                statistics_models.SchoolWeeklyStatus.objects.filter(school__country=country).count(), duration))
+
+            _, duration = timed(aggregate_school_daily_status_to_school_weekly_status_in_bulk, country, date)
+            logger.info('Set based weekly aggregation (update): {0} rows in {1:.2f} seconds.'.format(
+                statistics_models.SchoolWeeklyStatus.objects.filter(school__country=country).count(), duration))
+
+            transaction.set_rollback(True)
+
+        logger.info('Completed aggregations benchmark, synthetic data rolled back.\n')
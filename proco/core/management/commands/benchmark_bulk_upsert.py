@@ -0,0 +1,164 @@
+import logging
+import math
+from datetime import datetime, timedelta
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from proco.core import db_utils as db_utilities
+from proco.core.management.commands.benchmark_aggregations import create_synthetic_country, timed
+from proco.data_sources.models import QoSData
+from proco.schools.models import School
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+
+def legacy_bulk_create_or_update(records, model, unique_fields, batch_size=1000):
+    """Previous core.utils.bulk_create_or_update: two lookup queries per record, kept as the benchmark baseline"""
+    # Let's define two lists:
+    # - one to hold the values that we want to insert,
+    # - and one to hold the new values alongside existing primary keys to update
+    records_to_create = []
+    records_to_update = []
+
+    # This is where we check if the records are pre-existing,
+    # and add primary keys to the objects if they do
+    records = [
+        {
+            'id': model.objects.filter(**{f: record[f] for f in unique_fields}).first().id
+            if model.objects.filter(**{f: record[f] for f in unique_fields}).first() is not None else None,
+            **record,
+        }
+        for record in records
+    ]
+
+    # This is where we delegate our records to our split lists:
+    # - if the record already exists in the DB (the 'id' primary key), add it to the update list.
+    # - Otherwise, add it to the creation list.
+    [
+        records_to_update.append(record)
+        if record['id'] is not None
+        else records_to_create.append(record)
+        for record in records
+    ]
+
+    if len(records_to_create) > 0:
+        # Remove the 'id' field, as these will all hold a value of None,
+        # since these records do not already exist in the DB
+        [record.pop('id') for record in records_to_create]
+
+        model.objects.bulk_create(
+            [model(**values) for values in records_to_create], batch_size=batch_size
+        )
+
+    if len(records_to_update) > 0:
+        for f in unique_fields:
+            [record.pop(f) for record in records_to_update]
+
+        model.objects.bulk_update(
+            [
+                model(**values)
+                for values in records_to_update
+            ],
+            set(records_to_update[0].keys()) - {'id', },
+            batch_size=batch_size,
+        )
+
+
+def get_synthetic_qos_records(country, total_rows, version):
+    schools = list(School.objects.filter(country=country).values_list('id', 'giga_id_school').order_by('id'))
+    rows_per_school = math.ceil(total_rows / len(schools))
+    start_datetime = timezone.make_aware(datetime(2024, 1, 1))
+
+    records = []
+    for school_id, giga_id_school in schools:
+        for index in range(rows_per_school):
+            if len(records) == total_rows:
+                return records
+
+            timestamp = start_datetime + timedelta(minutes=15 * index)
+            records.append({
+                'school_id': school_id,
+                'country_id': country.id,
+                'school_id_giga': giga_id_school,
+                'timestamp': timestamp,
+                'date': timestamp.date(),
+                'speed_download': float(version * 10 + index % 10),
+                'speed_upload': float(version * 5 + index % 5),
+                'latency': float(index % 100),
+                'version': version,
+            })
+    return records
+
+
+def clear_qos_data(country):
+    QoSData.objects.filter(country=country).delete()
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the QoS upsert helpers (legacy per record lookups, set based upsert of dicts and COPY of a '
+            'DataFrame) on a synthetic country. All the generated data is rolled back at the end of the run.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-rows', dest='rows', default='5000,50000,500000', type=str,
+            help='Comma separated list of the number of QoS rows to upsert.'
+        )
+
+        parser.add_argument(
+            '-schools', dest='schools', default=5000, type=int,
+            help='Number of synthetic schools to create for the benchmark country.'
+        )
+
+        parser.add_argument(
+            '-legacy_max_rows', dest='legacy_max_rows', default=50000, type=int,
+            help='Skip the legacy helper above this number of rows as it runs 2 queries per record.'
+        )
+
+        parser.add_argument(
+            '-seed', dest='seed', default=42, type=int,
+            help='Seed for the synthetic data generator.'
+        )
+
+    def handle(self, **options):
+        logger.info('Executing bulk upsert benchmark utility.\n')
+        logger.info('Options: {}\n\n'.format(options))
+
+        unique_fields = ['school_id', 'timestamp']
+
+        with transaction.atomic():
+            country, duration = timed(create_synthetic_country, options.get('schools'), options.get('seed'))
+            logger.info('Created {0} synthetic schools in {1:.2f} seconds.'.format(options.get('schools'), duration))
+
+            for total_rows in [int(rows) for rows in options.get('rows').split(',')]:
+                new_records = get_synthetic_qos_records(country, total_rows, 1)
+                updated_records = get_synthetic_qos_records(country, total_rows, 2)
+
+                if total_rows <= options.get('legacy_max_rows'):
+                    _, duration = timed(legacy_bulk_create_or_update, [dict(r) for r in new_records], QoSData,
+                                        unique_fields)
+                    logger.info('Legacy helper (insert) of {0} rows: {1:.2f} seconds.'.format(total_rows, duration))
+                    _, duration = timed(legacy_bulk_create_or_update, [dict(r) for r in updated_records], QoSData,
+                                        unique_fields)
+                    logger.info('Legacy helper (update) of {0} rows: {1:.2f} seconds.'.format(total_rows, duration))
+                    clear_qos_data(country)
+                else:
+                    logger.info('Legacy helper skipped for {0} rows.'.format(total_rows))
+
+                for label, insert_records, update_records in [
+                    ('dicts', new_records, updated_records),
+                    ('DataFrame', pd.DataFrame(new_records), pd.DataFrame(updated_records)),
+                ]:
+                    counts, duration = timed(db_utilities.bulk_upsert, insert_records, QoSData, unique_fields)
+                    logger.info('Set based upsert of {0} (insert) of {1} rows: {2} inserted, {3} updated in '
+                                '{4:.2f} seconds.'.format(label, total_rows, counts[0], counts[1], duration))
+                    counts, duration = timed(db_utilities.bulk_upsert, update_records, QoSData, unique_fields)
+                    logger.info('Set based upsert of {0} (update) of {1} rows: {2} inserted, {3} updated in '
+                                '{4:.2f} seconds.'.format(label, total_rows, counts[0], counts[1], duration))
+                    clear_qos_data(country)
+
+            transaction.set_rollback(True)
+
+        logger.info('Completed bulk upsert benchmark, synthetic data rolled back.\n')
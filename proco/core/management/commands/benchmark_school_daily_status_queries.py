@@ -0,0 +1,120 @@
+import json
+import logging
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+
+from proco.connection_statistics.models import SchoolDailyStatus
+from proco.core import partitions as partition_utilities
+from proco.core import utils as core_utilities
+from proco.locations.models import Country
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+# Weekly average per school, the shape of the live map and layer info queries
+WEEK_WINDOW_QUERY = """
+SELECT t."school_id", AVG(t."connectivity_speed") AS "avg_speed"
+FROM "connection_statistics_schooldailystatus" t
+INNER JOIN "schools_school" s ON s."id" = t."school_id"
+WHERE s."country_id" = %(country_id)s
+    AND s."deleted" IS NULL
+    AND t."deleted" IS NULL
+    AND t."date" BETWEEN %(start_date)s AND %(end_date)s
+GROUP BY t."school_id"
+"""
+
+# Yearly average per school, the shape of the time player query
+YEARS_WINDOW_QUERY = """
+SELECT t."school_id", EXTRACT(YEAR FROM t."date") AS "year", AVG(t."connectivity_speed") AS "avg_speed"
+FROM "connection_statistics_schooldailystatus" t
+INNER JOIN "schools_school" s ON s."id" = t."school_id"
+WHERE s."country_id" = %(country_id)s
+    AND s."deleted" IS NULL
+    AND t."deleted" IS NULL
+    AND t."date" >= %(start_date)s
+GROUP BY t."school_id", "year"
+"""
+
+
+def get_scanned_relations(plan, table_name):
+    """Names of the SchoolDailyStatus table or partitions read by the plan nodes"""
+    relations = set()
+    relation_name = plan.get('Relation Name', '')
+    if relation_name.startswith(table_name):
+        relations.add(relation_name)
+
+    for sub_plan in plan.get('Plans', []):
+        relations |= get_scanned_relations(sub_plan, table_name)
+    return relations
+
+
+def explain_query(query, params):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + query, params)
+        result = cursor.fetchone()[0]
+
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+class Command(BaseCommand):
+    help = ('Run EXPLAIN ANALYZE of the typical 7 days and 4 years SchoolDailyStatus windows for a country and '
+            'report the execution time, the buffers and the partitions read.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-country_id', dest='country_id', required=False, type=int,
+            help='Pass the Country ID to benchmark. Default: the country with the most schools.'
+        )
+
+        parser.add_argument(
+            '-iterations', dest='iterations', default=3, type=int,
+            help='Number of runs of each query, the first one warms up the cache.'
+        )
+
+    def handle(self, **options):
+        logger.info('Executing school daily status queries benchmark utility.\n')
+        logger.info('Options: {}\n\n'.format(options))
+
+        country_id = options.get('country_id')
+        if not country_id:
+            country_id = Country.objects.all().annotate(
+                schools_count=Count('schools'),
+            ).order_by('-schools_count').values_list('id', flat=True).first()
+
+        table_name = SchoolDailyStatus._meta.db_table
+        partitions = partition_utilities.get_table_partitions(table_name)
+        logger.info('Table "{0}" partitioned: {1}, partitions: {2}.'.format(
+            table_name, partition_utilities.is_partitioned_table(table_name), len(partitions)))
+
+        today = core_utilities.get_current_datetime_object().date()
+        benchmarks = [
+            ('7 days window', WEEK_WINDOW_QUERY, {
+                'country_id': country_id,
+                'start_date': today - timedelta(days=7),
+                'end_date': today - timedelta(days=1),
+            }),
+            ('4 years window', YEARS_WINDOW_QUERY, {
+                'country_id': country_id,
+                'start_date': today.replace(year=today.year - 4, month=1, day=1),
+            }),
+        ]
+
+        for label, query, params in benchmarks:
+            for iteration in range(options.get('iterations')):
+                result = explain_query(query, params)
+                plan = result['Plan']
+                logger.info(
+                    '{0} #{1}: planning {2:.1f} ms, execution {3:.1f} ms, shared buffers hit {4} read {5}, '
+                    'rows {6}, relations read: {7}.'.format(
+                        label, iteration + 1,
+                        result.get('Planning Time', 0), result.get('Execution Time', 0),
+                        plan.get('Shared Hit Blocks', 0), plan.get('Shared Read Blocks', 0),
+                        plan.get('Actual Rows', 0),
+                        sorted(get_scanned_relations(plan, table_name)),
+                    ))
+
+        logger.info('Completed school daily status queries benchmark.\n')
@@ -0,0 +1,117 @@
+import logging
+import math
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from proco.locations import search_backends
+from proco.locations.api import AggregateSearchViewSet
+from proco.locations.models import SchoolSearchDocument
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+# Synthetic documents with negative ids, so they never collide with the documents of the real schools
+SYNTHETIC_DOCUMENTS_SQL = """
+SELECT -i AS "id",
+    'Escola ' || (ARRAY['Santa', 'Maria', 'Nossa', 'Senhora', 'Municipal', 'Estadual', 'Primary', 'Secondary',
+        'Ecole', 'Colegio', 'Liceo', 'Instituto'])[1 + i %% 12] || ' ' || (i %% 9973) AS "name",
+    SUBSTR(MD5(i::text), 1, 8) || '-' || SUBSTR(MD5(i::text), 9, 4) || '-' || SUBSTR(MD5(i::text), 13, 4) || '-'
+        || SUBSTR(MD5(i::text), 17, 4) || '-' || SUBSTR(MD5(i::text), 21, 12) AS "giga_id_school",
+    'EXT' || i AS "external_id",
+    -(1 + i %% 5000) AS "admin1_id",
+    'Province ' || (i %% 5000) AS "admin1_name",
+    NULL::integer AS "admin2_id",
+    NULL::varchar AS "admin2_name",
+    -(1 + i %% 200) AS "country_id",
+    'Country ' || (i %% 200) AS "country_name",
+    'C' || (i %% 200) AS "country_code"
+FROM GENERATE_SERIES(1, %(schools)s) AS i
+"""
+
+# Query params of the typical searches of the global search box
+BENCHMARK_QUERIES = (
+    ('browse', {}),
+    ('one word prefix', {'q': 'escol'}),
+    ('two words prefix', {'q': 'santa esc'}),
+    ('prefix in a country', {'q': 'maria', 'country_id__exact': '-7'}),
+    ('admin filter', {'q': 'escola', 'admin1_id__in': '-1,-2,-3'}),
+    ('giga id phrase', {'q': 'c4ca4238-a0b9'}),
+    ('deep page', {'q': 'escola', 'page': '50'}),
+)
+
+
+def get_percentile(values, percentile):
+    sorted_values = sorted(values)
+    return sorted_values[max(0, int(math.ceil(percentile / 100.0 * len(sorted_values))) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Compare the latency of the school search backends on a synthetic corpus. The synthetic documents '
+            'are inserted in the SchoolSearchDocument table inside a transaction which is rolled back at the end. '
+            'The Azure backend searches its live index, it is only benchmarked with --include_azure.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-schools', dest='schools', default=2000000, type=int,
+            help='Number of synthetic school documents. Default: 2M.'
+        )
+
+        parser.add_argument(
+            '-iterations', dest='iterations', default=20, type=int,
+            help='Number of runs of each query, after one warm up run.'
+        )
+
+        parser.add_argument(
+            '--include_azure', action='store_true', dest='include_azure', default=False,
+            help='If provided, the same queries are sent to the Azure Cognitive Search index.'
+        )
+
+    def run_query(self, backend, params):
+        view = AggregateSearchViewSet()
+        view.params = {key: [value] for key, value in params.items()}
+
+        start_time = time.perf_counter()
+        results = backend.search(view)
+        count = results.get_count()
+        list(results)
+        return (time.perf_counter() - start_time) * 1000, count
+
+    def benchmark_backend(self, backend_name, iterations):
+        backend = search_backends.get_search_backend(backend_name)
+
+        for label, params in BENCHMARK_QUERIES:
+            _, count = self.run_query(backend, params)
+            latencies = [self.run_query(backend, params)[0] for _ in range(iterations)]
+            logger.info('{0} - {1}: matches {2}, mean {3:.1f} ms, p50 {4:.1f} ms, p95 {5:.1f} ms.'.format(
+                backend_name, label, count, statistics.mean(latencies),
+                get_percentile(latencies, 50), get_percentile(latencies, 95),
+            ))
+
+    def handle(self, **options):
+        logger.info('Executing school search benchmark utility.\n')
+        logger.info('Options: {}\n\n'.format(options))
+
+        iterations = max(options.get('iterations'), 1)
+
+        with transaction.atomic():
+            start_time = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    search_backends.get_insert_search_documents_query(SYNTHETIC_DOCUMENTS_SQL),
+                    {'schools': options.get('schools')},
+                )
+                cursor.execute('ANALYZE "{0}"'.format(SchoolSearchDocument._meta.db_table))
+            logger.info('Inserted {0} synthetic school documents in {1:.1f} s.'.format(
+                options.get('schools'), time.perf_counter() - start_time))
+
+            self.benchmark_backend(search_backends.SEARCH_BACKEND_POSTGRES, iterations)
+
+            # Never keep the synthetic documents
+            transaction.set_rollback(True)
+
+        if options.get('include_azure'):
+            self.benchmark_backend(search_backends.SEARCH_BACKEND_AZURE, iterations)
+
+        logger.info('Completed school search benchmark.\n')
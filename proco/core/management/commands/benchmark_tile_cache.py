@@ -0,0 +1,113 @@
+import logging
+import pickle
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from proco.utils.cache import cache_manager
+from proco.utils.tiles import TILE_CONTENT_TYPE, compressed_tile_response
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+BENCHMARK_CACHE_KEY = 'BENCHMARK_TILE_CACHE'
+
+
+def create_synthetic_tile(tile_size, seed):
+    """
+    Create a payload which looks like a vector tile: a sequence of small features with an id, a status label
+    and point coordinates, so it compresses roughly like the real ST_AsMVT output.
+    """
+    rnd = random.Random(seed)
+    statuses = [b'good', b'moderate', b'bad', b'unknown']
+
+    payload = bytearray()
+    while len(payload) < tile_size:
+        payload += b'\x08' + rnd.getrandbits(24).to_bytes(3, 'little')
+        payload += b'\x12' + rnd.choice(statuses)
+        payload += b'\x18\x01\x22\x03\x09' + rnd.getrandbits(16).to_bytes(2, 'little')
+        payload += rnd.getrandbits(16).to_bytes(2, 'little')
+    return bytes(payload[:tile_size])
+
+
+def get_entry_size(key):
+    """Size of the cache entry as it is written to Redis: pickled value and, when available, MEMORY USAGE"""
+    full_key = '{0}_{1}'.format(cache_manager.CACHE_PREFIX, key)
+    pickled_size = len(pickle.dumps(cache.get(full_key), pickle.HIGHEST_PROTOCOL))
+
+    try:
+        from django_redis import get_redis_connection
+
+        memory_usage = get_redis_connection('default').memory_usage(cache.make_key(full_key))
+    except Exception:
+        memory_usage = None
+
+    return pickled_size, memory_usage
+
+
+def timed_loop(func, iterations):
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start_time) / iterations
+
+
+class Command(BaseCommand):
+    help = 'Compare the pickled tile response and the compressed bytes entries of the soft cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-tile_size', dest='tile_size', default=64 * 1024, type=int,
+            help='Size in bytes of the synthetic tile.'
+        )
+
+        parser.add_argument(
+            '-iterations', dest='iterations', default=1000, type=int,
+            help='Number of cache hits to measure for each entry type.'
+        )
+
+        parser.add_argument(
+            '-seed', dest='seed', default=42, type=int,
+            help='Seed for the synthetic tile generator.'
+        )
+
+    def handle(self, **options):
+        logger.info('Executing tile cache benchmark utility.\n')
+        logger.info('Options: {}\n\n'.format(options))
+
+        iterations = options.get('iterations')
+        tile = create_synthetic_tile(options.get('tile_size'), options.get('seed'))
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        response = HttpResponse(tile, content_type=TILE_CONTENT_TYPE)
+        response['Access-Control-Allow-Origin'] = '*'
+
+        response_key = BENCHMARK_CACHE_KEY + '_RESPONSE'
+        bytes_key = BENCHMARK_CACHE_KEY + '_BYTES'
+
+        try:
+            cache_manager.set(response_key, response)
+            cache_manager.set_bytes(bytes_key, tile, content_type=TILE_CONTENT_TYPE)
+
+            logger.info('Tile size: {0} bytes.'.format(len(tile)))
+            logger.info('Pickled response entry: {0} bytes, Redis memory usage: {1}.'.format(
+                *get_entry_size(response_key)))
+            logger.info('Compressed bytes entry: {0} bytes, Redis memory usage: {1}.'.format(
+                *get_entry_size(bytes_key)))
+
+            duration = timed_loop(lambda: cache_manager.get(response_key), iterations)
+            logger.info('Pickled response hit: {0:.1f} microseconds.'.format(duration * 1000000))
+
+            def _bytes_hit():
+                compressed_tile, metadata = cache_manager.get_bytes(bytes_key)
+                return compressed_tile_response(request, compressed_tile, content_type=metadata['content_type'])
+
+            duration = timed_loop(_bytes_hit, iterations)
+            logger.info('Compressed bytes hit: {0:.1f} microseconds.'.format(duration * 1000000))
+        finally:
+            cache_manager.invalidate([response_key, bytes_key], hard=True)
+
+        logger.info('Completed tile cache benchmark.\n')
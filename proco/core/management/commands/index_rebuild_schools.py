@@ -3,6 +3,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import time
 import logging
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from azure.core.credentials import AzureKeyCredential
 from azure.search.documents import SearchClient
@@ -10,10 +11,12 @@ from azure.search.documents.indexes import SearchIndexClient
 from azure.search.documents.indexes.models import CorsOptions, SearchIndex
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db.models import Prefetch, F
+from django.db.models import F, Q
 
+from proco.core import utils as core_utilities
 from proco.core.utils import is_blank_string
-from proco.locations.models import Country
+from proco.locations import search_backends
+from proco.locations.models import Country, CountryAdminMetadata, SchoolSearchIndexWatermark
 from proco.locations.search_indexes import SchoolIndex
 from proco.schools.models import School
 
@@ -82,46 +85,92 @@ def clear_index():
         search_client.delete_documents(all_docs)
 
 
-def collect_data(country_id, school_id):
+def get_index_watermark():
+    """Start time of the last successful update of all the schools, None if unknown"""
+    return SchoolSearchIndexWatermark.objects.filter(
+        backend=settings.SCHOOL_SEARCH_BACKEND,
+        index_name=SchoolIndex.Meta.index_name,
+    ).values_list('watermark', flat=True).first()
+
+
+def set_index_watermark(value):
+    SchoolSearchIndexWatermark.objects.update_or_create(
+        backend=settings.SCHOOL_SEARCH_BACKEND,
+        index_name=SchoolIndex.Meta.index_name,
+        defaults={'watermark': value},
+    )
+
+
+def get_changed_schools_filter(changed_since):
+    """Schools modified since changed_since, or whose country, admin1 or admin2 was modified since changed_since"""
+    changed_country_ids = Country.objects.all_records().filter(modified__gt=changed_since).values('id')
+    changed_admin_ids = CountryAdminMetadata.objects.all_records().filter(
+        last_modified_at__gt=changed_since).values('id')
+
+    return (
+        Q(modified__gt=changed_since) |
+        Q(country_id__in=changed_country_ids) |
+        Q(admin1_id__in=changed_admin_ids) |
+        Q(admin2_id__in=changed_admin_ids)
+    )
+
+
+def get_deleted_school_ids(changed_since):
+    return list(School.objects.all_deleted().filter(deleted__gt=changed_since).values_list('id', flat=True))
+
+
+def get_documents_queryset(country_id=None, school_id=None, changed_since=None, school_ids=None):
     qry_fields = [
         attr
         for attr in dir(SchoolIndex)
         if not callable(getattr(SchoolIndex, attr)) and not attr.startswith("__")
     ]
 
-    queryset = SchoolIndex.Meta.model.objects.all()
+    qs = SchoolIndex.Meta.model.objects.all()
 
-    qs = queryset.prefetch_related(
-        Prefetch('country', Country.objects.defer('geometry')),
-    ).annotate(
+    if country_id:
+        qs = qs.filter(country_id=country_id)
+
+    if school_id:
+        qs = qs.filter(id=school_id)
+
+    if school_ids is not None:
+        qs = qs.filter(id__in=school_ids)
+
+    if changed_since:
+        qs = qs.filter(get_changed_schools_filter(changed_since))
+
+    return qs.annotate(
         school_id=F('id'),
         country_name=F('country__name'),
         country_code=F('country__code'),
         admin1_name=F('admin1__name'),
         admin2_name=F('admin2__name'),
-    ).values(*qry_fields).order_by(*SchoolIndex.Meta.ordering).distinct(*qry_fields)
+    ).values(*qry_fields).order_by('id')
 
-    if country_id:
-        qs = qs.filter(country_id=country_id)
 
-    if school_id:
-        qs = qs.filter(id=school_id)
+def get_document(qry_data):
+    qry_data['school_id'] = str(qry_data['school_id'])
+    if is_blank_string(qry_data['admin1_name']):
+        qry_data['admin1_name'] = 'Unknown'
+        del qry_data['admin1_id']
+    if is_blank_string(qry_data['admin2_name']):
+        del qry_data['admin2_name']
+        del qry_data['admin2_id']
+    return qry_data
+
 
+def iter_document_batches(queryset, batch_size=1000):
+    """Stream the documents of the queryset in lists of batch_size documents"""
     docs = []
-    for qry_data in qs:
-        qry_data['school_id'] = str(qry_data['school_id'])
-        if is_blank_string(qry_data['admin1_name']):
-            qry_data['admin1_name'] = 'Unknown'
-            del qry_data['admin1_id']
-        if is_blank_string(qry_data['admin2_name']):
-            del qry_data['admin2_name']
-            del qry_data['admin2_id']
-        docs.append(qry_data)
-
-    logger.info('Total records to upload: {0}'.format(len(docs)))
-    # docs = docs[0:100000]
-    # print('Total records to upload: {0}'.format(len(docs)))
-    return docs
+    for qry_data in queryset.iterator(chunk_size=batch_size):
+        docs.append(get_document(qry_data))
+        if len(docs) >= batch_size:
+            yield docs
+            docs = []
+
+    if len(docs) > 0:
+        yield docs
 
 
 def divide_chunks(data_list, batch_size=1000):
@@ -150,11 +199,20 @@ def upload_docs(search_client, headers, data_chunk, failed_data_chunks, count, r
     return uploaded
 
 
-def load_index(docs, batch_size=1000):
-    search_client = SearchClient(cognitive_search_settings['SEARCH_ENDPOINT'], SchoolIndex.Meta.index_name,
-                                 AzureKeyCredential(cognitive_search_settings['SEARCH_API_KEY']))
+def create_search_client():
+    return SearchClient(cognitive_search_settings['SEARCH_ENDPOINT'], SchoolIndex.Meta.index_name,
+                        AzureKeyCredential(cognitive_search_settings['SEARCH_API_KEY']))
+
+
+def load_index(doc_batches, max_workers=1):
+    """
+    load_index
+        Upload the document batches with up to max_workers uploads in flight. Batches are pulled from the
+        iterator only when a worker is about to be free, so the memory holds at most 2 * max_workers batches.
+        Returns True when all the batches are uploaded.
+    """
+    search_client = create_search_client()
 
-    count = 1
     # INFO: Trick to avoid the 104 exception
     # ("Connection broken: ConnectionResetError(104, 'Connection reset by peer')",
     # ConnectionResetError(104, 'Connection reset by peer'))
@@ -164,18 +222,74 @@ def load_index(docs, batch_size=1000):
     }  # noqa
 
     failed_data_chunks = []
-    for data_chunk in divide_chunks(docs, batch_size=batch_size):
-        uploaded = upload_docs(search_client, headers, data_chunk, failed_data_chunks, count, retry_no=1)
-        if not uploaded:
-            logger.error('Failed to upload the docs even after 3 retries. Please check error file for more details.')
-            failed_data_chunks.append(data_chunk)
+    uploads = {}
+    uploaded_count = 0
+
+    def collect_uploads(return_when):
+        nonlocal uploaded_count
+        done, _ = wait(uploads.keys(), return_when=return_when)
+        for upload in done:
+            data_chunk = uploads.pop(upload)
+            if upload.result():
+                uploaded_count += len(data_chunk)
+            else:
+                logger.error('Failed to upload the docs even after 3 retries. Please check error file for more '
+                             'details.')
+                failed_data_chunks.append(data_chunk)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for count, data_chunk in enumerate(doc_batches, start=1):
+            if len(uploads) >= 2 * max_workers:
+                collect_uploads(FIRST_COMPLETED)
+
+            upload = executor.submit(upload_docs, search_client, headers, data_chunk, failed_data_chunks, count)
+            uploads[upload] = data_chunk
+
+        if len(uploads) > 0:
+            collect_uploads(ALL_COMPLETED)
+
+    logger.info('Total records uploaded: {0}'.format(uploaded_count))
+    return len(failed_data_chunks) == 0
+
+
+def delete_documents(school_ids, batch_size=1000):
+    search_client = create_search_client()
+
+    for data_chunk in divide_chunks(school_ids, batch_size=batch_size):
+        search_client.delete_documents(documents=[{'school_id': str(school_id)} for school_id in data_chunk])
+
+    logger.info('Total records deleted: {0}'.format(len(school_ids)))
+
+
+def update_index_documents(country_id=None, school_id=None, changed_since=None, school_ids=None):
+    """
+    update_index_documents
+        Upload the documents of all the schools, a country, a school, a list of schools or the schools changed
+        since changed_since and, in the last two cases, delete the documents of the deleted schools.
+        Returns True when all the documents are uploaded.
+    """
+    queryset = get_documents_queryset(
+        country_id=country_id, school_id=school_id, changed_since=changed_since, school_ids=school_ids)
+    uploaded = load_index(
+        iter_document_batches(queryset, batch_size=settings.SCHOOL_SEARCH_INDEX_BATCH_SIZE),
+        max_workers=settings.SCHOOL_SEARCH_INDEX_UPLOAD_WORKERS,
+    )
 
-        time.sleep(1.0)
-        count += 1
+    deleted_school_ids = []
+    if changed_since:
+        deleted_school_ids = get_deleted_school_ids(changed_since)
+    elif school_ids is not None:
+        deleted_school_ids = list(School.objects.all_deleted().filter(id__in=school_ids).values_list('id', flat=True))
+
+    if len(deleted_school_ids) > 0:
+        delete_documents(deleted_school_ids, batch_size=settings.SCHOOL_SEARCH_INDEX_BATCH_SIZE)
+
+    return uploaded
 
 
 class Command(BaseCommand):
-    help = 'Completely rebuilds the search index by removing the old data and then updating.'
+    help = ('Completely rebuilds the search index by removing the old data and then updating. With the postgres '
+            'search backend, --update_index rebuilds the SchoolSearchDocument rows.')
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -198,6 +312,12 @@ class Command(BaseCommand):
             help='If provided, already created cognitive index data will be uploaded again.'
         )
 
+        parser.add_argument(
+            '--incremental', action='store_true', dest='incremental', default=False,
+            help='If provided with --update_index, only the schools changed since the last update of all the '
+                 'schools are updated.'
+        )
+
         parser.add_argument(
             '-country_id', dest='country_id', required=False, type=int,
             help='Pass the Country ID in case want to control the update.'
@@ -208,12 +328,42 @@ class Command(BaseCommand):
             help='Pass the School ID in case want to control the update.'
         )
 
+        parser.add_argument(
+            '-school_ids', dest='school_ids', required=False, type=int, nargs='+',
+            help='Pass the School IDs in case want to update only these schools, e.g. the published ones.'
+        )
+
     def handle(self, **options):
         logger.info('Index operations STARTED ({0})'.format(SchoolIndex.Meta.index_name))
-        if settings.ENABLE_AZURE_COGNITIVE_SEARCH:
-            country_id = options.get('country_id', None)
-            school_id = options.get('school_id', None)
-
+        country_id = options.get('country_id', None)
+        school_id = options.get('school_id', None)
+        school_ids = options.get('school_ids', None)
+
+        # Changes committed while the update runs are picked again by the next incremental update
+        started_at = core_utilities.get_current_datetime_object()
+        changed_since = None
+        if options.get('incremental', False) and school_ids is None:
+            changed_since = get_index_watermark()
+            if changed_since is None:
+                logger.info('No index watermark found, updating all the schools.')
+            else:
+                logger.info('Updating the schools changed since: {0}'.format(changed_since))
+
+        updated = False
+        if settings.SCHOOL_SEARCH_BACKEND == search_backends.SEARCH_BACKEND_POSTGRES:
+            if options.get('update_index', False):
+                logger.info('Rebuild search documents - Start')
+                # Kept apart from school_ids, an incremental update of all the schools still moves the watermark
+                document_school_ids = school_ids
+                if changed_since:
+                    document_school_ids = list(School.objects.all().filter(
+                        get_changed_schools_filter(changed_since)).values_list('id', flat=True))
+                    document_school_ids.extend(get_deleted_school_ids(changed_since))
+
+                search_backends.rebuild_school_search_documents(
+                    country_id=country_id, school_id=school_id, school_ids=document_school_ids)
+                updated = True
+        elif settings.ENABLE_AZURE_COGNITIVE_SEARCH:
             if options.get('delete_index', False):
                 logger.info('Delete index - Start')
                 delete_index()
@@ -227,22 +377,12 @@ class Command(BaseCommand):
                 clear_index()
 
             if options.get('update_index', False):
-                logger.info('Collect index data - Start')
-                if country_id or school_id:
-                    data_to_load = collect_data(country_id, school_id)
-
-                    if len(data_to_load) > 0:
-                        logger.info('Load index - Start - {0}'.format(country_id))
-                        load_index(data_to_load, batch_size=10000)
-                else:
-                    all_countries = list(
-                        School.objects.all().values_list('country_id', flat=True).order_by('country_id').distinct(
-                            'country_id'))
-                    for country_id in all_countries:
-                        data_to_load = collect_data(country_id, None)
-
-                        if len(data_to_load) > 0:
-                            logger.info('Load index - Start - {0}'.format(country_id))
-                            load_index(data_to_load, batch_size=10000)
+                logger.info('Load index - Start')
+                updated = update_index_documents(
+                    country_id=country_id, school_id=school_id, changed_since=changed_since, school_ids=school_ids)
+
+        # Only a successful update of all the schools moves the watermark
+        if updated and not country_id and not school_id and school_ids is None:
+            set_index_watermark(started_at)
 
         logger.info('Index operations ENDED ({0})'.format(SchoolIndex.Meta.index_name))
@@ -0,0 +1,46 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from proco.connection_statistics.models import SchoolDailyStatus
+from proco.core import partitions as partition_utilities
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+
+class Command(BaseCommand):
+    """
+    Move SchoolDailyStatus to a table range partitioned by date. The rows are copied partition by partition
+    while the table stays in use, only the rows of the last recent_days are copied while the table is locked.
+    Do not run redo_aggregations or data loss recovery for older dates meanwhile.
+    The previous table is kept as connection_statistics_schooldailystatus_legacy, drop it once checked.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-interval', dest='interval', default=settings.SCHOOL_DAILY_STATUS_PARTITION_INTERVAL, type=str,
+            choices=[partition_utilities.PARTITION_INTERVAL_MONTH, partition_utilities.PARTITION_INTERVAL_YEAR],
+            help='Pass the partition interval. Default: settings.SCHOOL_DAILY_STATUS_PARTITION_INTERVAL.'
+        )
+
+        parser.add_argument(
+            '-recent_days', dest='recent_days', default=settings.LIVE_DATA_RETENTION_DAYS, type=int,
+            help='Number of days still updated by the live aggregations, copied while the table is locked.'
+        )
+
+    def handle(self, **options):
+        logger.info('Executing partition school daily status utility.\n')
+        logger.info('Options: {}\n\n'.format(options))
+
+        recent_date = timezone.localdate() - timedelta(days=options['recent_days'])
+
+        if partition_utilities.copy_to_partitioned_table(
+            SchoolDailyStatus, 'date', options['interval'], recent_date, settings.LIVE_DATA_PARTITIONS_AHEAD_DAYS,
+            date_column=True,
+        ):
+            logger.info('Completed partition school daily status successfully.\n')
+        else:
+            logger.info('SchoolDailyStatus is already partitioned, nothing to do.\n')
@@ -1,12 +1,16 @@
 import datetime
 import logging
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
 from proco.connection_statistics.utils import (
     aggregate_school_daily_status_to_school_weekly_status,
     aggregate_school_daily_to_country_daily,
+    refresh_country_school_map,
     update_country_weekly_status,
+    update_realtime_weekly_summary,
+    update_school_status_summary,
 )
 from proco.core import utils as core_utilities
 from proco.locations.models import Country
@@ -92,6 +96,11 @@ class Command(BaseCommand):
                 monday_date_list[0], monday_date_list[-1]))
             for monday_date in monday_date_list:
                 aggregate_school_daily_status_to_school_weekly_status(country, monday_date)
+                if settings.ENABLE_STATISTICS_SUMMARY:
+                    update_realtime_weekly_summary(country, monday_date)
+
+            if settings.ENABLE_STATISTICS_SUMMARY:
+                update_school_status_summary(country)
             logger.info('Completed school weekly aggregations.\n\n')
 
         if options.get('update_country_daily'):
@@ -115,6 +124,7 @@ class Command(BaseCommand):
                                 ' Year - {0}, Week No - {1}'.format(year, monday_week_no))
             logger.info('Completed country weekly aggregations.\n\n')
 
+        refresh_country_school_map(country)
         country.invalidate_country_related_cache()
 
         logger.info('Completed redo aggregations successfully.\n')
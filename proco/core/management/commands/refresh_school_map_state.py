@@ -0,0 +1,53 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from proco.connection_statistics.models import SchoolMapState
+from proco.connection_statistics.utils import refresh_school_map_clusters, refresh_school_map_state
+from proco.locations.models import Country
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+
+class Command(BaseCommand):
+    """
+    Refresh the SchoolMapState rows read by the map tiles when ENABLE_SCHOOL_MAP_STATE is on, and the
+    SchoolMapCluster rows with --clusters or ENABLE_SCHOOL_MAP_CLUSTERS.
+    Run it once before turning the settings on.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-country_id', dest='country_id', required=False, type=int,
+            help='Pass the Country ID to refresh only one country. Default: all countries.'
+        )
+
+        parser.add_argument(
+            '--clusters', action='store_true', dest='clusters', default=False,
+            help='If provided, the school map clusters are refreshed even if ENABLE_SCHOOL_MAP_CLUSTERS is off.'
+        )
+
+    def handle(self, **options):
+        logger.info('Executing refresh school map state utility.\n')
+        logger.info('Options: {}\n\n'.format(options))
+
+        if options.get('country_id'):
+            country_ids = [options['country_id']]
+        else:
+            # One transaction per country, including the countries which only have stale map state rows left
+            country_ids = sorted(
+                set(Country.objects.all().values_list('id', flat=True)) |
+                set(SchoolMapState.objects.all().values_list('country_id', flat=True).distinct())
+            )
+
+        refresh_clusters = options.get('clusters') or settings.ENABLE_SCHOOL_MAP_CLUSTERS
+
+        for country_id in country_ids:
+            logger.info('Refreshing school map state for country: {0}'.format(country_id))
+            refresh_school_map_state(country_id=country_id)
+
+            if refresh_clusters:
+                refresh_school_map_clusters(country_id=country_id)
+
+        logger.info('Completed refresh school map state successfully.\n')
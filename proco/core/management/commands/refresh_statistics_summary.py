@@ -0,0 +1,56 @@
+import datetime
+import logging
+
+from django.core.management.base import BaseCommand
+
+from proco.connection_statistics.utils import update_realtime_weekly_summary, update_school_status_summary
+from proco.core.management.commands.redo_aggregations import get_date_list
+from proco.locations.models import Country
+from proco.utils import dates as date_utilities
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the statistics summary tables (SchoolStatusSummary and RealTimeWeeklySummary) used by the
+    global stats and connectivity stats APIs when ENABLE_STATISTICS_SUMMARY is on.
+    Run it once for the past years before turning the setting on.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-country_id', dest='country_id', required=False, type=int,
+            help='Pass the Country ID to refresh only one country. Default: all countries.'
+        )
+
+        parser.add_argument(
+            '-year', dest='year', default=date_utilities.get_current_year(), type=int,
+            help='Pass the year to refresh the weekly summary for.'
+        )
+
+        parser.add_argument(
+            '-week_no', dest='week_no', required=False, type=int,
+            help='Pass the week number to refresh only one week of the year.'
+        )
+
+    def handle(self, **options):
+        logger.info('Executing refresh statistics summary utility.\n')
+        logger.info('Options: {}\n\n'.format(options))
+
+        countries = Country.objects.all().order_by('id')
+        if options.get('country_id'):
+            countries = countries.filter(id=options['country_id'])
+
+        dates_list = list(get_date_list(options.get('year'), options.get('week_no')))
+        # Every week touched by the date range, including the partial first week of the year
+        monday_date_list = sorted({date - datetime.timedelta(days=date.weekday()) for date in dates_list})
+
+        for country in countries:
+            logger.info('Refreshing statistics summary for country: {0}'.format(country.id))
+            update_school_status_summary(country)
+
+            for monday_date in monday_date_list:
+                update_realtime_weekly_summary(country, monday_date)
+
+        logger.info('Completed refresh statistics summary successfully.\n')
@@ -0,0 +1,450 @@
+import logging
+import re
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+PARTITION_INTERVAL_DAY = 'day'
+PARTITION_INTERVAL_WEEK = 'week'
+PARTITION_INTERVAL_MONTH = 'month'
+PARTITION_INTERVAL_YEAR = 'year'
+
+PARTITION_INTERVALS = (
+    PARTITION_INTERVAL_DAY,
+    PARTITION_INTERVAL_WEEK,
+    PARTITION_INTERVAL_MONTH,
+    PARTITION_INTERVAL_YEAR,
+)
+
+# Upper bound of a range partition as printed by pg_get_expr: FOR VALUES FROM (...) TO ('2024-01-08 00:00:00+00')
+PARTITION_UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+
+# Index name and table of a pg_get_indexdef statement: CREATE INDEX name ON public.table USING btree (...)
+INDEX_DEFINITION_TARGET_RE = re.compile(r' INDEX \S+ ON (ONLY )?\S+ ')
+
+
+def get_partition_start(date, interval):
+    """
+    get_partition_start
+        First date of the partition holding the given date: the date itself for daily partitions, the Monday of
+        its week, the first day of its month or of its year for the other intervals.
+    """
+    if interval == PARTITION_INTERVAL_WEEK:
+        return date - timedelta(days=date.weekday())
+    if interval == PARTITION_INTERVAL_MONTH:
+        return date.replace(day=1)
+    if interval == PARTITION_INTERVAL_YEAR:
+        return date.replace(month=1, day=1)
+    return date
+
+
+def get_next_partition_start(partition_start, interval):
+    if interval == PARTITION_INTERVAL_WEEK:
+        return partition_start + timedelta(days=7)
+    if interval == PARTITION_INTERVAL_MONTH:
+        return (partition_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if interval == PARTITION_INTERVAL_YEAR:
+        return partition_start.replace(year=partition_start.year + 1)
+    return partition_start + timedelta(days=1)
+
+
+def get_partition_name(table_name, start_date):
+    return '{0}_p{1}'.format(table_name, start_date.strftime('%Y%m%d'))
+
+
+def get_partition_bound(date, date_column=False):
+    """
+    get_partition_bound
+        Partition bound value of a date: the date itself for a date column, midnight of the date in the
+        current time zone for a datetime column.
+    """
+    if date_column:
+        return date
+    return timezone.make_aware(datetime.combine(date, time.min))
+
+
+def parse_partition_upper_bound(partition_bound):
+    """
+    parse_partition_upper_bound
+        Upper bound datetime of a range partition from its pg_get_expr(relpartbound) expression,
+        None for the DEFAULT partition and for MAXVALUE bounds. Date bounds are returned as midnight of the date.
+    """
+    match = PARTITION_UPPER_BOUND_RE.search(partition_bound or '')
+    if not match:
+        return None
+
+    upper_bound = parse_datetime(match.group(1))
+    if upper_bound is None:
+        upper_bound_date = parse_date(match.group(1))
+        if upper_bound_date is None:
+            return None
+        upper_bound = get_partition_bound(upper_bound_date)
+    return upper_bound
+
+
+def is_partitioned_table(table_name):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", [table_name])
+        row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def get_table_partitions(table_name):
+    """
+    get_table_partitions
+        Partitions of the table as a list of (partition name, upper bound) sorted by upper bound,
+        the upper bound is None for the DEFAULT partition.
+    """
+    query = """
+    SELECT c."relname", pg_get_expr(c."relpartbound", c."oid")
+    FROM pg_inherits i
+    INNER JOIN pg_class c ON c."oid" = i."inhrelid"
+    WHERE i."inhparent" = to_regclass(%s)
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, [table_name])
+        partitions = [
+            (partition_name, parse_partition_upper_bound(partition_bound))
+            for partition_name, partition_bound in cursor.fetchall()
+        ]
+
+    range_partitions = sorted(
+        [partition for partition in partitions if partition[1] is not None], key=lambda partition: partition[1])
+    return range_partitions + [partition for partition in partitions if partition[1] is None]
+
+
+def create_default_partition(table_name, partition_prefix=None):
+    """
+    create_default_partition
+        Catch all partition for the rows outside the range partitions, so an insert never fails because the
+        partition of its date was not created in time.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE TABLE IF NOT EXISTS "{0}_default" PARTITION OF "{1}" DEFAULT'.format(
+            partition_prefix or table_name, table_name))
+
+
+def create_table_partitions(table_name, start_date, end_date, interval, date_column=False, partition_prefix=None):
+    """
+    create_table_partitions
+        Create the range partitions of the table covering start_date to end_date (both included).
+        Ranges before the upper bound of the latest existing partition are skipped, so the function can be
+        called repeatedly to keep the partitions ahead of the incoming data.
+
+        date_column: True if the partition key is a date column instead of a datetime column.
+        partition_prefix: name of the partitions before the start date suffix, defaults to the table name.
+
+    :return: list of the created partition names
+    """
+    range_partitions = [upper_bound for _, upper_bound in get_table_partitions(table_name) if upper_bound]
+    partition_start = get_partition_start(start_date, interval)
+    if range_partitions:
+        partition_start = max(partition_start, timezone.localtime(range_partitions[-1]).date())
+
+    created_partitions = []
+    while partition_start <= end_date:
+        partition_name = get_partition_name(partition_prefix or table_name, partition_start)
+        query = 'CREATE TABLE IF NOT EXISTS "{partition}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)'.format(
+            partition=partition_name,
+            table=table_name,
+        )
+
+        next_partition_start = get_next_partition_start(partition_start, interval)
+
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(query, [
+                    get_partition_bound(partition_start, date_column=date_column),
+                    get_partition_bound(next_partition_start, date_column=date_column),
+                ])
+            created_partitions.append(partition_name)
+        except Exception as ex:
+            # e.g. the DEFAULT partition already holds rows of the range
+            logger.error('Failed to create the partition "{0}": {1}'.format(partition_name, ex))
+
+        partition_start = next_partition_start
+
+    return created_partitions
+
+
+def drop_table_partitions_before(table_name, cutoff_datetime):
+    """
+    drop_table_partitions_before
+        Drop the partitions of the table whose rows are all older than cutoff_datetime. Unlike a DELETE, it only
+        changes the catalog and leaves no dead rows behind.
+
+    :return: list of the dropped partition names
+    """
+    dropped_partitions = []
+    for partition_name, upper_bound in get_table_partitions(table_name):
+        if upper_bound is None or upper_bound > cutoff_datetime:
+            continue
+
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS "{0}"'.format(partition_name))
+        dropped_partitions.append(partition_name)
+
+    return dropped_partitions
+
+
+def get_renamed_index_name(index_name, suffix):
+    # PostgreSQL identifiers are limited to 63 characters
+    return index_name[:63 - len(suffix)] + suffix
+
+
+def get_table_definitions(cursor, table_name):
+    """
+    get_table_definitions
+        Definitions to rebuild the table as a partitioned table.
+
+    :return: tuple of the id sequence name, the list of (name, type, definition) of the primary key, unique and
+        foreign key constraints and the list of (name, definition) of the indexes
+    """
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table_name])
+    sequence_name = cursor.fetchone()[0]
+
+    cursor.execute("""
+    SELECT "conname", "contype", pg_get_constraintdef("oid")
+    FROM pg_constraint
+    WHERE "conrelid" = to_regclass(%s) AND "contype" IN ('p', 'u', 'f')
+    """, [table_name])
+    constraints = cursor.fetchall()
+
+    cursor.execute("""
+    SELECT i."relname", pg_get_indexdef(i."oid")
+    FROM pg_index x
+    INNER JOIN pg_class i ON i."oid" = x."indexrelid"
+    WHERE x."indrelid" = to_regclass(%s)
+    """, [table_name])
+    indexes = cursor.fetchall()
+
+    return sequence_name, constraints, indexes
+
+
+def get_index_definition_for_table(index_definition, index_name, table_name):
+    """
+    get_index_definition_for_table
+        pg_get_indexdef statement rewritten to create the same index under another name on another table.
+    """
+    return INDEX_DEFINITION_TARGET_RE.sub(
+        ' INDEX "{0}" ON "{1}" '.format(index_name, table_name), index_definition, count=1)
+
+
+def convert_to_partitioned_table(model, column, interval, ahead_days):
+    """
+    convert_to_partitioned_table
+        Turn the table of the model into a table range partitioned by the given datetime column, keeping all the
+        existing rows and the id sequence:
+
+        1. A validated CHECK constraint and a unique (id, column) index are built on the current table without
+           blocking the writes.
+        2. The current table is renamed to <table>_legacy and a partitioned table with the same columns, primary
+           key (id, column), indexes, unique and foreign key constraints takes its name.
+        3. The legacy table is attached as the partition of all the rows before the boundary date. The CHECK
+           constraint and the index make it a catalog only operation, the rows are not copied.
+        4. The range partitions from the boundary date up to ahead_days and a DEFAULT partition are created.
+
+        The legacy partition is dropped by the retention like any other partition once its rows are old enough.
+        Requires PostgreSQL 11 or later.
+
+    :return: False if the table is already partitioned
+    """
+    table_name = model._meta.db_table
+    if is_partitioned_table(table_name):
+        return False
+
+    legacy_table_name = '{0}_legacy'.format(table_name)
+    check_name = '{0}_partition_bound'.format(table_name)
+    partition_key_index_name = get_renamed_index_name(table_name, '_partition_pkey')
+
+    today = timezone.localdate()
+    # Keep one more interval of margin for the rows written while the table is converted
+    boundary_date = get_next_partition_start(get_next_partition_start(get_partition_start(today, interval), interval),
+                                             interval)
+    boundary = get_partition_bound(boundary_date)
+
+    logger.info('Validating the rows of "{0}" before {1}.'.format(table_name, boundary))
+    with connection.cursor() as cursor:
+        # Left behind by a previous failed conversion
+        cursor.execute('ALTER TABLE "{0}" DROP CONSTRAINT IF EXISTS "{1}"'.format(table_name, check_name))
+        cursor.execute(
+            'ALTER TABLE "{table}" ADD CONSTRAINT "{check}" CHECK ("{column}" IS NOT NULL AND "{column}" < %s) '
+            'NOT VALID'.format(table=table_name, check=check_name, column=column),
+            [boundary],
+        )
+        cursor.execute('ALTER TABLE "{0}" VALIDATE CONSTRAINT "{1}"'.format(table_name, check_name))
+        cursor.execute(
+            'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{index}" ON "{table}" ("id", "{column}")'.format(
+                index=partition_key_index_name, table=table_name, column=column)
+        )
+
+    logger.info('Converting "{0}" to a table partitioned by "{1}".'.format(table_name, column))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('LOCK TABLE "{0}" IN ACCESS EXCLUSIVE MODE'.format(table_name))
+
+        sequence_name, constraints, indexes = get_table_definitions(cursor, table_name)
+        constraint_names = [constraint_name for constraint_name, _, _ in constraints]
+        indexes = [
+            (index_name, index_definition)
+            for index_name, index_definition in indexes
+            if index_name != partition_key_index_name
+        ]
+
+        cursor.execute('ALTER TABLE "{0}" RENAME TO "{1}"'.format(table_name, legacy_table_name))
+        for index_name, _ in indexes:
+            # Index names are unique in the schema, free them for the partitioned table
+            cursor.execute('ALTER INDEX "{0}" RENAME TO "{1}"'.format(
+                index_name, get_renamed_index_name(index_name, '_legacy')))
+
+        cursor.execute(
+            'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            'PARTITION BY RANGE ("{column}")'.format(table=table_name, legacy=legacy_table_name, column=column)
+        )
+        cursor.execute('ALTER TABLE "{0}" DROP CONSTRAINT "{1}"'.format(table_name, check_name))
+        cursor.execute('ALTER SEQUENCE {0} OWNED BY "{1}"."id"'.format(sequence_name, table_name))
+
+        for constraint_name, constraint_type, constraint_definition in constraints:
+            if constraint_type == 'p':
+                constraint_definition = 'PRIMARY KEY ("id", "{0}")'.format(column)
+            cursor.execute('ALTER TABLE "{0}" ADD CONSTRAINT "{1}" {2}'.format(
+                table_name, constraint_name, constraint_definition))
+
+        for index_name, index_definition in indexes:
+            if index_name not in constraint_names:
+                # Same definition, the table name is the one of the partitioned table again
+                cursor.execute(index_definition)
+
+        # The partition gets the primary key of the partitioned table on the (id, column) index instead
+        legacy_primary_key_names = [
+            get_renamed_index_name(constraint_name, '_legacy')
+            for constraint_name, constraint_type, _ in constraints
+            if constraint_type == 'p'
+        ]
+        for constraint_name in legacy_primary_key_names:
+            cursor.execute('ALTER TABLE "{0}" DROP CONSTRAINT "{1}"'.format(legacy_table_name, constraint_name))
+
+        cursor.execute(
+            'ALTER TABLE "{table}" ATTACH PARTITION "{legacy}" FOR VALUES FROM (MINVALUE) TO (%s)'.format(
+                table=table_name, legacy=legacy_table_name),
+            [boundary],
+        )
+        cursor.execute('ALTER TABLE "{0}" DROP CONSTRAINT "{1}"'.format(legacy_table_name, check_name))
+
+        create_table_partitions(table_name, boundary_date, today + timedelta(days=ahead_days), interval)
+        create_default_partition(table_name)
+
+    logger.info('Converted "{0}" to a partitioned table.'.format(table_name))
+    return True
+
+
+def copy_to_partitioned_table(model, column, interval, recent_date, ahead_days, date_column=False):
+    """
+    copy_to_partitioned_table
+        Move the rows of the table of the model to a new table range partitioned by the given column, one
+        partition at a time, then swap the two tables:
+
+        1. <table>_partitioned is created with the same columns, primary key (id, column), indexes, unique and
+           foreign key constraints. Its indexes get temporary names.
+        2. The rows before recent_date are copied partition by partition, each partition in its own transaction,
+           while the table stays in use.
+        3. In one short transaction the table is locked, the rows from recent_date are copied, the table is
+           renamed to <table>_legacy and the partitioned table takes its name and its index names.
+
+        Changes of the rows before recent_date made during step 2 are lost, so no backfill of old dates must run
+        meanwhile. The legacy table is kept to check the result and has to be dropped manually.
+        Requires PostgreSQL 11 or later.
+
+    :return: False if the table is already partitioned
+    """
+    table_name = model._meta.db_table
+    if is_partitioned_table(table_name):
+        return False
+
+    new_table_name = '{0}_partitioned'.format(table_name)
+    legacy_table_name = '{0}_legacy'.format(table_name)
+
+    with connection.cursor() as cursor:
+        # Left behind by a previous failed conversion
+        cursor.execute('DROP TABLE IF EXISTS "{0}"'.format(new_table_name))
+
+        sequence_name, constraints, indexes = get_table_definitions(cursor, table_name)
+        constraint_names = [constraint_name for constraint_name, _, _ in constraints]
+
+        cursor.execute(
+            'CREATE TABLE "{new_table}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            'PARTITION BY RANGE ("{column}")'.format(new_table=new_table_name, table=table_name, column=column)
+        )
+
+        for constraint_name, constraint_type, constraint_definition in constraints:
+            if constraint_type == 'p':
+                constraint_definition = 'PRIMARY KEY ("id", "{0}")'.format(column)
+            if constraint_type != 'f':
+                # Index backed constraint names are unique in the schema like the index names
+                constraint_name = get_renamed_index_name(constraint_name, '_new')
+            cursor.execute('ALTER TABLE "{0}" ADD CONSTRAINT "{1}" {2}'.format(
+                new_table_name, constraint_name, constraint_definition))
+
+        for index_name, index_definition in indexes:
+            if index_name not in constraint_names:
+                cursor.execute(get_index_definition_for_table(
+                    index_definition, get_renamed_index_name(index_name, '_new'), new_table_name))
+
+        cursor.execute('SELECT MIN("{0}") FROM "{1}"'.format(column, table_name))
+        first_value = cursor.fetchone()[0]
+
+    today = timezone.localdate()
+    start_date = recent_date
+    if first_value is not None:
+        start_date = min(first_value if date_column else timezone.localtime(first_value).date(), recent_date)
+
+    create_table_partitions(new_table_name, start_date, today + timedelta(days=ahead_days), interval,
+                            date_column=date_column, partition_prefix=table_name)
+    create_default_partition(new_table_name, partition_prefix=table_name)
+
+    copy_query = 'INSERT INTO "{new_table}" SELECT * FROM "{table}" WHERE "{column}" >= %s AND "{column}" < %s'.format(
+        new_table=new_table_name, table=table_name, column=column)
+
+    partition_start = get_partition_start(start_date, interval)
+    while partition_start < recent_date:
+        partition_end = min(get_next_partition_start(partition_start, interval), recent_date)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(copy_query, [
+                get_partition_bound(partition_start, date_column=date_column),
+                get_partition_bound(partition_end, date_column=date_column),
+            ])
+            logger.info('Copied {0} rows of "{1}" from {2} to {3}.'.format(
+                cursor.rowcount, table_name, partition_start, partition_end))
+
+        partition_start = partition_end
+
+    logger.info('Swapping "{0}" with its partitioned copy.'.format(table_name))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('LOCK TABLE "{0}" IN ACCESS EXCLUSIVE MODE'.format(table_name))
+
+        cursor.execute(
+            'INSERT INTO "{new_table}" SELECT * FROM "{table}" WHERE "{column}" >= %s'.format(
+                new_table=new_table_name, table=table_name, column=column),
+            [get_partition_bound(recent_date, date_column=date_column)],
+        )
+        logger.info('Copied {0} rows of "{1}" from {2}.'.format(cursor.rowcount, table_name, recent_date))
+
+        cursor.execute('ALTER TABLE "{0}" RENAME TO "{1}"'.format(table_name, legacy_table_name))
+        cursor.execute('ALTER TABLE "{0}" RENAME TO "{1}"'.format(new_table_name, table_name))
+        for index_name, _ in indexes:
+            cursor.execute('ALTER INDEX "{0}" RENAME TO "{1}"'.format(
+                index_name, get_renamed_index_name(index_name, '_legacy')))
+            # Renaming the index of a constraint renames the constraint as well
+            cursor.execute('ALTER INDEX "{0}" RENAME TO "{1}"'.format(
+                get_renamed_index_name(index_name, '_new'), index_name))
+
+        cursor.execute('ALTER SEQUENCE {0} OWNED BY "{1}"."id"'.format(sequence_name, table_name))
+
+    logger.info('Converted "{0}" to a partitioned table, the previous table is kept as "{1}".'.format(
+        table_name, legacy_table_name))
+    return True
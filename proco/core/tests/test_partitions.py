@@ -0,0 +1,156 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from proco.connection_statistics.models import RealTimeConnectivity
+from proco.core import partitions as partition_utilities
+
+
+class PartitionsTestCase(TestCase):
+    databases = ['default', ]
+
+    def test_get_partition_start(self):
+        # 2024-01-10 is a Wednesday
+        self.assertEqual(partition_utilities.get_partition_start(date(2024, 1, 10), 'day'), date(2024, 1, 10))
+        self.assertEqual(partition_utilities.get_partition_start(date(2024, 1, 10), 'week'), date(2024, 1, 8))
+        self.assertEqual(partition_utilities.get_partition_start(date(2024, 1, 8), 'week'), date(2024, 1, 8))
+
+    def test_get_partition_start_month_and_year(self):
+        self.assertEqual(partition_utilities.get_partition_start(date(2024, 2, 29), 'month'), date(2024, 2, 1))
+        self.assertEqual(partition_utilities.get_partition_start(date(2024, 2, 29), 'year'), date(2024, 1, 1))
+
+    def test_get_next_partition_start(self):
+        self.assertEqual(partition_utilities.get_next_partition_start(date(2024, 1, 8), 'day'), date(2024, 1, 9))
+        self.assertEqual(partition_utilities.get_next_partition_start(date(2024, 1, 8), 'week'), date(2024, 1, 15))
+        self.assertEqual(partition_utilities.get_next_partition_start(date(2024, 1, 1), 'month'), date(2024, 2, 1))
+        self.assertEqual(partition_utilities.get_next_partition_start(date(2024, 12, 1), 'month'), date(2025, 1, 1))
+        self.assertEqual(partition_utilities.get_next_partition_start(date(2024, 1, 1), 'year'), date(2025, 1, 1))
+
+    def test_get_partition_name(self):
+        self.assertEqual(
+            partition_utilities.get_partition_name('connection_statistics_realtimeconnectivity', date(2024, 1, 8)),
+            'connection_statistics_realtimeconnectivity_p20240108',
+        )
+
+    def test_parse_partition_upper_bound(self):
+        self.assertEqual(
+            partition_utilities.parse_partition_upper_bound(
+                "FOR VALUES FROM ('2024-01-01 00:00:00+00') TO ('2024-01-08 00:00:00+00')"),
+            datetime(2024, 1, 8, tzinfo=timezone.utc),
+        )
+        self.assertEqual(
+            partition_utilities.parse_partition_upper_bound(
+                "FOR VALUES FROM (MINVALUE) TO ('2024-01-08 00:00:00+00')"),
+            datetime(2024, 1, 8, tzinfo=timezone.utc),
+        )
+        self.assertEqual(
+            partition_utilities.parse_partition_upper_bound("FOR VALUES FROM ('2024-01-01') TO ('2025-01-01')"),
+            datetime(2025, 1, 1, tzinfo=timezone.utc),
+        )
+        self.assertIsNone(partition_utilities.parse_partition_upper_bound('DEFAULT'))
+        self.assertIsNone(partition_utilities.parse_partition_upper_bound(
+            "FOR VALUES FROM ('2024-01-01 00:00:00+00') TO (MAXVALUE)"))
+
+    def test_get_index_definition_for_table(self):
+        self.assertEqual(
+            partition_utilities.get_index_definition_for_table(
+                'CREATE UNIQUE INDEX schooldailystatus_unique_without_deleted ON '
+                'public.connection_statistics_schooldailystatus USING btree (date, school_id, live_data_source) '
+                'WHERE (deleted IS NULL)',
+                'schooldailystatus_unique_without_deleted_new',
+                'connection_statistics_schooldailystatus_partitioned',
+            ),
+            'CREATE UNIQUE INDEX "schooldailystatus_unique_without_deleted_new" ON '
+            '"connection_statistics_schooldailystatus_partitioned" USING btree (date, school_id, live_data_source) '
+            'WHERE (deleted IS NULL)',
+        )
+
+    def test_is_partitioned_table(self):
+        self.assertFalse(partition_utilities.is_partitioned_table(RealTimeConnectivity._meta.db_table))
+        self.assertFalse(partition_utilities.is_partitioned_table('unknown_table'))
+        self.assertListEqual(partition_utilities.get_table_partitions(RealTimeConnectivity._meta.db_table), [])
+
+
+class TablePartitionsTestCase(TransactionTestCase):
+    """
+    Partitions a small scratch table end to end. CREATE INDEX CONCURRENTLY of convert_to_partitioned_table can not
+    run inside the transaction of a TestCase.
+    """
+    databases = ['default', ]
+
+    table_name = 'core_partitions_test_data'
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        # convert_to_partitioned_table only reads the table name of the model
+        self.model = SimpleNamespace(_meta=SimpleNamespace(db_table=self.table_name))
+
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE "{0}" ("id" serial PRIMARY KEY, "created" timestamp with time zone '
+                           'NOT NULL, "value" integer NOT NULL)'.format(self.table_name))
+            cursor.execute('CREATE INDEX "{0}_created" ON "{0}" ("created")'.format(self.table_name))
+            for days_ago, value in ((60, 1), (30, 2), (0, 3)):
+                cursor.execute('INSERT INTO "{0}" ("created", "value") VALUES (%s, %s)'.format(self.table_name), [
+                    partition_utilities.get_partition_bound(self.today - timedelta(days=days_ago)), value])
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS "{0}" CASCADE'.format(self.table_name))
+            cursor.execute('DROP TABLE IF EXISTS "{0}_legacy" CASCADE'.format(self.table_name))
+        super().tearDown()
+
+    def get_row_count(self, table_name=None):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM "{0}"'.format(table_name or self.table_name))
+            return cursor.fetchone()[0]
+
+    def get_partition_bound(self, days):
+        return partition_utilities.get_partition_bound(self.today + timedelta(days=days))
+
+    def get_partition_name(self, days):
+        return partition_utilities.get_partition_name(self.table_name, self.today + timedelta(days=days))
+
+    def test_convert_create_and_drop_table_partitions(self):
+        self.assertTrue(partition_utilities.convert_to_partitioned_table(self.model, 'created', 'day', 5))
+        self.assertTrue(partition_utilities.is_partitioned_table(self.table_name))
+        self.assertFalse(partition_utilities.convert_to_partitioned_table(self.model, 'created', 'day', 5))
+
+        # All the existing rows stay in the legacy partition, bounded 2 days ahead
+        self.assertEqual(self.get_row_count(), 3)
+        self.assertEqual(self.get_row_count('{0}_legacy'.format(self.table_name)), 3)
+        self.assertListEqual(partition_utilities.get_table_partitions(self.table_name), [
+            ('{0}_legacy'.format(self.table_name), self.get_partition_bound(2)),
+            (self.get_partition_name(2), self.get_partition_bound(3)),
+            (self.get_partition_name(3), self.get_partition_bound(4)),
+            (self.get_partition_name(4), self.get_partition_bound(5)),
+            (self.get_partition_name(5), self.get_partition_bound(6)),
+            ('{0}_default'.format(self.table_name), None),
+        ])
+
+        with connection.cursor() as cursor:
+            # The id sequence is kept
+            cursor.execute('INSERT INTO "{0}" ("created", "value") VALUES (%s, %s) RETURNING "id"'.format(
+                self.table_name), [self.get_partition_bound(3), 4])
+            self.assertEqual(cursor.fetchone()[0], 4)
+        self.assertEqual(self.get_row_count(self.get_partition_name(3)), 1)
+
+        # Only the ranges after the latest partition are created
+        self.assertListEqual(
+            partition_utilities.create_table_partitions(
+                self.table_name, self.today, self.today + timedelta(days=7), 'day'),
+            [self.get_partition_name(6), self.get_partition_name(7)],
+        )
+        self.assertEqual(partition_utilities.get_table_partitions(self.table_name)[-2],
+                         (self.get_partition_name(7), self.get_partition_bound(8)))
+
+        self.assertListEqual(
+            partition_utilities.drop_table_partitions_before(self.table_name, self.get_partition_bound(3)),
+            ['{0}_legacy'.format(self.table_name), self.get_partition_name(2)],
+        )
+        self.assertEqual(self.get_row_count(), 1)
+        self.assertEqual(partition_utilities.get_table_partitions(self.table_name)[0],
+                         (self.get_partition_name(3), self.get_partition_bound(4)))
@@ -1,8 +1,12 @@
+from datetime import timedelta
+
 from django.test import TestCase
 from django.utils import timezone
 
 from proco.core import db_utils as core_db_utilities
 from proco.core import utils as core_utilities
+from proco.data_sources.models import QoSData
+from proco.schools.tests.factories import SchoolFactory
 from proco.utils.tests import TestAPIViewSetMixin
 
 
@@ -119,3 +123,30 @@ class DBUtilsUtilitiesTestCase(TestAPIViewSetMixin, TestCase):
         result = core_db_utilities.sql_to_response(sql, label='InvalidCountrySearch')
         self.assertIsNone(result)
 
+    def test_bulk_upsert_utility(self):
+        school = SchoolFactory()
+        timestamp = timezone.now().replace(microsecond=0)
+
+        def get_record(minutes, speed_download):
+            return {
+                'school': school,
+                'country': school.country,
+                'school_id_giga': school.giga_id_school,
+                'timestamp': timestamp + timedelta(minutes=minutes),
+                'date': timestamp.date(),
+                'speed_download': speed_download,
+            }
+
+        self.assertTupleEqual(core_db_utilities.bulk_upsert([], QoSData, ['school', 'timestamp']), (0, 0))
+        self.assertTupleEqual(core_db_utilities.bulk_upsert(
+            [get_record(0, 1.0), get_record(1, 2.0)], QoSData, ['school', 'timestamp']), (2, 0))
+
+        # Last record wins for duplicated keys
+        self.assertTupleEqual(core_db_utilities.bulk_upsert(
+            [get_record(1, 3.0), get_record(1, 4.0), get_record(2, 5.0)], QoSData, ['school', 'timestamp'],
+            batch_size=1), (1, 1))
+
+        self.assertListEqual(
+            list(QoSData.objects.filter(school=school).order_by('timestamp').values_list('speed_download', flat=True)),
+            [1.0, 4.0, 5.0],
+        )
@@ -0,0 +1,134 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from proco.utils import cache as cache_utilities
+from proco.utils.cache import cache_manager
+
+
+class CacheTagsTestCase(TestCase):
+    databases = ['default', ]
+
+    def test_get_cache_tag(self):
+        self.assertEqual(cache_utilities.get_cache_tag('GLOBAL_STATS'), 'GLOBAL_STATS')
+        self.assertEqual(cache_utilities.get_cache_tag(scope='country_code', value='BR'), 'country_code_br')
+        self.assertEqual(cache_utilities.get_cache_tag('SCHOOLS', 'country_code', 'BR'), 'SCHOOLS_country_code_br')
+
+    def test_get_cache_tags(self):
+        self.assertListEqual(
+            cache_utilities.get_cache_tags('DATA_LAYER_MAP', layer_id=[1, 1], country_id=[12]),
+            [
+                'DATA_LAYER_MAP',
+                'layer_id_1',
+                'DATA_LAYER_MAP_layer_id_1',
+                'country_id_12',
+                'DATA_LAYER_MAP_country_id_12',
+            ],
+        )
+
+    def test_get_request_cache_tags(self):
+        request = RequestFactory().get('/', {'country_id__in': '12,14', 'layer_id': '3'})
+        tags = cache_utilities.get_request_cache_tags('GLOBAL_STATS', request, {'country_code': 'BR'})
+
+        self.assertIn('GLOBAL_STATS', tags)
+        self.assertIn('GLOBAL_STATS_country_id_12', tags)
+        self.assertIn('country_id_14', tags)
+        self.assertIn('GLOBAL_STATS_layer_id_3', tags)
+        self.assertIn('GLOBAL_STATS_country_code_br', tags)
+
+
+class SoftCacheManagerTagsTestCase(TestCase):
+    databases = ['default', ]
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_set_does_not_create_tag_keys(self):
+        cache_manager.set('STATS_KEY', {'data': 'value'}, tags=['GLOBAL_STATS'])
+        self.assertListEqual(list(cache.keys('*')), ['SOFT_CACHE_STATS_KEY'])
+
+    @mock.patch('proco.utils.cache.update_cached_value.delay')
+    def test_soft_invalidate_tags(self, update_cached_value):
+        cache_manager.set('STATS_KEY', {'data': 'value'}, request_path='/stats', tags=['GLOBAL_STATS'])
+        cache_manager.set('OTHER_KEY', {'data': 'value'}, request_path='/other', tags=['SCHOOLS'])
+
+        cache_manager.invalidate_tags(['GLOBAL_STATS'])
+
+        self.assertEqual(cache_manager.get('STATS_KEY'), {'data': 'value'})
+        update_cached_value.assert_called_once_with(url='/stats')
+
+        update_cached_value.reset_mock()
+        self.assertEqual(cache_manager.get('OTHER_KEY'), {'data': 'value'})
+        update_cached_value.assert_not_called()
+
+        # Refreshed entry is written with the new generation
+        cache_manager.set('STATS_KEY', {'data': 'new value'}, request_path='/stats', tags=['GLOBAL_STATS'])
+        self.assertEqual(cache_manager.get('STATS_KEY'), {'data': 'new value'})
+        update_cached_value.assert_not_called()
+
+    def test_hard_invalidate_tags(self):
+        cache_manager.set('STATS_KEY', {'data': 'value'}, tags=['GLOBAL_STATS'])
+        cache_manager.set_bytes('TILE_KEY', b'tile', tags=['GLOBAL_STATS'])
+        cache_manager.set('OTHER_KEY', {'data': 'value'}, tags=['SCHOOLS'])
+
+        cache_manager.invalidate_tags(['GLOBAL_STATS'], hard=True)
+
+        self.assertIsNone(cache_manager.get('STATS_KEY'))
+        self.assertIsNone(cache_manager.get_bytes('TILE_KEY'))
+        self.assertEqual(cache_manager.get('OTHER_KEY'), {'data': 'value'})
+
+        # The invalidated entries are removed by the read, not only hidden
+        self.assertFalse(cache.has_key('SOFT_CACHE_STATS_KEY'))
+        self.assertFalse(cache.has_key('SOFT_CACHE_TILE_KEY'))
+        self.assertTrue(cache.has_key('SOFT_CACHE_OTHER_KEY'))
+
+    @override_settings(SOFT_CACHE_TIMEOUT_FACTOR=3)
+    def test_entries_expire_after_soft_timeouts(self):
+        cache_manager.set('STATS_KEY', {'data': 'value'}, soft_timeout=100, tags=['GLOBAL_STATS'])
+        cache_manager.set_bytes('TILE_KEY', b'tile', soft_timeout=100)
+        cache_manager.set('CONFIG_KEY', {'data': 'value'}, soft_timeout=None)
+
+        self.assertTrue(290 <= cache.ttl('SOFT_CACHE_STATS_KEY') <= 300)
+        self.assertTrue(290 <= cache.ttl('SOFT_CACHE_TILE_KEY') <= 300)
+        self.assertIsNone(cache.ttl('SOFT_CACHE_CONFIG_KEY'))
+
+        # A soft invalidation of the key keeps its expiry
+        cache_manager.invalidate('STATS_KEY')
+        self.assertTrue(290 <= cache.ttl('SOFT_CACHE_STATS_KEY') <= 300)
+
+    def test_invalidate_all(self):
+        cache_manager.set('STATS_KEY', {'data': 'value'}, tags=['GLOBAL_STATS'])
+        cache_manager.set('OTHER_KEY', {'data': 'value'})
+
+        cache_manager.invalidate(hard=True)
+
+        self.assertIsNone(cache_manager.get('STATS_KEY'))
+        self.assertIsNone(cache_manager.get('OTHER_KEY'))
+
+    def test_invalidate_key(self):
+        cache_manager.set('STATS_KEY', {'data': 'value'})
+        cache_manager.invalidate('STATS_KEY', hard=True)
+        self.assertIsNone(cache_manager.get('STATS_KEY'))
+
+    @mock.patch('proco.utils.cache.update_cached_value.delay')
+    def test_single_flight_refresh(self, update_cached_value):
+        cache_manager.set('STATS_KEY', {'data': 'value'}, request_path='/stats', tags=['GLOBAL_STATS'])
+        cache_manager.invalidate_tags(['GLOBAL_STATS'])
+
+        for _ in range(5):
+            self.assertEqual(cache_manager.get('STATS_KEY'), {'data': 'value'})
+
+        update_cached_value.assert_called_once_with(url='/stats')
+        self.assertDictEqual(cache_manager.get_refresh_stats(), {
+            cache_manager.REFRESH_QUEUED: 1,
+            cache_manager.REFRESH_DEDUPLICATED: 4,
+        })
+
+        # Writing the refreshed value releases the lock for the next invalidation
+        cache_manager.set('STATS_KEY', {'data': 'new value'}, request_path='/stats', tags=['GLOBAL_STATS'])
+        cache_manager.invalidate_tags(['GLOBAL_STATS'])
+        cache_manager.get('STATS_KEY')
+
+        self.assertEqual(update_cached_value.call_count, 2)
@@ -6,6 +6,7 @@ from django.urls import reverse
 from proco.background.models import BackgroundTask
 from proco.locations.tests.factories import CountryFactory
 from proco.schools.tests import factories as schools_test_models
+from proco.utils import cached_computations
 from proco.utils import tasks as utils_tasks
 from proco.utils.tests import TestAPIViewSetMixin
 
@@ -29,6 +30,42 @@ class UtilsTasksTestCase(TestAPIViewSetMixin, TestCase):
     def test_update_cached_value(self):
         self.assertIsNone(utils_tasks.update_cached_value(url=reverse('locations:countries-list')))
 
+    def test_update_cached_value_with_query_params(self):
+        self.assertIsNone(utils_tasks.update_cached_value(
+            url=reverse('locations:countries-detail', kwargs={'pk': self.country.code.lower()}),
+            query_params={'cache': 'on'},
+        ))
+        self.assertIsNotNone(cache.get('SOFT_CACHE_COUNTRY_INFO_pk_{0}'.format(self.country.code.lower())))
+
+    def test_warm_cached_computations(self):
+        self.assertIsNone(utils_tasks.warm_cached_computations(jobs=[
+            ('countries_list', {}),
+            ('country_detail', {'pk': self.country.code.lower()}),
+        ]))
+        self.assertIsNotNone(cache.get('SOFT_CACHE_COUNTRY_INFO_pk_{0}'.format(self.country.code.lower())))
+
+    def test_run_cached_computations_with_unknown_params(self):
+        self.assertEqual(cached_computations.run_cached_computations([('countries_list', {'country_id': 1})]), 1)
+
+    def test_run_cached_computations_with_invalid_params(self):
+        self.assertEqual(cached_computations.run_cached_computations([
+            ('global_stats', {'country_id': 'abc'}),
+            ('global_connectivity_stats', {'is_weekly': 'yes'}),
+            ('country_connectivity_stats', {'country_id': self.country.id, 'start_date': '2024-01-01'}),
+            ('country_detail', {}),
+        ]), 4)
+
+    def test_run_connectivity_stats_cached_computations(self):
+        self.assertEqual(cached_computations.run_cached_computations([
+            ('global_connectivity_stats', {
+                'is_weekly': True, 'start_date': '01-01-2024', 'end_date': '07-01-2024', 'benchmark': 'global',
+            }),
+            ('country_connectivity_stats', {
+                'country_id': self.country.id, 'is_weekly': 'false', 'start_date': '01-01-2024',
+                'end_date': '31-01-2024', 'benchmark': 'global',
+            }),
+        ]), 0)
+
     def test_update_all_cached_values(self):
         self.assertIsNone(utils_tasks.update_all_cached_values(clean_cache=True))
 
@@ -0,0 +1,221 @@
+import gzip
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from proco.accounts.models import DataLayer
+from proco.locations.tests.factories import CountryFactory
+from proco.schools.tests import factories as schools_test_models
+from proco.utils import tasks as utils_tasks
+from proco.utils import tiles as tiles_utilities
+from proco.utils.dates import format_date
+from proco.utils.cache import cache_manager
+
+
+class TileStoreTestCase(TestCase):
+    databases = ['default', ]
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super().tearDown()
+
+    def test_get_filter_hash(self):
+        self.assertEqual(
+            tiles_utilities.get_filter_hash({'country_id': ['1'], 'benchmark': ['global']}),
+            tiles_utilities.get_filter_hash({'benchmark': ['global'], 'country_id': ['1']}),
+        )
+        self.assertNotEqual(
+            tiles_utilities.get_filter_hash({'country_id': ['1']}),
+            tiles_utilities.get_filter_hash({'country_id': ['2']}),
+        )
+
+    def test_mercator_extent_to_tile_range(self):
+        world = (-tiles_utilities.WORLD_MERCATOR_MAX, -tiles_utilities.WORLD_MERCATOR_MAX,
+                 tiles_utilities.WORLD_MERCATOR_MAX, tiles_utilities.WORLD_MERCATOR_MAX)
+        self.assertEqual(tiles_utilities.mercator_extent_to_tile_range(world, 0), (0, 0, 0, 0))
+        self.assertEqual(tiles_utilities.mercator_extent_to_tile_range(world, 2), (0, 0, 3, 3))
+
+        # Single point in the south-east quarter of the world
+        self.assertEqual(tiles_utilities.mercator_extent_to_tile_range((1000, -1000, 1000, -1000), 1), (1, 1, 1, 1))
+
+    def test_redis_tile_store(self):
+        tile_store = tiles_utilities.RedisTileStore(timeout=60)
+        self.assertIsNone(tile_store.get(1, 2, 1, 1, 'abc'))
+
+        tile_store.set(1, 2, 1, 1, 'abc', b'tile')
+        self.assertEqual(gzip.decompress(tile_store.get(1, 2, 1, 1, 'abc')), b'tile')
+        self.assertIsNone(tile_store.get(1, 2, 1, 1, 'xyz'))
+
+    def test_file_system_tile_store(self):
+        tile_store = tiles_utilities.FileSystemTileStore(self.directory, timeout=60)
+        self.assertIsNone(tile_store.get(1, 2, 1, 1, 'abc'))
+
+        tile_store.set(1, 2, 1, 1, 'abc', b'tile')
+        self.assertEqual(gzip.decompress(tile_store.get(1, 2, 1, 1, 'abc')), b'tile')
+
+        tile_store.set(1, 2, 1, 1, 'abc', b'new tile')
+        self.assertEqual(gzip.decompress(tile_store.get(1, 2, 1, 1, 'abc')), b'new tile')
+
+    def test_file_system_tile_store_cleanup(self):
+        tile_store = tiles_utilities.FileSystemTileStore(self.directory, timeout=60)
+        tile_store.set(1, 2, 1, 1, 'old', b'tile')
+        tile_store.set(1, 2, 1, 1, 'new', b'tile')
+        tile_store.set(2, 2, 1, 1, 'old', b'tile')
+
+        # Age the tiles of the previous generation past the timeout
+        old_time = time.time() - 120
+        for layer in ('1', '2'):
+            for root, directories, file_names in os.walk(os.path.join(self.directory, layer, 'old')):
+                for name in directories + file_names:
+                    os.utime(os.path.join(root, name), (old_time, old_time))
+            os.utime(os.path.join(self.directory, layer, 'old'), (old_time, old_time))
+
+        self.assertEqual(tile_store.cleanup(), 2)
+        self.assertIsNone(tile_store.get(1, 2, 1, 1, 'old'))
+        self.assertEqual(gzip.decompress(tile_store.get(1, 2, 1, 1, 'new')), b'tile')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, '2')))
+
+        self.assertEqual(tiles_utilities.RedisTileStore(timeout=60).cleanup(), 0)
+
+    def test_compressed_tile_response(self):
+        compressed_tile = gzip.compress(b'tile')
+
+        response = tiles_utilities.compressed_tile_response(
+            RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, deflate'), compressed_tile)
+        self.assertEqual(response.content, compressed_tile)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        response = tiles_utilities.compressed_tile_response(RequestFactory().get('/'), compressed_tile)
+        self.assertEqual(response.content, b'tile')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    @override_settings(TILE_STORE_BACKEND='')
+    def test_tile_store_disabled(self):
+        self.assertIsNone(tiles_utilities.get_tile_store())
+
+
+class SoftCacheManagerBytesTestCase(TestCase):
+    databases = ['default', ]
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_set_and_get_bytes(self):
+        self.assertIsNone(cache_manager.get_bytes('TILE_KEY'))
+
+        cache_manager.set_bytes('TILE_KEY', b'tile', content_type=tiles_utilities.TILE_CONTENT_TYPE)
+        compressed_tile, metadata = cache_manager.get_bytes('TILE_KEY')
+
+        self.assertEqual(gzip.decompress(compressed_tile), b'tile')
+        self.assertEqual(metadata['content_type'], tiles_utilities.TILE_CONTENT_TYPE)
+        self.assertFalse(metadata['invalidated'])
+
+    def test_invalidate_bytes(self):
+        cache_manager.set_bytes('TILE_KEY', b'tile', content_type=tiles_utilities.TILE_CONTENT_TYPE)
+        cache_manager.invalidate('TILE_KEY')
+
+        compressed_tile, metadata = cache_manager.get_bytes('TILE_KEY')
+        self.assertEqual(gzip.decompress(compressed_tile), b'tile')
+        self.assertTrue(metadata['invalidated'])
+
+    def test_get_bytes_ignores_pickled_values(self):
+        cache_manager.set('TILE_KEY', {'data': 'value'})
+        self.assertIsNone(cache_manager.get_bytes('TILE_KEY'))
+
+
+class WarmDataLayerMapTilesTestCase(TestCase):
+    databases = {'default', settings.READ_ONLY_DB_KEY, }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory()
+        cls.school = schools_test_models.SchoolFactory(country=cls.country)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super().tearDown()
+
+    @override_settings(TILE_STORE_MAX_ZOOM=1)
+    def test_warm_data_layer_map_tiles(self):
+        self.assertIsNone(utils_tasks.warm_data_layer_map_tiles())
+
+    def test_warm_data_layer_map_tiles_for_static_layer(self):
+        call_command('load_system_data_layers', '--update_data_sources', '--update_data_layers')
+        data_layer = DataLayer.objects.filter(
+            type=DataLayer.LAYER_TYPE_STATIC,
+            status=DataLayer.LAYER_STATUS_PUBLISHED,
+        ).first()
+        self.assertIsNotNone(data_layer)
+
+        with override_settings(TILE_STORE_BACKEND='disk', TILE_STORE_DIRECTORY=self.directory, TILE_STORE_MAX_ZOOM=1):
+            self.assertIsNone(utils_tasks.warm_data_layer_map_tiles(layer_id=data_layer.id))
+
+            tile_paths = [
+                os.path.join(root, file_name)
+                for root, _, file_names in os.walk(os.path.join(self.directory, str(data_layer.id)))
+                for file_name in file_names
+                if file_name.endswith(tiles_utilities.FileSystemTileStore.FILE_EXTENSION)
+            ]
+            # One tile per zoom level covers the single school
+            self.assertEqual(len(tile_paths), 2)
+
+            # Replace the stored tiles so the response can only come from the tile store
+            for tile_path in tile_paths:
+                with open(tile_path, 'wb') as tile_file:
+                    tile_file.write(gzip.compress(b'stored tile'))
+
+            url = reverse('accounts:map-data-layer', args=(data_layer.id,))
+            response = self.client.get(url, {'z': '0', 'x': '0', 'y': '0.pbf'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, b'stored tile')
+
+            response = self.client.get(url, {'z': '0', 'x': '0', 'y': '0.pbf'}, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(gzip.decompress(response.content), b'stored tile')
+
+            # The map client sends the parameters of the default view explicitly
+            last_week_date = timezone.now().date() - timedelta(days=7)
+            start_date = last_week_date - timedelta(days=last_week_date.weekday())
+            client_params = {
+                'start_date': format_date(start_date),
+                'end_date': format_date(start_date + timedelta(days=6)),
+                'is_weekly': 'true',
+                'benchmark': 'global',
+                'z': '0',
+                'x': '0',
+                'y': '0.pbf',
+            }
+            response = self.client.get(url, client_params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, b'stored tile')
+
+            # Another view of the layer has its own tiles
+            response = self.client.get(url, dict(client_params, benchmark='national'))
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.content, b'stored tile')
+
+    @override_settings(TILE_STORE_BACKEND='')
+    def test_warm_data_layer_map_tiles_with_disabled_store(self):
+        self.assertIsNone(utils_tasks.warm_data_layer_map_tiles())
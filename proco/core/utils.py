@@ -256,59 +256,6 @@ def column_normalize(data_df, valid_columns=None):
         data_df.drop(_to_delete, axis=1, inplace=True)
 
 
-def bulk_create_or_update(records, model, unique_fields, batch_size=1000):
-    # Let's define two lists:
-    # - one to hold the values that we want to insert,
-    # - and one to hold the new values alongside existing primary keys to update
-    records_to_create = []
-    records_to_update = []
-
-    # This is where we check if the records are pre-existing,
-    # and add primary keys to the objects if they do
-    records = [
-        {
-            'id': model.objects.filter(**{f: record[f] for f in unique_fields}).first().id
-            if model.objects.filter(**{f: record[f] for f in unique_fields}).first() is not None else None,
-            **record,
-        }
-        for record in records
-    ]
-
-    # This is where we delegate our records to our split lists:
-    # - if the record already exists in the DB (the 'id' primary key), add it to the update list.
-    # - Otherwise, add it to the creation list.
-    [
-        records_to_update.append(record)
-        if record['id'] is not None
-        else records_to_create.append(record)
-        for record in records
-    ]
-
-    if len(records_to_create) > 0:
-        logger.debug('Total records to create: {}'.format(len(records_to_create)))
-        # Remove the 'id' field, as these will all hold a value of None,
-        # since these records do not already exist in the DB
-        [record.pop('id') for record in records_to_create]
-
-        model.objects.bulk_create(
-            [model(**values) for values in records_to_create], batch_size=batch_size
-        )
-
-    if len(records_to_update) > 0:
-        logger.debug('Total records to update: {}'.format(len(records_to_update)))
-        for f in unique_fields:
-            [record.pop(f) for record in records_to_update]
-
-        model.objects.bulk_update(
-            [
-                model(**values)
-                for values in records_to_update
-            ],
-            set(records_to_update[0].keys()) - {'id', },
-            batch_size=batch_size,
-        )
-
-
 def get_giga_filter_fields(request):
     from proco.accounts.models import AdvanceFilter
     from proco.utils.cache import cache_manager
@@ -71,7 +71,7 @@ class QoSLoaderViewSet(APIView):
             'country_id')
 
         for country_id in countries_ids:
-            sources_tasks.finalize_previous_day_data(None, country_id, date)
+            sources_tasks.finalize_previous_day_data(None, country_id, date, incremental=False)
 
         return Response(data={'success': True})
 
@@ -93,7 +93,7 @@ class DailyCheckAppLoaderViewSet(APIView):
 
         today_date = core_utilities.get_current_datetime_object().date()
         for country_id in countries_ids:
-            sources_tasks.finalize_previous_day_data(None, country_id, today_date)
+            sources_tasks.finalize_previous_day_data(None, country_id, today_date, incremental=False)
         return Response(data={'success': True})
 
 
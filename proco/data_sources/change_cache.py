@@ -0,0 +1,149 @@
+import logging
+import os
+import tempfile
+
+import delta_sharing
+import pandas as pd
+from django.conf import settings
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+
+class DeltaSharingChangeCache(object):
+    """
+    DeltaSharingChangeCache
+        Local Parquet copy of the changes of one Delta Sharing table version, keyed by
+        (share, schema, table, version). The changes of a version never change, so a resumed or recovery run
+        replays them from the disk instead of downloading them again.
+        Files are evicted in least recently used order when the cache grows over max_size bytes.
+    """
+    FILE_EXTENSION = '.parquet'
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def get_path(self, share_name, schema_name, table_name, version):
+        return os.path.join(self.directory, share_name, schema_name, table_name, str(version) + self.FILE_EXTENSION)
+
+    def get(self, share_name, schema_name, table_name, version):
+        path = self.get_path(share_name, schema_name, table_name, version)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            df = pd.read_parquet(path)
+            # Keep the recently used files at the end of the eviction order
+            os.utime(path)
+            return df
+        except Exception as ex:
+            logger.error('Failed to read the cached changes "{0}", removing it: {1}'.format(path, ex))
+            self.remove(path)
+            return None
+
+    def set(self, share_name, schema_name, table_name, version, df):
+        path = self.get_path(share_name, schema_name, table_name, version)
+        table_directory = os.path.dirname(path)
+        os.makedirs(table_directory, exist_ok=True)
+
+        # Write to a temporary file first so readers never see a partially written file
+        file_descriptor, temp_path = tempfile.mkstemp(dir=table_directory, suffix='.tmp')
+        os.close(file_descriptor)
+        try:
+            df.to_parquet(temp_path, index=False)
+            os.replace(temp_path, path)
+        except Exception as ex:
+            logger.error('Failed to cache the changes "{0}": {1}'.format(path, ex))
+            self.remove(temp_path)
+            return
+
+        self.evict()
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        cached_files = []
+        for directory, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                if not file_name.endswith(self.FILE_EXTENSION):
+                    continue
+
+                path = os.path.join(directory, file_name)
+                try:
+                    file_stat = os.stat(path)
+                except OSError:
+                    # Evicted meanwhile by another worker
+                    continue
+                cached_files.append((file_stat.st_mtime, file_stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in cached_files)
+        for _, size, path in sorted(cached_files):
+            if total_size <= self.max_size:
+                break
+
+            logger.debug('Evicting the cached changes "{0}".'.format(path))
+            self.remove(path)
+            total_size -= size
+
+
+def get_change_cache():
+    """
+    get_change_cache
+        Change cache configured with settings.DATA_SOURCE_CHANGE_CACHE_*, None if it is disabled.
+    """
+    if settings.DATA_SOURCE_CHANGE_CACHE_MAX_SIZE > 0:
+        return DeltaSharingChangeCache(settings.DATA_SOURCE_CHANGE_CACHE_DIRECTORY,
+                                       settings.DATA_SOURCE_CHANGE_CACHE_MAX_SIZE)
+    return None
+
+
+def load_table_version_changes(table_url, share_name, schema_name, table_name, version):
+    """
+    load_table_version_changes
+        Changes of one version of a shared table as a pandas DataFrame, from the change cache when available.
+    """
+    change_cache = get_change_cache()
+
+    if change_cache:
+        loaded_data_df = change_cache.get(share_name, schema_name, table_name, version)
+        if loaded_data_df is not None:
+            logger.debug('Loaded the "{0}" version changes of "{1}" from the change cache.'.format(
+                version, table_name))
+            return loaded_data_df
+
+    loaded_data_df = delta_sharing.load_table_changes_as_pandas(
+        table_url,
+        version,
+        version,
+        None,
+        None,
+    )
+
+    if change_cache:
+        change_cache.set(share_name, schema_name, table_name, version, loaded_data_df)
+    return loaded_data_df
+
+
+def load_table_changes(table_url, share_name, schema_name, table_name, starting_version, ending_version):
+    """
+    load_table_changes
+        Changes from starting_version to ending_version (both included) of a shared table, loaded version by
+        version through the change cache. Without starting_version the whole range is loaded in one call.
+    """
+    if starting_version is None:
+        return delta_sharing.load_table_changes_as_pandas(
+            table_url,
+            starting_version,
+            ending_version,
+            None,
+            None,
+        )
+
+    return pd.concat([
+        load_table_version_changes(table_url, share_name, schema_name, table_name, version)
+        for version in range(starting_version, ending_version + 1)
+    ], axis=0, ignore_index=True)
@@ -10,6 +10,7 @@ from django.db.models import Q
 
 from proco.connection_statistics.config import app_config as statistics_configs
 from proco.connection_statistics.models import RealTimeConnectivity
+from proco.connection_statistics.utils import mark_real_time_connectivity_dirty
 from proco.core.utils import get_current_datetime_object
 from proco.data_sources.models import DailyCheckAppMeasurementData
 from proco.data_sources.tasks import finalize_previous_day_data
@@ -235,6 +236,7 @@ class Command(BaseCommand):
                         logger.info(
                             'Loading the data to "RealTimeConnectivity" table as it has reached 5000 benchmark.')
                         RealTimeConnectivity.objects.bulk_create(realtime)
+                        mark_real_time_connectivity_dirty(realtime)
                         realtime = []
 
                 if len(unknown_schools) > 0:
@@ -244,6 +246,7 @@ class Command(BaseCommand):
             logger.info('Loading the remaining ({0}) data to "RealTimeConnectivity" table.'.format(len(realtime)))
             if len(realtime) > 0:
                 RealTimeConnectivity.objects.bulk_create(realtime)
+                mark_real_time_connectivity_dirty(realtime)
 
             logger.info('Aggregated successfully to RealTimeConnectivity table.\n\n')
 
@@ -265,7 +268,7 @@ class Command(BaseCommand):
 
             for country_id in countries_ids:
                 logger.info('Finalizing the records for Country ID: {0}'.format(country_id))
-                finalize_previous_day_data(None, country_id, pull_data_date)
+                finalize_previous_day_data(None, country_id, pull_data_date, incremental=False)
 
             logger.info('Finalized records successfully to actual proco tables.\n\n')
 
@@ -14,7 +14,10 @@ from proco.connection_statistics.utils import (
     aggregate_real_time_data_to_school_daily_status,
     aggregate_school_daily_status_to_school_weekly_status,
     aggregate_school_daily_to_country_daily,
+    mark_real_time_connectivity_dirty,
+    refresh_country_school_map,
     update_country_weekly_status,
+    update_school_status_summary,
 )
 from proco.core.utils import get_current_datetime_object
 from proco.data_sources.models import DailyCheckAppMeasurementData
@@ -290,6 +293,7 @@ class Command(BaseCommand):
                                 logger.info('Loading the data to "RealTimeConnectivity" table as it '
                                             'has reached 5000 benchmark.')
                                 statistics_models.RealTimeConnectivity.objects.bulk_create(realtime)
+                                mark_real_time_connectivity_dirty(realtime)
                                 realtime = []
 
                         if len(unknown_schools) > 0:
@@ -300,6 +304,7 @@ class Command(BaseCommand):
                         'Loading the remaining ({0}) data to "RealTimeConnectivity" table.'.format(len(realtime)))
                     if len(realtime) > 0:
                         statistics_models.RealTimeConnectivity.objects.bulk_create(realtime)
+                        mark_real_time_connectivity_dirty(realtime)
 
             logger.info('Aggregated successfully to RealTimeConnectivity table.\n\n')
 
@@ -335,6 +340,9 @@ class Command(BaseCommand):
             call_command('populate_school_registration_data', *cmd_args)
 
             country = Country.objects.get(id=impacted_country_id)
+            if settings.ENABLE_STATISTICS_SUMMARY:
+                update_school_status_summary(country)
+            refresh_country_school_map(country)
             country.invalidate_country_related_cache()
 
         logger.info('Completed data loss recovery utility for pcdc successfully.\n')
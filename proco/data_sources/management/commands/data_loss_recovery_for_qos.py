@@ -11,7 +11,10 @@ from django.db.models import Avg
 
 from proco.connection_statistics.config import app_config as statistics_configs
 from proco.connection_statistics.models import RealTimeConnectivity
-from proco.core.utils import get_current_datetime_object, bulk_create_or_update
+from proco.connection_statistics.utils import mark_real_time_connectivity_dirty
+from proco.core.db_utils import bulk_upsert
+from proco.core.utils import get_current_datetime_object
+from proco.data_sources import change_cache
 from proco.data_sources import utils as sources_utilities
 from proco.data_sources.models import QoSData
 from proco.data_sources.tasks import finalize_previous_day_data
@@ -96,13 +99,8 @@ def load_qos_data_source_response_to_model(version_number, country):
                                      'Hence skipping current data pull.')
                         exit(0)
 
-                    loaded_data_df = delta_sharing.load_table_changes_as_pandas(
-                        table_url,
-                        version_number,
-                        version_number,
-                        None,
-                        None,
-                    )
+                    loaded_data_df = change_cache.load_table_version_changes(
+                        table_url, share_name, schema_name, table_name, version_number)
                     logger.info('Total count of rows in the {0} version data: {1}'.format(
                         version_number, len(loaded_data_df)))
 
@@ -164,13 +162,13 @@ def load_qos_data_source_response_to_model(version_number, country):
 
                             if len(insert_entries) == 5000:
                                 logger.info('Loading the data to "QoSData" table as it has reached 5000 benchmark.')
-                                bulk_create_or_update(insert_entries, QoSData, ['school', 'timestamp'])
+                                bulk_upsert(insert_entries, QoSData, ['school', 'timestamp'])
                                 insert_entries = []
                                 logger.info('#\n' * 10)
 
                         logger.info('Loading the remaining ({0}) data to "QoSData" table.'.format(len(insert_entries)))
                         if len(insert_entries) > 0:
-                            bulk_create_or_update(insert_entries, QoSData, ['school', 'timestamp'])
+                            bulk_upsert(insert_entries, QoSData, ['school', 'timestamp'])
                     else:
                         logger.info('No data to update in current table: {0}.'.format(table_name))
                 except Exception as ex:
@@ -264,11 +262,13 @@ def sync_qos_realtime_data(date, country):
         if len(realtime) == 5000:
             logger.info('Loading the data to "RealTimeConnectivity" table as it has reached 5000 benchmark.')
             RealTimeConnectivity.objects.bulk_create(realtime)
+            mark_real_time_connectivity_dirty(realtime)
             realtime = []
 
     logger.info('Loading the remaining ({0}) data to "RealTimeConnectivity" table.'.format(len(realtime)))
     if len(realtime) > 0:
         RealTimeConnectivity.objects.bulk_create(realtime)
+        mark_real_time_connectivity_dirty(realtime)
 
 
 def get_latest_api_version(country_code=None):
@@ -475,7 +475,7 @@ class Command(BaseCommand):
                     logger.info('Weekly record details. \tWeek No: {0}\tYear: {1}'.format(monday_week_no, monday_year))
 
                     logger.info('\n\nFinalizing the records for country ID: {0}'.format(country.id))
-                    finalize_previous_day_data(None, country.id, pull_data_date)
+                    finalize_previous_day_data(None, country.id, pull_data_date, incremental=False)
                     logger.info('Finalized records successfully to actual proco tables.\n\n')
             else:
                 logger.error('Please pass required parameters as:'
@@ -1,23 +1,27 @@
 import json
 import logging
 import os
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 
 import delta_sharing
 from django.conf import settings
 from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from django.db.models import Avg
+from django.db import connection
+from django.utils import timezone
 
 from proco.connection_statistics.config import app_config as statistics_configs
-from proco.connection_statistics.models import RealTimeConnectivity
+from proco.connection_statistics.models import DirtySchoolDay, RealTimeConnectivity
 from proco.connection_statistics.utils import (
     aggregate_real_time_data_to_school_daily_status,
     aggregate_school_daily_status_to_school_weekly_status,
     aggregate_school_daily_to_country_daily,
+    refresh_country_school_map,
     update_country_weekly_status,
+    update_school_status_summary,
 )
-from proco.core.utils import get_current_datetime_object, bulk_create_or_update
+from proco.core.db_utils import bulk_upsert
+from proco.core.utils import get_current_datetime_object
 from proco.data_sources import utils as sources_utilities
 from proco.data_sources import tasks as sources_tasks
 from proco.data_sources.models import QoSData
@@ -127,7 +131,7 @@ def load_qos_data_source_response_to_model(country, data_pull_date):
 
                 if len(insert_entries) == 5000:
                     logger.info('Loading the data to "QoSData" table as it has reached 5000 benchmark.')
-                    bulk_create_or_update(insert_entries, QoSData, ['school', 'timestamp'])
+                    bulk_upsert(insert_entries, QoSData, ['school', 'timestamp'])
                     if len(unregistered_school_giga_ids) > 0:
                         logger.error('School with giga IDs not found in DB. Hence skipping the '
                                      'load for these schools at batch: {0}'.format(', '.join(unregistered_school_giga_ids)))
@@ -138,7 +142,7 @@ def load_qos_data_source_response_to_model(country, data_pull_date):
 
             logger.info('Loading the remaining ({0}) data to "QoSData" table.'.format(len(insert_entries)))
             if len(insert_entries) > 0:
-                bulk_create_or_update(insert_entries, QoSData, ['school', 'timestamp'])
+                bulk_upsert(insert_entries, QoSData, ['school', 'timestamp'])
 
                 if len(unregistered_school_giga_ids) > 0:
                     logger.error('School with giga IDs not found in DB. Hence skipping the '
@@ -150,93 +154,55 @@ def load_qos_data_source_response_to_model(country, data_pull_date):
 
 
 def sync_qos_realtime_data(country, aggr_date):
-    qos_measurements = QoSData.objects.filter(
-        timestamp__date=aggr_date,
-        country=country,
-    ).values(
-        'school'
-    ).annotate(
-        download_avg=Avg('speed_download'),
-        latency_avg=Avg('latency'),
-        upload_avg=Avg('speed_upload'),
-        roundtrip_time_avg=Avg('roundtrip_time'),
-        jitter_download_avg=Avg('jitter_download'),
-        jitter_upload_avg=Avg('jitter_upload'),
-        rtt_packet_loss_pct_avg=Avg('rtt_packet_loss_pct'),
-        speed_download_probe_avg=Avg('speed_download_probe'),
-        speed_upload_probe_avg=Avg('speed_upload_probe'),
-        latency_probe_avg=Avg('latency_probe'),
-        speed_download_mean_avg=Avg('speed_download_mean'),
-        speed_upload_mean_avg=Avg('speed_upload_mean'),
-    ).order_by('school')
-
-    if not qos_measurements.exists():
+    start_datetime = timezone.make_aware(datetime.combine(aggr_date, time.min))
+
+    query = """
+    WITH inserted AS (
+        INSERT INTO "{realtime_table}" (
+            "created", "modified", "school_id", "live_data_source", {columns}, "deleted"
+        )
+        SELECT %(start_datetime)s, %(current_datetime)s, q."school_id", %(live_data_source)s, {avg_values}, NULL
+        FROM "{qos_table}" q
+        WHERE q."country_id" = %(country_id)s
+            AND q."timestamp" >= %(start_datetime)s
+            AND q."timestamp" < %(end_datetime)s
+            AND q."school_id" IS NOT NULL
+        GROUP BY q."school_id"
+        RETURNING "school_id"
+    ),
+    dirty AS (
+        INSERT INTO "{dirty_table}" ("school_id", "date", "live_data_source", "created")
+        SELECT DISTINCT i."school_id", %(aggr_date)s, %(live_data_source)s, %(current_datetime)s
+        FROM inserted i
+        ON CONFLICT ("school_id", "date", "live_data_source") DO NOTHING
+    )
+    SELECT COUNT(*) FROM inserted
+    """.format(
+        realtime_table=RealTimeConnectivity._meta.db_table,
+        dirty_table=DirtySchoolDay._meta.db_table,
+        qos_table=QoSData._meta.db_table,
+        columns=', '.join(['"{0}"'.format(column) for column in sources_utilities.QOS_REALTIME_CONNECTIVITY_COLUMNS]),
+        avg_values=sources_utilities.get_qos_realtime_connectivity_values(aggregate='AVG'),
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, {
+            'current_datetime': get_current_datetime_object(),
+            'live_data_source': statistics_configs.QOS_SOURCE,
+            'country_id': country.id,
+            'start_datetime': start_datetime,
+            'end_datetime': start_datetime + timedelta(days=1),
+            'aggr_date': aggr_date,
+        })
+        row_count = cursor.fetchone()[0]
+
+    if row_count == 0:
         logger.info('No records to aggregate on provided date: "{0}". Hence skipping for the given date.'.format(
             date_utilities.format_date(aggr_date)))
         return
 
-    logger.info('Migrating the records from "QoSData" to "RealTimeConnectivity" with date: {0} '.format(
-        date_utilities.format_date(aggr_date)))
-
-    realtime = []
-
-    for qos_measurement in qos_measurements:
-        connectivity_speed = qos_measurement.get('download_avg')
-        if connectivity_speed:
-            # convert Mbps to bps
-            connectivity_speed = connectivity_speed * 1000 * 1000
-
-        connectivity_upload_speed = qos_measurement.get('upload_avg')
-        if connectivity_upload_speed:
-            # convert Mbps to bps
-            connectivity_upload_speed = connectivity_upload_speed * 1000 * 1000
-
-        connectivity_speed_probe = qos_measurement.get('speed_download_probe_avg')
-        if connectivity_speed_probe:
-            # convert Mbps to bps
-            connectivity_speed_probe = connectivity_speed_probe * 1000 * 1000
-
-        connectivity_upload_speed_probe = qos_measurement.get('speed_upload_probe_avg')
-        if connectivity_upload_speed_probe:
-            # convert Mbps to bps
-            connectivity_upload_speed_probe = connectivity_upload_speed_probe * 1000 * 1000
-
-        connectivity_speed_mean = qos_measurement.get('speed_download_mean_avg')
-        if connectivity_speed_mean:
-            # convert Mbps to bps
-            connectivity_speed_mean = connectivity_speed_mean * 1000 * 1000
-
-        connectivity_upload_speed_mean = qos_measurement.get('speed_upload_mean_avg')
-        if connectivity_upload_speed_mean:
-            # convert Mbps to bps
-            connectivity_upload_speed_mean = connectivity_upload_speed_mean * 1000 * 1000
-
-        realtime.append(RealTimeConnectivity(
-            created=aggr_date,
-            connectivity_speed=connectivity_speed,
-            connectivity_upload_speed=connectivity_upload_speed,
-            connectivity_latency=qos_measurement.get('latency_avg'),
-            roundtrip_time=qos_measurement.get('roundtrip_time_avg'),
-            jitter_download=qos_measurement.get('jitter_download_avg'),
-            jitter_upload=qos_measurement.get('jitter_upload_avg'),
-            rtt_packet_loss_pct=qos_measurement.get('rtt_packet_loss_pct_avg'),
-            connectivity_speed_probe=connectivity_speed_probe,
-            connectivity_upload_speed_probe=connectivity_upload_speed_probe,
-            connectivity_latency_probe=qos_measurement.get('latency_probe_avg'),
-            connectivity_speed_mean=connectivity_speed_mean,
-            connectivity_upload_speed_mean=connectivity_upload_speed_mean,
-            school_id=qos_measurement.get('school'),
-            live_data_source=statistics_configs.QOS_SOURCE,
-        ))
-
-        if len(realtime) == 5000:
-            logger.info('Loading the data to "RealTimeConnectivity" table as it has reached 5000 benchmark.')
-            RealTimeConnectivity.objects.bulk_create(realtime)
-            realtime = []
-
-    logger.info('Loading the remaining ({0}) data to "RealTimeConnectivity" table.'.format(len(realtime)))
-    if len(realtime) > 0:
-        RealTimeConnectivity.objects.bulk_create(realtime)
+    logger.info('Migrated ({0}) records from "QoSData" to "RealTimeConnectivity" with date: {1} '.format(
+        row_count, date_utilities.format_date(aggr_date)))
 
 
 def check_missing_dates_from_table(country, dates):
@@ -439,6 +405,9 @@ class Command(BaseCommand):
                 cmd_args = ['--reset', f'-country_id={country.id}']
                 call_command('populate_school_registration_data', *cmd_args)
 
+                if settings.ENABLE_STATISTICS_SUMMARY:
+                    update_school_status_summary(country)
+                refresh_country_school_map(country)
                 country.invalidate_country_related_cache()
 
         try:
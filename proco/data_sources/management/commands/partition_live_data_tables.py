@@ -0,0 +1,49 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from proco.core import partitions as partition_utilities
+from proco.data_sources.utils import LIVE_DATA_TABLES
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+
+class Command(BaseCommand):
+    """
+    Convert the raw live measurement tables (RealTimeConnectivity, DailyCheckAppMeasurementData and QoSData) to
+    PostgreSQL range partitioned tables. Once converted, clean_old_live_data creates the partitions ahead of time
+    and drops the old partitions instead of deleting the old rows.
+    The existing rows are kept in place as the first partition. Run it in a maintenance window as each table is
+    locked while it is swapped.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-table', dest='table', required=False, type=str,
+            choices=[model.__name__ for model, _ in LIVE_DATA_TABLES],
+            help='Pass the model name to convert only one table. Default: all the live data tables.'
+        )
+
+        parser.add_argument(
+            '-interval', dest='interval', default=settings.LIVE_DATA_PARTITION_INTERVAL, type=str,
+            choices=list(partition_utilities.PARTITION_INTERVALS),
+            help='Pass the partition interval. Default: settings.LIVE_DATA_PARTITION_INTERVAL.'
+        )
+
+    def handle(self, **options):
+        logger.info('Executing partition live data tables utility.\n')
+        logger.info('Options: {}\n\n'.format(options))
+
+        for model, column in LIVE_DATA_TABLES:
+            if options.get('table') and model.__name__ != options['table']:
+                continue
+
+            if partition_utilities.convert_to_partitioned_table(
+                model, column, options['interval'], settings.LIVE_DATA_PARTITIONS_AHEAD_DAYS,
+            ):
+                logger.info('Partitioned "{0}" by "{1}".'.format(model.__name__, column))
+            else:
+                logger.info('"{0}" is already partitioned, skipping it.'.format(model.__name__))
+
+        logger.info('Completed partition live data tables successfully.\n')
@@ -6,34 +6,37 @@ from datetime import timedelta
 
 from celery import chain, chord, group, current_task
 from django.conf import settings
-from django.contrib.gis.geos import Point
 from django.core.management import call_command
 from django.db.models import Count
-from django.db.utils import DataError
-from requests.exceptions import HTTPError
 
+from proco.accounts import models as accounts_models
 from proco.accounts import utils as account_utilities
 from proco.background import utils as background_task_utilities
 from proco.connection_statistics import models as statistics_models
 from proco.connection_statistics.utils import (
+    aggregate_dirty_school_days,
     aggregate_real_time_data_to_school_daily_status,
     aggregate_school_daily_status_to_school_weekly_status,
     aggregate_school_daily_to_country_daily,
+    refresh_country_school_map,
+    refresh_school_map_clusters,
+    refresh_school_map_state,
     update_country_weekly_status,
+    update_realtime_weekly_summary,
+    update_school_status_summary,
 )
+from proco.core import partitions as partition_utilities
 from proco.core import utils as core_utilities
-from proco.core.config import app_config as core_configs
 from proco.custom_auth import models as auth_models
 from proco.custom_auth.utils import get_user_emails_for_permissions
 from proco.data_sources import models as sources_models
 from proco.data_sources import utils as source_utilities
 from proco.data_sources.config import app_config as sources_config
 from proco.data_sources.models import QoSData
-from proco.locations.models import Country, CountryAdminMetadata
-from proco.schools.models import School
+from proco.locations.models import Country
 from proco.taskapp import app
 from proco.utils.dates import format_date
-from proco.utils.tasks import populate_school_new_fields_task
+from proco.utils.tasks import populate_school_new_fields_task, warm_data_layer_map_tiles
 
 logger = logging.getLogger('gigamaps.' + __name__)
 
@@ -43,7 +46,7 @@ def finalize_task():
     return 'Done'
 
 
-def load_data_from_school_master_apis(country_iso3_format=None):
+def load_data_from_school_master_apis(country_iso3_format=None, task_instance=None):
     """
     Background task which handles School Master Data source changes from APIs to PROCO DB
 
@@ -89,10 +92,8 @@ def load_data_from_school_master_apis(country_iso3_format=None):
 
             school_master_fields = [f.name for f in sources_models.SchoolMasterData._meta.get_fields()]
 
+            table_names = []
             for schema_table in schema_tables:
-                logger.debug('#' * 10)
-                logger.debug('Table: %s', schema_table)
-
                 if country_iso3_format and country_iso3_format != schema_table.name:
                     continue
 
@@ -101,16 +102,17 @@ def load_data_from_school_master_apis(country_iso3_format=None):
                                    'Hence skipping the load for this country code.'.format(schema_table.name))
                     continue
 
-                try:
-                    source_utilities.sync_school_master_data(
-                        profile_file, share_name, schema_name, schema_table.name, changes_for_countries,
-                        deleted_schools, school_master_fields)
-                except (HTTPError, DataError, ValueError) as ex:
-                    logger.error('Exception caught for "{0}": {1}'.format(schema_table.name, str(ex)))
-                    errors.append('{0} : {1} - {2}'.format(schema_table.name, type(ex).__name__, str(ex)))
-                except Exception as ex:
-                    logger.error('Exception caught for "{0}": {1}'.format(schema_table.name, str(ex)))
-                    errors.append('{0} : {1} - {2}'.format(schema_table.name, type(ex).__name__, str(ex)))
+                table_names.append(schema_table.name)
+
+            table_errors = source_utilities.sync_shared_tables(
+                table_names,
+                lambda table_name: source_utilities.sync_school_master_data(
+                    profile_file, share_name, schema_name, table_name, changes_for_countries, deleted_schools,
+                    school_master_fields),
+                task_instance=task_instance,
+            )
+            errors.extend(['{0} : {1} - {2}'.format(table_name, type(ex).__name__, str(ex))
+                           for table_name, ex in table_errors.items()])
 
         else:
             logger.error('School Master schema ({0}) does not exist to use for share ({1}).'.format(schema_name,
@@ -185,14 +187,6 @@ def handle_published_school_master_data_row(published_row=None, country_ids=None
     """
     logger.info('Handling the published school master data rows.')
 
-    environment_map = {
-        'urban': 'urban',
-        'urbana': 'urban',
-        'rural': 'rural',
-    }
-
-    coverage_type_choices = dict(statistics_models.SchoolWeeklyStatus.COVERAGE_TYPES).keys()
-
     if country_ids and len(country_ids) > 0:
         task_key = 'handle_published_school_master_data_row_status_{current_time}_country_ids_{ids}'.format(
             current_time=format_date(core_utilities.get_current_datetime_object(), frmt='%d%m%Y_%H'),
@@ -230,212 +224,24 @@ def handle_published_school_master_data_row(published_row=None, country_ids=None
             new_published_records = new_published_records.filter(country_id__in=country_ids)
 
         task_instance.info('Total published records to update: {}'.format(new_published_records.count()))
+        published_country_ids = list(new_published_records.order_by('country_id').values_list(
+            'country_id', flat=True).distinct())
+
+        admin_maps = {}
+        for data_chunk in core_utilities.queryset_iterator(new_published_records, chunk_size=1000, print_msg=False):
+            try:
+                school_ids, new_school_ids = source_utilities.publish_school_master_data_rows(data_chunk, admin_maps)
+                updated_school_ids.extend(school_ids)
+                created_school_ids.extend(new_school_ids)
+                continue
+            except Exception as ex:
+                logger.error('Error reported on publishing the chunk, publishing its rows one by one: {0}'.format(ex))
 
-        for data_chunk in core_utilities.queryset_iterator(new_published_records, chunk_size=100, print_msg=False):
             for row in data_chunk:
                 try:
-                    environment = row.school_area_type.lower() if not core_utilities.is_blank_string(
-                        row.school_area_type) else ''
-                    environment = environment_map.get(environment, '')
-
-                    admin1_instance = None
-                    if not core_utilities.is_blank_string(row.admin1_id_giga):
-                        admin1_instance = CountryAdminMetadata.objects.filter(
-                            country=row.country,
-                            giga_id_admin=row.admin1_id_giga,
-                            layer_name=CountryAdminMetadata.LAYER_NAME_ADMIN1,
-                        ).first()
-
-                    admin2_instance = None
-                    if not core_utilities.is_blank_string(row.admin2_id_giga):
-                        admin2_instance = CountryAdminMetadata.objects.filter(
-                            country=row.country,
-                            giga_id_admin=row.admin2_id_giga,
-                            layer_name=CountryAdminMetadata.LAYER_NAME_ADMIN2,
-                        ).first()
-
-                    school, created = School.objects.update_or_create(
-                        giga_id_school=row.school_id_giga,
-                        country=row.country,
-                        defaults={
-                            'external_id': row.school_id_govt,
-                            'name': row.school_name,
-                            'geopoint': Point(x=row.longitude, y=row.latitude),
-                            'education_level': '' if core_utilities.is_blank_string(
-                                row.education_level) else row.education_level,
-                            'education_level_govt': row.education_level_govt,
-                            'environment': environment,
-                            'school_type': '' if core_utilities.is_blank_string(
-                                row.school_funding_type) else row.school_funding_type,
-                            'establishment_year': row.school_establishment_year,
-                            'admin1': admin1_instance,
-                            'admin2': admin2_instance,
-                        },
-                    )
-
-                    date = core_utilities.get_current_datetime_object().date()
-                    school_weekly = statistics_models.SchoolWeeklyStatus.objects.filter(
-                        school=school, week=date.isocalendar()[1], year=date.isocalendar()[0],
-                    ).last()
-
-                    if not school_weekly:
-                        school_weekly = statistics_models.SchoolWeeklyStatus.objects.filter(school=school).last()
-
-                        if school_weekly:
-                            # copy latest available one
-                            school_weekly.id = None
-                            school_weekly.year = date.isocalendar()[0]
-                            school_weekly.week = date.isocalendar()[1]
-                            school_weekly.modified = core_utilities.get_current_datetime_object()
-                            school_weekly.created = core_utilities.get_current_datetime_object()
-
-                            school_weekly.connectivity_speed = None
-                            school_weekly.connectivity_upload_speed = None
-                            school_weekly.connectivity_latency = None
-                            school_weekly.roundtrip_time = None
-                            school_weekly.jitter_download = None
-                            school_weekly.jitter_upload = None
-                            school_weekly.rtt_packet_loss_pct = None
-                            school_weekly.connectivity_speed_probe = None
-                            school_weekly.connectivity_upload_speed_probe = None
-                            school_weekly.connectivity_latency_probe = None
-                            school_weekly.connectivity_speed_mean = None
-                            school_weekly.connectivity_upload_speed_mean = None
-                        else:
-                            school_weekly = statistics_models.SchoolWeeklyStatus.objects.create(
-                                school=school,
-                                year=date.isocalendar()[0],
-                                week=date.isocalendar()[1],
-                            )
-
-                    school_weekly.num_students = row.num_students
-                    school_weekly.num_teachers = row.num_teachers
-                    school_weekly.num_classroom = row.num_classrooms
-                    school_weekly.num_latrines = row.num_latrines
-                    school_weekly.running_water = False \
-                        if core_utilities.is_blank_string(row.water_availability) \
-                        else str(row.water_availability).lower() in core_configs.true_choices
-                    school_weekly.electricity_availability = False \
-                        if core_utilities.is_blank_string(row.electricity_availability) \
-                        else str(row.electricity_availability).lower() in core_configs.true_choices
-                    school_weekly.computer_lab = False \
-                        if core_utilities.is_blank_string(row.computer_lab) \
-                        else str(row.computer_lab).lower() in core_configs.true_choices
-                    school_weekly.num_computers = row.num_computers
-
-                    if core_utilities.is_blank_string(row.connectivity_govt):
-                        school_weekly.connectivity = None
-                    else:
-                        school_weekly.connectivity = str(row.connectivity_govt).lower() in core_configs.true_choices
-
-                    school_weekly.connectivity_type = row.connectivity_type_govt or 'unknown'
-
-                    if core_utilities.is_blank_string(row.cellular_coverage_availability):
-                        school_weekly.coverage_availability = None
-                    else:
-                        school_weekly.coverage_availability = str(
-                            row.cellular_coverage_availability).lower() in core_configs.true_choices
-
-                    coverage_type = statistics_models.SchoolWeeklyStatus.COVERAGE_UNKNOWN
-                    if not core_utilities.is_blank_string(row.cellular_coverage_type):
-                        coverage_type_in_lower = str(row.cellular_coverage_type).lower()
-                        if coverage_type_in_lower in coverage_type_choices:
-                            coverage_type = coverage_type_in_lower
-                        elif coverage_type_in_lower in ['no service', 'no coverage', 'no']:
-                            coverage_type = statistics_models.SchoolWeeklyStatus.COVERAGE_NO
-
-                    school_weekly.coverage_type = coverage_type
-
-                    school_weekly.download_speed_contracted = row.download_speed_contracted
-                    school_weekly.num_computers_desired = row.num_computers_desired
-                    school_weekly.electricity_type = row.electricity_type
-                    school_weekly.num_adm_personnel = row.num_adm_personnel
-
-                    school_weekly.fiber_node_distance = row.fiber_node_distance
-                    school_weekly.microwave_node_distance = row.microwave_node_distance
-
-                    school_weekly.schools_within_1km = row.schools_within_1km
-                    school_weekly.schools_within_2km = row.schools_within_2km
-                    school_weekly.schools_within_3km = row.schools_within_3km
-
-                    school_weekly.nearest_lte_distance = row.nearest_LTE_distance
-                    school_weekly.nearest_umts_distance = row.nearest_UMTS_distance
-                    school_weekly.nearest_gsm_distance = row.nearest_GSM_distance
-                    school_weekly.nearest_nr_distance = row.nearest_NR_distance
-
-                    school_weekly.pop_within_1km = row.pop_within_1km
-                    school_weekly.pop_within_2km = row.pop_within_2km
-                    school_weekly.pop_within_3km = row.pop_within_3km
-
-                    school_weekly.school_data_source = row.school_data_source
-                    school_weekly.school_data_collection_year = row.school_data_collection_year
-                    school_weekly.school_data_collection_modality = row.school_data_collection_modality
-                    school_weekly.school_location_ingestion_timestamp = row.school_location_ingestion_timestamp
-                    school_weekly.connectivity_govt_ingestion_timestamp = row.connectivity_govt_ingestion_timestamp
-                    school_weekly.connectivity_govt_collection_year = row.connectivity_govt_collection_year
-                    school_weekly.disputed_region = False if core_utilities.is_blank_string(
-                        row.disputed_region) else str(row.disputed_region).lower() in core_configs.true_choices
-
-                    download_speed_benchmark = row.download_speed_benchmark
-                    if download_speed_benchmark:
-                        # convert Mbps to bps
-                        school_weekly.download_speed_benchmark = download_speed_benchmark * 1000 * 1000
-
-                    school_weekly.num_students_girls = row.num_students_girls
-                    school_weekly.num_students_boys = row.num_students_boys
-                    school_weekly.num_students_other = row.num_students_other
-                    school_weekly.num_teachers_female = row.num_teachers_female
-                    school_weekly.num_teachers_male = row.num_teachers_male
-                    school_weekly.num_tablets = row.num_tablets
-                    school_weekly.num_robotic_equipment = row.num_robotic_equipment
-
-                    school_weekly.computer_availability = None \
-                        if core_utilities.is_blank_string(row.computer_availability) \
-                        else str(row.computer_availability).lower() in core_configs.true_choices
-                    school_weekly.teachers_trained = None \
-                        if core_utilities.is_blank_string(row.teachers_trained) \
-                        else str(row.teachers_trained).lower() in core_configs.true_choices
-                    school_weekly.sustainable_business_model = None \
-                        if core_utilities.is_blank_string(row.sustainable_business_model) \
-                        else str(row.sustainable_business_model).lower() in core_configs.true_choices
-                    school_weekly.device_availability = None \
-                        if core_utilities.is_blank_string(row.device_availability) \
-                        else str(row.device_availability).lower() in core_configs.true_choices
-
-                    school_weekly.building_id_govt = row.building_id_govt
-                    school_weekly.num_schools_per_building = row.num_schools_per_building
-
-                    school_weekly.save()
-
-                    rt_registered = None
-                    if not core_utilities.is_blank_string(row.connectivity_RT):
-                        rt_registered = str(row.connectivity_RT).lower() in core_configs.true_choices
-
-                    if rt_registered is not None and row.connectivity_RT_ingestion_timestamp is not None:
-                        school_rt_qs = statistics_models.SchoolRealTimeRegistration.objects.filter(school=school)
-                        if school_rt_qs.exists():
-                            school_rt_instance = school_rt_qs.order_by('-created').first()
-
-                            school_rt_instance.rt_registered = rt_registered
-                            school_rt_instance.rt_registration_date = row.connectivity_RT_ingestion_timestamp
-                            school_rt_instance.rt_source = row.connectivity_RT_datasource
-
-                            school_rt_instance.save()
-                        else:
-                            statistics_models.SchoolRealTimeRegistration.objects.create(
-                                school=school,
-                                rt_registered=rt_registered,
-                                rt_registration_date=row.connectivity_RT_ingestion_timestamp,
-                                rt_source=row.connectivity_RT_datasource,
-                            )
-
-                    row.is_read = True
-                    row.school = school
-                    row.save()
-
-                    updated_school_ids.append(school.id)
-                    if created:
-                        created_school_ids.append(school.id)
+                    school_ids, new_school_ids = source_utilities.publish_school_master_data_rows([row], admin_maps)
+                    updated_school_ids.extend(school_ids)
+                    created_school_ids.extend(new_school_ids)
                 except Exception as ex:
                     logger.error('Error reported on publishing: {0}'.format(ex))
                     logger.error('Record: {0}'.format(row.__dict__))
@@ -446,10 +252,20 @@ def handle_published_school_master_data_row(published_row=None, country_ids=None
                 populate_school_new_fields_task.delay(None, None, None, school_ids=updated_school_ids[i:i + 20])
 
 
-        for new_school_id in created_school_ids:
-            # As it's a new school added through School Master record publishing, add the school to search index
-            cmd_args = ['--update_index', '-school_id={0}'.format(new_school_id)]
-            call_command('index_rebuild_schools', *cmd_args)
+        if len(updated_school_ids) > 0 or len(created_school_ids) > 0:
+            # Add the new and the updated schools to the search index in batches
+            call_command('index_rebuild_schools', '--update_index', school_ids=updated_school_ids + created_school_ids)
+
+            if settings.ENABLE_SCHOOL_MAP_STATE:
+                refresh_school_map_state(school_ids=updated_school_ids + created_school_ids)
+
+                if settings.ENABLE_SCHOOL_MAP_CLUSTERS:
+                    for country_id in published_country_ids:
+                        refresh_school_map_clusters(country_id=country_id)
+
+            if settings.ENABLE_STATISTICS_SUMMARY:
+                for country in Country.objects.filter(id__in=published_country_ids):
+                    update_school_status_summary(country)
 
         background_task_utilities.task_on_complete(task_instance)
     else:
@@ -500,11 +316,15 @@ def handle_deleted_school_master_data_row(deleted_row=None, country_ids=None):
 
         current_date = core_utilities.get_current_datetime_object()
         task_instance.info('Total records to update: {}'.format(new_deleted_records.count()))
+        deleted_country_ids = list(new_deleted_records.order_by('country_id').values_list(
+            'country_id', flat=True).distinct())
+        deleted_school_ids = []
 
         for data_chunk in core_utilities.queryset_iterator(new_deleted_records, chunk_size=1000):
             for row in data_chunk:
                 try:
                     row.school.delete()
+                    deleted_school_ids.append(row.school_id)
 
                     statistics_models.SchoolWeeklyStatus.objects.filter(school=row.school).update(deleted=current_date)
 
@@ -522,6 +342,18 @@ def handle_deleted_school_master_data_row(deleted_row=None, country_ids=None):
                     task_instance.info('Error reported for ID ({0}) on deletion: {1}'.format(row.id, ex))
 
         task_instance.info('Remaining records: {}'.format(new_deleted_records.count()))
+
+        if settings.ENABLE_SCHOOL_MAP_STATE and len(deleted_school_ids) > 0:
+            refresh_school_map_state(school_ids=deleted_school_ids)
+
+            if settings.ENABLE_SCHOOL_MAP_CLUSTERS:
+                for country_id in deleted_country_ids:
+                    refresh_school_map_clusters(country_id=country_id)
+
+        if settings.ENABLE_STATISTICS_SUMMARY and len(deleted_school_ids) > 0:
+            for country in Country.objects.filter(id__in=deleted_country_ids):
+                update_school_status_summary(country)
+
         background_task_utilities.task_on_complete(task_instance)
     else:
         logger.error('Found running Job with "{0}" name so skipping current iteration'.format(task_key))
@@ -673,18 +505,30 @@ def load_data_from_daily_check_app_api(*args):
 
 @app.task(soft_time_limit=4 * 60 * 60, time_limit=4 * 60 * 60)
 def load_data_from_qos_apis(*args):
-    logger.info('Loading the QoS data to DB.')
-    changes_for_countries = {}
+    task_key = 'load_data_from_qos_apis_status_{current_time}'.format(
+        current_time=format_date(core_utilities.get_current_datetime_object(), frmt='%d%m%Y_%H'),
+    )
+    task_id = current_task.request.id or str(uuid.uuid4())
+    task_instance = background_task_utilities.task_on_start(task_id, task_key, 'Load QoS Data from Live source')
+
+    if task_instance:
+        logger.info('Loading the QoS data to DB.')
+        changes_for_countries = {}
+
+        source_utilities.load_qos_data_source_response_to_model(changes_for_countries, task_instance=task_instance)
 
-    source_utilities.load_qos_data_source_response_to_model(changes_for_countries)
+        countries_ids = list(Country.objects.all().filter(
+            iso3_format__in=list(changes_for_countries.keys())
+        ).values_list('id', flat=True).order_by('id').distinct('id'))
 
-    countries_ids = list(Country.objects.all().filter(
-        iso3_format__in=list(changes_for_countries.keys())
-    ).values_list('id', flat=True).order_by('id').distinct('id'))
+        for country_id in countries_ids:
+            source_utilities.sync_qos_realtime_data(country_id)
+        task_instance.info('Synced the realtime data for ({0}) countries with QoS changes'.format(len(countries_ids)))
+        logger.info('Loaded the QoS data to DB successfully.')
 
-    for country_id in countries_ids:
-        source_utilities.sync_qos_realtime_data(country_id)
-    logger.info('Loaded the QoS data to DB successfully.')
+        background_task_utilities.task_on_complete(task_instance)
+    else:
+        logger.error('Found running Job with "{0}" name so skipping current iteration'.format(task_key))
 
 
 @app.task(soft_time_limit=2 * 60 * 60, time_limit=2 * 60 * 60)
@@ -763,19 +607,29 @@ def update_static_data(*args, country_iso3_format=None):
 
     if task_instance:
         logger.debug('Not found running job for static data pull handler: {}'.format(task_key))
-        load_data_from_school_master_apis(country_iso3_format=country_iso3_format)
+        load_data_from_school_master_apis(country_iso3_format=country_iso3_format, task_instance=task_instance)
         task_instance.info('Completed the load data from School Master API call')
         cleanup_school_master_rows.s()
         task_instance.info('Scheduled cleanup school master rows')
+        warm_data_layer_map_tiles.delay(layer_type=accounts_models.DataLayer.LAYER_TYPE_STATIC)
+        task_instance.info('Scheduled static layer map tiles warming')
         background_task_utilities.task_on_complete(task_instance)
     else:
         logger.error('Found Job with "{0}" name so skipping current iteration'.format(task_key))
 
 
 @app.task(soft_time_limit=60 * 60, time_limit=60 * 60)
-def finalize_previous_day_data(_prev_result, country_id, date, *args):
+def finalize_previous_day_data(_prev_result, country_id, date, *args, incremental=True):
     country = Country.objects.get(id=country_id)
 
+    if settings.ENABLE_INCREMENTAL_AGGREGATIONS and incremental:
+        # Dirty school days cover every date with new live data, not only the given one.
+        # Callers that rewrite the live data of an explicit date pass incremental=False to re-aggregate all of it.
+        if aggregate_dirty_school_days(country):
+            refresh_country_school_map(country)
+            country.invalidate_country_related_cache()
+        return
+
     aggregate_real_time_data_to_school_daily_status(country, date)
     aggregate_school_daily_to_country_daily(country, date)
 
@@ -783,6 +637,11 @@ def finalize_previous_day_data(_prev_result, country_id, date, *args):
     if weekly_data_available:
         update_country_weekly_status(country, date)
 
+    if settings.ENABLE_STATISTICS_SUMMARY:
+        update_realtime_weekly_summary(country, date)
+        update_school_status_summary(country)
+
+    refresh_country_school_map(country)
     country.invalidate_country_related_cache()
 
 
@@ -819,6 +678,7 @@ def update_live_data(*args, today=True):
                     ]),
                     finalize_task.si(),
                 ),
+                warm_data_layer_map_tiles.si(layer_type=accounts_models.DataLayer.LAYER_TYPE_LIVE),
             ).delay()
 
         else:
@@ -833,7 +693,7 @@ def update_live_data(*args, today=True):
                     ]),
                     finalize_task.si(),
                 ),
-
+                warm_data_layer_map_tiles.si(layer_type=accounts_models.DataLayer.LAYER_TYPE_LIVE),
             ).delay()
 
         background_task_utilities.task_on_complete(task_instance)
@@ -873,7 +733,7 @@ def update_qos_data(*args, today=True):
                 ]),
                 finalize_task.si(),
             ),
-
+            warm_data_layer_map_tiles.si(layer_type=accounts_models.DataLayer.LAYER_TYPE_LIVE),
         ).delay()
 
         background_task_utilities.task_on_complete(task_instance)
@@ -892,24 +752,35 @@ def clean_old_live_data():
 
     if task_instance:
         logger.debug('Not found running job for live data cleanup handler: {}'.format(task_key))
-        older_then_date = current_datetime - timedelta(days=30)
-
-        logger.debug('Deleting all the rows from "RealTimeConnectivity" Data Table which is older than: {0}'.format(
-            older_then_date))
-        statistics_models.RealTimeConnectivity.objects.filter(created__lt=older_then_date).delete()
-        task_instance.info('"RealTimeConnectivity" data table completed')
-
-        logger.debug(
-            'Deleting all the rows from "DailyCheckAppMeasurementData" Data Table which is older than: {0}'.format(
-                older_then_date))
-        # Delete all entries from DailyCheckApp Data Table which is older than 7 days
-        sources_models.DailyCheckAppMeasurementData.objects.filter(created_at__lt=older_then_date).delete()
-        task_instance.info('"DailyCheckAppMeasurementData" data table completed')
-
-        logger.debug('Deleting all the rows from "QoSData" Data Table which is older than: {0}'.format(older_then_date))
-        # Delete all entries from QoS Data Table which is older than 7 days
-        sources_models.QoSData.objects.filter(timestamp__lt=older_then_date).delete()
-        task_instance.info('"QoSData" data table completed')
+        older_then_date = current_datetime - timedelta(days=settings.LIVE_DATA_RETENTION_DAYS)
+        partitions_end_date = current_datetime.date() + timedelta(days=settings.LIVE_DATA_PARTITIONS_AHEAD_DAYS)
+
+        for model, column in source_utilities.LIVE_DATA_TABLES:
+            table_name = model._meta.db_table
+
+            if partition_utilities.is_partitioned_table(table_name):
+                created_partitions = partition_utilities.create_table_partitions(
+                    table_name, current_datetime.date(), partitions_end_date, settings.LIVE_DATA_PARTITION_INTERVAL)
+                logger.debug('Created partitions of "{0}": {1}'.format(model.__name__, created_partitions))
+
+                logger.debug('Dropping all the partitions of "{0}" Data Table which are older than: {1}'.format(
+                    model.__name__, older_then_date))
+                dropped_partitions = partition_utilities.drop_table_partitions_before(table_name, older_then_date)
+                logger.debug('Dropped partitions of "{0}": {1}'.format(model.__name__, dropped_partitions))
+            else:
+                logger.debug('Deleting all the rows from "{0}" Data Table which is older than: {1}'.format(
+                    model.__name__, older_then_date))
+                model.objects.filter(**{column + '__lt': older_then_date}).delete()
+
+            task_instance.info('"{0}" data table completed'.format(model.__name__))
+
+        # SchoolDailyStatus has no retention, only keep its partitions ahead of the aggregations
+        school_daily_table_name = statistics_models.SchoolDailyStatus._meta.db_table
+        if partition_utilities.is_partitioned_table(school_daily_table_name):
+            partition_utilities.create_table_partitions(
+                school_daily_table_name, current_datetime.date(), partitions_end_date,
+                settings.SCHOOL_DAILY_STATUS_PARTITION_INTERVAL, date_column=True)
+            task_instance.info('"SchoolDailyStatus" partitions completed')
 
         background_task_utilities.task_on_complete(task_instance)
     else:
@@ -92,6 +92,7 @@ class DataSourcesTasksTestCase(TestAPIViewSetMixin, TestCase):
         self.assertEqual(sources_models.QoSData.objects.all().count(), 0)
         sources_tasks.load_data_from_qos_apis()
         self.assertEqual(sources_models.QoSData.objects.all().count(), 0)
+        self.assertTrue(BackgroundTask.objects.filter(name__startswith='load_data_from_qos_apis_status_').exists())
 
     def test_cleanup_school_master_rows(self):
         self.assertEqual(sources_models.SchoolMasterData.objects.all().count(), 3)
@@ -1,11 +1,71 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs, urlparse
+
 import pandas as pd
 from django.test import TestCase
+from django.utils import timezone
 
+from proco.connection_statistics.models import (
+    RealTimeConnectivity,
+    SchoolRealTimeRegistration,
+    SchoolWeeklyStatus,
+)
 from proco.data_sources import utils as sources_utilities
+from proco.data_sources.change_cache import DeltaSharingChangeCache
+from proco.data_sources.models import DailyCheckAppMeasurementData, QoSData, SchoolMasterData
+from proco.data_sources.tests.factories import SchoolMasterDataFactory
+from proco.locations.tests.factories import Admin1Factory, CountryFactory
 from proco.schools.tests.factories import SchoolFactory
 from proco.utils.tests import TestAPIViewSetMixin
 
 
+class DailyCheckAppStubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class DailyCheckAppStubHandler(BaseHTTPRequestHandler):
+    """Serves `total_pages` synthetic pages of measurements, the first request of page 1 fails with a 503"""
+    total_pages = 3
+    failed_pages = set()
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        page_no = int(params['page'][0])
+        page_size = int(params['size'][0])
+
+        if page_no == 1 and page_no not in self.failed_pages:
+            self.failed_pages.add(page_no)
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        response_data = []
+        if page_no < self.total_pages:
+            response_data = [{
+                'timestamp': '2024-01-01T10:00:00+00:00',
+                'school_id': 'school_{0}_{1}'.format(page_no, index),
+                'source': 'DailyCheckApp',
+                'download': 10.0,
+            } for index in range(page_size)]
+
+        body = json.dumps(response_data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
 class UtilsUtilitiesTestCase(TestAPIViewSetMixin, TestCase):
 
     def test_normalize_school_name(self):
@@ -129,11 +189,204 @@ class UtilsUtilitiesTestCase(TestAPIViewSetMixin, TestCase):
             'connectivity_RT': None,
         }, None))
 
+    def test_get_review_required_mask(self):
+        school = SchoolFactory()
+        schools_df = sources_utilities.get_school_review_fields_data_frame(school.country)
+
+        unchanged_row = {
+            'school_id_giga': school.giga_id_school,
+            'school_name': school.name.upper(),
+            'school_id_govt': school.external_id,
+            'admin1_id_giga': school.admin1.giga_id_admin,
+            'admin2_id_giga': None,
+            'latitude': school.geopoint.y,
+            'longitude': school.geopoint.x,
+            'education_level': school.education_level,
+        }
+        df = pd.DataFrame([
+            unchanged_row,
+            dict(unchanged_row, school_name='School Name'),
+            dict(unchanged_row, admin2_id_giga='admin2_id_giga'),
+            dict(unchanged_row, latitude=1234567),
+            dict(unchanged_row, school_id_giga='new_school_giga_id'),
+        ]).merge(schools_df, on='school_id_giga', how='left')
+
+        self.assertListEqual(sources_utilities.get_review_required_mask(df).tolist(), [False, True, True, True, True])
+
+    def test_sync_shared_tables(self):
+        synced_tables = []
+
+        def sync_table(table_name):
+            if table_name == 'BAD':
+                raise ValueError('Invalid table')
+            synced_tables.append(table_name)
+
+        for max_workers in [1, 3]:
+            synced_tables.clear()
+            errors = sources_utilities.sync_shared_tables(['BRA', 'BAD', 'IND', 'KEN'], sync_table,
+                                                          max_workers=max_workers)
+
+            self.assertListEqual(sorted(synced_tables), ['BRA', 'IND', 'KEN'])
+            self.assertListEqual(list(errors.keys()), ['BAD'])
+            self.assertIsInstance(errors['BAD'], ValueError)
+
+    def test_change_cache(self):
+        with tempfile.TemporaryDirectory() as cache_directory:
+            change_cache = DeltaSharingChangeCache(cache_directory, max_size=10 * 1024 * 1024)
+            df = pd.DataFrame.from_dict({'school_id_giga': ['giga_1', 'giga_2'], '_commit_version': [3, 3]})
+
+            self.assertIsNone(change_cache.get('gold', 'qos', 'BRA', 3))
+
+            change_cache.set('gold', 'qos', 'BRA', 3, df)
+            pd.testing.assert_frame_equal(change_cache.get('gold', 'qos', 'BRA', 3), df)
+            self.assertIsNone(change_cache.get('gold', 'qos', 'BRA', 4))
+
+            # Least recently used version is evicted first
+            change_cache.set('gold', 'qos', 'BRA', 4, df)
+            os.utime(change_cache.get_path('gold', 'qos', 'BRA', 3), (0, 0))
+            change_cache.max_size = os.path.getsize(change_cache.get_path('gold', 'qos', 'BRA', 4))
+            change_cache.evict()
+
+            self.assertIsNone(change_cache.get('gold', 'qos', 'BRA', 3))
+            self.assertIsNotNone(change_cache.get('gold', 'qos', 'BRA', 4))
+
+    def test_load_daily_check_app_data_source_response_to_model(self):
+        server = DailyCheckAppStubServer(('127.0.0.1', 0), DailyCheckAppStubHandler)
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+
+        try:
+            sources_utilities.load_daily_check_app_data_source_response_to_model(DailyCheckAppMeasurementData, {
+                'url': 'http://127.0.0.1:{0}/measurements/v2'.format(server.server_address[1]),
+                'data_limit': 5,
+                'query_params': {'page': '{page_no}', 'size': '{page_size}'},
+                'auth_token_required': False,
+            }, concurrency=2)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(DailyCheckAppMeasurementData.objects.count(), 15)
+        self.assertSetEqual(
+            set(DailyCheckAppMeasurementData.objects.values_list('school_id', flat=True)),
+            {'school_{0}_{1}'.format(page_no, index) for page_no in range(3) for index in range(5)},
+        )
+
+    def test_load_daily_check_app_data_source_response_to_model_closes_session_on_error(self):
+        session = MagicMock()
+        session.get.side_effect = ConnectionError('Connection refused')
+
+        with patch.object(sources_utilities, 'get_pooled_session', return_value=session):
+            with self.assertRaises(ConnectionError):
+                sources_utilities.load_daily_check_app_data_source_response_to_model(DailyCheckAppMeasurementData, {
+                    'url': 'http://127.0.0.1/measurements/v2',
+                    'auth_token_required': False,
+                }, concurrency=1)
+
+        session.close.assert_called_once_with()
+        self.assertEqual(DailyCheckAppMeasurementData.objects.count(), 0)
+
+    def test_get_dailycheckapp_school_maps(self):
+        school = SchoolFactory(external_id='govt_school_id')
+        timestamp = timezone.now()
+        DailyCheckAppMeasurementData.objects.create(created_at=timestamp, timestamp=timestamp, school_id='1',
+                                                    giga_id_school=school.giga_id_school, source='DailyCheckApp')
+        DailyCheckAppMeasurementData.objects.create(created_at=timestamp, timestamp=timestamp,
+                                                    school_id=school.external_id, country_code=school.country.code,
+                                                    source='MLab')
+        DailyCheckAppMeasurementData.objects.create(created_at=timestamp, timestamp=timestamp,
+                                                    school_id='unknown', source='MLab')
+
+        dcm_schools, mlab_schools, mlab_country_schools = sources_utilities.get_dailycheckapp_school_maps(
+            DailyCheckAppMeasurementData.objects.all())
+
+        self.assertDictEqual(dcm_schools, {school.giga_id_school: school.id})
+        self.assertDictEqual(mlab_schools, {school.external_id: school.id})
+        self.assertDictEqual(mlab_country_schools, {(school.country.code, school.external_id): school.id})
+
     def test_parse_row(self):
         df = pd.DataFrame.from_dict({'school_name': ['Test School'], 'timestamp': [pd.Timestamp(0)]})
 
         self.assertEqual(type(sources_utilities.parse_row(df.iloc[0])), dict)
 
+    def test_localize_data_frame_timestamps(self):
+        df = pd.DataFrame.from_dict({'timestamp': [pd.Timestamp(0), None]})
+        df = sources_utilities.localize_data_frame_timestamps(df)
+
+        self.assertIsNotNone(df['timestamp'].dt.tz)
+        self.assertTrue(pd.isna(df['timestamp'].iloc[1]))
+
+    def test_map_qos_data_frame_to_schools(self):
+        school = SchoolFactory()
+        df = pd.DataFrame.from_dict({'school_id_giga': [school.giga_id_school, 'unknown', school.giga_id_school]})
+
+        df = sources_utilities.map_qos_data_frame_to_schools(df, school.country)
+        self.assertListEqual(df['school_id'].tolist(), [school.id, school.id])
+
+    def test_load_qos_data_frame_to_model(self):
+        school = SchoolFactory()
+        qos_model_fields = [f.name for f in QoSData._meta.get_fields()]
+
+        df = pd.DataFrame.from_dict({
+            'school_id_giga': [school.giga_id_school, school.giga_id_school, 'unknown'],
+            'timestamp': [pd.Timestamp('2024-01-01 10:00'), pd.Timestamp('2024-01-01 11:00'),
+                          pd.Timestamp('2024-01-01 10:00')],
+            'date': ['2024-01-01', '2024-01-01', '2024-01-01'],
+            'speed_download': [10.5, None, 1.0],
+            'ip_family': [4, None, 4],
+            'unknown_column': ['a', 'b', 'c'],
+        })
+
+        loaded_rows = sources_utilities.load_qos_data_frame_to_model(df.copy(), school.country, 1, qos_model_fields)
+        self.assertEqual(loaded_rows, 2)
+        self.assertEqual(QoSData.objects.filter(school=school, version=1).count(), 2)
+
+        df['speed_download'] = [20.0, 5.0, 1.0]
+        sources_utilities.load_qos_data_frame_to_model(df.copy(), school.country, 2, qos_model_fields)
+
+        self.assertEqual(QoSData.objects.filter(school=school).count(), 2)
+        self.assertListEqual(
+            list(QoSData.objects.filter(school=school).order_by('timestamp').values_list('speed_download', 'version')),
+            [(20.0, 2), (5.0, 2)],
+        )
+
+    def test_publish_school_master_data_rows(self):
+        country = CountryFactory()
+        admin1 = Admin1Factory(country=country, layer_name='adm1')
+        school = SchoolFactory(country=country)
+        SchoolWeeklyStatus.objects.create(school=school, year=2020, week=1, num_students=10, connectivity_speed=5)
+
+        rows = [
+            SchoolMasterDataFactory(country=country, school=None, school_id_giga=school.giga_id_school,
+                                    school_name='Old Name', longitude=10, latitude=20,
+                                    status=SchoolMasterData.ROW_STATUS_PUBLISHED),
+            SchoolMasterDataFactory(country=country, school=None, school_id_giga=school.giga_id_school,
+                                    school_name='New Name', admin1_id_giga=admin1.giga_id_admin,
+                                    longitude=10, latitude=20, num_students=20,
+                                    status=SchoolMasterData.ROW_STATUS_PUBLISHED),
+            SchoolMasterDataFactory(country=country, school=None, longitude=10, latitude=20,
+                                    connectivity_RT='yes', connectivity_RT_ingestion_timestamp=timezone.now(),
+                                    status=SchoolMasterData.ROW_STATUS_PUBLISHED),
+        ]
+
+        school_ids, created_school_ids = sources_utilities.publish_school_master_data_rows(rows)
+
+        self.assertEqual(len(school_ids), 2)
+        self.assertEqual(len(created_school_ids), 1)
+        self.assertFalse(SchoolMasterData.objects.filter(id__in=[row.id for row in rows], is_read=False).exists())
+
+        # Last row of the school wins, the weekly row is copied from the latest one without the live data
+        school.refresh_from_db()
+        self.assertEqual(school.name, 'New Name')
+        self.assertEqual(school.name_lower, 'new name')
+        self.assertEqual(school.admin1_id, admin1.id)
+        self.assertEqual(school.last_weekly_status.num_students, 20)
+        self.assertIsNone(school.last_weekly_status.connectivity_speed)
+        self.assertEqual(SchoolWeeklyStatus.objects.filter(school=school).count(), 2)
+
+        self.assertTrue(SchoolRealTimeRegistration.objects.filter(
+            school_id=created_school_ids[0], rt_registered=True).exists())
+
     def test_get_request_headers(self):
         request_configs = {
             'url': '/code/measurements/v2',
@@ -172,5 +425,20 @@ class UtilsUtilitiesTestCase(TestAPIViewSetMixin, TestCase):
     def test_sync_qos_realtime_data(self):
         self.assertIsNone(sources_utilities.sync_qos_realtime_data(123))
 
+        school = SchoolFactory()
+        timestamp = timezone.now() - timedelta(hours=1)
+        QoSData.objects.create(school=school, country=school.country, timestamp=timestamp, date=timestamp.date(),
+                               school_id_giga=school.giga_id_school, speed_download=10.5, speed_upload=None,
+                               latency=20.0)
+
+        sources_utilities.sync_qos_realtime_data(school.country_id)
+
+        realtime = RealTimeConnectivity.objects.get(school=school)
+        self.assertEqual(realtime.created, timestamp)
+        self.assertEqual(realtime.connectivity_speed, 10500000)
+        self.assertIsNone(realtime.connectivity_upload_speed)
+        self.assertEqual(realtime.connectivity_latency, 20.0)
+        self.assertEqual(realtime.live_data_source, 'QOS')
+
     def test_sync_dailycheckapp_realtime_data(self):
         self.assertIsNone(sources_utilities.sync_dailycheckapp_realtime_data())
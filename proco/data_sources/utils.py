@@ -1,6 +1,9 @@
 import json
 import logging
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import timedelta
 
 import delta_sharing
@@ -11,18 +14,34 @@ import requests
 from delta_sharing.protocol import Schema, Share
 from delta_sharing.reader import DeltaSharingReader
 from django.conf import settings
-from django.db.models import Q
+from django.contrib.gis.geos import Point
+from django.db import connection, connections, transaction
+from django.db.models import F, FloatField, Func, Q
 from django.db.models.functions import Lower
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
 from rest_framework import status
+from simple_history.utils import bulk_update_with_history
+from urllib3.util.retry import Retry
 
 from proco.accounts.models import APIKey
+from proco.connection_statistics import models as statistics_models
 from proco.connection_statistics.config import app_config as statistics_configs
 from proco.connection_statistics.models import RealTimeConnectivity
+from proco.connection_statistics.utils import (
+    CONNECTIVITY_STATISTICS_FIELDS,
+    mark_school_days_dirty,
+    update_school_last_weekly_status,
+)
+from proco.core import db_utils as db_utilities
 from proco.core import utils as core_utilities
+from proco.core.config import app_config as core_configs
 from proco.custom_auth.models import ApplicationUser
 from proco.data_sources import models as sources_models
-from proco.locations.models import Country
+from proco.data_sources.change_cache import load_table_changes, load_table_version_changes
+from proco.locations.models import Country, CountryAdminMetadata
 from proco.schools.models import School
+from proco.schools.signals import change_integration_status_country
 from proco.utils.dates import format_date
 from proco.utils.urls import add_url_params
 
@@ -30,8 +49,25 @@ logger = logging.getLogger('gigamaps.' + __name__)
 
 response_timezone = pytz.timezone(settings.TIME_ZONE)
 
+# Raw live measurement tables with the datetime column they are cleaned and partitioned by
+LIVE_DATA_TABLES = (
+    (RealTimeConnectivity, 'created'),
+    (sources_models.DailyCheckAppMeasurementData, 'created_at'),
+    (sources_models.QoSData, 'timestamp'),
+)
+
+TIMESTAMP_COLUMNS = [
+    'timestamp',
+    'school_location_ingestion_timestamp',
+    'connectivity_RT_ingestion_timestamp',
+    'connectivity_govt_ingestion_timestamp',
+]
+
 ds_settings = settings.DATA_SOURCE_CONFIG
 
+# Limits the number of shared table syncs writing to the DB at the same time, downloads are not limited by it
+shared_table_db_writers = threading.BoundedSemaphore(settings.DATA_SOURCE_SYNC_DB_WRITERS)
+
 
 class ProcoSharingClient(delta_sharing.SharingClient):
 
@@ -60,6 +96,55 @@ class ProcoSharingClient(delta_sharing.SharingClient):
                 return schema
 
 
+def sync_shared_tables(table_names, sync_table, task_instance=None, max_workers=None):
+    """
+    sync_shared_tables
+        Call sync_table(table_name) for every Delta Sharing table, in a pool of DATA_SOURCE_SYNC_WORKERS threads
+        as the sync of a table is mostly waiting on the download of its changes. An error of one table is logged
+        and does not stop the other tables. The progress is written to the log of task_instance, if given.
+
+    :return: OrderedDict of table name to exception for the failed tables
+    """
+    max_workers = settings.DATA_SOURCE_SYNC_WORKERS if max_workers is None else max_workers
+    errors = OrderedDict()
+
+    def _sync(table_name, close_connections):
+        try:
+            sync_table(table_name)
+        finally:
+            if close_connections:
+                # Each worker thread opens its own DB connections
+                connections.close_all()
+
+    def _report(completed, table_name, ex):
+        if ex:
+            logger.error('Exception caught for "{0}": {1}'.format(table_name, str(ex)))
+            errors[table_name] = ex
+            message = 'Failed to sync table "{0}" ({1}/{2}): {3} - {4}'.format(
+                table_name, completed, len(table_names), type(ex).__name__, str(ex))
+        else:
+            message = 'Synced table "{0}" ({1}/{2})'.format(table_name, completed, len(table_names))
+
+        logger.info(message)
+        if task_instance:
+            task_instance.info(message)
+
+    if max_workers <= 1 or len(table_names) <= 1:
+        for completed, table_name in enumerate(table_names, start=1):
+            try:
+                _sync(table_name, False)
+                _report(completed, table_name, None)
+            except Exception as ex:
+                _report(completed, table_name, ex)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_sync, table_name, True): table_name for table_name in table_names}
+            for completed, future in enumerate(as_completed(futures), start=1):
+                _report(completed, futures[future], future.exception())
+
+    return errors
+
+
 def normalize_school_name(school_name):
     # If its blank string then put default value
     if pd.isna(school_name) or core_utilities.is_blank_string(school_name):
@@ -86,6 +171,75 @@ def normalize_school_master_data_frame(df):
     return df
 
 
+def localize_data_frame_timestamps(df):
+    """Column wise version of the timestamp localization of parse_row"""
+    for timestamp_col_name in TIMESTAMP_COLUMNS:
+        if timestamp_col_name in df.columns:
+            df[timestamp_col_name] = pd.to_datetime(df[timestamp_col_name]).dt.tz_localize(response_timezone)
+    return df
+
+
+def map_qos_data_frame_to_schools(df, country):
+    """
+    map_qos_data_frame_to_schools
+        Add the school_id column to the QoS rows by resolving all the Giga IDs of the DataFrame with one query.
+        Rows of the schools not found in the DB are dropped.
+    """
+    giga_ids = df['school_id_giga'].dropna().unique().tolist()
+    schools_df = pd.DataFrame(
+        list(School.objects.filter(
+            country=country, giga_id_school__in=giga_ids,
+        ).order_by('id').values_list('giga_id_school', 'id')),
+        columns=['school_id_giga', 'school_id'],
+    ).drop_duplicates(subset=['school_id_giga'], keep='first')
+
+    df = df.merge(schools_df, on='school_id_giga', how='left')
+    df['school_id'] = df['school_id'].astype('Int64')
+
+    unknown_schools = df['school_id'].isna()
+    if unknown_schools.any():
+        logger.warning('Schools with Giga IDs ({0}) not found in PROCO DB. '
+                       'Hence skipping the load for {1} rows.'.format(
+                           ', '.join(map(str, df.loc[unknown_schools, 'school_id_giga'].unique())),
+                           unknown_schools.sum()))
+
+    df = df[~unknown_schools].copy()
+    df['school_id'] = df['school_id'].astype('int64')
+    return df
+
+
+def load_qos_data_frame_to_model(loaded_data_df, country, version, qos_model_fields):
+    """
+    load_qos_data_frame_to_model
+        Load the rows of one QoS table version to QoSData: schools are resolved with one query and a merge,
+        timestamps are localized column wise and the rows are upserted with COPY on (school, timestamp).
+
+    :return: number of loaded rows
+    """
+    df_columns = list(loaded_data_df.columns.tolist())
+    cols_to_delete = list(set(df_columns) - set(qos_model_fields)) + ['id', 'created', 'modified', 'school_id',
+                                                                      'country_id', 'modified_by', ]
+    logger.debug('All QoS API response columns: {}'.format(df_columns))
+    logger.debug('All QoS API response columns to delete: {}'.format(list(set(df_columns) - set(qos_model_fields))))
+
+    loaded_data_df = loaded_data_df.drop(columns=cols_to_delete, errors='ignore', )
+    loaded_data_df = normalize_qos_data_frame(loaded_data_df)
+    loaded_data_df = localize_data_frame_timestamps(loaded_data_df)
+    loaded_data_df = map_qos_data_frame_to_schools(loaded_data_df, country)
+
+    loaded_data_df['version'] = version
+    loaded_data_df['country_id'] = country.id
+
+    logger.info('Loading the ({0}) data to "QoSData" table.'.format(len(loaded_data_df)))
+    if len(loaded_data_df) == 0:
+        return 0
+    # Only the upsert takes a writer slot, the data frame preparation above overlaps with the other tables
+    with shared_table_db_writers:
+        inserted_rows, updated_rows = db_utilities.bulk_upsert(loaded_data_df, sources_models.QoSData,
+                                                               ['school', 'timestamp'])
+    return inserted_rows + updated_rows
+
+
 def normalize_qos_data_frame(df):
     if 'school_id_govt' in list(df.columns.tolist()):
         df['school_id_govt'] = df['school_id_govt'].fillna('thisnanwillreplaceback').apply(
@@ -163,12 +317,7 @@ def parse_row(row):
     row.replace(np.nan, None, inplace=True)
     row.replace(pd.NaT, None, inplace=True)
 
-    for timestamp_col_name in [
-        'timestamp',
-        'school_location_ingestion_timestamp',
-        'connectivity_RT_ingestion_timestamp',
-        'connectivity_govt_ingestion_timestamp',
-    ]:
+    for timestamp_col_name in TIMESTAMP_COLUMNS:
         value = row.get(timestamp_col_name, None)
         if not core_utilities.is_blank_string(value):
             row[timestamp_col_name] = value.tz_localize(response_timezone)
@@ -176,6 +325,128 @@ def parse_row(row):
     return row.to_dict()
 
 
+SCHOOL_MASTER_DATA_CHUNK_SIZE = 5000
+
+
+def get_school_review_fields_data_frame(country):
+    """
+    get_school_review_fields_data_frame
+        Giga ID and the fields compared by the review detection of all the schools of the country, loaded
+        with one query. As with School.objects.filter(...).first(), the first school of a duplicate Giga ID wins.
+    """
+    schools_df = pd.DataFrame(
+        list(School.objects.filter(country=country).annotate(
+            current_latitude=Func(F('geopoint'), function='ST_Y', output_field=FloatField()),
+            current_longitude=Func(F('geopoint'), function='ST_X', output_field=FloatField()),
+        ).order_by('id').values_list(
+            'giga_id_school', 'id', 'name', 'external_id', 'admin1__giga_id_admin', 'admin2__giga_id_admin',
+            'current_latitude', 'current_longitude', 'education_level',
+        )),
+        columns=['school_id_giga', 'school_id', 'current_name', 'current_external_id', 'current_admin1_id_giga',
+                 'current_admin2_id_giga', 'current_latitude', 'current_longitude', 'current_education_level'],
+    )
+    return schools_df.drop_duplicates(subset=['school_id_giga'], keep='first')
+
+
+def get_lower_values(values):
+    """Column wise version of 'None if is_blank_string(value) else str(value).lower()'"""
+    values = values.astype(object)
+    is_blank = values.isna() | values.astype(str).str.strip().eq('')
+    return values.astype(str).str.lower().where(~is_blank)
+
+
+def get_changed_values_mask(old_values, new_values):
+    return (old_values != new_values) & ~(old_values.isna() & new_values.isna())
+
+
+def get_changed_coordinates_mask(old_values, new_values):
+    """
+    Column wise version of the coordinate check of has_changes_for_review: a coordinate has changed if the
+    integer part or the first 5 decimals of its string representation are different.
+    """
+    old_parts = old_values.astype(str).str.split('.', n=1, expand=True).reindex(columns=[0, 1]).fillna('')
+    new_parts = new_values.astype(str).str.split('.', n=1, expand=True).reindex(columns=[0, 1]).fillna('')
+
+    return get_changed_values_mask(old_values, new_values) & (
+        (old_parts[0] != new_parts[0]) | (old_parts[1].str[:5] != new_parts[1].str[:5])
+    )
+
+
+def get_review_required_mask(df):
+    """
+    get_review_required_mask
+        Column wise version of has_changes_for_review for a change frame merged with
+        get_school_review_fields_data_frame: new schools and the schools with changes in the name, government ID,
+        admin1/admin2, location or education level have to go through the review process.
+    """
+    return (
+        df['school_id'].isna() |
+        (df['school_name'].astype(str).str.lower() != df['current_name'].astype(str).str.lower()) |
+        get_changed_values_mask(get_lower_values(df['current_external_id']), get_lower_values(df['school_id_govt'])) |
+        get_changed_values_mask(get_lower_values(df['current_admin1_id_giga']),
+                                get_lower_values(df['admin1_id_giga'])) |
+        get_changed_values_mask(get_lower_values(df['current_admin2_id_giga']),
+                                get_lower_values(df['admin2_id_giga'])) |
+        get_changed_coordinates_mask(df['current_latitude'], df['latitude']) |
+        get_changed_coordinates_mask(df['current_longitude'], df['longitude']) |
+        get_changed_values_mask(get_lower_values(df['current_education_level']),
+                                get_lower_values(df['education_level']))
+    )
+
+
+def get_school_master_data_entries(df, schools_df, country):
+    """
+    get_school_master_data_entries
+        Build the SchoolMasterData rows of a chunk of the change frame.
+        1. If it is a new school, then it has to go through review process
+        2. If it is an existing school, then check for required field if it has changed.
+        if changes, then only send for review otherwise publish it directly
+        3. School can be deleted only if its already present in Giga DB
+
+    :return: tuple of inserted/updated rows and removed rows
+    """
+    change_type_col_name = DeltaSharingReader._change_type_col_name()
+
+    df = df.merge(schools_df, on='school_id_giga', how='left')
+    for col_name in ['school_id_govt', 'admin1_id_giga', 'admin2_id_giga', 'latitude', 'longitude',
+                     'education_level']:
+        if col_name not in df.columns:
+            df[col_name] = None
+
+    current_datetime = core_utilities.get_current_datetime_object()
+    is_insert = df[change_type_col_name].isin(['insert', 'update_postimage'])
+    is_remove = df[change_type_col_name].isin(['remove', 'delete']) & df['school_id'].notna()
+    is_published = is_insert & ~get_review_required_mask(df)
+
+    df.loc[is_published, 'status'] = sources_models.SchoolMasterData.ROW_STATUS_PUBLISHED
+    df.loc[is_published, 'published_at'] = current_datetime
+    df.loc[is_remove, 'status'] = sources_models.SchoolMasterData.ROW_STATUS_DELETED
+    df.loc[is_remove, 'modified'] = current_datetime
+
+    df = df[is_insert | is_remove]
+    is_remove = is_remove[df.index]
+
+    df = localize_data_frame_timestamps(df.drop(
+        columns=[change_type_col_name] + [
+            col_name for col_name in schools_df.columns if col_name.startswith('current_')],
+    ))
+    df = df.astype(object).where(df.notna(), None)
+    df['country'] = country
+
+    rows = [
+        # status and modified are only passed when they are set, otherwise the model defaults apply
+        sources_models.SchoolMasterData(**{
+            col_name: value
+            for col_name, value in row.items()
+            if value is not None or col_name not in ['status', 'modified']
+        })
+        for row in df.to_dict('records')
+    ]
+    insert_entries = [row for row, removed in zip(rows, is_remove) if not removed]
+    remove_entries = [row for row, removed in zip(rows, is_remove) if removed]
+    return insert_entries, remove_entries
+
+
 def sync_school_master_data(profile_file, share_name, schema_name, table_name, changes_for_countries, deleted_schools,
                             school_master_fields):
     country = Country.objects.filter(iso3_format=table_name, ).first()
@@ -207,13 +478,8 @@ def sync_school_master_data(profile_file, share_name, schema_name, table_name, c
                     'Hence skipping the data update for current country ({0}).'.format(country))
         return
 
-    loaded_data_df = delta_sharing.load_table_changes_as_pandas(
-        table_url,
-        table_last_data_version,
-        table_current_version,
-        None,
-        None,
-    )
+    loaded_data_df = load_table_changes(
+        table_url, share_name, schema_name, table_name, table_last_data_version, table_current_version)
     logger.debug('Total count of rows in the data: {0}'.format(len(loaded_data_df)))
 
     if len(loaded_data_df) > 0:
@@ -240,86 +506,357 @@ def sync_school_master_data(profile_file, share_name, schema_name, table_name, c
         logger.debug('All School Master API response columns to delete: {}'.format(
             list(set(df_columns) - set(school_master_fields))))
 
-        insert_entries = []
-        remove_entries = []
-
         changes_for_countries[table_name] = True
 
+        change_type_col_name = DeltaSharingReader._change_type_col_name()
+        loaded_data_df = loaded_data_df.drop(
+            columns=list(set(cols_to_delete) - {change_type_col_name}), errors='ignore')
         loaded_data_df = normalize_school_master_data_frame(loaded_data_df)
-
         loaded_data_df['version'] = table_current_version
-        loaded_data_df['country'] = country
 
-        for _, row in loaded_data_df.iterrows():
-            change_type = row[DeltaSharingReader._change_type_col_name()]
+        schools_df = get_school_review_fields_data_frame(country)
 
-            row.drop(
-                labels=cols_to_delete,
-                inplace=True,
-                errors='ignore',
-            )
+        inserted_count = 0
+        removed_schools = []
+        # All or none of the rows of the table version are written, so a failed run resumes from the same version
+        with shared_table_db_writers, transaction.atomic():
+            for start in range(0, len(loaded_data_df), SCHOOL_MASTER_DATA_CHUNK_SIZE):
+                insert_entries, remove_entries = get_school_master_data_entries(
+                    loaded_data_df.iloc[start:start + SCHOOL_MASTER_DATA_CHUNK_SIZE], schools_df, country)
 
-            if change_type in ['insert', 'update_postimage']:
-                school = School.objects.filter(
-                    country=country,
-                    giga_id_school=row['school_id_giga'],
-                ).first()
-
-                # 1. If it is a new school, then it has to go through review process
-                # 2. If it is an existing school, then check for required field if it has changed.
-                # if changes, then only send for review otherwise publish it directly
-                if school:
-                    row['school_id'] = school.id
-                    review_required = has_changes_for_review(row, school)
-                    if not review_required:
-                        row['status'] = sources_models.SchoolMasterData.ROW_STATUS_PUBLISHED
-                        row['published_at'] = core_utilities.get_current_datetime_object()
-
-                row_as_dict = parse_row(row)
-                insert_entries.append(sources_models.SchoolMasterData(**row_as_dict))
-
-                if len(insert_entries) == 5000:
-                    logger.debug('Loading the data to "SchoolMasterData" table as it has reached 5000 benchmark.')
+                logger.debug('Loading the ({0}) data to "SchoolMasterData" table.'.format(len(insert_entries)))
+                if len(insert_entries) > 0:
                     sources_models.SchoolMasterData.objects.bulk_create(insert_entries)
-                    insert_entries = []
-                    logger.debug('#' * 10)
-                    logger.debug('\n\n')
-
-            elif change_type in ['remove', 'delete']:
-                school = School.objects.filter(
-                    country=country,
-                    giga_id_school=row['school_id_giga'],
-                ).first()
-
-                # School can be deleted only if its already present in Giga DB
-                if school:
-                    row['school_id'] = school.id
-                    row['status'] = sources_models.SchoolMasterData.ROW_STATUS_DELETED
-                    row['modified'] = core_utilities.get_current_datetime_object()
-
-                    row_as_dict = parse_row(row)
-                    remove_entries.append(sources_models.SchoolMasterData(**row_as_dict))
-
-                if len(remove_entries) == 5000:
-                    logger.info('Loading the data to "SchoolMasterData" table as it has reached 5000 benchmark.')
-                    sources_models.SchoolMasterData.objects.bulk_create(remove_entries)
-                    remove_entries = []
-                    logger.debug('#' * 10)
-                    logger.debug('\n\n')
 
-        logger.info('Loading the remaining ({0}) data to "SchoolMasterData" table.'.format(len(insert_entries)))
-        if len(insert_entries) > 0:
-            sources_models.SchoolMasterData.objects.bulk_create(insert_entries)
+                logger.debug('Removing ({0}) records from "SchoolMasterData" table.'.format(len(remove_entries)))
+                if len(remove_entries) > 0:
+                    sources_models.SchoolMasterData.objects.bulk_create(remove_entries)
 
-        logger.info('Removing ({0}) records from "SchoolMasterData" table.'.format(len(remove_entries)))
-        if len(remove_entries) > 0:
-            sources_models.SchoolMasterData.objects.bulk_create(remove_entries)
+                inserted_count += len(insert_entries)
+                removed_schools.extend(
+                    [country.name + ' : ' + school_master_row.school_name for school_master_row in remove_entries])
 
-            deleted_schools.extend(
-                [country.name + ' : ' + school_master_row.school_name for school_master_row in remove_entries])
+        deleted_schools.extend(removed_schools)
+        logger.info('Loaded ({0}) rows and ({1}) removed rows to "SchoolMasterData" table.'.format(
+            inserted_count, len(removed_schools)))
     else:
         logger.info('No data to update in current table: {0}.'.format(table_name))
 
+    # Checkpoint of the loaded version
+    sources_models.SchoolMasterData.set_last_version(table_current_version, table_name)
+
+
+SCHOOL_AREA_TYPE_ENVIRONMENT_MAP = {
+    'urban': 'urban',
+    'urbana': 'urban',
+    'rural': 'rural',
+}
+
+# School fields written by the school master data publishing, including the lower case copies of School.save
+SCHOOL_MASTER_DATA_PUBLISHED_FIELDS = [
+    'external_id', 'name', 'geopoint', 'education_level', 'education_level_govt', 'environment', 'school_type',
+    'establishment_year', 'admin1', 'admin2', 'name_lower', 'education_level_lower', 'education_level_govt_lower',
+    'school_type_lower', 'modified',
+]
+
+
+def get_admin_metadata_map(country_id):
+    """
+    get_admin_metadata_map
+        CountryAdminMetadata ids of a country by (layer_name, giga_id_admin), the oldest row wins for
+        duplicated Giga IDs as with .first().
+    """
+    admin_map = {}
+    for admin_id, layer_name, giga_id_admin in CountryAdminMetadata.objects.filter(
+        country_id=country_id,
+        layer_name__in=[CountryAdminMetadata.LAYER_NAME_ADMIN1, CountryAdminMetadata.LAYER_NAME_ADMIN2],
+    ).order_by('id').values_list('id', 'layer_name', 'giga_id_admin'):
+        admin_map.setdefault((layer_name, giga_id_admin), admin_id)
+    return admin_map
+
+
+def to_true_choice(value, blank_value=None):
+    if core_utilities.is_blank_string(value):
+        return blank_value
+    return str(value).lower() in core_configs.true_choices
+
+
+def set_school_weekly_fields_from_master_row(school_weekly, row):
+    """
+    set_school_weekly_fields_from_master_row
+        Copy the static fields of a published SchoolMasterData row to the SchoolWeeklyStatus of the school.
+    """
+    school_weekly.num_students = row.num_students
+    school_weekly.num_teachers = row.num_teachers
+    school_weekly.num_classroom = row.num_classrooms
+    school_weekly.num_latrines = row.num_latrines
+    school_weekly.running_water = to_true_choice(row.water_availability, blank_value=False)
+    school_weekly.electricity_availability = to_true_choice(row.electricity_availability, blank_value=False)
+    school_weekly.computer_lab = to_true_choice(row.computer_lab, blank_value=False)
+    school_weekly.num_computers = row.num_computers
+
+    school_weekly.connectivity = to_true_choice(row.connectivity_govt)
+    school_weekly.connectivity_type = row.connectivity_type_govt or 'unknown'
+    school_weekly.coverage_availability = to_true_choice(row.cellular_coverage_availability)
+
+    coverage_type = statistics_models.SchoolWeeklyStatus.COVERAGE_UNKNOWN
+    if not core_utilities.is_blank_string(row.cellular_coverage_type):
+        coverage_type_in_lower = str(row.cellular_coverage_type).lower()
+        if coverage_type_in_lower in dict(statistics_models.SchoolWeeklyStatus.COVERAGE_TYPES).keys():
+            coverage_type = coverage_type_in_lower
+        elif coverage_type_in_lower in ['no service', 'no coverage', 'no']:
+            coverage_type = statistics_models.SchoolWeeklyStatus.COVERAGE_NO
+
+    school_weekly.coverage_type = coverage_type
+
+    school_weekly.download_speed_contracted = row.download_speed_contracted
+    school_weekly.num_computers_desired = row.num_computers_desired
+    school_weekly.electricity_type = row.electricity_type
+    school_weekly.num_adm_personnel = row.num_adm_personnel
+
+    school_weekly.fiber_node_distance = row.fiber_node_distance
+    school_weekly.microwave_node_distance = row.microwave_node_distance
+
+    school_weekly.schools_within_1km = row.schools_within_1km
+    school_weekly.schools_within_2km = row.schools_within_2km
+    school_weekly.schools_within_3km = row.schools_within_3km
+
+    school_weekly.nearest_lte_distance = row.nearest_LTE_distance
+    school_weekly.nearest_umts_distance = row.nearest_UMTS_distance
+    school_weekly.nearest_gsm_distance = row.nearest_GSM_distance
+    school_weekly.nearest_nr_distance = row.nearest_NR_distance
+
+    school_weekly.pop_within_1km = row.pop_within_1km
+    school_weekly.pop_within_2km = row.pop_within_2km
+    school_weekly.pop_within_3km = row.pop_within_3km
+
+    school_weekly.school_data_source = row.school_data_source
+    school_weekly.school_data_collection_year = row.school_data_collection_year
+    school_weekly.school_data_collection_modality = row.school_data_collection_modality
+    school_weekly.school_location_ingestion_timestamp = row.school_location_ingestion_timestamp
+    school_weekly.connectivity_govt_ingestion_timestamp = row.connectivity_govt_ingestion_timestamp
+    school_weekly.connectivity_govt_collection_year = row.connectivity_govt_collection_year
+    school_weekly.disputed_region = to_true_choice(row.disputed_region, blank_value=False)
+
+    download_speed_benchmark = row.download_speed_benchmark
+    if download_speed_benchmark:
+        # convert Mbps to bps
+        school_weekly.download_speed_benchmark = download_speed_benchmark * 1000 * 1000
+
+    school_weekly.num_students_girls = row.num_students_girls
+    school_weekly.num_students_boys = row.num_students_boys
+    school_weekly.num_students_other = row.num_students_other
+    school_weekly.num_teachers_female = row.num_teachers_female
+    school_weekly.num_teachers_male = row.num_teachers_male
+    school_weekly.num_tablets = row.num_tablets
+    school_weekly.num_robotic_equipment = row.num_robotic_equipment
+
+    school_weekly.computer_availability = to_true_choice(row.computer_availability)
+    school_weekly.teachers_trained = to_true_choice(row.teachers_trained)
+    school_weekly.sustainable_business_model = to_true_choice(row.sustainable_business_model)
+    school_weekly.device_availability = to_true_choice(row.device_availability)
+
+    school_weekly.building_id_govt = row.building_id_govt
+    school_weekly.num_schools_per_building = row.num_schools_per_building
+
+
+def get_published_school(row, school, admin_map):
+    if not school:
+        school = School(giga_id_school=row.school_id_giga, country_id=row.country_id)
+
+    environment = row.school_area_type.lower() if not core_utilities.is_blank_string(row.school_area_type) else ''
+
+    school.external_id = row.school_id_govt
+    school.name = row.school_name
+    school.geopoint = Point(x=row.longitude, y=row.latitude)
+    school.education_level = '' if core_utilities.is_blank_string(row.education_level) else row.education_level
+    school.education_level_govt = row.education_level_govt
+    school.environment = SCHOOL_AREA_TYPE_ENVIRONMENT_MAP.get(environment, '')
+    school.school_type = '' if core_utilities.is_blank_string(row.school_funding_type) else row.school_funding_type
+    school.establishment_year = row.school_establishment_year
+    school.admin1_id = None if core_utilities.is_blank_string(row.admin1_id_giga) else admin_map.get(
+        (CountryAdminMetadata.LAYER_NAME_ADMIN1, row.admin1_id_giga))
+    school.admin2_id = None if core_utilities.is_blank_string(row.admin2_id_giga) else admin_map.get(
+        (CountryAdminMetadata.LAYER_NAME_ADMIN2, row.admin2_id_giga))
+    school.normalize_fields()
+    return school
+
+
+def get_published_school_weekly(school_id, current_weekly, latest_weekly, year, week, current_datetime):
+    if current_weekly:
+        return current_weekly
+
+    if latest_weekly:
+        # copy latest available one
+        school_weekly = latest_weekly
+        school_weekly.id = None
+        school_weekly.created = current_datetime
+
+        for field_name in CONNECTIVITY_STATISTICS_FIELDS:
+            setattr(school_weekly, field_name, None)
+    else:
+        school_weekly = statistics_models.SchoolWeeklyStatus(school_id=school_id, created=current_datetime)
+
+    school_weekly.year = year
+    school_weekly.week = week
+    school_weekly.date = school_weekly.get_date()
+    return school_weekly
+
+
+def replay_published_schools_post_save(schools, created_school_ids):
+    """
+    replay_published_schools_post_save
+        bulk_create and bulk_update do not send the School post_save signal which keeps the integration status
+        and the school counts of CountryWeeklyStatus in sync, so it is replayed once per country and the
+        counts are incremented for all the created schools in one UPDATE.
+    """
+    schools_by_country = OrderedDict()
+    for school in schools:
+        schools_by_country.setdefault(school.country_id, []).append(school)
+
+    for country_id, country_schools in schools_by_country.items():
+        created_schools = [school for school in country_schools if school.id in created_school_ids]
+        sample_school = created_schools[0] if len(created_schools) > 0 else country_schools[0]
+        sample_school.refresh_from_db(fields=['last_weekly_status'])
+
+        change_integration_status_country(instance=sample_school, created=len(created_schools) > 0)
+
+        if len(created_schools) > 1:
+            statistics_models.CountryWeeklyStatus.objects.filter(
+                country_id=country_id,
+                year=sample_school.last_weekly_status.year,
+                week=sample_school.last_weekly_status.week,
+            ).update(
+                schools_total=F('schools_total') + len(created_schools) - 1,
+                schools_connectivity_unknown=F('schools_connectivity_unknown') + len(created_schools) - 1,
+            )
+
+
+def publish_school_master_data_rows(rows, admin_maps=None):
+    """
+    publish_school_master_data_rows
+        Publish a chunk of SchoolMasterData rows with a fixed number of bulk statements instead of ~10 queries
+        per row: schools, their weekly row of the current week and their real time registration are upserted
+        with bulk_create/bulk_update and the rows are marked as read in one UPDATE (plus their history rows).
+        For multiple rows of the same school the last one wins, as with the row by row publishing.
+
+    :param rows: list of published SchoolMasterData rows
+    :param admin_maps: CountryAdminMetadata maps by country id (see get_admin_metadata_map), shared between chunks
+    :return: tuple of published school ids and created school ids
+    """
+    admin_maps = {} if admin_maps is None else admin_maps
+    current_datetime = core_utilities.get_current_datetime_object()
+    year, week = current_datetime.date().isocalendar()[:2]
+
+    rows_by_school = OrderedDict()
+    for row in rows:
+        rows_by_school.setdefault((row.country_id, row.school_id_giga), []).append(row)
+
+    existing_schools = {
+        (school.country_id, school.giga_id_school): school
+        for school in School.objects.filter(
+            country_id__in={country_id for country_id, _ in rows_by_school},
+            giga_id_school__in={giga_id_school for _, giga_id_school in rows_by_school},
+        )
+    }
+
+    schools = OrderedDict()
+    for key, school_rows in rows_by_school.items():
+        country_id = key[0]
+        if country_id not in admin_maps:
+            admin_maps[country_id] = get_admin_metadata_map(country_id)
+        schools[key] = get_published_school(school_rows[-1], existing_schools.get(key), admin_maps[country_id])
+
+    with transaction.atomic():
+        schools_to_create = [school for school in schools.values() if school.id is None]
+        schools_to_update = [school for school in schools.values() if school.id is not None]
+
+        School.objects.bulk_create(schools_to_create)
+        for school in schools_to_update:
+            school.modified = current_datetime
+        School.objects.bulk_update(schools_to_update, SCHOOL_MASTER_DATA_PUBLISHED_FIELDS)
+
+        school_ids = [school.id for school in schools.values()]
+        created_school_ids = [school.id for school in schools_to_create]
+
+        current_weekly = {
+            school_weekly.school_id: school_weekly
+            for school_weekly in statistics_models.SchoolWeeklyStatus.objects.filter(
+                school_id__in=school_ids, year=year, week=week,
+            ).order_by('id')
+        }
+        latest_weekly = {
+            school_weekly.school_id: school_weekly
+            for school_weekly in statistics_models.SchoolWeeklyStatus.objects.filter(
+                school_id__in=[school_id for school_id in school_ids if school_id not in current_weekly],
+            ).order_by('school_id', '-id').distinct('school_id')
+        }
+
+        weekly_rows = []
+        for key, school in schools.items():
+            school_weekly = get_published_school_weekly(school.id, current_weekly.get(school.id),
+                                                        latest_weekly.get(school.id), year, week, current_datetime)
+            set_school_weekly_fields_from_master_row(school_weekly, rows_by_school[key][-1])
+            school_weekly.modified = current_datetime
+            weekly_rows.append(school_weekly)
+
+        statistics_models.SchoolWeeklyStatus.objects.bulk_create(
+            [school_weekly for school_weekly in weekly_rows if school_weekly.id is None])
+        statistics_models.SchoolWeeklyStatus.objects.bulk_update(
+            [school_weekly for school_weekly in weekly_rows if school_weekly.id is not None],
+            [field.name for field in statistics_models.SchoolWeeklyStatus._meta.concrete_fields
+             if not field.primary_key and field.name not in ['school', 'year', 'week', 'date', 'created']],
+        )
+        update_school_last_weekly_status([school_weekly.id for school_weekly in weekly_rows])
+
+        rt_rows = {}
+        for key, school in schools.items():
+            row = rows_by_school[key][-1]
+            rt_registered = to_true_choice(row.connectivity_RT)
+            if rt_registered is not None and row.connectivity_RT_ingestion_timestamp is not None:
+                rt_rows[school.id] = (rt_registered, row)
+
+        latest_rt_registrations = {
+            rt_instance.school_id: rt_instance
+            for rt_instance in statistics_models.SchoolRealTimeRegistration.objects.filter(
+                school_id__in=list(rt_rows.keys()),
+            ).order_by('created', 'id')
+        }
+
+        rt_registrations_to_create = []
+        rt_registrations_to_update = []
+        for school_id, (rt_registered, row) in rt_rows.items():
+            rt_instance = latest_rt_registrations.get(school_id)
+            if rt_instance:
+                rt_registrations_to_update.append(rt_instance)
+            else:
+                rt_instance = statistics_models.SchoolRealTimeRegistration(school_id=school_id)
+                rt_registrations_to_create.append(rt_instance)
+
+            rt_instance.rt_registered = rt_registered
+            rt_instance.rt_registration_date = row.connectivity_RT_ingestion_timestamp
+            rt_instance.rt_source = row.connectivity_RT_datasource
+            rt_instance.last_modified_at = current_datetime
+
+        statistics_models.SchoolRealTimeRegistration.objects.bulk_create(rt_registrations_to_create)
+        statistics_models.SchoolRealTimeRegistration.objects.bulk_update(
+            rt_registrations_to_update, ['rt_registered', 'rt_registration_date', 'rt_source', 'last_modified_at'])
+
+        replay_published_schools_post_save(list(schools.values()), set(created_school_ids))
+
+        published_rows = []
+        for key, school_rows in rows_by_school.items():
+            for row in school_rows:
+                row.is_read = True
+                row.school = schools[key]
+                row.modified = current_datetime
+                published_rows.append(row)
+
+        bulk_update_with_history(published_rows, sources_models.SchoolMasterData, ['is_read', 'school', 'modified'],
+                                 batch_size=1000, default_date=current_datetime)
+
+    return school_ids, created_school_ids
+
 
 def get_request_headers(request_configs):
     source_request_headers = request_configs.get('headers', {})
@@ -349,7 +886,39 @@ def get_request_headers(request_configs):
     return source_request_headers
 
 
-def load_daily_check_app_data_source_response_to_model(model, request_configs):
+def get_pooled_session(pool_size):
+    """
+    get_pooled_session
+        requests Session with keep-alive connections for pool_size concurrent requests, retrying the failed
+        GET requests with an exponential backoff (DAILY_CHECK_APP FETCH_RETRIES and FETCH_BACKOFF_FACTOR).
+    """
+    dca_settings = ds_settings.get('DAILY_CHECK_APP')
+    retry = Retry(
+        total=dca_settings.get('FETCH_RETRIES'),
+        backoff_factor=dca_settings.get('FETCH_BACKOFF_FACTOR'),
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET'],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_page_url(request_configs, page_no, page_size):
+    source_url = request_configs.get('url')
+    if request_configs.get('query_params'):
+        source_url = add_url_params(source_url, {
+            param: value.format(page_no=page_no, page_size=page_size)
+            for param, value in request_configs.get('query_params').items()
+        })
+    return source_url
+
+
+def load_daily_check_app_data_source_response_to_model(model, request_configs, concurrency=None):
     """
     "request_config": {
         "url": "https://uni-connect-services-dev.azurewebsites.net/api/v1/measurements",
@@ -360,58 +929,91 @@ def load_daily_check_app_data_source_response_to_model(model, request_configs):
             "Content-Type": "application/json"
         }
     },
+
+    Pages are fetched over one pooled session with up to `concurrency` (default: DAILY_CHECK_APP FETCH_CONCURRENCY)
+    requests in flight. They are written in page order through a BulkInsertSink until the first empty page, so
+    memory is bounded by the pages in flight whatever the backlog.
+    Without query_params the URL is not paginated and it is fetched once.
     """
     source_request_headers = get_request_headers(request_configs)
-
-    page_no = 0
     page_size = request_configs.get('data_limit', 1000)
 
-    has_more_data = True
+    paginated = bool(request_configs.get('query_params'))
+    if concurrency is None:
+        concurrency = ds_settings.get('DAILY_CHECK_APP').get('FETCH_CONCURRENCY')
+    concurrency = max(1, concurrency) if paginated else 1
 
-    insert_entries = []
-    new_params = {}
+    logger.debug('Request header: {0}'.format(source_request_headers))
 
-    while has_more_data:
-        logger.debug('#' * 10)
-        source_url = request_configs.get('url')
+    session = get_pooled_session(concurrency)
 
-        if request_configs.get('query_params'):
-            for param, value in request_configs.get('query_params').items():
-                new_params[param] = value.format(page_no=page_no, page_size=page_size)
+    def _fetch(page_no):
+        source_url = get_page_url(request_configs, page_no, page_size)
+        logger.debug('Executing the request URL: {0}'.format(source_url))
+        return session.get(source_url, headers=source_request_headers)
 
-            page_no += 1
-            source_url = add_url_params(request_configs.get('url'), new_params)
+    try:
+        with db_utilities.BulkInsertSink(model) as sink, ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pages_in_flight = OrderedDict((page_no, executor.submit(_fetch, page_no)) for page_no in range(concurrency))
+            next_page_no = concurrency
 
-        logger.debug('Executing the request URL: {0}'.format(source_url))
-        logger.debug('Request header: {0}'.format(source_request_headers))
+            while len(pages_in_flight) > 0:
+                page_no, future = pages_in_flight.popitem(last=False)
+                response = future.result()
 
-        response = requests.get(source_url, headers=source_request_headers)
+                if response.status_code != status.HTTP_200_OK:
+                    logger.error('Invalid response received for page {0}: {1}'.format(page_no, response))
+                    break
 
-        if response.status_code != status.HTTP_200_OK:
-            logger.error('Invalid response received {0}'.format(response))
-            return
+                response_data = response.json()
+                if len(response_data) == 0:
+                    logger.debug('No records to read further.')
+                    break
 
-        response_data = response.json()
+                for data in response_data:
+                    if not data.get('created_at', None):
+                        data['created_at'] = data.get('timestamp')
+                    sink.add(model(**data))
 
-        if len(response_data) == 0:
-            logger.debug('No records to read further.')
-            has_more_data = False
-        else:
-            for data in response_data:
-                if not data.get('created_at', None):
-                    data['created_at'] = data.get('timestamp')
-                insert_entries.append(model(**data))
+                if paginated:
+                    pages_in_flight[next_page_no] = executor.submit(_fetch, next_page_no)
+                    next_page_no += 1
+
+            # Pages past the last one are not needed anymore
+            for future in pages_in_flight.values():
+                future.cancel()
+    finally:
+        # Also on a failed page, so the pooled connections are not left open
+        session.close()
+
+    logger.info('Loaded ({0}) rows to "{1}" table.'.format(sink.total_count, model.__name__))
 
-        if len(insert_entries) >= 5000:
-            logger.info('Loading the data to "{0}" table as it has reached 5000 benchmark.'.format(model.__name__))
-            model.objects.bulk_create(insert_entries)
-            insert_entries = []
-            logger.debug('#' * 10)
-            logger.debug('\n\n')
 
-    logger.info('Loading the remaining ({0}) data to "{1}" table.'.format(len(insert_entries), model.__name__))
-    if len(insert_entries) > 0:
-        model.objects.bulk_create(insert_entries)
+def get_dailycheckapp_school_maps(measurements):
+    """
+    get_dailycheckapp_school_maps
+        Resolve the schools of all the measurements with two queries. Daily Check App measurements are mapped by
+        Giga ID. MLab measurements are mapped by government school ID within the country of the measurement,
+        or within all the countries when the country code is unknown.
+
+    :return: tuple of {giga_id_school: school_id}, {external_id: school_id} and
+    {(country_code, external_id): school_id}
+    """
+    dcm_schools = dict(School.objects.filter(
+        giga_id_school__in=measurements.filter(source__iexact='DailyCheckApp').values('giga_id_school'),
+    ).order_by('id').values_list('giga_id_school', 'id'))
+
+    mlab_schools = {}
+    mlab_country_schools = {}
+    for country_code, external_id, school_id in School.objects.filter(
+        external_id__in=measurements.filter(source__iexact='MLab').values('school_id'),
+    ).order_by('id').values_list('country__code', 'external_id', 'id'):
+        mlab_schools[external_id] = school_id
+        mlab_country_schools[(country_code, external_id)] = school_id
+
+    logger.debug('Mapped schools in DailyCheckApp: {0}, Mapped schools in MLab: {1}'.format(
+        len(dcm_schools), len(mlab_schools)))
+    return dcm_schools, mlab_schools, mlab_country_schools
 
 
 def sync_dailycheckapp_realtime_data():
@@ -450,100 +1052,132 @@ def sync_dailycheckapp_realtime_data():
     logger.debug('Migrating the records from "DailyCheckAppMeasurementData" to "RealTimeConnectivity" '
                  'with date range: {0} - {1}'.format(last_measurement_date, current_datetime))
 
-    realtime = []
-
-    countries = set(dailycheckapp_measurements.values_list(
-        'country_code', flat=True,
-    ).order_by('country_code'))
-
-    for country_code in countries:
-        logger.debug('Current Country Code: {}'.format(country_code))
-        if country_code:
-            country = Country.objects.filter(code=country_code).first()
-        else:
-            country = None
-
-        dcm_giga_ids = set(dailycheckapp_measurements.filter(
-            country_code=country_code,
-            source__iexact='DailyCheckApp',
-        ).values_list('giga_id_school', flat=True).order_by('giga_id_school'))
-
-        dcm_schools = {
-            school.giga_id_school: school
-            for school in School.objects.filter(giga_id_school__in=dcm_giga_ids)
-        }
-        logger.debug('Total schools in DailyCheckApp: {0}, Successfully mapped schools: {1}'.format(
-            len(dcm_giga_ids), len(dcm_schools)))
-
-        mlab_school_ids = set(dailycheckapp_measurements.filter(
-            country_code=country_code,
-            source__iexact='MLab',
-        ).values_list('school_id', flat=True).order_by('school_id'))
+    dcm_schools, mlab_schools, mlab_country_schools = get_dailycheckapp_school_maps(dailycheckapp_measurements)
+    known_country_codes = set(Country.objects.filter(
+        code__in=dailycheckapp_measurements.values('country_code'),
+    ).values_list('code', flat=True))
 
-        schools_qs = School.objects
-        if country:
-            schools_qs = schools_qs.filter(country=country)
-
-        mlab_schools = {
-            school.external_id: school
-            for school in schools_qs.filter(external_id__in=mlab_school_ids)
-        }
-        logger.debug('Total schools in MLab: {0}, Successfully mapped schools: {1}'.format(
-            len(mlab_school_ids), len(mlab_schools)))
-
-        for dailycheckapp_measurement in dailycheckapp_measurements.filter(country_code=country_code):
-            if str(dailycheckapp_measurement.source).lower() == 'dailycheckapp':
-                giga_id_school = dailycheckapp_measurement.giga_id_school
-                if giga_id_school not in dcm_schools:
+    # not using aggregate because there can be new entries between two operations
+    last_update = None
+    dirty_keys = set()
+
+    with db_utilities.BulkInsertSink(RealTimeConnectivity) as realtime:
+        for dailycheckapp_measurement in dailycheckapp_measurements.values(
+            'created_at', 'timestamp', 'source', 'giga_id_school', 'school_id', 'country_code',
+            'download', 'upload', 'latency',
+        ).order_by().iterator(chunk_size=5000):
+            if last_update is None or dailycheckapp_measurement['created_at'] > last_update:
+                last_update = dailycheckapp_measurement['created_at']
+
+            country_code = dailycheckapp_measurement['country_code']
+            if str(dailycheckapp_measurement['source']).lower() == 'dailycheckapp':
+                giga_id_school = dailycheckapp_measurement['giga_id_school']
+                school_id = dcm_schools.get(giga_id_school)
+                if school_id is None:
                     logger.debug(f'skipping DCM unknown school Country Code: {country_code}, '
                                  f'Giga ID: {giga_id_school}')
                     continue
-                school = dcm_schools[giga_id_school]
             else:
-                school_id = dailycheckapp_measurement.school_id
-                if school_id not in mlab_schools:
+                govt_school_id = dailycheckapp_measurement['school_id']
+                if country_code in known_country_codes:
+                    school_id = mlab_country_schools.get((country_code, govt_school_id))
+                else:
+                    school_id = mlab_schools.get(govt_school_id)
+
+                if school_id is None:
                     logger.debug(f'skipping MLab unknown school Country Code: {country_code}, '
-                                 f'Govt School ID: {school_id}')
+                                 f'Govt School ID: {govt_school_id}')
                     continue
-                school = mlab_schools[school_id]
 
-            connectivity_speed = dailycheckapp_measurement.download
+            connectivity_speed = dailycheckapp_measurement['download']
             if connectivity_speed:
                 # kb/s -> b/s
                 connectivity_speed = connectivity_speed * 1000
 
-            connectivity_upload_speed = dailycheckapp_measurement.upload
+            connectivity_upload_speed = dailycheckapp_measurement['upload']
             if connectivity_upload_speed:
                 # kb/s -> b/s
                 connectivity_upload_speed = connectivity_upload_speed * 1000
 
-            realtime.append(RealTimeConnectivity(
-                created=dailycheckapp_measurement.timestamp,
+            realtime.add(RealTimeConnectivity(
+                created=dailycheckapp_measurement['timestamp'],
                 connectivity_speed=connectivity_speed,
                 connectivity_upload_speed=connectivity_upload_speed,
-                connectivity_latency=dailycheckapp_measurement.latency,
-                school=school,
+                connectivity_latency=dailycheckapp_measurement['latency'],
+                school_id=school_id,
                 live_data_source=statistics_configs.DAILY_CHECK_APP_MLAB_SOURCE,
             ))
+            dirty_keys.add((
+                school_id,
+                timezone.localtime(dailycheckapp_measurement['timestamp']).date(),
+                statistics_configs.DAILY_CHECK_APP_MLAB_SOURCE,
+            ))
 
-            if len(realtime) == 5000:
-                logger.info('Loading the data to "RealTimeConnectivity" table as it has reached 5000 benchmark.')
-                RealTimeConnectivity.objects.bulk_create(realtime)
-                realtime = []
-
-    logger.info('Loading the remaining ({0}) data to "RealTimeConnectivity" table.'.format(len(realtime)))
-    if len(realtime) > 0:
-        RealTimeConnectivity.objects.bulk_create(realtime)
+    logger.info('Loaded ({0}) rows to "RealTimeConnectivity" table.'.format(realtime.total_count))
+    mark_school_days_dirty(dirty_keys)
 
-    # not using aggregate because there can be new entries between two operations
-    if dailycheckapp_measurements:
-        last_update = max((m.created_at for m in dailycheckapp_measurements))
-    else:
+    if last_update is None:
         last_update = current_datetime
     sources_models.DailyCheckAppMeasurementData.set_last_dailycheckapp_measurement_date(last_update)
 
 
-def load_qos_data_source_response_to_model(changes_for_countries):
+def sync_qos_data(profile_file, share_name, schema_name, table_name, changes_for_countries, qos_model_fields):
+    country = Country.objects.filter(iso3_format=table_name).first()
+    logger.debug('Country object: {0}'.format(country))
+
+    if not country:
+        logger.error('Country with ISO3 Format ({0}) not found in DB. '
+                     'Hence skipping the load for current table.'.format(table_name))
+        return
+
+    table_last_data_version = sources_models.QoSData.get_last_version(table_name)
+    logger.debug('Table last data version present in DB: {0}'.format(table_last_data_version))
+
+    # Create an url to access a shared table.
+    # A table path is the profile file path following with `#` and the fully qualified name of a table
+    # (`<share-name>.<schema-name>.<table-name>`).
+    table_url = profile_file + "#{share_name}.{schema_name}.{table_name}".format(
+        share_name=share_name,
+        schema_name=schema_name,
+        table_name=table_name,
+    )
+    logger.debug('Table URL: %s', table_url)
+
+    table_current_version = delta_sharing.get_table_version(table_url)
+    logger.debug('Table current version from API: {0}'.format(table_current_version))
+
+    if table_last_data_version == table_current_version:
+        logger.info('Both QoS data version in DB and Table version from API, are same. '
+                    'Hence skipping the data update for current country ({0}).'.format(country))
+        return
+
+    if not table_last_data_version:
+        # In case if its 1st pull, then pull only last 10 version's data at max
+        # This is the case when we have restored the DB dump and running the task first time
+        table_last_data_version = int(max(-1, table_current_version - 10))
+
+    version_list = list(range(table_last_data_version + 1, table_current_version + 1))
+    for version in version_list:
+        loaded_data_df = load_table_version_changes(table_url, share_name, schema_name, table_name, version)
+        logger.debug('Total count of rows in the {0} version data: {1}'.format(version, len(loaded_data_df)))
+        loaded_data_df = loaded_data_df[loaded_data_df[DeltaSharingReader._change_type_col_name()].isin(
+            ['insert', 'update_postimage'])]
+
+        logger.debug(
+            'Total count of rows after filtering only ["insert", "update_postimage"] in the "{0}" '
+            'version data: {1}'.format(version, len(loaded_data_df)))
+
+        if len(loaded_data_df) > 0:
+            changes_for_countries[table_name] = True
+            load_qos_data_frame_to_model(loaded_data_df, country, version, qos_model_fields)
+
+        # Checkpoint of the version, a failed run resumes with the next one
+        sources_models.QoSData.set_last_version(version, table_name)
+    else:
+        logger.info('No data to update in current table: {0}.'.format(table_name))
+
+
+def load_qos_data_source_response_to_model(changes_for_countries, task_instance=None):
     qos_ds_settings = ds_settings.get('QOS')
 
     share_name = qos_ds_settings['SHARE_NAME']
@@ -577,124 +1211,20 @@ def load_qos_data_source_response_to_model(changes_for_countries):
 
             qos_model_fields = [f.name for f in sources_models.QoSData._meta.get_fields()]
 
+            table_names = []
             for schema_table in schema_tables:
-                logger.debug('#' * 10)
-                logger.debug('Table: %s', schema_table)
-
-                table_name = schema_table.name
-
-                try:
-                    country = Country.objects.filter(iso3_format=table_name).first()
-                    logger.debug('Country object: {0}'.format(country))
-
-                    if not country:
-                        logger.error('Country with ISO3 Format ({0}) not found in DB. '
-                                     'Hence skipping the load for current table.'.format(table_name))
-                        continue
-
-                    if len(country_codes_for_exclusion) > 0 and table_name in country_codes_for_exclusion:
-                        logger.warning('Country with ISO3 Format ({0}) asked to exclude in PROCO DB. '
-                                       'Hence skipping the load for current table.'.format(table_name))
-                        continue
-
-                    table_last_data_version = sources_models.QoSData.get_last_version(table_name)
-                    logger.debug('Table last data version present in DB: {0}'.format(table_last_data_version))
-
-                    # Create an url to access a shared table.
-                    # A table path is the profile file path following with `#` and the fully qualified name of a table
-                    # (`<share-name>.<schema-name>.<table-name>`).
-                    table_url = profile_file + "#{share_name}.{schema_name}.{table_name}".format(
-                        share_name=share_name,
-                        schema_name=schema_name,
-                        table_name=table_name,
-                    )
-                    logger.debug('Table URL: %s', table_url)
-
-                    table_current_version = delta_sharing.get_table_version(table_url)
-                    logger.debug('Table current version from API: {0}'.format(table_current_version))
-
-                    if table_last_data_version == table_current_version:
-                        logger.info('Both QoS data version in DB and Table version from API, are same. '
-                                    'Hence skipping the data update for current country ({0}).'.format(country))
-                        continue
-
-                    if not table_last_data_version:
-                        # In case if its 1st pull, then pull only last 10 version's data at max
-                        # This is the case when we have restored the DB dump and running the task first time
-                        table_last_data_version = int(max(-1, table_current_version - 10))
-
-                    version_list = list(range(table_last_data_version + 1, table_current_version + 1))
-                    for version in version_list:
-                        loaded_data_df = delta_sharing.load_table_changes_as_pandas(
-                            table_url,
-                            version,
-                            version,
-                            None,
-                            None,
-                        )
-                        logger.debug(
-                            'Total count of rows in the {0} version data: {1}'.format(version, len(loaded_data_df)))
-                        loaded_data_df = loaded_data_df[loaded_data_df[DeltaSharingReader._change_type_col_name()].isin(
-                            ['insert', 'update_postimage'])]
-
-                        logger.debug(
-                            'Total count of rows after filtering only ["insert", "update_postimage"] in the "{0}" '
-                            'version data: {1}'.format(version, len(loaded_data_df)))
-
-                        if len(loaded_data_df) > 0:
-                            insert_entries = []
-
-                            changes_for_countries[table_name] = True
-
-                            df_columns = list(loaded_data_df.columns.tolist())
-                            cols_to_delete = list(set(df_columns) - set(qos_model_fields)) + ['id', 'created',
-                                                                                              'modified', 'school_id',
-                                                                                              'country_id',
-                                                                                              'modified_by', ]
-                            logger.debug('All QoS API response columns: {}'.format(df_columns))
-                            logger.debug('All QoS API response columns to delete: {}'.format(
-                                list(set(df_columns) - set(qos_model_fields))))
-
-                            loaded_data_df.drop(columns=cols_to_delete, inplace=True, errors='ignore', )
-
-                            loaded_data_df = normalize_qos_data_frame(loaded_data_df)
-
-                            loaded_data_df['version'] = version
-                            loaded_data_df['country'] = country
-
-                            for _, row in loaded_data_df.iterrows():
-                                school = School.objects.filter(
-                                    country=country, giga_id_school=row['school_id_giga'],
-                                ).first()
-
-                                if not school:
-                                    logger.warning(
-                                        'School with Giga ID ({0}) not found in PROCO DB. '
-                                        'Hence skipping the load for current school.'.format(row['school_id_giga']))
-                                    continue
-
-                                row['school'] = school
-
-                                row_as_dict = parse_row(row)
-                                insert_entries.append(row_as_dict)
-
-                                if len(insert_entries) == 5000:
-                                    logger.info('Loading the data to "QoSData" table as it has reached 5000 benchmark.')
-                                    core_utilities.bulk_create_or_update(insert_entries, sources_models.QoSData,
-                                                                         ['school', 'timestamp'])
-                                    insert_entries = []
-                                    logger.debug('#' * 10)
-                                    logger.debug('\n\n')
-
-                            logger.info(
-                                'Loading the remaining ({0}) data to "QoSData" table.'.format(len(insert_entries)))
-                            if len(insert_entries) > 0:
-                                core_utilities.bulk_create_or_update(insert_entries, sources_models.QoSData,
-                                                                     ['school', 'timestamp'])
-                    else:
-                        logger.info('No data to update in current table: {0}.'.format(table_name))
-                except Exception as ex:
-                    logger.error('Exception caught for "{0}": {1}'.format(schema_table.name, str(ex)))
+                if len(country_codes_for_exclusion) > 0 and schema_table.name in country_codes_for_exclusion:
+                    logger.warning('Country with ISO3 Format ({0}) asked to exclude in PROCO DB. '
+                                   'Hence skipping the load for current table.'.format(schema_table.name))
+                    continue
+                table_names.append(schema_table.name)
+
+            sync_shared_tables(
+                table_names,
+                lambda table_name: sync_qos_data(
+                    profile_file, share_name, schema_name, table_name, changes_for_countries, qos_model_fields),
+                task_instance=task_instance,
+            )
         else:
             logger.error('QoS schema ({0}) does not exist to use for share ({1}).'.format(schema_name, share_name))
     else:
@@ -706,7 +1236,47 @@ def load_qos_data_source_response_to_model(changes_for_countries):
         pass
 
 
+# RealTimeConnectivity column: (QoSData column, speed in Mbps to convert to bps)
+QOS_REALTIME_CONNECTIVITY_COLUMNS = OrderedDict([
+    ('connectivity_speed', ('speed_download', True)),
+    ('connectivity_upload_speed', ('speed_upload', True)),
+    ('connectivity_latency', ('latency', False)),
+    ('connectivity_speed_probe', ('speed_download_probe', True)),
+    ('connectivity_upload_speed_probe', ('speed_upload_probe', True)),
+    ('connectivity_latency_probe', ('latency_probe', False)),
+    ('connectivity_speed_mean', ('speed_download_mean', True)),
+    ('connectivity_upload_speed_mean', ('speed_upload_mean', True)),
+    ('roundtrip_time', ('roundtrip_time', False)),
+    ('jitter_download', ('jitter_download', False)),
+    ('jitter_upload', ('jitter_upload', False)),
+    ('rtt_packet_loss_pct', ('rtt_packet_loss_pct', False)),
+])
+
+
+def get_qos_realtime_connectivity_values(aggregate=None):
+    """
+    get_qos_realtime_connectivity_values
+        SQL expressions of the QOS_REALTIME_CONNECTIVITY_COLUMNS values from the QoSData row "q",
+        optionally wrapped in an aggregate function. Speeds are converted from Mbps to bps.
+    """
+    values = []
+    for qos_column, is_speed in QOS_REALTIME_CONNECTIVITY_COLUMNS.values():
+        value = 'q."{0}"'.format(qos_column)
+        if aggregate:
+            value = '{0}({1})'.format(aggregate, value)
+        if is_speed:
+            value = '{0} * 1000 * 1000'.format(value)
+        values.append(value)
+    return ', '.join(values)
+
+
 def sync_qos_realtime_data(country_id):
+    """
+    sync_qos_realtime_data
+        Copy the QoS measurements of the country received since the last QoS RealTimeConnectivity row with one
+        INSERT ... SELECT, one row per (timestamp, school). The rows never go through the Python process.
+        The same statement records the copied (school, date) keys in DirtySchoolDay for the next aggregation.
+    """
     current_datetime = core_utilities.get_current_datetime_object()
 
     last_entry_date = RealTimeConnectivity.objects.filter(
@@ -717,76 +1287,47 @@ def sync_qos_realtime_data(country_id):
     if not last_entry_date:
         last_entry_date = current_datetime - timedelta(days=1)
 
-    qos_measurements = sources_models.QoSData.objects.filter(
-        timestamp__gt=last_entry_date,
-        timestamp__lte=current_datetime,
-        country_id=country_id,
-    ).values(
-        'timestamp', 'speed_download', 'speed_upload', 'latency', 'school',
-        'roundtrip_time', 'jitter_download', 'jitter_upload', 'rtt_packet_loss_pct',
-        'speed_download_probe', 'speed_upload_probe', 'latency_probe',
-        'speed_download_mean', 'speed_upload_mean',
-    ).order_by('timestamp').distinct(*['timestamp', 'school'])
-
     logger.debug('Migrating the records from "QoSData" to "RealTimeConnectivity" with date range: {0} - {1}'.format(
         last_entry_date, current_datetime))
 
-    realtime = []
-
-    for qos_measurement in qos_measurements:
-        connectivity_speed = qos_measurement.get('speed_download')
-        if connectivity_speed:
-            # convert Mbps to bps
-            connectivity_speed = connectivity_speed * 1000 * 1000
-
-        connectivity_speed_probe = qos_measurement.get('speed_download_probe')
-        if connectivity_speed_probe:
-            # convert Mbps to bps
-            connectivity_speed_probe = connectivity_speed_probe * 1000 * 1000
-
-        connectivity_speed_mean = qos_measurement.get('speed_download_mean')
-        if connectivity_speed_mean:
-            # convert Mbps to bps
-            connectivity_speed_mean = connectivity_speed_mean * 1000 * 1000
-
-        connectivity_upload_speed = qos_measurement.get('speed_upload')
-        if connectivity_upload_speed:
-            # convert Mbps to bps
-            connectivity_upload_speed = connectivity_upload_speed * 1000 * 1000
-
-        connectivity_upload_speed_probe = qos_measurement.get('speed_upload_probe')
-        if connectivity_upload_speed_probe:
-            # convert Mbps to bps
-            connectivity_upload_speed_probe = connectivity_upload_speed_probe * 1000 * 1000
-
-        connectivity_upload_speed_mean = qos_measurement.get('speed_upload_mean')
-        if connectivity_upload_speed_mean:
-            # convert Mbps to bps
-            connectivity_upload_speed_mean = connectivity_upload_speed_mean * 1000 * 1000
-
-        realtime.append(RealTimeConnectivity(
-            created=qos_measurement.get('timestamp'),
-            connectivity_speed=connectivity_speed,
-            connectivity_upload_speed=connectivity_upload_speed,
-            connectivity_latency=qos_measurement.get('latency'),
-            connectivity_speed_probe=connectivity_speed_probe,
-            connectivity_upload_speed_probe=connectivity_upload_speed_probe,
-            connectivity_latency_probe=qos_measurement.get('latency_probe'),
-            connectivity_speed_mean=connectivity_speed_mean,
-            connectivity_upload_speed_mean=connectivity_upload_speed_mean,
-            roundtrip_time=qos_measurement.get('roundtrip_time'),
-            jitter_download=qos_measurement.get('jitter_download'),
-            jitter_upload=qos_measurement.get('jitter_upload'),
-            rtt_packet_loss_pct=qos_measurement.get('rtt_packet_loss_pct'),
-            school_id=qos_measurement.get('school'),
-            live_data_source=statistics_configs.QOS_SOURCE,
-        ))
-
-        if len(realtime) == 5000:
-            logger.info('Loading the data to "RealTimeConnectivity" table as it has reached 5000 benchmark.')
-            RealTimeConnectivity.objects.bulk_create(realtime)
-            realtime = []
-
-    logger.info('Loading the remaining ({0}) data to "RealTimeConnectivity" table.'.format(len(realtime)))
-    if len(realtime) > 0:
-        RealTimeConnectivity.objects.bulk_create(realtime)
+    query = """
+    WITH inserted AS (
+        INSERT INTO "{realtime_table}" (
+            "created", "modified", "school_id", "live_data_source", {columns}, "deleted"
+        )
+        SELECT DISTINCT ON (q."timestamp", q."school_id")
+            q."timestamp", %(current_datetime)s, q."school_id", %(live_data_source)s, {values}, NULL
+        FROM "{qos_table}" q
+        WHERE q."country_id" = %(country_id)s
+            AND q."timestamp" > %(start_datetime)s
+            AND q."timestamp" <= %(end_datetime)s
+            AND q."school_id" IS NOT NULL
+        ORDER BY q."timestamp", q."school_id", q."id"
+        RETURNING "school_id", "created"
+    ),
+    dirty AS (
+        INSERT INTO "{dirty_table}" ("school_id", "date", "live_data_source", "created")
+        SELECT DISTINCT i."school_id", (i."created" AT TIME ZONE %(time_zone)s)::date, %(live_data_source)s,
+            %(current_datetime)s
+        FROM inserted i
+        ON CONFLICT ("school_id", "date", "live_data_source") DO NOTHING
+    )
+    SELECT COUNT(*) FROM inserted
+    """.format(
+        realtime_table=RealTimeConnectivity._meta.db_table,
+        dirty_table=statistics_models.DirtySchoolDay._meta.db_table,
+        qos_table=sources_models.QoSData._meta.db_table,
+        columns=', '.join(['"{0}"'.format(column) for column in QOS_REALTIME_CONNECTIVITY_COLUMNS]),
+        values=get_qos_realtime_connectivity_values(),
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, {
+            'current_datetime': current_datetime,
+            'live_data_source': statistics_configs.QOS_SOURCE,
+            'country_id': country_id,
+            'start_datetime': last_entry_date,
+            'end_datetime': current_datetime,
+            'time_zone': timezone.get_current_timezone_name(),
+        })
+        logger.info('Loaded ({0}) rows to "RealTimeConnectivity" table.'.format(cursor.fetchone()[0]))
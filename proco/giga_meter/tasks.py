@@ -7,8 +7,6 @@ from celery import chain
 from celery import current_task
 from django.conf import settings
 from django.db.models import Count
-from django.db.utils import DataError
-from requests.exceptions import HTTPError
 
 from proco.background import utils as background_task_utilities
 from proco.core import utils as core_utilities
@@ -22,7 +20,7 @@ from proco.utils.dates import format_date
 logger = logging.getLogger('gigamaps.' + __name__)
 
 
-def giga_meter_load_data_from_school_master_apis(country_iso3_format=None):
+def giga_meter_load_data_from_school_master_apis(country_iso3_format=None, task_instance=None):
     """
     Background task which handles School Master Data source changes from APIs to GigaMeter DB
 
@@ -63,10 +61,8 @@ def giga_meter_load_data_from_school_master_apis(country_iso3_format=None):
 
             school_master_fields = [f.name for f in giga_meter_models.GigaMeter_SchoolMasterData._meta.get_fields()]
 
+            table_names = []
             for schema_table in schema_tables:
-                logger.debug('#' * 10)
-                logger.debug('Table: %s', schema_table)
-
                 if country_iso3_format and country_iso3_format != schema_table.name:
                     continue
 
@@ -75,13 +71,14 @@ def giga_meter_load_data_from_school_master_apis(country_iso3_format=None):
                                    'Hence skipping the load for this country code.'.format(schema_table.name))
                     continue
 
-                try:
-                    giga_meter_utilities.sync_school_master_data(
-                        profile_file, share_name, schema_name, schema_table.name, school_master_fields)
-                except (HTTPError, DataError, ValueError) as ex:
-                    logger.error('Exception caught for "{0}": {1}'.format(schema_table.name, str(ex)))
-                except Exception as ex:
-                    logger.error('Exception caught for "{0}": {1}'.format(schema_table.name, str(ex)))
+                table_names.append(schema_table.name)
+
+            data_sources_utilities.sync_shared_tables(
+                table_names,
+                lambda table_name: giga_meter_utilities.sync_school_master_data(
+                    profile_file, share_name, schema_name, table_name, school_master_fields),
+                task_instance=task_instance,
+            )
 
         else:
             logger.error('School Master schema ({0}) does not exist to use for share ({1}).'.format(schema_name,
@@ -360,7 +357,8 @@ def giga_meter_update_static_data(*args, country_iso3_format=None, force_tasks=F
 
     if task_instance:
         logger.debug('Not found running job for static data pull handler: {}'.format(task_key))
-        giga_meter_load_data_from_school_master_apis(country_iso3_format=country_iso3_format)
+        giga_meter_load_data_from_school_master_apis(country_iso3_format=country_iso3_format,
+                                                     task_instance=task_instance)
         task_instance.info('Completed the load data from School Master API call')
 
         # Delete all the old records where more than 1 record for same School GIGA ID
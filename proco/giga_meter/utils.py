@@ -4,8 +4,9 @@ import delta_sharing
 from delta_sharing.reader import DeltaSharingReader
 from django.conf import settings
 
-from proco.giga_meter import models as giga_meter_models
 from proco.data_sources import utils as sources_utilities
+from proco.data_sources.change_cache import load_table_changes
+from proco.giga_meter import models as giga_meter_models
 
 logger = logging.getLogger('gigamaps.' + __name__)
 
@@ -50,13 +51,9 @@ def sync_school_master_data(
                     'Hence skipping the data update for current country ({0}).'.format(country))
         return
 
-    loaded_data_df = delta_sharing.load_table_changes_as_pandas(
-        table_url,
-        country_latest_school_master_data_version,
-        table_current_version,
-        None,
-        None,
-    )
+    loaded_data_df = load_table_changes(
+        table_url, share_name, schema_name, table_name, country_latest_school_master_data_version,
+        table_current_version)
     logger.debug('Total count of rows in the data: {0}'.format(len(loaded_data_df)))
 
     if len(loaded_data_df) > 0:
@@ -106,14 +103,16 @@ def sync_school_master_data(
 
                 if len(insert_entries) == 5000:
                     logger.debug('Loading the data to "SchoolMasterData" table as it has reached 5000 benchmark.')
-                    giga_meter_models.GigaMeter_SchoolMasterData.objects.bulk_create(insert_entries)
+                    with sources_utilities.shared_table_db_writers:
+                        giga_meter_models.GigaMeter_SchoolMasterData.objects.bulk_create(insert_entries)
                     insert_entries = []
                     logger.debug('#' * 10)
                     logger.debug('\n\n')
 
         logger.info('Loading the remaining ({0}) data to "SchoolMasterData" table.'.format(len(insert_entries)))
         if len(insert_entries) > 0:
-            giga_meter_models.GigaMeter_SchoolMasterData.objects.bulk_create(insert_entries)
+            with sources_utilities.shared_table_db_writers:
+                giga_meter_models.GigaMeter_SchoolMasterData.objects.bulk_create(insert_entries)
     else:
         logger.info('No data to update in current table: {0}.'.format(table_name))
 
@@ -3,9 +3,6 @@ import logging
 import traceback
 from collections import OrderedDict
 
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes import SearchIndexClient
 from azure.search.documents.indexes.models import SearchFieldDataType
 from django.conf import settings
 from django.core.exceptions import ValidationError
@@ -31,6 +28,7 @@ from proco.core import permissions as core_permissions
 from proco.core import utils as core_utilities
 from proco.core.viewsets import BaseModelViewSet
 from proco.data_sources.models import SchoolMasterData
+from proco.locations import search_backends
 from proco.locations.models import Country, CountryAdminMetadata
 from proco.locations.search_indexes import SchoolIndex
 from proco.locations.serializers import (
@@ -43,7 +41,7 @@ from proco.locations.serializers import (
     ListCountrySerializer,
 )
 from proco.schools.models import School
-from proco.utils.cache import cache_manager
+from proco.utils.cache import cache_manager, get_request_cache_tags
 from proco.utils.error_message import delete_succ_mess, error_mess, id_missing_error_mess
 from proco.utils.filters import NullsAlwaysLastOrderingFilter
 from proco.utils.log import action_log, changed_fields
@@ -91,6 +89,12 @@ class CountryViewSet(
         qs = super().get_queryset()
         return qs.defer('geometry')
 
+    def get_cache_tags(self, family):
+        # Country detail is requested by the country code
+        if self.kwargs.get('pk'):
+            return get_request_cache_tags(family, self.request, self.kwargs, country_code=[self.kwargs['pk']])
+        return super().get_cache_tags(family)
+
     def filter_queryset(self, queryset):
         """
         Given a queryset, filter it with whichever filter backend is in use.
@@ -420,7 +424,8 @@ class CountrySearchStatListAPIView(CachedListMixin, ListAPIView):
         data = self._format_result(queryset_data)
 
         request_path = remove_query_param(request.get_full_path(), self.CACHE_KEY)
-        cache_manager.set(cache_key, data, request_path=request_path)
+        cache_manager.set(cache_key, data, request_path=request_path,
+                          tags=self.get_cache_tags(self.get_list_cache_family()))
         return data
 
     def list(self, request, *args, **kwargs):
@@ -441,19 +446,11 @@ class BaseSearchMixin:
 
     params = {}
 
-    cognitive_search_settings = settings.AZURE_CONFIG.get('COGNITIVE_SEARCH')
-    endpoint = cognitive_search_settings['SEARCH_ENDPOINT']
-    credentials = AzureKeyCredential(cognitive_search_settings['SEARCH_API_KEY'])
-
-    def create_search_client(self):
-        return SearchClient(
-            endpoint=self.endpoint,
-            index_name=self.index_class.Meta.index_name,
-            credential=self.credentials,
-        )
+    # Name of the search backend, settings.SCHOOL_SEARCH_BACKEND by default
+    search_backend = None
 
-    def create_admin_client(self):
-        return SearchIndexClient(endpoint=self.endpoint, credential=self.credentials)
+    def get_search_backend(self):
+        return search_backends.get_search_backend(self.search_backend)
 
     @property
     def possible_filters(self):
@@ -526,6 +523,13 @@ class BaseSearchMixin:
 
         return search_text
 
+    @property
+    def get_search_words(self):
+        """Words of the search text without the prefix wildcard, no words to match all the documents."""
+        search_text = self.params.get('q', ['*'])[-1]
+        search_text = core_utilities.sanitize_str(self.normalize_search_text(search_text))
+        return [search_word.strip('*') for search_word in search_text.split() if search_word.strip('*')]
+
     @property
     def get_search_fields(self):
         search_fields = self.params.get('search_fields')
@@ -586,32 +590,7 @@ class BaseSearchMixin:
     def index_search(self, request, *args, **kwargs):
         self.params = dict(request.query_params)
 
-        search_client = self.create_search_client()
-        logger.debug(
-            'Search params: \nsearch_text - {search_text}\ninclude_total_count - {include_total_count}'
-            '\norder_by - {order_by}\nsearch_fields - {search_fields}\nselect - {select}'
-            '\nskip - {skip}\ntop - {top}\nfilter - {filter}\nquery_type - {query_type}'.format(
-                search_text=self.get_search_text,
-                include_total_count=self.get_count,
-                order_by=self.get_orderby,
-                search_fields=self.get_search_fields,
-                select=self.get_select,
-                skip=self.get_skip,
-                top=self.get_top,
-                filter=self.get_filters,
-                query_type=self.get_query_type,
-            ))
-        results = search_client.search(
-            search_text=self.get_search_text,
-            include_total_count=self.get_count,
-            order_by=self.get_orderby,
-            search_fields=self.get_search_fields,
-            select=self.get_select,
-            skip=self.get_skip,
-            top=self.get_top,
-            filter=self.get_filters,
-            query_type=self.get_query_type,
-        )
+        results = self.get_search_backend().search(self)
 
         logger.debug('Total Documents Matching Query: {}'.format(results.get_count()))
         return results
@@ -620,7 +599,7 @@ class BaseSearchMixin:
 class AggregateSearchViewSet(BaseSearchMixin, ListAPIView):
     """
     AggregateSearchViewSet
-        Endpoint to use the Cognitive search index.
+        Endpoint to search the schools through the configured search backend, Cognitive Search or PostgreSQL.
         Inherits: BaseSearchMixin, ListAPIView
     """
     index_class = SchoolIndex
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.28 on 2026-10-17 10:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0021_removed_geometry_simplified_field_from_country'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='SchoolSearchDocument',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=1000, null=True)),
+                ('giga_id_school', models.CharField(max_length=50, null=True)),
+                ('external_id', models.CharField(max_length=50, null=True)),
+                ('admin1_id', models.IntegerField(null=True)),
+                ('admin1_name', models.CharField(max_length=255, null=True)),
+                ('admin2_id', models.IntegerField(null=True)),
+                ('admin2_name', models.CharField(max_length=255, null=True)),
+                ('country_id', models.IntegerField(db_index=True)),
+                ('country_name', models.CharField(max_length=255, null=True)),
+                ('country_code', models.CharField(max_length=32, null=True)),
+                ('search_text', models.TextField(default='')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='schoolsearchdocument',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='schoolsearch_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='schoolsearchdocument',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='schoolsearch_text_trgm',
+                                                           opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='schoolsearchdocument',
+            index=models.Index(fields=['country_name', 'admin1_name', 'admin2_name', 'name'],
+                               name='schoolsearch_default_ordering'),
+        ),
+    ]
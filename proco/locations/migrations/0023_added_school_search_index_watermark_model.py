@@ -0,0 +1,27 @@
+# Generated by Django 2.2.28 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0022_added_school_search_document_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolSearchIndexWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('backend', models.CharField(max_length=32)),
+                ('index_name', models.CharField(max_length=255)),
+                ('watermark', models.DateTimeField()),
+                ('modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='schoolsearchindexwatermark',
+            constraint=models.UniqueConstraint(fields=('backend', 'index_name'), name='schoolsearch_watermark_unique'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 import numpy as np
 from django.contrib.gis.db.models import MultiPolygonField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.constraints import UniqueConstraint
 from django.utils import timezone
 from django.utils.translation import ugettext as _
 from jsonfield import JSONField
@@ -11,7 +14,7 @@ from sklearn.metrics import DistanceMetric
 from proco.core.models import BaseModelMixin, CustomDateTimeField
 from proco.locations.managers import CountryManager
 from proco.locations.utils import get_random_name_image
-from proco.utils.cache import cache_manager
+from proco.utils.cache import cache_manager, get_cache_tag
 
 
 class BBoxMixin(models.Model):
@@ -68,14 +71,14 @@ class Country(GeometryMixin, TimeStampedModel):
         return f'{self.name}'
 
     def invalidate_country_related_cache(self):
-        cache_manager.invalidate((
-            'GLOBAL_STATS*',
-            'COUNTRIES_LIST*',
-            'COUNTRY_INFO_pk_{0}'.format(str(self.code).lower()),
-            'SCHOOLS_{0}_*'.format(str(self.code).lower()),
-            'CONNECTIVITY_CONFIGURATIONS_STATS_*_country_id_*{}*'.format(self.id),
-            'DATA_LAYER_INFO_*_country_id_*{}*'.format(self.id),
-        ))
+        cache_manager.invalidate_tags([
+            'GLOBAL_STATS',
+            'COUNTRIES_LIST',
+            get_cache_tag('COUNTRY_INFO', 'country_code', self.code),
+            get_cache_tag('SCHOOLS', 'country_code', self.code),
+            get_cache_tag('CONNECTIVITY_CONFIGURATIONS_STATS', 'country_id', self.id),
+            get_cache_tag('DATA_LAYER_INFO', 'country_id', self.id),
+        ])
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -192,3 +195,54 @@ class CountryAdminMetadata(BaseModelMixin, BBoxMixin):
 
     def __str__(self):
         return f'{self.name} - {self.name_en} - {self.country}'
+
+
+class SchoolSearchDocument(models.Model):
+    """
+    SchoolSearchDocument
+        Denormalised school, admin and country row searched by the PostgreSQL search backend. It mirrors the
+        documents of the Cognitive Search SchoolIndex and is rebuilt by the index_rebuild_schools command.
+    """
+    id = models.IntegerField(primary_key=True)
+
+    name = models.CharField(max_length=1000, null=True)
+    giga_id_school = models.CharField(max_length=50, null=True)
+    external_id = models.CharField(max_length=50, null=True)
+
+    admin1_id = models.IntegerField(null=True)
+    admin1_name = models.CharField(max_length=255, null=True)
+    admin2_id = models.IntegerField(null=True)
+    admin2_name = models.CharField(max_length=255, null=True)
+
+    country_id = models.IntegerField(db_index=True)
+    country_name = models.CharField(max_length=255, null=True)
+    country_code = models.CharField(max_length=32, null=True)
+
+    # Lower cased searchable fields, matched with LIKE through the trigram index
+    search_text = models.TextField(default='')
+    search_vector = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='schoolsearch_vector_gin'),
+            GinIndex(fields=['search_text'], name='schoolsearch_text_trgm', opclasses=['gin_trgm_ops']),
+            models.Index(fields=['country_name', 'admin1_name', 'admin2_name', 'name'],
+                         name='schoolsearch_default_ordering'),
+        ]
+
+
+class SchoolSearchIndexWatermark(models.Model):
+    """
+    SchoolSearchIndexWatermark
+        Start time of the last successful update of all the schools of a search index, per search backend and
+        index name. index_rebuild_schools --incremental only updates the schools changed since then.
+    """
+    backend = models.CharField(max_length=32)
+    index_name = models.CharField(max_length=255)
+    watermark = models.DateTimeField()
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['backend', 'index_name'], name='schoolsearch_watermark_unique'),
+        ]
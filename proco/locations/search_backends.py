@@ -0,0 +1,304 @@
+import logging
+
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents import SearchClient
+from azure.search.documents.indexes.models import SearchFieldDataType
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import Q
+
+from proco.core import utils as core_utilities
+from proco.locations.models import Country, CountryAdminMetadata, SchoolSearchDocument
+from proco.locations.search_indexes import SchoolIndex
+from proco.schools.models import School
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+SEARCH_BACKEND_AZURE = 'azure'
+SEARCH_BACKEND_POSTGRES = 'postgres'
+
+INTEGER_FIELD_TYPES = (SearchFieldDataType.Int32, SearchFieldDataType.Int64)
+
+# Document columns which can be selected, filtered and ordered, the search columns are internal
+SEARCH_DOCUMENT_FIELDS = (
+    'id', 'name', 'giga_id_school', 'external_id',
+    'admin1_id', 'admin1_name', 'admin2_id', 'admin2_name',
+    'country_id', 'country_name', 'country_code',
+)
+
+SEARCH_DOCUMENT_INSERT_SQL = """
+INSERT INTO "{table_name}" ({columns}, "search_text", "search_vector")
+SELECT {columns}, d."search_text", TO_TSVECTOR('simple', d."search_text")
+FROM (
+    SELECT src.*, {search_text} AS "search_text"
+    FROM ({source_query}) src
+) d
+"""
+
+# Same documents as index_rebuild_schools.get_document: blank admin1 names are indexed as 'Unknown' without the
+# admin1 id, blank admin2 names are indexed without the admin2 fields
+SCHOOL_SEARCH_DOCUMENT_SOURCE_SQL = """
+SELECT s."id", s."name", s."giga_id_school", s."external_id",
+    CASE WHEN NULLIF(TRIM(a1."name"), '') IS NULL THEN NULL ELSE s."admin1_id" END AS "admin1_id",
+    CASE WHEN NULLIF(TRIM(a1."name"), '') IS NULL THEN 'Unknown' ELSE a1."name" END AS "admin1_name",
+    CASE WHEN NULLIF(TRIM(a2."name"), '') IS NULL THEN NULL ELSE s."admin2_id" END AS "admin2_id",
+    CASE WHEN NULLIF(TRIM(a2."name"), '') IS NULL THEN NULL ELSE a2."name" END AS "admin2_name",
+    s."country_id", c."name" AS "country_name", c."code" AS "country_code"
+FROM "{school_table}" s
+INNER JOIN "{country_table}" c ON c."id" = s."country_id"
+LEFT OUTER JOIN "{admin_table}" a1 ON a1."id" = s."admin1_id"
+LEFT OUTER JOIN "{admin_table}" a2 ON a2."id" = s."admin2_id"
+WHERE s."deleted" IS NULL {school_filter}
+"""
+
+
+def get_search_text_sql(fields, alias=None):
+    """Lower cased concatenation of the searchable fields, the text indexed by the trigram and tsvector indexes"""
+    prefix = '{0}.'.format(alias) if alias else ''
+    return "LOWER(CONCAT_WS(' ', {0}))".format(', '.join([
+        prefix + connection.ops.quote_name(field_name)
+        for field_name in fields
+    ]))
+
+
+def get_insert_search_documents_query(source_query):
+    """INSERT of the rows returned by source_query, which must select all the SEARCH_DOCUMENT_FIELDS"""
+    return SEARCH_DOCUMENT_INSERT_SQL.format(
+        table_name=SchoolSearchDocument._meta.db_table,
+        columns=', '.join([connection.ops.quote_name(field_name) for field_name in SEARCH_DOCUMENT_FIELDS]),
+        search_text=get_search_text_sql(SchoolIndex.Meta.searchable_fields, alias='src'),
+        source_query=source_query,
+    )
+
+
+def rebuild_school_search_documents(country_id=None, school_id=None, school_ids=None):
+    """
+    rebuild_school_search_documents
+        Replace the SchoolSearchDocument rows of all the schools, a country, a school or a list of schools in one
+        transaction, so searches keep reading the previous rows until it commits.
+    """
+    document_filter = ''
+    school_filter = ''
+    params = {}
+
+    if country_id:
+        document_filter += ' AND "country_id" = %(country_id)s'
+        school_filter += ' AND s."country_id" = %(country_id)s'
+        params['country_id'] = country_id
+
+    if school_id:
+        document_filter += ' AND "id" = %(school_id)s'
+        school_filter += ' AND s."id" = %(school_id)s'
+        params['school_id'] = school_id
+
+    if school_ids is not None:
+        document_filter += ' AND "id" = ANY(%(school_ids)s)'
+        school_filter += ' AND s."id" = ANY(%(school_ids)s)'
+        params['school_ids'] = list(school_ids)
+
+    source_query = SCHOOL_SEARCH_DOCUMENT_SOURCE_SQL.format(
+        school_table=School._meta.db_table,
+        country_table=Country._meta.db_table,
+        admin_table=CountryAdminMetadata._meta.db_table,
+        school_filter=school_filter,
+    )
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM "{0}" WHERE TRUE{1}'.format(
+                SchoolSearchDocument._meta.db_table, document_filter), params)
+            cursor.execute(get_insert_search_documents_query(source_query), params)
+            documents_count = cursor.rowcount
+
+    logger.info('Rebuilt {0} school search documents.'.format(documents_count))
+    return documents_count
+
+
+class SearchResults(object):
+    """Page of search results with the total count of the matching documents, like the Azure search results"""
+
+    def __init__(self, count, results):
+        self.count = count
+        self.results = results
+
+    def get_count(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.results)
+
+
+class BaseSearchBackend(object):
+    """
+    BaseSearchBackend
+        Runs the search of a BaseSearchMixin view with its parsed query params and returns the page of results
+        with get_count(), the total count of the matching documents.
+    """
+
+    def search(self, view):
+        raise NotImplementedError
+
+
+class AzureSearchBackend(BaseSearchBackend):
+    """Search the Azure Cognitive Search index of the view"""
+
+    def create_search_client(self, view):
+        cognitive_search_settings = settings.AZURE_CONFIG.get('COGNITIVE_SEARCH')
+        return SearchClient(
+            endpoint=cognitive_search_settings['SEARCH_ENDPOINT'],
+            index_name=view.index_class.Meta.index_name,
+            credential=AzureKeyCredential(cognitive_search_settings['SEARCH_API_KEY']),
+        )
+
+    def search(self, view):
+        search_client = self.create_search_client(view)
+        logger.debug(
+            'Search params: \nsearch_text - {search_text}\ninclude_total_count - {include_total_count}'
+            '\norder_by - {order_by}\nsearch_fields - {search_fields}\nselect - {select}'
+            '\nskip - {skip}\ntop - {top}\nfilter - {filter}\nquery_type - {query_type}'.format(
+                search_text=view.get_search_text,
+                include_total_count=view.get_count,
+                order_by=view.get_orderby,
+                search_fields=view.get_search_fields,
+                select=view.get_select,
+                skip=view.get_skip,
+                top=view.get_top,
+                filter=view.get_filters,
+                query_type=view.get_query_type,
+            ))
+        return search_client.search(
+            search_text=view.get_search_text,
+            include_total_count=view.get_count,
+            order_by=view.get_orderby,
+            search_fields=view.get_search_fields,
+            select=view.get_select,
+            skip=view.get_skip,
+            top=view.get_top,
+            filter=view.get_filters,
+            query_type=view.get_query_type,
+        )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgresSearchBackend
+        Search the SchoolSearchDocument table with the same semantics as the Azure query of the view:
+        every word is a prefix and all the words must match, through the tsvector GIN index. A search text with
+        a hyphen is an Azure phrase query, matched with LIKE through the pg_trgm GIN index.
+    """
+
+    def get_search_fields(self, view):
+        search_fields = [field_name for field_name in view.get_search_fields
+                         if field_name in SchoolIndex.Meta.searchable_fields]
+        return search_fields or list(SchoolIndex.Meta.searchable_fields)
+
+    def filter_search_text(self, view, queryset):
+        search_words = [search_word.lower() for search_word in view.get_search_words]
+        if len(search_words) == 0:
+            return queryset
+
+        search_fields = self.get_search_fields(view)
+        if set(search_fields) == set(SchoolIndex.Meta.searchable_fields):
+            search_text_sql = connection.ops.quote_name('search_text')
+            search_vector_sql = connection.ops.quote_name('search_vector')
+        else:
+            search_text_sql = get_search_text_sql(search_fields)
+            search_vector_sql = "TO_TSVECTOR('simple', {0})".format(search_text_sql)
+
+        if any('-' in search_word for search_word in search_words):
+            phrase = ' '.join(search_words)
+            for char in ('\\', '%', '_'):
+                phrase = phrase.replace(char, '\\' + char)
+            return queryset.extra(where=['{0} LIKE %s'.format(search_text_sql)], params=['%' + phrase + '%'])
+
+        ts_query = ' & '.join([
+            "'{0}':*".format(search_word.replace('\\', '\\\\').replace("'", "''"))
+            for search_word in search_words
+        ])
+        return queryset.extra(where=["{0} @@ TO_TSQUERY('simple', %s)".format(search_vector_sql)], params=[ts_query])
+
+    def filter_fields(self, view, queryset):
+        possible_filter_keys = view.possible_filters
+
+        for param_key, param_value in view.params.items():
+            if param_key not in possible_filter_keys:
+                continue
+
+            param_value = param_value[-1] or 'null'
+            field_name, filter_name = param_key.split('__')[0], param_key.split('__')[1]
+            field_type = view.filter_field_type.get(field_name)
+            values = param_value.split(',') if filter_name == 'in' else [param_value]
+
+            # Start with an always false condition so a filter without any valid value matches nothing
+            field_filter = Q(pk__in=[])
+            for val in values:
+                if val == 'null':
+                    field_filter |= Q(**{field_name + '__isnull': True})
+                elif field_type in INTEGER_FIELD_TYPES:
+                    val = core_utilities.convert_to_int(val, orig=True)
+                    if isinstance(val, int):
+                        field_filter |= Q(**{field_name: val})
+                else:
+                    field_filter |= Q(**{field_name: val})
+            queryset = queryset.filter(field_filter)
+
+        return queryset
+
+    def get_ordering(self, view):
+        order_by = view.params.get('ordering')
+        if not order_by:
+            order_by = view.index_class.Meta.ordering
+        else:
+            order_by = [core_utilities.sanitize_str(field_name) for field_name in order_by[-1].split(',')]
+
+        ordering = []
+        for order_field in order_by:
+            field_name = order_field.lstrip('-').replace('school_id', 'id')
+            if field_name in SEARCH_DOCUMENT_FIELDS:
+                ordering.append(('-' if order_field.startswith('-') else '') + field_name)
+
+        # Stable pages for the documents with the same values
+        if 'id' not in [order_field.lstrip('-') for order_field in ordering]:
+            ordering.append('id')
+        return ordering
+
+    def get_select(self, view):
+        return [field_name for field_name in view.get_select.split(',')
+                if field_name in SEARCH_DOCUMENT_FIELDS or field_name == 'school_id']
+
+    def search(self, view):
+        queryset = SchoolSearchDocument.objects.all()
+        queryset = self.filter_search_text(view, queryset)
+        queryset = self.filter_fields(view, queryset)
+        queryset = queryset.order_by(*self.get_ordering(view))
+
+        select = self.get_select(view)
+        top = view.get_top
+        skip = view.get_skip
+
+        rows = queryset.values('id', *[field_name for field_name in select if field_name != 'school_id'])
+        results = [
+            {field_name: str(row['id']) if field_name == 'school_id' else row[field_name] for field_name in select}
+            for row in rows[skip:skip + top]
+        ]
+
+        count = queryset.count() if view.get_count else None
+        logger.debug('Search query: {0}'.format(queryset.query))
+        return SearchResults(count, results)
+
+
+SEARCH_BACKENDS = {
+    SEARCH_BACKEND_AZURE: AzureSearchBackend,
+    SEARCH_BACKEND_POSTGRES: PostgresSearchBackend,
+}
+
+
+def get_search_backend(name=None):
+    """Search backend by name, settings.SCHOOL_SEARCH_BACKEND by default"""
+    name = name or settings.SCHOOL_SEARCH_BACKEND
+    backend_class = SEARCH_BACKENDS.get(name)
+    if backend_class is None:
+        raise ImproperlyConfigured('Unknown search backend "{0}", the choices are: {1}'.format(
+            name, ', '.join(SEARCH_BACKENDS.keys())))
+    return backend_class()
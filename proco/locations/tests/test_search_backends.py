@@ -0,0 +1,138 @@
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from proco.core.management.commands import index_rebuild_schools
+from proco.locations import search_backends
+from proco.locations.models import SchoolSearchDocument, SchoolSearchIndexWatermark
+from proco.locations.tests.factories import Admin1Factory, CountryFactory
+from proco.schools.models import School
+from proco.schools.tests.factories import SchoolFactory
+
+
+@override_settings(SCHOOL_SEARCH_BACKEND=search_backends.SEARCH_BACKEND_POSTGRES)
+class PostgresSearchBackendTestCase(TestCase):
+    databases = ['default', ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory(name='Brazil', code='BR')
+        cls.admin1 = Admin1Factory(country=cls.country, name='Parana')
+        cls.other_admin1 = Admin1Factory(country=cls.country, name='Bahia')
+
+        cls.school_one = SchoolFactory(country=cls.country, admin1=cls.admin1, name='Escola Santa Maria',
+                                       giga_id_school='a1b2c3d4-0001')
+        cls.school_two = SchoolFactory(country=cls.country, admin1=cls.admin1, name='Escola Municipal',
+                                       giga_id_school='a1b2c3d4-0002')
+        cls.school_three = SchoolFactory(country=cls.country, admin1=cls.other_admin1, name='Colegio Estadual',
+                                         giga_id_school='e5f6a7b8-0003')
+
+        search_backends.rebuild_school_search_documents()
+
+    def search(self, query_params):
+        response = self.client.get(reverse('locations:global-search-filter'), query_params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_rebuild_school_search_documents(self):
+        self.assertEqual(SchoolSearchDocument.objects.count(), 3)
+
+        document = SchoolSearchDocument.objects.get(id=self.school_one.id)
+        self.assertEqual(document.country_name, 'Brazil')
+        self.assertEqual(document.admin1_name, 'Parana')
+        self.assertIsNone(document.admin2_id)
+        self.assertIn('escola santa maria', document.search_text)
+
+        self.school_one.name = 'Escola Renamed'
+        self.school_one.save()
+        self.assertEqual(search_backends.rebuild_school_search_documents(school_id=self.school_one.id), 1)
+        self.assertEqual(SchoolSearchDocument.objects.get(id=self.school_one.id).name, 'Escola Renamed')
+        self.assertEqual(SchoolSearchDocument.objects.count(), 3)
+
+    def test_search_prefix_words(self):
+        data = self.search({'q': 'esc sant'})
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['school_id'], str(self.school_one.id))
+
+        data = self.search({'q': 'escol'})
+        self.assertEqual(data['count'], 2)
+
+    def test_search_hyphen_phrase(self):
+        data = self.search({'q': 'a1b2c3d4-00'})
+        self.assertEqual(data['count'], 2)
+
+    def test_search_filters_ordering_and_paging(self):
+        data = self.search({'admin1_id__in': '{0},{1}'.format(self.admin1.id, self.other_admin1.id),
+                            'ordering': '-name', 'page_size': 2, 'page': 1})
+        self.assertEqual(data['count'], 3)
+        self.assertEqual([result['name'] for result in data['results']], ['Escola Santa Maria', 'Escola Municipal'])
+
+        data = self.search({'admin1_id__in': '{0},{1}'.format(self.admin1.id, self.other_admin1.id),
+                            'ordering': '-name', 'page_size': 2, 'page': 2})
+        self.assertEqual([result['name'] for result in data['results']], ['Colegio Estadual'])
+
+        data = self.search({'q': 'escola', 'admin1_name__exact': 'Bahia'})
+        self.assertEqual(data['count'], 0)
+
+        data = self.search({'country_id__exact': 'invalid'})
+        self.assertEqual(data['count'], 0)
+
+    def test_incremental_index_rebuild_schools(self):
+        self.assertIsNone(index_rebuild_schools.get_index_watermark())
+        call_command('index_rebuild_schools', '--update_index', '--incremental')
+        watermark = index_rebuild_schools.get_index_watermark()
+        self.assertIsNotNone(watermark)
+
+        self.school_two.name = 'Escola Renamed'
+        self.school_two.save()
+        self.school_three.delete()
+
+        call_command('index_rebuild_schools', '--update_index', '--incremental')
+        self.assertEqual(SchoolSearchDocument.objects.get(id=self.school_two.id).name, 'Escola Renamed')
+        self.assertFalse(SchoolSearchDocument.objects.filter(id=self.school_three.id).exists())
+        self.assertEqual(SchoolSearchDocument.objects.count(), 2)
+
+        # The incremental update moves the watermark, the next one only picks the schools changed after it
+        self.assertGreater(index_rebuild_schools.get_index_watermark(), watermark)
+        self.assertFalse(School.objects.filter(
+            index_rebuild_schools.get_changed_schools_filter(index_rebuild_schools.get_index_watermark())).exists())
+
+    def test_index_rebuild_given_schools(self):
+        call_command('index_rebuild_schools', '--update_index')
+        watermark = index_rebuild_schools.get_index_watermark()
+        self.assertEqual(SchoolSearchIndexWatermark.objects.count(), 1)
+
+        self.school_one.name = 'Escola Published'
+        self.school_one.save()
+        self.school_three.delete()
+
+        call_command('index_rebuild_schools', '--update_index', school_ids=[self.school_one.id, self.school_three.id])
+        self.assertEqual(SchoolSearchDocument.objects.get(id=self.school_one.id).name, 'Escola Published')
+        self.assertFalse(SchoolSearchDocument.objects.filter(id=self.school_three.id).exists())
+        self.assertEqual(SchoolSearchDocument.objects.count(), 2)
+
+        # Updating a list of schools does not move the watermark of the incremental updates
+        self.assertEqual(index_rebuild_schools.get_index_watermark(), watermark)
+
+    def test_changed_schools_filter(self):
+        changed_since = timezone.now()
+        queryset = School.objects.all()
+        self.assertFalse(queryset.filter(index_rebuild_schools.get_changed_schools_filter(changed_since)).exists())
+
+        self.other_admin1.name = 'Bahia State'
+        self.other_admin1.save()
+        self.assertListEqual(
+            list(queryset.filter(index_rebuild_schools.get_changed_schools_filter(changed_since)).values_list(
+                'id', flat=True)),
+            [self.school_three.id],
+        )
+
+    def test_iter_document_batches(self):
+        queryset = index_rebuild_schools.get_documents_queryset(country_id=self.country.id)
+        batches = list(index_rebuild_schools.iter_document_batches(queryset, batch_size=2))
+        self.assertListEqual([len(batch) for batch in batches], [2, 1])
+        self.assertEqual(batches[0][0]['school_id'], str(self.school_one.id))
+        self.assertNotIn('admin2_id', batches[0][0])
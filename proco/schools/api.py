@@ -23,7 +23,15 @@ from rest_framework.utils.urls import remove_query_param
 from rest_framework.views import APIView
 
 from proco.connection_statistics.models import SchoolWeeklyStatus, SchoolDailyStatus, SchoolRealTimeRegistration
-from proco.connection_statistics.utils import get_benchmark_value_for_default_download_layer
+from proco.connection_statistics.utils import (
+    SCHOOL_MAP_CLUSTER_CONNECTIVITY,
+    SCHOOL_MAP_CLUSTER_CONNECTIVITY_STATUS,
+    SCHOOL_MAP_CLUSTER_COVERAGE,
+    SCHOOL_MAP_STATE_SCHOOL_JOIN,
+    get_benchmark_value_for_default_download_layer,
+    get_school_map_cluster_query,
+    get_school_map_sampling,
+)
 from proco.core import mixins as core_mixins
 from proco.core import permissions as core_permissions
 from proco.core import utils as core_utilities
@@ -44,11 +52,12 @@ from proco.schools.serializers import (
 )
 from proco.schools.tasks import process_loaded_file
 from proco.utils import dates as date_utilities
-from proco.utils.cache import cache_manager, custom_cache_control
+from proco.utils.cache import cache_manager, custom_cache_control, get_request_cache_tags
 from proco.utils.error_message import id_missing_error_mess, delete_succ_mess, \
     error_mess
 from proco.utils.log import action_log, changed_fields
 from proco.utils.mixins import CachedListMixin
+from proco.utils.tiles import compressed_tile_response
 
 logger = logging.getLogger('gigamaps.' + __name__)
 
@@ -132,6 +141,27 @@ class RandomSchoolsListAPIView(CachedListMixin, ListAPIView):
 
 
 class BaseTileGenerator:
+    def get_cluster_country_ids(self, request):
+        """
+        Country ids of a tile request which can be drawn with the school clusters, an empty list for all the
+        countries, None if the request filters the schools below the country level as the clusters are per country
+        """
+        query_params = request.query_params
+        if any(param in query_params for param in ('admin1_id', 'admin1_id__in', 'school_id', 'school_id__in')):
+            return None
+
+        if (
+            len(core_utilities.get_filter_sql(request, 'schools', 'schools_school')) > 0 or
+            len(core_utilities.get_filter_sql(request, 'school_static', 'connection_statistics_schoolweeklystatus')) > 0
+        ):
+            return None
+
+        if 'country_id' in query_params:
+            return [query_params['country_id']]
+        elif 'country_id__in' in query_params:
+            return [c_id.strip() for c_id in query_params['country_id__in'].split(',')]
+        return []
+
     def path_to_tile(self, request):
         path = "/" + request.query_params.get('z') + "/" + request.query_params.get(
             'x') + "/" + request.query_params.get('y')
@@ -179,6 +209,10 @@ class BaseTileGenerator:
     def envelope_to_sql(self, env, request):
         raise NotImplementedError("envelope_to_sql must be implemented in the subclass.")
 
+    def cluster_to_sql(self, tile, env, request):
+        """SQL of the precomputed school clusters of a low zoom tile, None to draw the schools"""
+        return None
+
     def sql_to_pbf(self, sql):
         try:
             with connections[settings.READ_ONLY_DB_KEY].cursor() as cur:
@@ -196,7 +230,12 @@ class BaseTileGenerator:
 
         env = self.tile_to_envelope(tile)
 
-        sql = self.envelope_to_sql(env, request)
+        sql = None
+        if settings.ENABLE_SCHOOL_MAP_CLUSTERS and tile['zoom'] < settings.SCHOOL_MAP_CLUSTER_ZOOM:
+            sql = self.cluster_to_sql(tile, env, request)
+
+        if sql is None:
+            sql = self.envelope_to_sql(env, request)
 
         logger.debug(sql.replace('\n', ''))
 
@@ -213,6 +252,14 @@ class SchoolTileGenerator(BaseTileGenerator):
         super().__init__()
         self.table_config = table_config
 
+    def cluster_to_sql(self, tile, env, request):
+        country_ids = self.get_cluster_country_ids(request)
+        if country_ids is None:
+            return None
+
+        return get_school_map_cluster_query(
+            self.envelope_to_bounds_sql(env), SCHOOL_MAP_CLUSTER_COVERAGE, tile['zoom'], 'coverage_status', country_ids)
+
     def envelope_to_sql(self, env, request):
         country_id = request.query_params.get('country_id', None)
         admin1_id = request.query_params.get('admin1_id', None)
@@ -220,19 +267,25 @@ class SchoolTileGenerator(BaseTileGenerator):
         tbl = self.table_config.copy()
         tbl['env'] = self.envelope_to_bounds_sql(env)
 
+        use_map_state = settings.ENABLE_SCHOOL_MAP_STATE
+        school_table = 'ms' if use_map_state else 'schools_school'
+
         tbl['limit_condition'] = 'LIMIT ' + str(int(request.query_params.get('limit', '50000')))
         tbl['country_condition'] = ''
         tbl['admin1_condition'] = ''
+        tbl['zoom_condition'] = ''
         tbl['random_order'] = ''
 
         if country_id or admin1_id:
             if admin1_id:
-                tbl['admin1_condition'] = f"AND schools_school.admin1_id = {admin1_id}"
+                tbl['admin1_condition'] = f"AND {school_table}.admin1_id = {admin1_id}"
 
             if country_id:
-                tbl['country_condition'] = f"AND schools_school.country_id = {country_id}"
+                tbl['country_condition'] = f"AND {school_table}.country_id = {country_id}"
         else:
-            tbl['random_order'] = 'ORDER BY random()' if int(request.query_params.get('z', 0)) == 2 else ''
+            zoom_level = int(request.query_params.get('z', 0))
+            tbl['zoom_condition'], tbl['random_order'] = get_school_map_sampling(
+                zoom_level, school_table, order_schools=zoom_level == 2)
 
         """In order to cater school requirements, {school_condition} can be added to id before/after country_condition
          in the query"""
@@ -268,6 +321,35 @@ class SchoolTileGenerator(BaseTileGenerator):
             SELECT ST_AsMVT(DISTINCT mvtgeom.*) FROM mvtgeom
         """
 
+        if use_map_state:
+            sql_tmpl = """WITH
+            bounds AS (
+            SELECT {env} AS geom,
+                   {env}::box2d AS b2d
+            ),
+            mvtgeom AS (
+            SELECT ST_AsMVTGeom(ms."geometry", bounds.b2d) AS geom,
+                ms."id",
+                ms."coverage_type",
+                ms."coverage_status",
+                ms."connectivity_status"
+            FROM connection_statistics_schoolmapstate ms
+            INNER JOIN bounds ON ST_Intersects(ms."geometry", bounds.geom)
+            {school_join}
+            {school_weekly_join}
+            WHERE TRUE
+             {country_condition}
+             {admin1_condition}
+             {school_condition}
+             {school_weekly_condition}
+             {zoom_condition}
+             {random_order}
+             {limit_condition}
+            )
+            SELECT ST_AsMVT(DISTINCT mvtgeom.*) FROM mvtgeom
+            """
+
+        tbl['school_join'] = ''
         tbl['school_condition'] = ''
         tbl['school_weekly_join'] = ''
         tbl['school_weekly_condition'] = ''
@@ -275,14 +357,15 @@ class SchoolTileGenerator(BaseTileGenerator):
         school_filters = core_utilities.get_filter_sql(request, 'schools', 'schools_school')
         if len(school_filters) > 0:
             tbl['school_condition'] = 'AND ' + school_filters
+            tbl['school_join'] = SCHOOL_MAP_STATE_SCHOOL_JOIN
 
         school_static_filters = core_utilities.get_filter_sql(request, 'school_static',
                                                               'connection_statistics_schoolweeklystatus')
         if len(school_static_filters) > 0:
             tbl['school_weekly_join'] = """
             LEFT OUTER JOIN connection_statistics_schoolweeklystatus
-                ON schools_school."last_weekly_status_id" = connection_statistics_schoolweeklystatus."id"
-            """
+                ON {0}."last_weekly_status_id" = connection_statistics_schoolweeklystatus."id"
+            """.format(school_table)
             tbl['school_weekly_condition'] = 'AND ' + school_static_filters
 
         return sql_tmpl.format(**tbl)
@@ -314,7 +397,21 @@ class ConnectivityTileGenerator(BaseTileGenerator):
         super().__init__()
         self.table_config = table_config
 
+    def cluster_to_sql(self, tile, env, request):
+        # The clusters are counted with the last weekly status against the global benchmark
+        if 'is_weekly' in request.query_params or request.query_params.get('benchmark', 'global') != 'global':
+            return None
+
+        country_ids = self.get_cluster_country_ids(request)
+        if country_ids is None:
+            return None
+
+        return get_school_map_cluster_query(
+            self.envelope_to_bounds_sql(env), SCHOOL_MAP_CLUSTER_CONNECTIVITY, tile['zoom'], 'connectivity',
+            country_ids)
+
     def query_filters(self, request, table_configs):
+        school_table = table_configs['school_table']
         table_configs['limit_condition'] = 'LIMIT ' + request.query_params.get('limit', '50000')
 
         if (
@@ -326,24 +423,24 @@ class ConnectivityTileGenerator(BaseTileGenerator):
             'school_id__in' in request.query_params
         ):
             if 'school_id' in request.query_params:
-                table_configs['school_condition'] = f" AND schools_school.id = {request.query_params['school_id']}"
+                table_configs['school_condition'] = f" AND {school_table}.id = {request.query_params['school_id']}"
             elif 'school_id__in' in request.query_params:
                 school_ids = ','.join([c.strip() for c in request.query_params['school_id__in'].split(',')])
-                table_configs['school_condition'] = f" AND schools_school.id IN ({school_ids})"
+                table_configs['school_condition'] = f" AND {school_table}.id IN ({school_ids})"
 
             elif 'admin1_id' in request.query_params:
                 table_configs[
-                    'admin1_condition'] = f" AND schools_school.admin1_id = {request.query_params['admin1_id']}"
+                    'admin1_condition'] = f" AND {school_table}.admin1_id = {request.query_params['admin1_id']}"
             elif 'admin1_id__in' in request.query_params:
                 admin1_ids = ','.join([c.strip() for c in request.query_params['admin1_id__in'].split(',')])
-                table_configs['admin1_condition'] = f" AND schools_school.admin1_id IN ({admin1_ids})"
+                table_configs['admin1_condition'] = f" AND {school_table}.admin1_id IN ({admin1_ids})"
 
             elif 'country_id' in request.query_params:
                 table_configs[
-                    'country_condition'] = f" AND schools_school.country_id = {request.query_params['country_id']}"
+                    'country_condition'] = f" AND {school_table}.country_id = {request.query_params['country_id']}"
             elif 'country_id__in' in request.query_params:
                 country_ids = ','.join([c.strip() for c in request.query_params['country_id__in'].split(',')])
-                table_configs['country_condition'] = f" AND schools_school.country_id IN ({country_ids})"
+                table_configs['country_condition'] = f" AND {school_table}.country_id IN ({country_ids})"
 
         else:
             zoom_level = int(request.query_params.get('z', '0'))
@@ -352,7 +449,8 @@ class ConnectivityTileGenerator(BaseTileGenerator):
             elif zoom_level == 1:
                 table_configs['limit_condition'] = 'LIMIT ' + '30000'
 
-            table_configs['random_order'] = 'ORDER BY schools_school.giga_id_school ASC'
+            table_configs['zoom_condition'], table_configs['random_order'] = get_school_map_sampling(
+                zoom_level, school_table)
 
         if 'is_weekly' in request.query_params:
             is_weekly = request.query_params.get('is_weekly', 'true') == 'true'
@@ -361,7 +459,8 @@ class ConnectivityTileGenerator(BaseTileGenerator):
 
             end_date = date_utilities.to_date(request.query_params.get('end_date'),
                                               default=datetime.combine(datetime.now(), time.min))
-            table_configs['rt_date_condition'] = f" AND rt_status.rt_registration_date <= '{end_date}'"
+            table_configs['rt_date_condition'] = " AND {0}.rt_registration_date <= '{1}'".format(
+                table_configs['rt_table'], end_date)
 
             month_number = date_utilities.get_month_from_date(start_date)
             year_number = date_utilities.get_year_from_date(start_date)
@@ -385,8 +484,12 @@ class ConnectivityTileGenerator(BaseTileGenerator):
                     # If for any week of the month data is not available then pick last week number
                     week_number = week_numbers_for_month[-1]
 
-            table_configs['weekly_lookup_condition'] = (f'ON schools_school.id = c.school_id AND c.week={week_number} '
+            table_configs['weekly_lookup_condition'] = (f'ON {school_table}.id = c.school_id AND c.week={week_number} '
                                                         f'AND c.year={year_number}')
+            table_configs['weekly_lookup_join'] = 'LEFT JOIN connection_statistics_schoolweeklystatus c {0} {1}'.format(
+                table_configs['weekly_lookup_condition'], 'AND c."deleted" IS NULL')
+            table_configs['weekly_id'] = 'c.id'
+            table_configs['weekly_connectivity_speed'] = 'c.connectivity_speed'
 
         table_configs['benchmark'], table_configs['benchmark_unit'] = get_benchmark_value_for_default_download_layer(
             request.query_params.get('benchmark', 'global'),
@@ -397,11 +500,21 @@ class ConnectivityTileGenerator(BaseTileGenerator):
         tbl = self.table_config.copy()
         tbl['env'] = self.envelope_to_bounds_sql(env)
 
+        use_map_state = settings.ENABLE_SCHOOL_MAP_STATE
+        tbl['school_table'] = 'ms' if use_map_state else 'schools_school'
+        tbl['rt_table'] = 'ms' if use_map_state else 'rt_status'
+
+        # Speed of the last weekly status, stored in the map state unless a given week is requested
+        tbl['weekly_lookup_join'] = ''
+        tbl['weekly_id'] = 'ms.last_weekly_status_id'
+        tbl['weekly_connectivity_speed'] = 'ms.connectivity_speed'
+
         tbl['limit_condition'] = ''
         tbl['country_condition'] = ''
         tbl['admin1_condition'] = ''
         tbl['school_condition'] = ''
         tbl['weekly_lookup_condition'] = 'ON schools_school.last_weekly_status_id = c.id'
+        tbl['zoom_condition'] = ''
         tbl['random_order'] = ''
         tbl['rt_date_condition'] = ''
 
@@ -448,20 +561,60 @@ class ConnectivityTileGenerator(BaseTileGenerator):
             SELECT ST_AsMVT(DISTINCT mvtgeom.*) FROM mvtgeom;
         """
 
+        if use_map_state:
+            sql_tmpl = """
+            WITH bounds AS (
+                SELECT {env} AS geom,
+                {env}::box2d AS b2d
+            ),
+            mvtgeom AS (
+                SELECT ST_AsMVTGeom(ms.geometry, bounds.b2d) AS geom,
+                ms.id,
+                CASE WHEN {weekly_id} is NULL AND ms.is_rt_connected = True {rt_date_condition} THEN 'unknown'
+                    WHEN {weekly_id} is NULL THEN NULL
+                    WHEN {weekly_connectivity_speed} >  {benchmark} THEN 'good'
+                    WHEN {weekly_connectivity_speed} <= {benchmark} and {weekly_connectivity_speed} >= 1000000
+                        THEN 'moderate'
+                    WHEN {weekly_connectivity_speed} < 1000000  THEN 'bad'
+                    ELSE 'unknown'
+                END AS connectivity,
+                ms.connectivity_status,
+                CASE WHEN ms.is_rt_connected = True {rt_date_condition} THEN True
+                    ELSE False
+                END AS is_rt_connected
+                FROM connection_statistics_schoolmapstate ms
+                INNER JOIN bounds ON ST_Intersects(ms.geometry, bounds.geom)
+                {school_join}
+                {school_weekly_join}
+                {weekly_lookup_join}
+                WHERE TRUE
+                    {country_condition}
+                    {admin1_condition}
+                    {school_condition}
+                    {school_weekly_condition}
+                    {zoom_condition}
+                {random_order}
+                {limit_condition}
+            )
+            SELECT ST_AsMVT(DISTINCT mvtgeom.*) FROM mvtgeom;
+            """
+
+        tbl['school_join'] = ''
         tbl['school_weekly_join'] = ''
         tbl['school_weekly_condition'] = ''
 
         school_filters = core_utilities.get_filter_sql(request, 'schools', 'schools_school')
         if len(school_filters) > 0:
             tbl['school_condition'] += ' AND ' + school_filters
+            tbl['school_join'] = SCHOOL_MAP_STATE_SCHOOL_JOIN
 
         school_static_filters = core_utilities.get_filter_sql(request, 'school_static',
                                                               'connection_statistics_schoolweeklystatus')
         if len(school_static_filters) > 0:
             tbl['school_weekly_join'] = """
             LEFT OUTER JOIN connection_statistics_schoolweeklystatus
-                ON schools_school."last_weekly_status_id" = connection_statistics_schoolweeklystatus."id"
-            """
+                ON {0}."last_weekly_status_id" = connection_statistics_schoolweeklystatus."id"
+            """.format(tbl['school_table'])
             tbl['school_weekly_condition'] = 'AND ' + school_static_filters
 
         return sql_tmpl.format(**tbl)
@@ -503,19 +656,21 @@ class ConnectivityTileRequestHandler(APIView):
         request_path = remove_query_param(request.get_full_path(), 'cache')
         cache_key = self.get_cache_key()
 
-        response = None
         if use_cached_data:
-            response = cache_manager.get(cache_key)
+            cached_tile = cache_manager.get_bytes(cache_key)
+            if cached_tile:
+                compressed_tile, metadata = cached_tile
+                return compressed_tile_response(request, compressed_tile, content_type=metadata['content_type'])
 
-        if not response:
-            try:
-                response = self.tile_generator.generate_tile(request)
-
-                cache_manager.set(cache_key, response, request_path=request_path,
-                                  soft_timeout=settings.CACHE_CONTROL_MAX_AGE)
-            except Exception as ex:
-                logger.error('Exception occurred for school connectivity tiles endpoint: {}'.format(ex))
-                response = Response({'error': 'An error occurred while processing the request'}, status=500)
+        try:
+            response = self.tile_generator.generate_tile(request)
+            if response.status_code == rest_status.HTTP_200_OK:
+                cache_manager.set_bytes(cache_key, response.content, content_type=response['Content-Type'],
+                                        request_path=request_path, soft_timeout=settings.CACHE_CONTROL_MAX_AGE,
+                                        tags=get_request_cache_tags(self.CACHE_KEY_PREFIX, request))
+        except Exception as ex:
+            logger.error('Exception occurred for school connectivity tiles endpoint: {}'.format(ex))
+            response = Response({'error': 'An error occurred while processing the request'}, status=500)
 
         return response
 
@@ -525,6 +680,15 @@ class SchoolStatusConnectivityTileGenerator(BaseTileGenerator):
         super().__init__()
         self.table_config = table_config
 
+    def cluster_to_sql(self, tile, env, request):
+        country_ids = self.get_cluster_country_ids(request)
+        if country_ids is None:
+            return None
+
+        return get_school_map_cluster_query(
+            self.envelope_to_bounds_sql(env), SCHOOL_MAP_CLUSTER_CONNECTIVITY_STATUS, tile['zoom'],
+            'connectivity_status', country_ids)
+
     def update_kwargs(self, request, table_configs):
         query_params = request.query_params.dict()
         query_param_keys = query_params.keys()
@@ -557,8 +721,12 @@ class SchoolStatusConnectivityTileGenerator(BaseTileGenerator):
         tbl['country_condition'] = ''
         tbl['admin1_condition'] = ''
         tbl['school_condition'] = ''
+        tbl['zoom_condition'] = ''
         tbl['random_order'] = ''
 
+        use_map_state = settings.ENABLE_SCHOOL_MAP_STATE
+        school_table = 'ms' if use_map_state else 'schools_school'
+
         self.update_kwargs(request, tbl)
 
         """sql with join and connectivity_speed"""
@@ -588,6 +756,33 @@ class SchoolStatusConnectivityTileGenerator(BaseTileGenerator):
             SELECT ST_AsMVT(DISTINCT mvtgeom.*) FROM mvtgeom;
         """
 
+        if use_map_state:
+            sql_tmpl = """
+            WITH bounds AS (
+                SELECT {env} AS geom,
+                {env}::box2d AS b2d
+            ),
+            mvtgeom AS (
+                SELECT ST_AsMVTGeom(ms.geometry, bounds.b2d) AS geom,
+                ms.id,
+                ms.connectivity_status
+                FROM connection_statistics_schoolmapstate ms
+                INNER JOIN bounds ON ST_Intersects(ms.geometry, bounds.geom)
+                {school_join}
+                {school_weekly_join}
+                WHERE TRUE
+                    {country_condition}
+                    {admin1_condition}
+                    {school_condition}
+                    {school_weekly_condition}
+                    {zoom_condition}
+                    {random_order}
+                    {limit_condition}
+            )
+            SELECT ST_AsMVT(DISTINCT mvtgeom.*) FROM mvtgeom;
+            """
+
+        tbl['school_join'] = ''
         tbl['school_weekly_join'] = ''
         tbl['school_weekly_condition'] = ''
 
@@ -595,7 +790,8 @@ class SchoolStatusConnectivityTileGenerator(BaseTileGenerator):
 
         if len(tbl.get('school_ids', [])) > 0:
             add_random_condition = False
-            tbl['school_condition'] = 'AND schools_school."id" IN ({0})'.format(
+            tbl['school_condition'] = 'AND {0}."id" IN ({1})'.format(
+                school_table,
                 ','.join([str(school_id) for school_id in tbl['school_ids']])
             )
         elif len(tbl.get('admin1_ids', [])) > 0:
@@ -605,7 +801,8 @@ class SchoolStatusConnectivityTileGenerator(BaseTileGenerator):
             else:
                 add_random_condition = False
 
-            tbl['admin1_condition'] = 'AND schools_school."admin1_id" IN ({0})'.format(
+            tbl['admin1_condition'] = 'AND {0}."admin1_id" IN ({1})'.format(
+                school_table,
                 ','.join([str(admin1_id) for admin1_id in tbl['admin1_ids']])
             )
         elif len(tbl.get('country_ids', [])) > 0:
@@ -615,31 +812,36 @@ class SchoolStatusConnectivityTileGenerator(BaseTileGenerator):
             else:
                 add_random_condition = False
 
-            tbl['country_condition'] = 'AND schools_school."country_id" IN ({0})'.format(
+            tbl['country_condition'] = 'AND {0}."country_id" IN ({1})'.format(
+                school_table,
                 ','.join([str(country_id) for country_id in tbl['country_ids']])
             )
 
         if len(tbl['school_filters']) > 0:
             tbl['school_condition'] += ' AND ' + tbl['school_filters']
+            tbl['school_join'] = SCHOOL_MAP_STATE_SCHOOL_JOIN
 
         if len(tbl['school_static_filters']) > 0:
             tbl['school_weekly_join'] = """
             INNER JOIN "connection_statistics_schoolweeklystatus"
-                ON schools_school."last_weekly_status_id" = connection_statistics_schoolweeklystatus."id"
-            """
+                ON {0}."last_weekly_status_id" = connection_statistics_schoolweeklystatus."id"
+            """.format(school_table)
             tbl['school_weekly_condition'] = ' AND ' + tbl['school_static_filters']
 
         if add_random_condition:
+            zoom_level = int(request.query_params.get('z', '0'))
             if 'limit' in request.query_params:
                 limit = request.query_params['limit']
-                tbl['random_order'] = 'ORDER BY random()' if int(request.query_params.get('z', '0')) == 2 else ''
+                order_schools = zoom_level == 2
             elif tbl.get('MAP_API_SAMPLING_LIMIT'):
                 limit = tbl['MAP_API_SAMPLING_LIMIT']
-                tbl['random_order'] = 'ORDER BY random()'
+                order_schools = True
             else:
                 limit = '50000'
-                tbl['random_order'] = 'ORDER BY random()' if int(request.query_params.get('z', '0')) == 2 else ''
+                order_schools = zoom_level == 2
 
+            tbl['zoom_condition'], tbl['random_order'] = get_school_map_sampling(
+                zoom_level, school_table, order_schools=order_schools)
             tbl['limit_condition'] = 'LIMIT ' + str(limit)
 
         return sql_tmpl.format(**tbl)
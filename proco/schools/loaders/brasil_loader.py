@@ -7,6 +7,7 @@ from dateutil import parser as dateutil_parser
 from pytz import UTC
 
 from proco.connection_statistics.models import RealTimeConnectivity, SchoolWeeklyStatus
+from proco.connection_statistics.utils import mark_real_time_connectivity_dirty
 from proco.core.utils import is_blank_string
 from proco.locations.models import Country, CountryAdminMetadata
 from proco.schools.models import School
@@ -164,10 +165,12 @@ class BrasilSimnetLoader(object):
 
             if len(new_entries) == 5000:
                 RealTimeConnectivity.objects.bulk_create(new_entries)
+                mark_real_time_connectivity_dirty(new_entries)
                 new_entries = []
 
         if len(new_entries) > 0:
             RealTimeConnectivity.objects.bulk_create(new_entries)
+            mark_real_time_connectivity_dirty(new_entries)
 
 
 brasil_statistic_loader = BrasilSimnetLoader()
@@ -90,7 +90,8 @@ class School(TimeStampedModel):
     def __str__(self):
         return f'{self.country} - {self.admin1} - {self.name}'
 
-    def save(self, **kwargs):
+    def normalize_fields(self):
+        """Lower case copies of the searchable fields, also used by the bulk writes which skip save"""
         self.name_lower = str(self.name).lower()
         if self.education_level:
             self.education_level_lower = str(self.education_level).lower()
@@ -100,6 +101,9 @@ class School(TimeStampedModel):
             self.school_type_lower = str(self.school_type).lower()
 
         self.external_id = str(self.external_id).lower()
+
+    def save(self, **kwargs):
+        self.normalize_fields()
         super().save(**kwargs)
 
     def delete(self, *args, **kwargs):
@@ -8,11 +8,17 @@ from random import randint  # noqa
 from typing import List
 
 from celery import current_task
+from django.conf import settings
 from django.contrib.gis.geos import MultiPoint, Point
 from django.db import transaction
 
 from proco.background import utils as background_task_utilities
-from proco.connection_statistics.utils import update_country_data_source_by_csv_filename, update_country_weekly_status
+from proco.connection_statistics.utils import (
+    refresh_country_school_map,
+    update_country_data_source_by_csv_filename,
+    update_country_weekly_status,
+    update_school_status_summary,
+)
 from proco.core import utils as core_utilities
 from proco.locations.models import Country
 from proco.schools import utils as school_utilities
@@ -122,6 +128,9 @@ def process_loaded_file(pk: int, force: bool = False):
                 today_date = core_utilities.get_current_datetime_object().date()
                 update_country_weekly_status(imported_file.country, today_date)
                 update_country_data_source_by_csv_filename(imported_file)
+                if settings.ENABLE_STATISTICS_SUMMARY:
+                    update_school_status_summary(imported_file.country)
+                refresh_country_school_map(imported_file.country)
                 imported_file.country.invalidate_country_related_cache()
                 update_country_related_cache.delay(imported_file.country.code)
 
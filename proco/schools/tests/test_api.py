@@ -1,11 +1,19 @@
+from unittest.mock import patch
+
 from django.conf import settings
 from django.core.cache import cache
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import resolve, reverse
 from rest_framework import status
 
 from proco.connection_statistics.models import CountryWeeklyStatus
+from proco.accounts.tests import test_utils as accounts_test_utilities
 from proco.connection_statistics.tests.factories import SchoolWeeklyStatusFactory
+from proco.connection_statistics.utils import (
+    get_school_map_cluster_query,
+    refresh_school_map_clusters,
+    refresh_school_map_state,
+)
 from proco.custom_auth.tests import test_utils as test_utilities
 from proco.locations.tests.factories import Admin1Factory, CountryFactory
 from proco.schools.tests.factories import FileImportFactory, SchoolFactory
@@ -515,3 +523,187 @@ class SchoolsApiTestCase(TestAPIViewSetMixin, TestCase):
         )
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(ENABLE_SCHOOL_MAP_STATE=True)
+class SchoolsMapStateTilesApiTestCase(TestAPIViewSetMixin, TestCase):
+    databases = {'default', settings.READ_ONLY_DB_KEY, }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = CountryFactory()
+        cls.admin1_one = Admin1Factory(country=cls.country)
+
+        cls.school_one = SchoolFactory(country=cls.country, admin1=cls.admin1_one, school_type='public')
+        cls.school_two = SchoolFactory(country=cls.country, admin1=cls.admin1_one, school_type='private')
+
+        cls.school_weekly_one = SchoolWeeklyStatusFactory(
+            school=cls.school_one,
+            connectivity=True, connectivity_speed=3 * (10 ** 6),
+            coverage_availability=True, coverage_type='3g',
+            num_students=100,
+        )
+        cls.school_one.last_weekly_status = cls.school_weekly_one
+        cls.school_one.save()
+
+        accounts_test_utilities.publish_school_advance_filters()
+        refresh_school_map_state()
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def get_tile(self, view_name, query_params):
+        query_params.update({'z': '2', 'x': '1', 'y': '2.mvt'})
+        url, _, view = schools_url((), query_params, view_name=view_name)
+        return self.forced_auth_req('get', url, view=view)
+
+    def assert_pbf_tile(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+
+    def test_school_tiles_global_view(self):
+        self.assert_pbf_tile(self.get_tile('tiles-view', {}))
+
+    def test_school_tiles_country_view(self):
+        self.assert_pbf_tile(self.get_tile('tiles-view', {'country_id': self.country.id}))
+
+    def test_school_tiles_admin_view(self):
+        self.assert_pbf_tile(self.get_tile('tiles-view', {
+            'country_id': self.country.id,
+            'admin1_id': self.admin1_one.id,
+        }))
+
+    def test_school_tiles_school_filter(self):
+        self.assert_pbf_tile(self.get_tile('tiles-view', {
+            'country_id': self.country.id,
+            'school_type__iexact': 'public',
+        }))
+
+    def test_school_tiles_school_static_filter(self):
+        self.assert_pbf_tile(self.get_tile('tiles-view', {
+            'country_id': self.country.id,
+            'num_students__range': '10,1000',
+        }))
+
+    def test_connectivity_tiles_global_view(self):
+        self.assert_pbf_tile(self.get_tile('tiles-connectivity-view', {
+            'indicator': 'download',
+            'benchmark': 'global',
+            'start_date': '24-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'true',
+        }))
+
+    def test_connectivity_tiles_country_view(self):
+        self.assert_pbf_tile(self.get_tile('tiles-connectivity-view', {
+            'country_id': self.country.id,
+            'indicator': 'download',
+            'benchmark': 'global',
+            'start_date': '24-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'true',
+        }))
+
+    def test_connectivity_tiles_admin_view(self):
+        self.assert_pbf_tile(self.get_tile('tiles-connectivity-view', {
+            'country_id': self.country.id,
+            'admin1_id': self.admin1_one.id,
+            'indicator': 'download',
+            'benchmark': 'global',
+            'start_date': '24-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'true',
+        }))
+
+    def test_connectivity_tiles_month_view(self):
+        self.assert_pbf_tile(self.get_tile('tiles-connectivity-view', {
+            'country_id': self.country.id,
+            'indicator': 'download',
+            'benchmark': 'global',
+            'start_date': '01-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'false',
+        }))
+
+    def test_connectivity_tiles_school_filters(self):
+        self.assert_pbf_tile(self.get_tile('tiles-connectivity-view', {
+            'country_id': self.country.id,
+            'indicator': 'download',
+            'benchmark': 'global',
+            'start_date': '24-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'true',
+            'school_type__iexact': 'public',
+            'num_students__range': '10,1000',
+        }))
+
+    def test_school_connectivity_status_tiles_country_view(self):
+        self.assert_pbf_tile(self.get_tile('tiles-school-connectivity-status-view', {
+            'country_id': self.country.id,
+            'indicator': 'download',
+            'benchmark': 'global',
+            'start_date': '24-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'true',
+        }))
+
+    def test_school_connectivity_status_tiles_school_filters(self):
+        self.assert_pbf_tile(self.get_tile('tiles-school-connectivity-status-view', {
+            'country_id': self.country.id,
+            'indicator': 'download',
+            'benchmark': 'global',
+            'start_date': '24-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'true',
+            'school_type__iexact': 'public',
+            'num_students__range': '10,1000',
+        }))
+
+
+@override_settings(ENABLE_SCHOOL_MAP_STATE=True, ENABLE_SCHOOL_MAP_CLUSTERS=True, SCHOOL_MAP_CLUSTER_ZOOM=7)
+class SchoolsMapClusterTilesApiTestCase(SchoolsMapStateTilesApiTestCase):
+    """Runs the map state tile tests with the clusters on, the z=2 tiles are below the cluster zoom"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        refresh_school_map_clusters()
+
+    def get_cluster_tile(self, view_name, query_params):
+        with patch('proco.schools.api.get_school_map_cluster_query', wraps=get_school_map_cluster_query) as query:
+            response = self.get_tile(view_name, query_params)
+        self.assert_pbf_tile(response)
+        return query.called
+
+    def test_cluster_tiles(self):
+        self.assertTrue(self.get_cluster_tile('tiles-view', {}))
+        self.assertTrue(self.get_cluster_tile('tiles-view', {'country_id': self.country.id}))
+        self.assertTrue(self.get_cluster_tile('tiles-school-connectivity-status-view', {
+            'country_id': self.country.id,
+        }))
+        self.assertTrue(self.get_cluster_tile('tiles-connectivity-view', {
+            'country_id': self.country.id,
+            'indicator': 'download',
+            'benchmark': 'global',
+        }))
+
+    def test_cluster_tiles_fall_back_to_schools(self):
+        # Admin level and school filtered views are drawn with the schools, the clusters are per country
+        self.assertFalse(self.get_cluster_tile('tiles-view', {
+            'country_id': self.country.id,
+            'admin1_id': self.admin1_one.id,
+        }))
+        self.assertFalse(self.get_cluster_tile('tiles-view', {
+            'country_id': self.country.id,
+            'school_type__iexact': 'public',
+        }))
+        # The clusters hold the last weekly status, not the status of a selected week
+        self.assertFalse(self.get_cluster_tile('tiles-connectivity-view', {
+            'country_id': self.country.id,
+            'indicator': 'download',
+            'benchmark': 'global',
+            'start_date': '24-06-2024',
+            'end_date': '30-06-2024',
+            'is_weekly': 'true',
+        }))
@@ -69,6 +69,11 @@ def finalize_setup(sender, **kwargs):
             'args': (),
             'kwargs': {'today': False},
         },
+        'proco.utils.tasks.cleanup_tile_store': {
+            'task': 'proco.utils.tasks.cleanup_tile_store',
+            'schedule': crontab(hour=3, minute=30),
+            'args': (),
+        },
         'proco.utils.tasks.populate_school_registration_data': {
             'task': 'proco.utils.tasks.populate_school_registration_data',
             'schedule': crontab(hour=2, minute=40),
@@ -1,3 +1,6 @@
+import gzip
+import json
+import struct
 from functools import wraps
 
 from django.conf import settings
@@ -8,54 +11,273 @@ from django.utils.cache import add_never_cache_headers, patch_cache_control
 from proco.utils.tasks import update_cached_value
 
 
+CACHE_TAG_ALL = 'ALL'
+
+CACHE_TAG_SCOPES = ('country_id', 'country_code', 'layer_id')
+
+
+def get_cache_tag(family=None, scope=None, value=None):
+    """
+    get_cache_tag
+        Name of a cache tag: endpoint family (GLOBAL_STATS), scope (country_id_12) or scoped family
+        (DATA_LAYER_INFO_country_id_12).
+    """
+    if scope is None:
+        return family
+
+    scope_tag = '{0}_{1}'.format(scope, str(value).strip().lower())
+    if family is None:
+        return scope_tag
+    return '{0}_{1}'.format(family, scope_tag)
+
+
+def get_cache_tags(family, **scopes):
+    """
+    get_cache_tags
+        All the tags of a cache entry of the given endpoint family and scopes,
+        e.g. get_cache_tags('DATA_LAYER_MAP', layer_id=[1], country_id=[12, 14])
+    """
+    tags = [family]
+    for scope, values in scopes.items():
+        for value in values or []:
+            tags.append(get_cache_tag(scope=scope, value=value))
+            tags.append(get_cache_tag(family=family, scope=scope, value=value))
+    return list(dict.fromkeys(tags))
+
+
+def get_request_cache_tags(family, request, view_kwargs=None, **extra_scopes):
+    """
+    get_request_cache_tags
+        Cache tags of an API response: the endpoint family plus the country and layer scopes found in the
+        query parameters (country_id, country_id__in, ...) and in the URL kwargs of the view.
+    """
+    params = getattr(request, 'query_params', request.GET)
+    view_kwargs = view_kwargs or {}
+
+    scopes = {}
+    for scope in CACHE_TAG_SCOPES:
+        values = list(extra_scopes.get(scope, []))
+        if params.get(scope):
+            values.append(params[scope])
+        if params.get(scope + '__in'):
+            values.extend([value for value in params[scope + '__in'].split(',') if value.strip()])
+        if view_kwargs.get(scope) is not None:
+            values.append(view_kwargs[scope])
+        scopes[scope] = values
+
+    return get_cache_tags(family, **scopes)
+
+
 class SoftCacheManager(object):
+    """
+    SoftCacheManager
+        Cache entries are served even when they are expired or invalidated, and a background task refreshes
+        them by replaying the request path.
+
+        Invalidation is tag based: every entry records the generation of its tags at write time, invalidating
+        a tag bumps its generation counter and the entries written with an older generation are detected
+        when they are read. Soft invalidation marks them as stale, hard invalidation makes them a cache miss
+        and the entry is deleted by the read which detects it. Entries with a soft timeout are stored with a TTL of
+        SOFT_CACHE_TIMEOUT_FACTOR soft timeouts, so the invalidated entries which are never read again expire.
+
+        Refreshes are single-flight: a short-lived lock per key lets only the first reader of a stale entry queue
+        the refresh task, the lock is released when the refreshed value is written.
+    """
     CACHE_PREFIX = 'SOFT_CACHE'
 
+    REFRESH_QUEUED = 'refresh_queued'
+    REFRESH_DEDUPLICATED = 'refresh_deduplicated'
+
+    # Binary entries are stored as: magic + 4 bytes header length + JSON metadata header + gzip compressed payload
+    BYTES_MAGIC = b'SCB1'
+    BYTES_HEADER_LENGTH = struct.Struct('>I')
+
+    def _get_key(self, key):
+        return '{0}_{1}'.format(self.CACHE_PREFIX, key)
+
+    def _get_tag_keys(self, tag):
+        return '{0}__TAG__{1}'.format(self.CACHE_PREFIX, tag), '{0}__HARD_TAG__{1}'.format(self.CACHE_PREFIX, tag)
+
+    def get_tag_generations(self, tags):
+        """
+        get_tag_generations
+            Current (soft, hard) generation of each tag, read in one round trip.
+        """
+        tag_keys = {tag: self._get_tag_keys(tag) for tag in tags}
+        generations = cache.get_many([key for keys in tag_keys.values() for key in keys])
+        return {
+            tag: [generations.get(soft_key, 0), generations.get(hard_key, 0)]
+            for tag, (soft_key, hard_key) in tag_keys.items()
+        }
+
+    def _get_refresh_lock_key(self, key):
+        return '{0}__REFRESH_LOCK__{1}'.format(self.CACHE_PREFIX, key)
+
+    def _get_stats_key(self, counter):
+        return '{0}__STATS__{1}'.format(self.CACHE_PREFIX, counter)
+
+    def _incr(self, key):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # First increment of the counter, if another worker created it meanwhile increment it
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+
+    def get_refresh_stats(self):
+        """
+        get_refresh_stats
+            Number of refresh tasks queued for stale entries and of the refreshes skipped because one was
+            already in flight for the same key.
+        """
+        counters = (self.REFRESH_QUEUED, self.REFRESH_DEDUPLICATED)
+        values = cache.get_many([self._get_stats_key(counter) for counter in counters])
+        return {counter: values.get(self._get_stats_key(counter), 0) for counter in counters}
+
+    def invalidate_tags(self, tags, hard=False):
+        """
+        invalidate_tags
+            Invalidate all the entries which have any of the given tags with one counter bump per tag.
+        """
+        for tag in tags:
+            soft_key, hard_key = self._get_tag_keys(tag)
+            self._incr(hard_key if hard else soft_key)
+
+    def _get_entry_state(self, tag_generations):
+        """Return (stale, missing) of an entry from the tag generations recorded when it was written"""
+        tag_generations = tag_generations or {CACHE_TAG_ALL: [0, 0]}
+        current_generations = self.get_tag_generations(tag_generations.keys())
+
+        stale = missing = False
+        for tag, (soft_generation, hard_generation) in tag_generations.items():
+            current_soft_generation, current_hard_generation = current_generations[tag]
+            if current_hard_generation != hard_generation:
+                missing = True
+            elif current_soft_generation != soft_generation:
+                stale = True
+        return stale, missing
+
+    def _refresh_if_stale(self, key, metadata, stale):
+        if (
+            (metadata['expired_at'] and metadata['expired_at'] < timezone.now().timestamp())
+            or metadata.get('invalidated', True) or stale
+        ) and metadata.get('request_path', None):
+            # SET NX: only the reader which takes the lock queues the refresh, the others keep serving the stale value
+            if cache.add(self._get_refresh_lock_key(key), 1, settings.SOFT_CACHE_REFRESH_LOCK_TIMEOUT):
+                update_cached_value.delay(url=metadata['request_path'])
+                self._incr(self._get_stats_key(self.REFRESH_QUEUED))
+            else:
+                self._incr(self._get_stats_key(self.REFRESH_DEDUPLICATED))
+
     def get(self, key):
-        value = cache.get('{0}_{1}'.format(self.CACHE_PREFIX, key), None)
+        value = cache.get(self._get_key(key), None)
 
-        if value:
-            if (
-                (value['expired_at'] and value['expired_at'] < timezone.now().timestamp())
-                or value.get('invalidated', True)
-            ) and value.get('request_path', None):
-                update_cached_value.delay(url=value['request_path'])
+        if value and isinstance(value, dict):
+            stale, missing = self._get_entry_state(value.get('tags'))
+            if missing:
+                cache.delete(self._get_key(key))
+                return None
+
+            self._refresh_if_stale(key, value, stale)
             return value['value']
 
+    def get_bytes(self, key):
+        """
+        get_bytes
+            Read an entry written with set_bytes.
+
+        :return: tuple of gzip compressed payload and metadata dict, None if the key is not in the cache
+        """
+        value = cache.get(self._get_key(key), None)
+
+        if value and isinstance(value, bytes) and value.startswith(self.BYTES_MAGIC):
+            metadata, payload = self._unpack_bytes(value)
+            stale, missing = self._get_entry_state(metadata.get('tags'))
+            if missing:
+                cache.delete(self._get_key(key))
+                return None
+
+            self._refresh_if_stale(key, metadata, stale)
+            return payload, metadata
+
+    def _pack_bytes(self, metadata, payload):
+        header = json.dumps(metadata).encode('utf-8')
+        return self.BYTES_MAGIC + self.BYTES_HEADER_LENGTH.pack(len(header)) + header + payload
+
+    def _unpack_bytes(self, value):
+        header_start = len(self.BYTES_MAGIC) + self.BYTES_HEADER_LENGTH.size
+        header_length = self.BYTES_HEADER_LENGTH.unpack(value[len(self.BYTES_MAGIC):header_start])[0]
+        metadata = json.loads(value[header_start:header_start + header_length].decode('utf-8'))
+        return metadata, value[header_start + header_length:]
+
     def _invalidate(self, key):
         value = cache.get(key, None)
         if value:
-            value['invalidated'] = True
-            cache.set(key, value, None)
+            # Keep the expiry of the entry, None if it has none
+            timeout = cache.ttl(key)
+            if timeout == 0:
+                return
+
+            if isinstance(value, bytes) and value.startswith(self.BYTES_MAGIC):
+                metadata, payload = self._unpack_bytes(value)
+                metadata['invalidated'] = True
+                cache.set(key, self._pack_bytes(metadata, payload), timeout)
+            else:
+                value['invalidated'] = True
+                cache.set(key, value, timeout)
 
     def invalidate_many(self, keys, hard=False):
         for key in keys:
             self.invalidate(key, hard=hard)
 
     def invalidate(self, key='*', hard=False):
-        if hard:
-            if isinstance(key, str):
-                keys = cache.keys('{0}_{1}'.format(self.CACHE_PREFIX, key))
-                for key in keys:
-                    cache.delete(key)
-            elif isinstance(key, (list, tuple)):
-                for k in key:
-                    cache.delete(k)
-        else:
-            if isinstance(key, str):
-                keys = cache.keys('{0}_{1}'.format(self.CACHE_PREFIX, key))
-                for key in keys:
-                    self._invalidate(key)
-            elif isinstance(key, (list, tuple)):
-                self.invalidate_many(key)
-
-    def set(self, key, value, request_path=None, soft_timeout=settings.CACHES['default']['TIMEOUT']):
-        cache.set('{0}_{1}'.format(self.CACHE_PREFIX, key), {
-            'value': value,
+        """
+        invalidate
+            '*' invalidates every entry of the manager with one generation bump of the ALL tag.
+            Any other value is an exact cache key (or a list of keys) as passed to set.
+            Use invalidate_tags to invalidate a group of entries.
+        """
+        if key == '*':
+            self.invalidate_tags([CACHE_TAG_ALL], hard=hard)
+        elif isinstance(key, str):
+            if hard:
+                cache.delete(self._get_key(key))
+            else:
+                self._invalidate(self._get_key(key))
+        elif isinstance(key, (list, tuple)):
+            self.invalidate_many(key, hard=hard)
+
+    def _get_timeout(self, soft_timeout):
+        if soft_timeout:
+            return soft_timeout * settings.SOFT_CACHE_TIMEOUT_FACTOR
+        return None
+
+    def _get_metadata(self, request_path, soft_timeout, tags):
+        return {
             'invalidated': False,
             'request_path': request_path,
             'expired_at': (timezone.now().timestamp() + soft_timeout) if soft_timeout else None,
-        }, None)
+            'tags': self.get_tag_generations([CACHE_TAG_ALL] + list(tags or [])),
+        }
+
+    def set(self, key, value, request_path=None, soft_timeout=settings.CACHES['default']['TIMEOUT'], tags=None):
+        entry = self._get_metadata(request_path, soft_timeout, tags)
+        entry['value'] = value
+        cache.set(self._get_key(key), entry, self._get_timeout(soft_timeout))
+        cache.delete(self._get_refresh_lock_key(key))
+
+    def set_bytes(self, key, payload, content_type=None, request_path=None,
+                  soft_timeout=settings.CACHES['default']['TIMEOUT'], tags=None):
+        """
+        set_bytes
+            Store the raw bytes of a response (e.g. a vector tile) gzip compressed with a small metadata header,
+            instead of pickling the whole response object.
+        """
+        metadata = self._get_metadata(request_path, soft_timeout, tags)
+        metadata['content_type'] = content_type
+        cache.set(self._get_key(key), self._pack_bytes(metadata, gzip.compress(payload, compresslevel=6)),
+                  self._get_timeout(soft_timeout))
+        cache.delete(self._get_refresh_lock_key(key))
 
 
 cache_manager = SoftCacheManager()
@@ -0,0 +1,171 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.http import QueryDict
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory
+
+from proco.utils.dates import format_date
+from proco.utils.db_routers import THREAD_LOCAL
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+
+def refresh_cached_view(url, query_params=None):
+    """
+    refresh_cached_view
+        Rebuild the cache entry of a cached API view by calling the view function in process with cache=off.
+        Compared to replaying the URL through the test client, this skips the middleware stack and the response
+        rendering, only the read-only DB routing of CustomRequestDBRouterMiddleware is applied.
+
+    :return: unrendered response of the view
+    """
+    split_url = urlsplit(url)
+    params = QueryDict(split_url.query, mutable=True)
+    for param, value in (query_params or {}).items():
+        params[param] = value
+    params['cache'] = 'off'
+
+    match = resolve(split_url.path)
+    request = APIRequestFactory().get(split_url.path, params)
+
+    if match.url_name in settings.READ_ONLY_DATABASE_ALLOWED_REQUESTS:
+        THREAD_LOCAL.OVERRIDE_DB_FOR_READ = settings.READ_ONLY_DB_KEY
+
+    try:
+        return match.func(request, *match.args, **match.kwargs)
+    finally:
+        if hasattr(THREAD_LOCAL, 'OVERRIDE_DB_FOR_READ'):
+            del THREAD_LOCAL.OVERRIDE_DB_FOR_READ
+
+
+def int_param(value):
+    return str(int(value))
+
+
+def bool_param(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if str(value).lower() not in ('true', 'false'):
+        raise ValueError('expected true or false, got {0!r}'.format(value))
+    return str(value).lower()
+
+
+def date_param(value):
+    """date, datetime or a string in settings.DATE_FORMAT"""
+    if isinstance(value, (date, datetime)):
+        return format_date(value)
+    return datetime.strptime(str(value), settings.DATE_FORMAT).strftime(settings.DATE_FORMAT)
+
+
+class CachedComputation(object):
+    """
+    CachedComputation
+        Cacheable API computation: the view behind url_name with typed URL kwargs and query parameters,
+        given as {name: type} where the type validates a value and converts it to its URL text.
+    """
+
+    def __init__(self, url_name, url_kwargs=None, query_params=None):
+        self.url_name = url_name
+        self.url_kwargs = url_kwargs or {}
+        self.query_params = query_params or {}
+
+    def clean_params(self, params):
+        unknown_params = set(params) - set(self.url_kwargs) - set(self.query_params)
+        if unknown_params:
+            raise ValueError('Unknown parameters for "{0}": {1}'.format(self.url_name, sorted(unknown_params)))
+
+        missing_params = set(self.url_kwargs) - set(params)
+        if missing_params:
+            raise ValueError('Missing parameters for "{0}": {1}'.format(self.url_name, sorted(missing_params)))
+
+        cleaned_params = {}
+        for name, value in params.items():
+            if value is None:
+                continue
+
+            param_type = self.url_kwargs.get(name) or self.query_params[name]
+            try:
+                cleaned_params[name] = param_type(value)
+            except (TypeError, ValueError) as ex:
+                raise ValueError('Invalid value for parameter "{0}" of "{1}": {2}'.format(name, self.url_name, ex))
+        return cleaned_params
+
+    def run(self, **params):
+        params = self.clean_params(params)
+
+        url = reverse(self.url_name, kwargs={name: params[name] for name in self.url_kwargs})
+        return refresh_cached_view(url, query_params={
+            name: params[name]
+            for name in self.query_params
+            if name in params
+        })
+
+
+CACHED_COMPUTATIONS = {}
+
+
+def register_cached_computation(name, url_name, url_kwargs=None, query_params=None):
+    CACHED_COMPUTATIONS[name] = CachedComputation(url_name, url_kwargs=url_kwargs, query_params=query_params)
+
+
+CONNECTIVITY_STATS_PARAMS = {
+    'is_weekly': bool_param,
+    'start_date': date_param,
+    'end_date': date_param,
+    'benchmark': str,
+}
+
+register_cached_computation('countries_search', 'locations:search-countries-admin-schools')
+register_cached_computation('countries_list', 'locations:countries-list')
+register_cached_computation('country_detail', 'locations:countries-detail', url_kwargs={'pk': str})
+register_cached_computation('global_stats', 'connection_statistics:global-stat', query_params={'country_id': int_param})
+register_cached_computation('latest_week_and_month', 'connection_statistics:get-latest-week-and-month',
+                            query_params={'country_id': int_param, 'layer_id': int_param})
+register_cached_computation('published_advance_filters', 'accounts:list-published-advance-filters',
+                            url_kwargs={'status': str, 'country_id': int_param},
+                            query_params={'expand': str, 'ordering': str})
+register_cached_computation('global_connectivity_stats', 'connection_statistics:global-connectivity-stat',
+                            query_params=CONNECTIVITY_STATS_PARAMS)
+register_cached_computation('country_connectivity_stats', 'connection_statistics:country-connectivity-stat',
+                            query_params=dict(CONNECTIVITY_STATS_PARAMS, country_id=int_param, admin1_id=int_param))
+
+
+def run_cached_computation(name, **params):
+    return CACHED_COMPUTATIONS[name].run(**params)
+
+
+def run_cached_computations(jobs, max_workers=None):
+    """
+    run_cached_computations
+        Run a list of (name, params) computations, in a thread pool when more than one worker is configured.
+        Errors are logged per computation so one failing view does not stop the rest of the warming.
+
+    :return: number of failed computations
+    """
+    max_workers = settings.CACHE_WARMING_WORKERS if max_workers is None else max_workers
+
+    def _run(job, close_connections):
+        name, params = job
+        try:
+            run_cached_computation(name, **params)
+            return True
+        except Exception as ex:
+            logger.error('Failed to refresh the cached computation "{0}" with {1}: {2}'.format(name, params, ex))
+            return False
+        finally:
+            if close_connections:
+                # Each worker thread opens its own DB connections
+                connections.close_all()
+
+    if max_workers <= 1 or len(jobs) <= 1:
+        results = [_run(job, False) for job in jobs]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(lambda job: _run(job, True), jobs))
+
+    return results.count(False)
@@ -1,7 +1,7 @@
 from rest_framework.response import Response
 from rest_framework.utils.urls import remove_query_param
 
-from proco.utils.cache import cache_manager
+from proco.utils.cache import cache_manager, get_request_cache_tags
 
 
 class UseCachedDataMixin(object):
@@ -10,15 +10,21 @@ class UseCachedDataMixin(object):
     def use_cached_data(self):
         return self.request.query_params.get(self.CACHE_KEY, 'on').lower() in ['on', 'true']
 
+    def get_cache_tags(self, family):
+        return get_request_cache_tags(family, self.request, self.kwargs)
+
 
 class CachedListMixin(UseCachedDataMixin):
     LIST_CACHE_KEY_PREFIX = None
 
+    def get_list_cache_family(self):
+        return getattr(self.__class__, 'LIST_CACHE_KEY_PREFIX', self.__class__.__name__) or self.__class__.__name__
+
     def get_list_cache_key(self):
         params = dict(self.request.query_params)
         params.pop(self.CACHE_KEY, None)
         return '{0}_{1}'.format(
-            getattr(self.__class__, 'LIST_CACHE_KEY_PREFIX', self.__class__.__name__) or self.__class__.__name__,
+            self.get_list_cache_family(),
             '_'.join(map(lambda x: '{0}_{1}'.format(x[0], x[1]), sorted(params.items()))),
         )
 
@@ -26,7 +32,8 @@ class CachedListMixin(UseCachedDataMixin):
         cache_key = self.get_list_cache_key()
         response = super(CachedListMixin, self).list(request, *args, **kwargs)
         request_path = remove_query_param(request.get_full_path(), self.CACHE_KEY)
-        cache_manager.set(cache_key, response.data, request_path=request_path)
+        cache_manager.set(cache_key, response.data, request_path=request_path,
+                          tags=self.get_cache_tags(self.get_list_cache_family()))
         return response
 
     def list(self, request, *args, **kwargs):
@@ -43,9 +50,12 @@ class CachedListMixin(UseCachedDataMixin):
 class CachedRetrieveMixin(UseCachedDataMixin):
     RETRIEVE_CACHE_KEY_PREFIX = None
 
+    def get_retrieve_cache_family(self):
+        return getattr(self.__class__, 'RETRIEVE_CACHE_KEY_PREFIX', self.__class__.__name__) or self.__class__.__name__
+
     def get_retrieve_cache_key(self):
         return '{0}_{1}'.format(
-            getattr(self.__class__, 'RETRIEVE_CACHE_KEY_PREFIX', self.__class__.__name__) or self.__class__.__name__,
+            self.get_retrieve_cache_family(),
             '_'.join(map(lambda x: '{0}_{1}'.format(x[0], x[1]), sorted(self.kwargs.items()))),
         )
 
@@ -53,7 +63,8 @@ class CachedRetrieveMixin(UseCachedDataMixin):
         cache_key = self.get_retrieve_cache_key()
         response = super(CachedRetrieveMixin, self).retrieve(request, *args, **kwargs)
         request_path = remove_query_param(request.get_full_path(), self.CACHE_KEY)
-        cache_manager.set(cache_key, response.data, request_path=request_path)
+        cache_manager.set(cache_key, response.data, request_path=request_path,
+                          tags=self.get_cache_tags(self.get_retrieve_cache_family()))
         return response
 
     def retrieve(self, request, *args, **kwargs):
@@ -1,19 +1,17 @@
 import logging
 import uuid
 
-from celery import chain
 from celery import current_task
 from django.conf import settings
 from django.core.management import call_command
 from django.db.models import Q
 from django.db.models.functions.text import Lower
-from django.urls import reverse
-from rest_framework.test import APIClient
 
 from proco.background import utils as background_task_utilities
 from proco.core import db_utils as db_utilities
 from proco.core import utils as core_utilities
 from proco.taskapp import app
+from proco.utils.cached_computations import refresh_cached_view, run_cached_computations
 from proco.utils.dates import format_date
 
 logger = logging.getLogger('gigamaps.' + __name__)
@@ -21,12 +19,18 @@ logger = logging.getLogger('gigamaps.' + __name__)
 
 @app.task(soft_time_limit=10 * 60, time_limit=11 * 60)
 def update_cached_value(*args, url='', query_params=None, **kwargs):
-    client = APIClient()
-    if query_params:
-        query_params['cache'] = False
-        client.get(url, query_params, format='json')
-    else:
-        client.get(url, {'cache': False}, format='json')
+    refresh_cached_view(url, query_params=query_params)
+
+
+@app.task(soft_time_limit=60 * 60, time_limit=61 * 60)
+def warm_cached_computations(*args, jobs=None):
+    """
+    warm_cached_computations
+        Refresh a list of registered cached computations, [(name, params), ...], in a thread pool.
+    """
+    jobs = jobs or []
+    failed = run_cached_computations(jobs)
+    logger.info('Refreshed {0} cached computations, {1} failed.'.format(len(jobs) - failed, failed))
 
 
 @app.task(soft_time_limit=15 * 60, time_limit=15 * 60)
@@ -54,9 +58,11 @@ def update_all_cached_values(*args, clean_cache=False):
                 cache_manager.invalidate()
                 logger.info('Cache invalidation started. Maps will be updated in a few minutes.')
 
-        update_cached_value.delay(url=reverse('locations:search-countries-admin-schools'))
-        update_cached_value.delay(url=reverse('locations:countries-list'))
-        update_cached_value.delay(url=reverse('connection_statistics:global-stat'))
+        jobs = [
+            ('countries_search', {}),
+            ('countries_list', {}),
+            ('global_stats', {}),
+        ]
 
         # Get countries which has at least has 1 school
         countries = Country.objects.filter(id__in=list(
@@ -78,31 +84,24 @@ def update_all_cached_values(*args, clean_cache=False):
         }
 
         for country in countries:
-            country_wise_task_list = [
-                update_cached_value.s(
-                    url=reverse('locations:countries-detail', kwargs={'pk': country.code.lower()})
-                ),
-                update_cached_value.s(
-                    url=reverse('connection_statistics:global-stat'),
-                    query_params={'country_id': country.id},
-                ),
-                update_cached_value.s(
-                    url=reverse('accounts:list-published-advance-filters',
-                                kwargs={'status': 'PUBLISHED', 'country_id': country.id}),
-                    query_params={'expand': 'column_configuration', 'ordering': 'name'},
-                ),
-            ]
+            jobs.extend([
+                ('country_detail', {'pk': country.code.lower()}),
+                ('global_stats', {'country_id': country.id}),
+                ('published_advance_filters', {
+                    'status': 'PUBLISHED',
+                    'country_id': country.id,
+                    'expand': 'column_configuration',
+                    'ordering': 'name',
+                }),
+            ])
 
             if country_wise_default_layers.get(country.id, None):
-                country_wise_task_list.append(update_cached_value.s(
-                    url=reverse('connection_statistics:get-latest-week-and-month'),
-                    query_params={
-                        'country_id': country.id,
-                        'layer_id': country_wise_default_layers[country.id],
-                    },
-                ))
+                jobs.append(('latest_week_and_month', {
+                    'country_id': country.id,
+                    'layer_id': country_wise_default_layers[country.id],
+                }))
 
-            chain(country_wise_task_list).delay()
+        warm_cached_computations.delay(jobs=jobs)
 
         background_task_utilities.task_on_complete(task_instance)
     else:
@@ -113,24 +112,28 @@ def update_all_cached_values(*args, clean_cache=False):
 def update_country_related_cache(country_code):
     from proco.locations.models import Country
 
-    update_cached_value.delay(url=reverse('locations:search-countries-admin-schools'))
-    update_cached_value.delay(url=reverse('locations:countries-list'))
-    update_cached_value.delay(url=reverse('connection_statistics:global-stat'))
-    update_cached_value.delay(url=reverse('locations:countries-detail', kwargs={'pk': country_code.lower()}))
+    jobs = [
+        ('countries_search', {}),
+        ('countries_list', {}),
+        ('global_stats', {}),
+        ('country_detail', {'pk': country_code.lower()}),
+    ]
 
     country = Country.objects.annotate(
         code_lower=Lower('code'),
     ).filter(code_lower=country_code.lower()).first()
     if country:
-        update_cached_value.delay(
-            url=reverse('connection_statistics:global-stat'),
-            query_params={'country_id': country.id},
-        )
-        update_cached_value.delay(
-            url=reverse('accounts:list-published-advance-filters',
-                        kwargs={'status': 'PUBLISHED', 'country_id': country.id}),
-            query_params={'expand': 'column_configuration', 'ordering': 'name'},
-        ),
+        jobs.extend([
+            ('global_stats', {'country_id': country.id}),
+            ('published_advance_filters', {
+                'status': 'PUBLISHED',
+                'country_id': country.id,
+                'expand': 'column_configuration',
+                'ordering': 'name',
+            }),
+        ])
+
+    run_cached_computations(jobs)
 
 
 @app.task(soft_time_limit=4 * 60 * 60, time_limit=4 * 60 * 60)
@@ -195,6 +198,10 @@ def populate_school_registration_data():
             cmd_args = ['--reset', '-school_id={0}'.format(missing_school_id['school_id'])]
             call_command('populate_school_registration_data', *cmd_args)
 
+        if settings.ENABLE_SCHOOL_MAP_STATE:
+            # Daily full refresh, it also picks the RT registrations and the schools changed outside the publish flow
+            call_command('refresh_school_map_state')
+
         background_task_utilities.task_on_complete(task_instance)
     else:
         logger.error('Found running Job with "{0}" name so skipping current iteration'.format(task_key))
@@ -280,3 +287,100 @@ def populate_school_new_fields_task(start_school_id, end_school_id, country_id,
         background_task_utilities.task_on_complete(task_instance)
     else:
         logger.error('Found running Job with "{0}" name so skipping current iteration'.format(task_key))
+
+
+@app.task(soft_time_limit=4 * 60 * 60, time_limit=4 * 60 * 60)
+def warm_data_layer_map_tiles(*args, layer_type=None, layer_id=None):
+    """
+    warm_data_layer_map_tiles
+        Task which pre-renders the default map tiles of the published data layers up to
+        settings.TILE_STORE_MAX_ZOOM and writes them to the tile store, so cold map loads never hit the database.
+        Only the tiles which cover at least one school are rendered.
+
+        Frequency: After every live/static data update
+        Limit: 4 hours
+    """
+    from django.db import connections
+
+    from proco.accounts.api import DataLayerMapViewSet
+    from proco.accounts.models import DataLayer
+    from proco.utils.tiles import get_tile_store, mercator_extent_to_tile_range
+
+    tile_store = get_tile_store()
+    if not tile_store:
+        logger.info('Tile store is disabled, skipping the map tiles warming.')
+        return
+
+    task_key = 'warm_data_layer_map_tiles_status_{current_time}_{layer_type}_{layer_id}'.format(
+        current_time=format_date(core_utilities.get_current_datetime_object(), frmt='%d%m%Y_%H'),
+        layer_type=layer_type,
+        layer_id=layer_id,
+    )
+
+    task_id = current_task.request.id or str(uuid.uuid4())
+    task_instance = background_task_utilities.task_on_start(
+        task_id, task_key, 'Pre-render the data layer map tiles to the tile store')
+
+    if task_instance:
+        logger.debug('Not found running job: {}'.format(task_key))
+
+        with connections[settings.READ_ONLY_DB_KEY].cursor() as cursor:
+            cursor.execute("""
+            SELECT ST_XMin(extent), ST_YMin(extent), ST_XMax(extent), ST_YMax(extent)
+            FROM (
+                SELECT ST_Extent(ST_Transform("geopoint", 3857)) AS extent
+                FROM "schools_school"
+                WHERE "deleted" IS NULL AND "geopoint" IS NOT NULL
+            ) AS schools_extent
+            """)
+            extent = cursor.fetchone()
+
+        if not extent or extent[0] is None:
+            task_instance.info('No schools found, nothing to render')
+            background_task_utilities.task_on_complete(task_instance)
+            return
+
+        tile_ranges = {
+            zoom: mercator_extent_to_tile_range(extent, zoom)
+            for zoom in range(settings.TILE_STORE_MAX_ZOOM + 1)
+        }
+
+        data_layers = DataLayer.objects.filter(status=DataLayer.LAYER_STATUS_PUBLISHED)
+        if layer_type:
+            data_layers = data_layers.filter(type=layer_type)
+        if layer_id:
+            data_layers = data_layers.filter(id=layer_id)
+
+        for data_layer_instance in data_layers.order_by('id'):
+            try:
+                total_tiles = DataLayerMapViewSet.warm_tile_store(data_layer_instance, tile_ranges, tile_store)
+                task_instance.info('Rendered {0} tiles for data layer "{1}"'.format(
+                    total_tiles, data_layer_instance.id))
+            except Exception as ex:
+                logger.error('Failed to render the tiles for data layer "{0}": {1}'.format(
+                    data_layer_instance.id, ex))
+                task_instance.info('Failed to render the tiles for data layer "{0}"'.format(data_layer_instance.id))
+
+        background_task_utilities.task_on_complete(task_instance)
+    else:
+        logger.error('Found running Job with "{0}" name so skipping current iteration'.format(task_key))
+
+
+@app.task(soft_time_limit=60 * 60, time_limit=60 * 60)
+def cleanup_tile_store(*args):
+    """
+    cleanup_tile_store
+        Task which removes the expired tiles from the tile store, so the disk tile store does not keep the
+        tiles of every old layer generation and filter.
+
+        Frequency: Once in a day
+        Limit: 1 hour
+    """
+    from proco.utils.tiles import get_tile_store
+
+    tile_store = get_tile_store()
+    if not tile_store:
+        logger.info('Tile store is disabled, skipping the tile store cleanup.')
+        return
+
+    logger.info('Removed {0} expired entries from the tile store.'.format(tile_store.cleanup()))
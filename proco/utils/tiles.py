@@ -0,0 +1,203 @@
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+logger = logging.getLogger('gigamaps.' + __name__)
+
+TILE_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+# Width of world in EPSG:3857
+WORLD_MERCATOR_MAX = 20037508.3427892
+
+
+def get_filter_hash(params):
+    """
+    get_filter_hash
+        Stable short hash of the request parameters which select the content of a tile (country, dates, filters, ...)
+    """
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def mercator_extent_to_tile_range(extent, zoom):
+    """
+    mercator_extent_to_tile_range
+        Convert an EPSG:3857 extent (xmin, ymin, xmax, ymax) to the (min_x, min_y, max_x, max_y) XYZ tile range
+        which covers it on the given zoom level.
+    """
+    xmin, ymin, xmax, ymax = extent
+    world_tile_size = 2 ** zoom
+    tile_size = (2 * WORLD_MERCATOR_MAX) / world_tile_size
+
+    def _clamp(value):
+        return min(max(int(math.floor(value)), 0), world_tile_size - 1)
+
+    # XYZ tile coordinates are in "image space" so origin is top-left
+    return (
+        _clamp((xmin + WORLD_MERCATOR_MAX) / tile_size),
+        _clamp((WORLD_MERCATOR_MAX - ymax) / tile_size),
+        _clamp((xmax + WORLD_MERCATOR_MAX) / tile_size),
+        _clamp((WORLD_MERCATOR_MAX - ymin) / tile_size),
+    )
+
+
+def compressed_tile_response(request, compressed_tile, content_type=None):
+    """
+    compressed_tile_response
+        Build the tile response from the gzip compressed PBF bytes. Clients which accept gzip get the stored bytes
+        as they are, others get the decompressed tile. Both responses vary on Accept-Encoding.
+    """
+    content_type = content_type or TILE_CONTENT_TYPE
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = HttpResponse(compressed_tile, content_type=content_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(compressed_tile), content_type=content_type)
+    # The body depends on Accept-Encoding, so shared caches must not serve one variant for the other
+    patch_vary_headers(response, ['Accept-Encoding'])
+    response['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+class BaseTileStore(object):
+    """
+    BaseTileStore
+        Store of pre-rendered vector tiles keyed by (layer, z, x, y, filter hash).
+        Tiles are kept as gzip compressed PBF bytes so they can be written to the response without any work.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def get(self, layer, z, x, y, filter_hash):
+        raise NotImplementedError('get must be implemented in the subclass.')
+
+    def set_compressed(self, layer, z, x, y, filter_hash, compressed_tile):
+        raise NotImplementedError('set_compressed must be implemented in the subclass.')
+
+    def set(self, layer, z, x, y, filter_hash, tile):
+        compressed_tile = gzip.compress(tile, compresslevel=6)
+        self.set_compressed(layer, z, x, y, filter_hash, compressed_tile)
+        return compressed_tile
+
+    def cleanup(self):
+        """
+        cleanup
+            Remove the expired tiles from the store and return the number of removed entries.
+            Nothing to do by default as the backend expires the entries itself.
+        """
+        return 0
+
+
+class RedisTileStore(BaseTileStore):
+    CACHE_PREFIX = 'TILE_STORE'
+
+    def get_key(self, layer, z, x, y, filter_hash):
+        return '{0}_{1}_{2}_{3}_{4}_{5}'.format(self.CACHE_PREFIX, layer, filter_hash, z, x, y)
+
+    def get(self, layer, z, x, y, filter_hash):
+        return cache.get(self.get_key(layer, z, x, y, filter_hash), None)
+
+    def set_compressed(self, layer, z, x, y, filter_hash, compressed_tile):
+        cache.set(self.get_key(layer, z, x, y, filter_hash), compressed_tile, self.timeout)
+
+
+class FileSystemTileStore(BaseTileStore):
+    FILE_EXTENSION = '.pbf.gz'
+
+    def __init__(self, directory, timeout=None):
+        super().__init__(timeout=timeout)
+        self.directory = directory
+
+    def get_path(self, layer, z, x, y, filter_hash):
+        return os.path.join(self.directory, str(layer), filter_hash, str(z), str(x), str(y) + self.FILE_EXTENSION)
+
+    def get(self, layer, z, x, y, filter_hash):
+        path = self.get_path(layer, z, x, y, filter_hash)
+        try:
+            if self.timeout and os.path.getmtime(path) + self.timeout < time.time():
+                return None
+
+            with open(path, 'rb') as tile_file:
+                return tile_file.read()
+        except OSError:
+            return None
+
+    def set_compressed(self, layer, z, x, y, filter_hash, compressed_tile):
+        path = self.get_path(layer, z, x, y, filter_hash)
+        tile_directory = os.path.dirname(path)
+        os.makedirs(tile_directory, exist_ok=True)
+
+        # Write to a temporary file first so readers never see a partially written tile
+        file_descriptor, temp_path = tempfile.mkstemp(dir=tile_directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as tile_file:
+                tile_file.write(compressed_tile)
+            os.replace(temp_path, path)
+        except OSError as ex:
+            logger.error('Failed to write the tile "{0}": {1}'.format(path, ex))
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def cleanup(self):
+        """
+        cleanup
+            Remove the <layer>/<filter hash> directories which have no tile written within the timeout.
+            Invalidating a layer moves it to a new filter hash, so the old directories are never read again.
+        """
+        if not self.timeout or not os.path.isdir(self.directory):
+            return 0
+
+        expiry_time = time.time() - self.timeout
+        removed_directories = 0
+
+        for layer in os.listdir(self.directory):
+            layer_directory = os.path.join(self.directory, layer)
+            if not os.path.isdir(layer_directory):
+                continue
+
+            for filter_hash in os.listdir(layer_directory):
+                hash_directory = os.path.join(layer_directory, filter_hash)
+                if not os.path.isdir(hash_directory):
+                    continue
+
+                last_write_time = os.path.getmtime(hash_directory)
+                for root, _, file_names in os.walk(hash_directory):
+                    for file_name in file_names:
+                        try:
+                            last_write_time = max(last_write_time, os.path.getmtime(os.path.join(root, file_name)))
+                        except OSError:
+                            continue
+
+                if last_write_time < expiry_time:
+                    shutil.rmtree(hash_directory, ignore_errors=True)
+                    removed_directories += 1
+
+            if not os.listdir(layer_directory):
+                shutil.rmtree(layer_directory, ignore_errors=True)
+
+        return removed_directories
+
+
+def get_tile_store():
+    """
+    get_tile_store
+        Tile store configured with settings.TILE_STORE_BACKEND, None if the tile store is disabled.
+    """
+    backend = (settings.TILE_STORE_BACKEND or '').lower()
+
+    if backend == 'redis':
+        return RedisTileStore(timeout=settings.TILE_STORE_TIMEOUT)
+    elif backend == 'disk':
+        return FileSystemTileStore(settings.TILE_STORE_DIRECTORY, timeout=settings.TILE_STORE_TIMEOUT)
+    return None